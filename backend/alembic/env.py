@@ -27,12 +27,15 @@ from app.db.database import get_database_url
 # access to the values within the .ini file in use.
 config = context.config
 
-# Set database URL from app settings
-config.set_main_option("sqlalchemy.url", get_database_url())
+# Set database URL from app settings, unless the caller already provided one
+# (run_alembic_migrations() passes the URL of the engine being initialized)
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", get_database_url())
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Skipped when the application runs
+# migrations at startup, so its own logging configuration is kept.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -109,8 +112,19 @@ def run_migrations_online() -> None:
     - Async mode is only used when explicitly needed (not for CLI)
 
     This ensures 'alembic upgrade head' works from CLI without issues.
+
+    PostgreSQL URLs use the asyncpg driver (no sync driver is installed),
+    so they are migrated on an async engine in a fresh event loop. Callers
+    inside a running loop (run_alembic_migrations) invoke Alembic from a
+    worker thread, where asyncio.run() is safe.
     """
-    # Always run synchronously to avoid async/sync URL mismatch issues
+    url = config.get_main_option("sqlalchemy.url")
+
+    if "+asyncpg://" in url:
+        asyncio.run(run_async_migrations())
+        return
+
+    # SQLite: run synchronously to avoid async/sync URL mismatch issues
     # The app's database URL may be async (sqlite+aiosqlite) but we convert
     # it to sync (sqlite) in run_migrations_sync() for compatibility
     run_migrations_sync()
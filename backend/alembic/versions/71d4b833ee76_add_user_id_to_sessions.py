@@ -44,10 +44,9 @@ def upgrade() -> None:
     """
     conn = op.get_bind()
 
-    # Check if user_id column already exists
-    result = conn.execute(text("PRAGMA table_info(sessions)"))
-    columns = result.fetchall()
-    column_names = [col[1] for col in columns]  # col[1] is column name
+    # Check if user_id column already exists (inspector works on every dialect)
+    inspector = sa.inspect(conn)
+    column_names = [col['name'] for col in inspector.get_columns('sessions')]
 
     if 'user_id' not in column_names:
         # Column doesn't exist, add it
@@ -70,6 +69,8 @@ def upgrade() -> None:
             conn.execute(text("DELETE FROM sessions WHERE user_id IS NULL"))
 
         # Make user_id non-nullable by recreating table
+        # (only pre-Alembic SQLite databases reach this branch; PostgreSQL
+        # deployments always start from the base migration, which has user_id)
         op.execute("""
             CREATE TABLE sessions_new (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -98,9 +99,7 @@ def upgrade() -> None:
     else:
         # Column already exists, just ensure it's properly configured
         # Check if it has the right constraints and indexes
-        result = conn.execute(text("PRAGMA index_list(sessions)"))
-        indexes = result.fetchall()
-        index_names = [idx[1] for idx in indexes]
+        index_names = [idx['name'] for idx in inspector.get_indexes('sessions')]
 
         if 'idx_sessions_user_id' not in index_names:
             op.create_index('idx_sessions_user_id', 'sessions', ['user_id'])
@@ -0,0 +1,76 @@
+"""add_user_id_to_processed_images
+
+Revision ID: b7e2f4a91c03
+Revises: 71d4b833ee76
+Create Date: 2026-10-19 10:00:00.000000
+
+This migration denormalizes the image owner onto processed_images so the
+history endpoint can page through a user's images without joining sessions.
+
+Strategy:
+1. Add user_id column as nullable
+2. Backfill user_id from the owning session
+3. Make user_id non-nullable and add the foreign key to users
+   (batch mode: SQLite rebuilds the table, other dialects use ALTER TABLE)
+4. Add the (user_id, created_at DESC, id DESC) history index
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a91c03'
+down_revision: Union[str, Sequence[str], None] = '71d4b833ee76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: Add user_id column and history index to processed_images."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    column_names = [col['name'] for col in inspector.get_columns('processed_images')]
+
+    if 'user_id' not in column_names:
+        op.add_column('processed_images', sa.Column('user_id', sa.Integer(), nullable=True))
+
+        # Backfill from the owning session (portable correlated subquery)
+        conn.execute(text("""
+            UPDATE processed_images
+            SET user_id = (
+                SELECT sessions.user_id FROM sessions
+                WHERE sessions.id = processed_images.session_id
+            )
+            WHERE user_id IS NULL
+        """))
+
+        # Images whose session no longer exists cannot be attributed
+        conn.execute(text("DELETE FROM processed_images WHERE user_id IS NULL"))
+
+        with op.batch_alter_table('processed_images') as batch_op:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(
+                'fk_processed_images_user_id', 'users', ['user_id'], ['id'], ondelete='CASCADE'
+            )
+
+    index_names = [idx['name'] for idx in sa.inspect(conn).get_indexes('processed_images')]
+
+    if 'idx_processed_images_user_created' not in index_names:
+        op.create_index(
+            'idx_processed_images_user_created',
+            'processed_images',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema: Remove user_id column from processed_images."""
+    op.drop_index('idx_processed_images_user_created', table_name='processed_images')
+
+    with op.batch_alter_table('processed_images') as batch_op:
+        batch_op.drop_constraint('fk_processed_images_user_id', type_='foreignkey')
+        batch_op.drop_column('user_id')
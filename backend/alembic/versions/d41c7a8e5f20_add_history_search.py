@@ -0,0 +1,101 @@
+"""add_history_search
+
+Revision ID: d41c7a8e5f20
+Revises: b7e2f4a91c03
+Create Date: 2026-10-19 11:00:00.000000
+
+This migration supports server-side history filtering:
+
+1. (user_id, model_id, created_at DESC, id DESC) index for the model filter
+2. (session_id, created_at DESC, id DESC) index for the session filter
+3. SQLite only: an external-content FTS5 table over original_filename, kept in
+   sync by INSERT/DELETE/UPDATE triggers and populated from existing rows.
+   Other dialects search filenames with ILIKE instead.
+
+The FTS DDL is repeated here (rather than imported from app.db.models) so the
+migration keeps working if the model module changes later.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c7a8e5f20'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f4a91c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS processed_images_fts USING fts5(
+        original_filename,
+        content='processed_images',
+        content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS processed_images_fts_ai AFTER INSERT ON processed_images BEGIN
+        INSERT INTO processed_images_fts(rowid, original_filename)
+        VALUES (new.id, new.original_filename);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS processed_images_fts_ad AFTER DELETE ON processed_images BEGIN
+        INSERT INTO processed_images_fts(processed_images_fts, rowid, original_filename)
+        VALUES ('delete', old.id, old.original_filename);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS processed_images_fts_au
+    AFTER UPDATE OF original_filename ON processed_images BEGIN
+        INSERT INTO processed_images_fts(processed_images_fts, rowid, original_filename)
+        VALUES ('delete', old.id, old.original_filename);
+        INSERT INTO processed_images_fts(rowid, original_filename)
+        VALUES (new.id, new.original_filename);
+    END
+    """,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema: Add history filter indexes and the filename FTS index."""
+    conn = op.get_bind()
+
+    index_names = [idx['name'] for idx in sa.inspect(conn).get_indexes('processed_images')]
+
+    if 'idx_processed_images_user_model_created' not in index_names:
+        op.create_index(
+            'idx_processed_images_user_model_created',
+            'processed_images',
+            ['user_id', 'model_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        )
+
+    if 'idx_processed_images_session_created' not in index_names:
+        op.create_index(
+            'idx_processed_images_session_created',
+            'processed_images',
+            ['session_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        )
+
+    if conn.dialect.name == 'sqlite':
+        for statement in FTS_DDL:
+            op.execute(statement)
+        # Index rows that existed before the triggers
+        op.execute("INSERT INTO processed_images_fts(processed_images_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema: Remove history filter indexes and the filename FTS index."""
+    conn = op.get_bind()
+
+    if conn.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS processed_images_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS processed_images_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS processed_images_fts_ai")
+        op.execute("DROP TABLE IF EXISTS processed_images_fts")
+
+    op.drop_index('idx_processed_images_session_created', table_name='processed_images')
+    op.drop_index('idx_processed_images_user_model_created', table_name='processed_images')
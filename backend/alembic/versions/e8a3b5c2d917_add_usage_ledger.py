@@ -0,0 +1,69 @@
+"""add_usage_ledger
+
+Revision ID: e8a3b5c2d917
+Revises: d41c7a8e5f20
+Create Date: 2026-10-19 12:00:00.000000
+
+This migration adds the per-user usage ledger used for quota checks:
+
+1. processed_images.storage_bytes: bytes stored on disk per image
+   (existing rows start at 0; their files were never measured)
+2. user_usage: one row per user with image count, storage bytes and the
+   provider call counter for the current UTC day
+3. Backfill user_usage from processed_images
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3b5c2d917'
+down_revision: Union[str, Sequence[str], None] = 'd41c7a8e5f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: Add storage_bytes and the user_usage ledger."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    column_names = [col['name'] for col in inspector.get_columns('processed_images')]
+    if 'storage_bytes' not in column_names:
+        op.add_column(
+            'processed_images',
+            sa.Column('storage_bytes', sa.BigInteger(), nullable=False, server_default='0'),
+        )
+
+    if not inspector.has_table('user_usage'):
+        op.create_table(
+            'user_usage',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('image_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('storage_bytes', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('provider_calls_day', sa.Date(), nullable=True),
+            sa.Column('provider_calls_today', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id')
+        )
+
+        # Seed the ledger from existing images
+        op.execute("""
+            INSERT INTO user_usage (user_id, image_count, storage_bytes, provider_calls_today, updated_at)
+            SELECT user_id, COUNT(*), COALESCE(SUM(storage_bytes), 0), 0, CURRENT_TIMESTAMP
+            FROM processed_images
+            GROUP BY user_id
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema: Remove the user_usage ledger and storage_bytes."""
+    op.drop_table('user_usage')
+
+    # Plain ALTER TABLE (not batch mode): rebuilding processed_images on SQLite
+    # would drop the FTS triggers created by d41c7a8e5f20
+    op.drop_column('processed_images', 'storage_bytes')
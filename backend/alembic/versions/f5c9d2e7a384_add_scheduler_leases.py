@@ -0,0 +1,44 @@
+"""add_scheduler_leases
+
+Revision ID: f5c9d2e7a384
+Revises: e8a3b5c2d917
+Create Date: 2026-10-19 14:00:00.000000
+
+This migration adds the lease table used to elect one worker process to
+run the cluster-wide scheduled jobs:
+
+1. scheduler_leases: one row per lease name with its current holder and
+   expiry time; rows are created by the first worker that asks for a lease
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c9d2e7a384'
+down_revision: Union[str, Sequence[str], None] = 'e8a3b5c2d917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema: Add the scheduler_leases table."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if not inspector.has_table('scheduler_leases'):
+        op.create_table(
+            'scheduler_leases',
+            sa.Column('name', sa.String(length=64), nullable=False),
+            sa.Column('holder', sa.String(length=255), nullable=False),
+            sa.Column('acquired_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema: Remove the scheduler_leases table."""
+    op.drop_table('scheduler_leases')
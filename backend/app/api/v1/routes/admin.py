@@ -4,25 +4,52 @@ Admin routes for user management.
 This module provides admin-only endpoints for managing users.
 Only users with 'admin' role can access these endpoints.
 """
+import asyncio
 import logging
-from typing import Optional
+import os
+import time
+from typing import Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.v1.schemas.config import ConfigReloadStatus
+from app.api.v1.schemas.memory import MemoryDiffResponse, MemorySnapshotResponse, MemoryStatus
+from app.api.v1.schemas.provider import (
+    CircuitBreakerResponse,
+    HedgingResponse,
+    ProviderConcurrencyResponse,
+)
 from app.api.v1.schemas.user import (
     PasswordReset,
+    UsageListResponse,
+    UsageReconcileResponse,
     UserCreate,
     UserListResponse,
     UserResponse,
     UserUpdate,
+    UserUsageResponse,
 )
 from app.core.authorization import require_admin
+from app.core.config import get_settings
 from app.core.security import get_password_hash
 from app.db.database import get_db
-from app.db.models import User
+from app.db.models import User, UserUsage
+from app.services.circuit_breaker import get_circuit_breakers
+from app.services.config_reloader import ConfigReloadError, get_config_reloader
+from app.services.hedging import get_hedging
+from app.services.memory_profiler import (
+    MemoryProfiler,
+    TracingNotStartedError,
+    UnknownSnapshotError,
+    get_memory_profiler,
+)
+from app.services.profiler import ProfilerBusyError, profile_cpu
+from app.services.provider_governor import get_provider_governor
+from app.services.usage_ledger import get_usage, reconcile_usage, utc_today
 
 logger = logging.getLogger(__name__)
 
@@ -400,3 +427,591 @@ async def reset_user_password(
     logger.info(f"Password reset for user {user.username} (ID: {user.id}) by admin")
 
     return UserResponse.model_validate(user)
+
+
+def _usage_response(usage: UserUsage) -> UserUsageResponse:
+    """Build a usage response, reporting today's provider calls only."""
+    return UserUsageResponse(
+        user_id=usage.user_id,
+        image_count=usage.image_count,
+        storage_bytes=usage.storage_bytes,
+        provider_calls_today=usage.calls_on(utc_today()),
+        updated_at=usage.updated_at,
+        reconciled_at=usage.reconciled_at,
+    )
+
+
+@router.get(
+    "/usage",
+    response_model=UsageListResponse,
+    summary="List usage for all users (Admin only)",
+    description="""
+    List per-user usage (stored images, storage bytes, provider calls today)
+    from the usage ledger, largest storage first. Only accessible to admin users.
+    """,
+)
+async def list_usage(
+    skip: int = Query(0, ge=0, description="Number of entries to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of entries to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin),
+) -> UsageListResponse:
+    """
+    List usage ledger entries (admin only).
+
+    Args:
+        skip: Number of entries to skip (pagination)
+        limit: Maximum number of entries to return
+        db: Database session
+        current_user: Current admin user
+
+    Returns:
+        Usage entries with total count
+    """
+    total = (await db.execute(select(func.count(UserUsage.user_id)))).scalar()
+
+    result = await db.execute(
+        select(UserUsage)
+        .order_by(UserUsage.storage_bytes.desc(), UserUsage.user_id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+    return UsageListResponse(
+        usage=[_usage_response(usage) for usage in result.scalars().all()],
+        total=total,
+    )
+
+
+@router.get(
+    "/users/{user_id}/usage",
+    response_model=UserUsageResponse,
+    summary="Get user usage (Admin only)",
+    description="Get a user's usage ledger entry. Only accessible to admin users.",
+)
+async def get_user_usage(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin),
+) -> UserUsageResponse:
+    """
+    Get usage for one user (admin only).
+
+    Args:
+        user_id: User ID
+        db: Database session
+        current_user: Current admin user
+
+    Returns:
+        Usage information (zeros if the user has no recorded usage yet)
+
+    Raises:
+        HTTPException 404: If user not found
+    """
+    usage = await get_usage(db, user_id)
+    if usage is not None:
+        return _usage_response(usage)
+
+    result = await db.execute(select(User.id).where(User.id == user_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with ID {user_id} not found",
+        )
+
+    return UserUsageResponse(
+        user_id=user_id,
+        image_count=0,
+        storage_bytes=0,
+        provider_calls_today=0,
+        updated_at=None,
+        reconciled_at=None,
+    )
+
+
+@router.post(
+    "/usage/reconcile",
+    response_model=UsageReconcileResponse,
+    summary="Reconcile usage ledger (Admin only)",
+    description="""
+    Recompute stored image counts and sizes from processed images and correct
+    any ledger drift. Runs automatically on a schedule; this triggers it now.
+    """,
+)
+async def reconcile_usage_ledger(
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_admin),
+) -> UsageReconcileResponse:
+    """
+    Reconcile the usage ledger (admin only).
+
+    Args:
+        db: Database session
+        current_user: Current admin user
+
+    Returns:
+        Number of corrected ledger rows
+    """
+    logger.info(f"Admin {current_user['username']} reconciling usage ledger")
+
+    corrected = await reconcile_usage(db)
+
+    return UsageReconcileResponse(corrected=corrected)
+
+
+@router.get(
+    "/providers/concurrency",
+    response_model=ProviderConcurrencyResponse,
+    summary="Provider concurrency and queue wait (Admin only)",
+    description="""
+    Current in-flight limits (which shrink on provider rate limits and recover
+    on success), running and queued calls, and queue wait time statistics for
+    each AI provider. Values are for the worker process serving the request.
+    """,
+)
+async def get_provider_concurrency(
+    current_user: dict = Depends(require_admin),
+) -> ProviderConcurrencyResponse:
+    """
+    Get provider concurrency governor state (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Per-provider limits, load and queue wait statistics
+    """
+    return ProviderConcurrencyResponse(providers=get_provider_governor().snapshot())
+
+
+@router.get(
+    "/providers/circuits",
+    response_model=CircuitBreakerResponse,
+    summary="Provider and model circuit breakers (Admin only)",
+    description="""
+    Circuit breaker state of every provider and model that has been called:
+    consecutive failures, how often each breaker opened, when the next request
+    will be let through and the last counted error. Values are for the worker
+    process serving the request.
+    """,
+)
+async def get_circuit_breaker_status(
+    current_user: dict = Depends(require_admin),
+) -> CircuitBreakerResponse:
+    """
+    Get circuit breaker state (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Breaker state per provider and per model
+    """
+    return CircuitBreakerResponse(**get_circuit_breakers().snapshot())
+
+
+@router.get(
+    "/providers/hedging",
+    response_model=HedgingResponse,
+    summary="Hedged request statistics (Admin only)",
+    description="""
+    For every hedged primary model: requests, how many were hedged to the
+    secondary model and how many of those the secondary won, hedges skipped
+    by the rate cap or an open circuit, and the provider calls and seconds
+    wasted on losing calls. Values are for the worker process serving the
+    request.
+    """,
+)
+async def get_hedging_status(
+    current_user: dict = Depends(require_admin),
+) -> HedgingResponse:
+    """
+    Get hedging statistics (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Hedging statistics per primary model
+    """
+    return HedgingResponse(**get_hedging().snapshot())
+
+
+@router.get(
+    "/config/reload",
+    response_model=ConfigReloadStatus,
+    summary="Configuration reload status (Admin only)",
+    description="""
+    Whether the configuration files are watched, how many configurations have
+    been applied since startup, the last rejected reload and changed settings
+    that need a restart. Values are for the worker process serving the request.
+    """,
+)
+async def get_config_reload_status(
+    current_user: dict = Depends(require_admin),
+) -> ConfigReloadStatus:
+    """
+    Get the configuration reload status (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Reload status
+    """
+    return ConfigReloadStatus(**get_config_reloader().snapshot())
+
+
+@router.post(
+    "/config/reload",
+    response_model=ConfigReloadStatus,
+    summary="Reload configuration (Admin only)",
+    description="""
+    Re-read and validate the configuration files and apply them without a
+    restart: models, rate limits, provider concurrency limits, circuit
+    breaker thresholds and hedge groups. Requests in flight finish with the
+    previous configuration. Invalid files are rejected with 422 and the
+    running configuration is kept. Applies to the worker process serving the
+    request; the file watcher reloads every worker.
+    """,
+    responses={422: {"description": "Configuration files are invalid"}},
+)
+async def reload_config(
+    current_user: dict = Depends(require_admin),
+) -> ConfigReloadStatus:
+    """
+    Reload the configuration files (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Reload status after the reload
+
+    Raises:
+        HTTPException: 422 if the configuration files are invalid
+    """
+    logger.info(f"Admin {current_user['username']} reloading configuration")
+
+    reloader = get_config_reloader()
+    try:
+        reloader.reload()
+    except ConfigReloadError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+    return ConfigReloadStatus(**reloader.snapshot())
+
+
+@router.get(
+    "/profile/cpu",
+    response_class=PlainTextResponse,
+    summary="CPU profile of this worker (Admin only)",
+    description="""
+    Sample the Python stacks of every thread in the worker process serving
+    the request for `seconds`, then return them in the collapsed-stack
+    format (one `thread;outer;...;inner count` line per distinct stack) for
+    flamegraph.pl, speedscope or inferno. Nothing is instrumented: the cost
+    is the sampler thread's own CPU time, which is kept under
+    `profiling.max_overhead` of one core by lengthening the interval.
+    Duration and sample rate are capped by `profiling.max_seconds` and
+    `profiling.min_interval_ms`; one profile runs per worker at a time.
+    """,
+    responses={
+        400: {"description": "Duration or interval outside the configured limits"},
+        404: {"description": "Profiling is disabled"},
+        409: {"description": "A profile is already running in this worker"},
+    },
+)
+async def get_cpu_profile(
+    seconds: float = Query(10, gt=0, description="Profiling duration in seconds"),
+    interval_ms: int = Query(10, ge=1, description="Milliseconds between samples"),
+    include_idle: bool = Query(False, description="Also count threads blocked waiting (locks, queues, selectors)"),
+    current_user: dict = Depends(require_admin),
+) -> PlainTextResponse:
+    """
+    Profile the worker's CPU use (admin only).
+
+    Args:
+        seconds: Profiling duration
+        interval_ms: Milliseconds between samples
+        include_idle: Also count threads blocked waiting
+        current_user: Current admin user
+
+    Returns:
+        Collapsed stacks as a text attachment
+
+    Raises:
+        HTTPException: 404 if profiling is disabled, 400 if a limit is exceeded,
+            409 if a profile is already running
+    """
+    settings = get_settings()
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.profiling_max_seconds}",
+        )
+    if interval_ms < settings.profiling_min_interval_ms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"interval_ms must be at least {settings.profiling_min_interval_ms}",
+        )
+
+    logger.info(f"Admin {current_user['username']} profiling CPU for {seconds}s")
+    try:
+        sampler = await profile_cpu(seconds, interval_ms / 1000, settings.profiling_max_overhead, include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    filename = f"cpu-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(sampler.samples),
+            "X-Profile-Duration": f"{sampler.duration:.3f}",
+            "X-Profile-Interval-Ms": f"{sampler.interval * 1000:.0f}",
+            "X-Profile-Overhead": f"{sampler.overhead:.4f}",
+        },
+    )
+
+
+def _memory_profiler() -> MemoryProfiler:
+    """The memory profiler, or 404 if memory profiling is disabled."""
+    if not get_settings().memory_profiling_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Memory profiling is disabled")
+    return get_memory_profiler()
+
+
+@router.get(
+    "/profile/memory",
+    response_model=MemoryStatus,
+    summary="Memory state of this worker (Admin only)",
+    description="""
+    RSS, garbage collector generation counts and collections, whether
+    allocations are traced, traced memory and the stored snapshots of the
+    worker process serving the request.
+    """,
+    responses={404: {"description": "Memory profiling is disabled"}},
+)
+async def get_memory_status(
+    current_user: dict = Depends(require_admin),
+) -> MemoryStatus:
+    """
+    Get the worker's memory state (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Memory state
+    """
+    return MemoryStatus(**_memory_profiler().status())
+
+
+@router.post(
+    "/profile/memory/tracing",
+    response_model=MemoryStatus,
+    summary="Start tracing allocations in this worker (Admin only)",
+    description="""
+    Start tracemalloc, recording `frames` frames per allocation (1 is enough
+    to group by line; more are needed to group by traceback). Tracing slows
+    every allocation and uses memory per live block until it is stopped.
+    Changing `frames` while tracing restarts it and drops stored snapshots.
+    """,
+    responses={
+        400: {"description": "frames is above memory_profiling.max_frames"},
+        404: {"description": "Memory profiling is disabled"},
+    },
+)
+async def start_memory_tracing(
+    frames: Optional[int] = Query(None, ge=1, description="Frames per allocation (default memory_profiling.frames)"),
+    current_user: dict = Depends(require_admin),
+) -> MemoryStatus:
+    """
+    Start tracing allocations (admin only).
+
+    Args:
+        frames: Frames recorded per allocation
+        current_user: Current admin user
+
+    Returns:
+        Memory state after starting
+
+    Raises:
+        HTTPException: 404 if memory profiling is disabled, 400 if frames is too high
+    """
+    profiler = _memory_profiler()
+    settings = get_settings()
+    frames = frames or settings.memory_profiling_frames
+    if frames > settings.memory_profiling_max_frames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"frames must be at most {settings.memory_profiling_max_frames}",
+        )
+
+    logger.info(f"Admin {current_user['username']} starting memory tracing ({frames} frames)")
+    profiler.start(frames)
+    return MemoryStatus(**profiler.status())
+
+
+@router.delete(
+    "/profile/memory/tracing",
+    response_model=MemoryStatus,
+    summary="Stop tracing allocations in this worker (Admin only)",
+    description="Stop tracemalloc and drop the stored snapshots, releasing their memory.",
+    responses={404: {"description": "Memory profiling is disabled"}},
+)
+async def stop_memory_tracing(
+    current_user: dict = Depends(require_admin),
+) -> MemoryStatus:
+    """
+    Stop tracing allocations (admin only).
+
+    Args:
+        current_user: Current admin user
+
+    Returns:
+        Memory state after stopping
+    """
+    profiler = _memory_profiler()
+    logger.info(f"Admin {current_user['username']} stopping memory tracing")
+    profiler.stop()
+    return MemoryStatus(**profiler.status())
+
+
+@router.post(
+    "/profile/memory/snapshots",
+    response_model=MemorySnapshotResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Take a memory snapshot in this worker (Admin only)",
+    description="""
+    Snapshot the traced allocations and keep it (up to
+    `memory_profiling.max_snapshots` per worker) for later diffs. Returns
+    the snapshot ID and its largest allocation sites. With `collect=true`,
+    a full garbage collection runs first, so unreachable reference cycles
+    (for example exception tracebacks holding images) are not counted.
+    """,
+    responses={
+        404: {"description": "Memory profiling is disabled"},
+        409: {"description": "Allocation tracing is not started in this worker"},
+    },
+)
+async def take_memory_snapshot(
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", description="Group allocations by"),
+    limit: int = Query(20, ge=1, le=500, description="Largest sites to return"),
+    collect: bool = Query(False, description="Run a full garbage collection first"),
+    current_user: dict = Depends(require_admin),
+) -> MemorySnapshotResponse:
+    """
+    Take and store a memory snapshot (admin only).
+
+    Args:
+        group_by: lineno, filename or traceback
+        limit: Largest sites to return
+        collect: Run a full garbage collection first
+        current_user: Current admin user
+
+    Returns:
+        Snapshot ID and largest allocation sites
+
+    Raises:
+        HTTPException: 404 if memory profiling is disabled, 409 if tracing is not started
+    """
+    profiler = _memory_profiler()
+    try:
+        snapshot = await asyncio.to_thread(profiler.take_snapshot, group_by, limit, collect)
+    except TracingNotStartedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    logger.info(f"Admin {current_user['username']} took memory snapshot {snapshot['id']}")
+    return MemorySnapshotResponse(**snapshot)
+
+
+@router.get(
+    "/profile/memory/top",
+    response_model=MemorySnapshotResponse,
+    summary="Largest live allocation sites in this worker (Admin only)",
+    description="Largest traced allocation sites right now, from a snapshot that is not stored.",
+    responses={
+        404: {"description": "Memory profiling is disabled"},
+        409: {"description": "Allocation tracing is not started in this worker"},
+    },
+)
+async def get_memory_top(
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", description="Group allocations by"),
+    limit: int = Query(20, ge=1, le=500, description="Largest sites to return"),
+    collect: bool = Query(False, description="Run a full garbage collection first"),
+    current_user: dict = Depends(require_admin),
+) -> MemorySnapshotResponse:
+    """
+    Get the largest live allocation sites (admin only).
+
+    Args:
+        group_by: lineno, filename or traceback
+        limit: Largest sites to return
+        collect: Run a full garbage collection first
+        current_user: Current admin user
+
+    Returns:
+        Largest allocation sites
+
+    Raises:
+        HTTPException: 404 if memory profiling is disabled, 409 if tracing is not started
+    """
+    profiler = _memory_profiler()
+    try:
+        return MemorySnapshotResponse(**await asyncio.to_thread(profiler.top, group_by, limit, collect))
+    except TracingNotStartedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get(
+    "/profile/memory/diff",
+    response_model=MemoryDiffResponse,
+    summary="Diff memory snapshots in this worker (Admin only)",
+    description="""
+    Allocation sites whose live memory changed most between snapshot `base`
+    and snapshot `target`, or the live heap when `target` is omitted. A site
+    that keeps growing across snapshots taken under steady load is the code
+    path holding on to memory.
+    """,
+    responses={
+        404: {"description": "Memory profiling is disabled, or a snapshot is not stored"},
+        409: {"description": "Allocation tracing is not started in this worker (diff against the live heap)"},
+    },
+)
+async def get_memory_diff(
+    base: int = Query(..., description="ID of the earlier snapshot"),
+    target: Optional[int] = Query(None, description="ID of the later snapshot (default: the live heap)"),
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", description="Group allocations by"),
+    limit: int = Query(20, ge=1, le=500, description="Sites to return"),
+    collect: bool = Query(False, description="Run a full garbage collection before a live snapshot"),
+    current_user: dict = Depends(require_admin),
+) -> MemoryDiffResponse:
+    """
+    Diff two memory snapshots (admin only).
+
+    Args:
+        base: ID of the earlier snapshot
+        target: ID of the later snapshot, or None for the live heap
+        group_by: lineno, filename or traceback
+        limit: Sites to return
+        collect: Run a full garbage collection before a live snapshot
+        current_user: Current admin user
+
+    Returns:
+        Size change and the sites that changed most
+
+    Raises:
+        HTTPException: 404 if memory profiling is disabled or a snapshot is not
+            stored, 409 if tracing is not started
+    """
+    profiler = _memory_profiler()
+    try:
+        diff = await asyncio.to_thread(profiler.compare, base, target, group_by, limit, collect)
+    except UnknownSnapshotError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except TracingNotStartedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return MemoryDiffResponse(**diff)
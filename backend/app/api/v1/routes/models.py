@@ -1,28 +1,38 @@
 """Model management routes."""
+import hashlib
+import json
+import math
 from functools import lru_cache
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.api.v1.schemas.model import (
     CustomSchemaResponse,
     ModelInfo,
     ModelListResponse,
+    ModelReadiness,
     ModelSchemaResponse,
     ParameterSchemaResponse,
 )
 from app.core.config import Settings, get_settings
+from app.core.metrics import CACHE_REQUESTS
 from app.core.replicate_schema import ReplicateModelSchema
 from app.core.security import get_current_user
+from app.services.circuit_breaker import get_circuit_breakers
+from app.services.warm_keeper import get_warm_keeper
 
 router = APIRouter(prefix="/models", tags=["models"])
 security = HTTPBearer(auto_error=False)
 
+# A loading model's ETA counts towards the ETag in steps of this many seconds
+ETAG_ETA_STEP_SECONDS = 10
 
-def get_cached_models(settings: Settings) -> list[ModelInfo]:
+
+def build_models(settings: Settings) -> list[ModelInfo]:
     """
-    Get the list of available models from configuration.
+    Build the list of available models from configuration.
 
     Args:
         settings: Application settings instance
@@ -87,6 +97,156 @@ def get_cached_models(settings: Settings) -> list[ModelInfo]:
     return models
 
 
+class ModelCatalog:
+    """
+    Models from one configuration, built once and served pre-serialized.
+
+    Every model is validated (including its ``replicate_schema``) and
+    serialized when the catalog is built. A response body is assembled from
+    those dicts plus each model's live state (circuit breaker and
+    readiness) and kept until that state changes. The ETag hashes the
+    body without the readiness fields that move on every probe
+    (``checked_at``, and the ETA below ``ETAG_ETA_STEP_SECONDS``), so it
+    only changes when the state does. Repeated requests neither re-parse
+    schemas nor re-serialize models, and clients holding the current ETag
+    get ``304 Not Modified``.
+
+    Args:
+        settings: Application settings the catalog is built from
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._models_config = settings.models_config
+        self.models = build_models(settings)
+        self.by_id = {model.id: model for model in self.models}
+        self._serialized = {model.id: model.model_dump(mode="json", by_alias=True) for model in self.models}
+        # model_id (None for the list) -> (live state, body, ETag)
+        self._rendered: dict[str | None, tuple[list, bytes, str]] = {}
+
+    def is_current(self, settings: Settings) -> bool:
+        """Whether the catalog was built from these settings' models."""
+        return settings is self.settings and settings.models_config == self._models_config
+
+    @staticmethod
+    def _live_state(models: list[ModelInfo]) -> list[tuple[str, dict | None]]:
+        """Circuit breaker state and readiness snapshot of each model."""
+        breakers = get_circuit_breakers()
+        warm_keeper = get_warm_keeper()
+        state = []
+        for model in models:
+            readiness = warm_keeper.get(model.id)
+            state.append((breakers.state(model.provider, model.id), readiness.snapshot() if readiness else None))
+        return state
+
+    @staticmethod
+    def _stable(item: dict) -> dict:
+        """Model dict as hashed for the ETag: readiness without its volatile fields."""
+        readiness = item.get("readiness")
+        if readiness is None:
+            return item
+        eta = readiness["eta_seconds"]
+        if eta is not None:
+            eta = math.ceil(eta / ETAG_ETA_STEP_SECONDS) * ETAG_ETA_STEP_SECONDS
+        return {**item, "readiness": {**readiness, "checked_at": None, "eta_seconds": eta}}
+
+    def render(self, model_id: str | None = None) -> tuple[bytes, str] | None:
+        """
+        JSON body and ETag for the model list, or for one model.
+
+        Args:
+            model_id: Model to render (None for the ModelListResponse)
+
+        Returns:
+            (body, ETag), or None if the model is not configured
+        """
+        if model_id is None:
+            models = self.models
+        elif model_id in self.by_id:
+            models = [self.by_id[model_id]]
+        else:
+            return None
+
+        state = self._live_state(models)
+        rendered = self._rendered.get(model_id)
+        if rendered is not None and rendered[0] == state:
+            return rendered[1], rendered[2]
+
+        items = []
+        for model, (circuit_state, readiness) in zip(models, state):
+            item = self._serialized[model.id]
+            if circuit_state != item["circuit_state"] or readiness is not None:
+                item = {**item, "circuit_state": circuit_state}
+                if readiness is not None:
+                    item["readiness"] = ModelReadiness(**readiness).model_dump(mode="json")
+            items.append(item)
+
+        payload = items[0] if model_id is not None else {"models": items, "total": len(items)}
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        stable = [self._stable(item) for item in items]
+        stable_payload = stable[0] if model_id is not None else {"models": stable, "total": len(stable)}
+        stable_body = json.dumps(stable_payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.blake2b(stable_body, digest_size=16).hexdigest()}"'
+        self._rendered[model_id] = (state, body, etag)
+        return body, etag
+
+
+_catalog: ModelCatalog | None = None
+
+
+def get_model_catalog(settings: Settings) -> ModelCatalog:
+    """Get the model catalog for the settings, rebuilding it when the models configuration changed."""
+    global _catalog
+    catalog = _catalog
+    if catalog is None or not catalog.is_current(settings):
+        CACHE_REQUESTS.labels("model_catalog", "miss").inc()
+        catalog = _catalog = ModelCatalog(settings)
+    else:
+        CACHE_REQUESTS.labels("model_catalog", "hit").inc()
+    return catalog
+
+
+def get_cached_models(settings: Settings) -> list[ModelInfo]:
+    """
+    Get the list of available models from the cached catalog.
+
+    Args:
+        settings: Application settings instance
+
+    Returns:
+        List of ModelInfo objects with schema information
+    """
+    return get_model_catalog(settings).models
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header names the ETag (weak comparison, as for GET)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+def catalog_response(request: Request, settings: Settings, body: bytes, etag: str) -> Response:
+    """
+    JSON response for a rendered catalog body, or 304 if the client has it.
+
+    Browsers may reuse the response for ``models_api.cache_ttl_seconds``
+    (0 = revalidate every time); the ETag makes revalidation cheap.
+    """
+    ttl = settings.models_cache_ttl_seconds
+    scope = "private" if settings.models_require_auth else "public"
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"{scope}, max-age={ttl}" if ttl > 0 else f"{scope}, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        CACHE_REQUESTS.labels("models_etag", "hit").inc()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    CACHE_REQUESTS.labels("models_etag", "miss").inc()
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 async def check_auth_if_required(
     settings: Settings,
     credentials: HTTPAuthorizationCredentials | None,
@@ -153,11 +313,18 @@ async def check_auth_if_required(
     - Description
     - Enabled status
     - Default parameters
+    - Circuit breaker state (`open` while the model is failing) and fallback model
+    - Readiness (`ready`, `loading` with an ETA, `error` or `unknown`) from background probes
 
     **Authentication:**
     - Optional (configurable via MODELS_REQUIRE_AUTH)
     - By default, models list is public
 
+    **Caching:**
+    - Responses carry an `ETag`; send it back in `If-None-Match` to get
+      `304 Not Modified` while the models and their state are unchanged
+    - `Cache-Control` max-age follows `models_api.cache_ttl_seconds`
+
     **Example Response:**
     ```json
     {
@@ -198,6 +365,7 @@ async def check_auth_if_required(
                 }
             }
         },
+        304: {"description": "Not modified (If-None-Match matched the current ETag)"},
         403: {
             "description": "Authentication required (if MODELS_REQUIRE_AUTH=true)",
             "content": {
@@ -209,6 +377,7 @@ async def check_auth_if_required(
     }
 )
 async def list_models(
+    request: Request,
     settings: Annotated[Settings, Depends(get_settings)],
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(security)] = None,
 ):
@@ -224,13 +393,14 @@ async def list_models(
     # Check auth if required
     await check_auth_if_required(settings, credentials)
 
-    models = get_cached_models(settings)
-    return ModelListResponse(models=models, total=len(models))
+    body, etag = get_model_catalog(settings).render()
+    return catalog_response(request, settings, body, etag)
 
 
 @router.get("/{model_id}", response_model=ModelInfo)
 async def get_model(
     model_id: str,
+    request: Request,
     settings: Annotated[Settings, Depends(get_settings)],
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(security)] = None,
 ):
@@ -249,13 +419,10 @@ async def get_model(
     # Check auth if required
     await check_auth_if_required(settings, credentials)
 
-    models = get_cached_models(settings)
-
-    for model in models:
-        if model.id == model_id:
-            return model
-
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"Model '{model_id}' not found",
-    )
+    rendered = get_model_catalog(settings).render(model_id)
+    if rendered is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Model '{model_id}' not found",
+        )
+    return catalog_response(request, settings, *rendered)
@@ -6,11 +6,12 @@ This module provides endpoints for:
 - Processing history
 - Image download and deletion
 """
-import asyncio
 import logging
+import math
+import time
 import uuid
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Dict
 
 from fastapi import (
     APIRouter,
@@ -23,7 +24,7 @@ from fastapi import (
     UploadFile,
 )
 from fastapi.responses import FileResponse
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.schemas.restoration import (
@@ -33,25 +34,52 @@ from app.api.v1.schemas.restoration import (
     ImageDetailResponse,
     RestoreResponse,
 )
-from app.core.config import get_settings
+from app.core import server_timing
+from app.core.config import Settings, get_settings
+from app.core.metrics import PROVIDER_BYTES, PROVIDER_CALL_DURATION, PROVIDER_QUEUE_WAIT
 from app.core.security import get_current_user, get_current_user_validated
+from app.core.tracing import span
 from app.db.database import get_db
+from app.db.history_search import filename_matches
 from app.db.models import ProcessedImage
+from app.db.write_queue import run_write
+from app.services.circuit_breaker import (
+    CircuitOpenError,
+    get_circuit_breakers,
+    select_model,
+)
+from app.services.concurrency_limiter import (
+    ConcurrencyLimiterError,
+    ConcurrencyLimitExceeded,
+    Lease,
+    get_concurrency_limiter,
+)
 from app.services.hf_inference import (
     HFInferenceError,
     HFInferenceService,
     HFModelError,
+    HFModelLoadingError,
     HFRateLimitError,
     HFTimeoutError,
 )
+from app.services.hedging import get_hedging
+from app.services.provider_governor import ProviderBusyError, get_provider_governor
 from app.services.replicate_inference import (
     ReplicateInferenceError,
     ReplicateInferenceService,
+    ReplicateInputError,
     ReplicateModelError,
     ReplicateRateLimitError,
     ReplicateTimeoutError,
 )
 from app.services.session_manager import SessionManager, SessionNotFoundError
+from app.services.usage_ledger import (
+    QuotaExceededError,
+    check_quota,
+    record_provider_call,
+    release_images,
+    release_provider_call,
+)
 from app.utils.image_processing import (
     ImageFormatError,
     ImageSizeError,
@@ -60,6 +88,12 @@ from app.utils.image_processing import (
     read_upload_file_bytes,
     validate_upload_file,
 )
+from app.utils.pagination import (
+    InvalidCursorError,
+    after_cursor,
+    decode_cursor,
+    encode_cursor,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -67,41 +101,139 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/restore", tags=["Restoration"])
 
-# Track concurrent uploads per session (in-memory for now)
-# In production, use Redis or similar
-_session_upload_counts: Dict[str, int] = {}
-_upload_count_lock = asyncio.Lock()
-
 
-async def check_concurrent_limit(session_id: str) -> None:
+async def check_concurrent_limit(session_id: str, user_id: int | None = None) -> Lease:
     """
-    Check if session has reached concurrent upload limit.
+    Take a concurrent upload slot for the session and its user.
 
     Args:
         session_id: Session identifier
+        user_id: Owning user's ID (enables the per-user limit)
+
+    Returns:
+        Lease to hand back to release_concurrent_slot()
 
     Raises:
-        HTTPException 429: If limit exceeded
+        HTTPException 429: If the session or user has no free slot
+        HTTPException 503: If the limiter backend is unavailable
     """
     settings = get_settings()
-    async with _upload_count_lock:
-        current_count = _session_upload_counts.get(session_id, 0)
-        if current_count >= settings.max_concurrent_uploads_per_session:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Maximum {settings.max_concurrent_uploads_per_session} "
-                f"concurrent uploads allowed per session",
-            )
-        _session_upload_counts[session_id] = current_count + 1
+    try:
+        return await get_concurrency_limiter().acquire_upload(session_id, user_id, settings)
+    except ConcurrencyLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+        )
+    except ConcurrencyLimiterError as e:
+        logger.error(f"Concurrency limiter unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Upload slots temporarily unavailable",
+        )
 
 
-async def release_concurrent_slot(session_id: str) -> None:
-    """Release concurrent upload slot for session."""
-    async with _upload_count_lock:
-        if session_id in _session_upload_counts:
-            _session_upload_counts[session_id] -= 1
-            if _session_upload_counts[session_id] <= 0:
-                del _session_upload_counts[session_id]
+async def release_concurrent_slot(lease: Lease | None) -> None:
+    """Release a concurrent upload slot taken by check_concurrent_limit()."""
+    if lease is not None:
+        await get_concurrency_limiter().release(lease)
+
+
+def provider_call_outcome(error: Exception) -> str:
+    """Metrics outcome label for a failed provider call."""
+    if isinstance(error, (HFRateLimitError, ReplicateRateLimitError)):
+        return "rate_limited"
+    if isinstance(error, (HFTimeoutError, ReplicateTimeoutError)):
+        return "timeout"
+    return "error"
+
+
+async def call_model(
+    settings: Settings,
+    model_config: dict,
+    image_bytes: bytes,
+    parameters: dict | None,
+    user_key: str,
+) -> bytes:
+    """
+    Call a model through its provider, once admitted by the circuit breakers.
+
+    Waits for a provider slot (fair-queued across users), then records the
+    outcome with the circuit breakers and, on success, the call's latency
+    for hedging. A call that never reaches a result (provider busy, or
+    cancelled as the losing side of a hedged request) releases its breaker
+    admission.
+
+    Args:
+        settings: Application settings
+        model_config: Configuration of the model to call
+        image_bytes: Preprocessed image bytes
+        parameters: Model parameters (None for the model's defaults)
+        user_key: Fair-queueing key of the requesting user
+
+    Returns:
+        Processed image bytes
+    """
+    provider = model_config.get("provider", "huggingface")
+    model_id = model_config["id"]
+    breakers = get_circuit_breakers()
+    recorded = False
+    started = time.monotonic()
+    with span("provider.call", provider=provider, model=model_id) as call_span:
+        try:
+            async with get_provider_governor().slot(provider, model_id, user_key) as slot:
+                PROVIDER_QUEUE_WAIT.labels(provider).observe(slot.waited)
+                call_span.set_attribute("provider.queue_wait_ms", round(slot.waited * 1000, 3))
+                if slot.waited:
+                    logger.info("Waited %.2fs for a %s slot (model %s)", slot.waited, provider, model_id)
+                PROVIDER_BYTES.labels(provider, model_id, "sent").inc(len(image_bytes))
+                call_started = time.monotonic()
+                outcome = "cancelled"
+                try:
+                    with span("provider.run", provider=provider, model=model_id):
+                        if provider == "replicate":
+                            # Use Replicate service
+                            replicate_service = ReplicateInferenceService(settings)
+                            processed_bytes = await replicate_service.process_image(
+                                model_id=model_id,
+                                image_bytes=image_bytes,
+                                parameters=parameters,
+                            )
+                        else:
+                            # Use HuggingFace service (default)
+                            hf_service = HFInferenceService(settings)
+                            processed_bytes = await hf_service.process_image(
+                                model_id=model_id,
+                                image_bytes=image_bytes,
+                            )
+                except Exception as e:
+                    outcome = provider_call_outcome(e)
+                    if outcome == "rate_limited":
+                        slot.mark_rate_limited()
+                    breakers.record_failure(provider, model_id, e)
+                    recorded = True
+                    raise
+                else:
+                    outcome = "success"
+                finally:
+                    PROVIDER_CALL_DURATION.labels(provider, model_id, outcome).observe(time.monotonic() - call_started)
+                    call_span.set_attribute("provider.outcome", outcome)
+                PROVIDER_BYTES.labels(provider, model_id, "received").inc(len(processed_bytes))
+                breakers.record_success(provider, model_id)
+                recorded = True
+        finally:
+            if not recorded:
+                breakers.release(provider, model_id)
+
+    get_hedging().record_latency(model_id, time.monotonic() - started)
+    return processed_bytes
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """Convert a client-supplied timestamp to naive UTC, matching stored created_at values."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 
 @router.post(
@@ -217,6 +349,14 @@ async def release_concurrent_slot(session_id: str) -> None:
                 }
             }
         },
+        503: {
+            "description": "Provider rate limited, no provider slot freed up in time, or model temporarily unavailable (circuit breaker open)",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "replicate is busy: no free slot within 120s"}
+                }
+            }
+        },
         504: {
             "description": "Processing timeout",
             "content": {
@@ -259,9 +399,10 @@ async def restore_image(
         HTTPException 400: Invalid file or model
         HTTPException 401: Not authenticated
         HTTPException 413: File too large
-        HTTPException 429: Concurrent upload limit exceeded
+        HTTPException 429: Concurrent upload limit or usage quota exceeded
         HTTPException 502: HuggingFace API error
-        HTTPException 503: Service unavailable
+        HTTPException 503: Provider rate limited, busy (queue full or wait timed out) or
+            failing (circuit breaker open and no fallback model)
         HTTPException 504: Timeout
     """
     settings = get_settings()
@@ -276,19 +417,41 @@ async def restore_image(
             detail="Invalid token: missing session information",
         )
 
-    logger.debug(f"Restore request - User: {user.get('sub')}, Session: {session_id}, Model: {model_id}, File: {file.filename}")
+    logger.debug("Restore request - Session: %s, Model: %s, File: %s", session_id, model_id, file.filename)
 
+    lease = None
+    breakers = get_circuit_breakers()
+    circuit = None  # (provider, model_id) admitted by the circuit breakers, until its outcome is recorded
+    using_fallback = False
     try:
-        # Check concurrent upload limit
-        logger.debug(f"Checking concurrent upload limit for session {session_id}")
-        await check_concurrent_limit(session_id)
-        logger.debug(f"Concurrent upload check passed for session {session_id}")
+        # Check concurrent upload limits (per session and per user)
+        logger.debug("Checking concurrent upload limit for session %s", session_id)
+        lease = await check_concurrent_limit(session_id, user.get("user_id"))
+        logger.debug("Concurrent upload check passed for session %s", session_id)
+
+        # Fail fast, or switch to the configured fallback model, while the
+        # model or its provider keeps failing
+        requested_config = settings.get_model_by_id(model_id)
+        if requested_config:
+            try:
+                selected_config = select_model(breakers, settings, requested_config)
+            except CircuitOpenError as e:
+                logger.warning(f"Rejecting request for model {model_id}: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=str(e),
+                    headers={"Retry-After": str(max(1, e.retry_after))},
+                )
+            using_fallback = selected_config["id"] != model_id
+            model_id = selected_config["id"]
+            circuit = (selected_config.get("provider", "huggingface"), model_id)
 
         # Validate uploaded file
         try:
-            logger.debug(f"Validating upload file: {file.filename} ({file.content_type})")
-            await validate_upload_file(file, settings)
-            logger.debug(f"File validation passed for: {file.filename}")
+            logger.debug("Validating upload file: %s (%s)", file.filename, file.content_type)
+            with span("restore.validate"):
+                await validate_upload_file(file, settings)
+            logger.debug("File validation passed for: %s", file.filename)
         except ImageFormatError as e:
             logger.warning(f"Invalid image format: {file.filename} - {str(e)}")
             raise HTTPException(
@@ -310,7 +473,7 @@ async def restore_image(
 
         # Verify session exists
         try:
-            await session_manager.get_session(db, session_id)
+            session = await session_manager.get_session(db, session_id)
         except SessionNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -319,9 +482,11 @@ async def restore_image(
 
         # Read file bytes
         try:
-            logger.debug(f"Reading file bytes: {file.filename}")
-            image_bytes = await read_upload_file_bytes(file)
-            logger.debug(f"Read {len(image_bytes)} bytes from {file.filename}")
+            logger.debug("Reading file bytes: %s", file.filename)
+            with span("restore.read_upload") as read_span:
+                image_bytes = await read_upload_file_bytes(file)
+                read_span.set_attribute("image.bytes", len(image_bytes))
+            logger.debug("Read %d bytes from %s", len(image_bytes), file.filename)
         except ImageValidationError as e:
             logger.error(f"Failed to read file {file.filename}: {str(e)}")
             raise HTTPException(
@@ -329,11 +494,24 @@ async def restore_image(
                 detail=f"Failed to read file: {str(e)}",
             )
 
+        # Check usage quotas (single ledger row lookup)
+        owner_id = session.user_id
+        try:
+            with span("restore.check_quota"):
+                await check_quota(db, owner_id, incoming_bytes=len(image_bytes), settings=settings)
+        except QuotaExceededError as e:
+            logger.warning(f"Quota exceeded for user {owner_id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+            )
+
         # Preprocess image
         try:
-            logger.debug(f"Preprocessing image for model")
-            preprocessed_bytes = preprocess_image_for_model(image_bytes)
-            logger.debug(f"Preprocessed image: {len(preprocessed_bytes)} bytes")
+            logger.debug("Preprocessing image for model")
+            with span("restore.preprocess"):
+                preprocessed_bytes = preprocess_image_for_model(image_bytes)
+            logger.debug("Preprocessed image: %d bytes", len(preprocessed_bytes))
         except ImageValidationError as e:
             logger.error(f"Image preprocessing failed: {str(e)}")
             raise HTTPException(
@@ -350,46 +528,90 @@ async def restore_image(
             )
 
         provider = model_config.get("provider", "huggingface")
-        logger.info(
-            f"Processing image with model {model_id} (provider: {provider}) "
-            f"for session {session_id}"
-        )
+        logger.info("Processing image with model %s (provider: %s) for session %s", model_id, provider, session_id)
 
-        # Parse parameters if provided
+        # Parse parameters if provided (they were meant for the requested
+        # model, so a fallback model runs with its own defaults)
         parsed_parameters = None
-        if parameters:
+        if parameters and not using_fallback:
             try:
                 import json
                 parsed_parameters = json.loads(parameters)
-                logger.info(f"Using user-provided parameters: {list(parsed_parameters.keys())}")
+                logger.debug("Using user-provided parameters: %s", list(parsed_parameters))
             except json.JSONDecodeError as e:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Invalid parameters JSON: {str(e)}",
                 )
 
-        # Process image with appropriate provider
+        # Count the provider call against the daily quota (refused at the limit)
+        async def _record_call(write_db: AsyncSession) -> date:
+            return await record_provider_call(
+                write_db, owner_id, limit=settings.quota_max_provider_calls_per_day
+            )
+
+        async def _release_call(write_db: AsyncSession) -> None:
+            await release_provider_call(write_db, owner_id, call_day)
+
         try:
-            if provider == "replicate":
-                # Use Replicate service
-                replicate_service = ReplicateInferenceService(settings)
-                processed_bytes = await replicate_service.process_image(
-                    model_id=model_id,
-                    image_bytes=preprocessed_bytes,
-                    parameters=parsed_parameters,
-                )
-            else:
-                # Use HuggingFace service (default)
-                hf_service = HFInferenceService(settings)
-                processed_bytes = await hf_service.process_image(
-                    model_id=model_id,
-                    image_bytes=preprocessed_bytes,
-                )
+            with span("restore.record_call"):
+                call_day = await run_write(db, _record_call)
+        except QuotaExceededError as e:
+            logger.warning(f"Quota exceeded for user {owner_id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+            )
+
+        # Process image with the model, or with whichever of the model and its
+        # hedge secondary answers first if the model is slow
+        user_key = f"user:{owner_id}"
+        hedging = get_hedging()
+        hedge_group = None if using_fallback else hedging.group_for(model_id)
+        circuit = None  # call_model() records the outcome from here on
+        try:
+            # Wall time, including the provider queue wait (hedged calls overlap)
+            with server_timing.measure("provider"):
+                if hedge_group:
+                    # The secondary was not asked for, so it runs with its own defaults
+                    processed_bytes, model_id = await hedging.run(
+                        hedge_group,
+                        lambda call_id: call_model(
+                            settings,
+                            settings.get_model_by_id(call_id),
+                            preprocessed_bytes,
+                            parsed_parameters if call_id == hedge_group.primary else None,
+                            user_key,
+                        ),
+                    )
+                else:
+                    processed_bytes = await call_model(
+                        settings, model_config, preprocessed_bytes, parsed_parameters, user_key
+                    )
+        except (ProviderBusyError, CircuitOpenError) as e:
+            # The provider was never called: give the call back
+            await run_write(db, _release_call)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": str(max(1, e.retry_after))},
+            )
+        except HFModelLoadingError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)) if e.retry_after is not None else 60)},
+            )
         except (HFModelError, ReplicateModelError) as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Model error: {str(e)}",
             )
+        except ReplicateInputError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid input: {str(e)}",
+            )
         except (HFRateLimitError, ReplicateRateLimitError) as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -417,14 +639,16 @@ async def restore_image(
         # Save original image
         original_dir = session_manager.get_storage_path_for_session(session_id)
         original_file_path = original_dir / original_filename
-        with open(original_file_path, "wb") as f:
-            f.write(image_bytes)
+        with span("storage.write", kind="original", bytes=len(image_bytes)), server_timing.measure("storage"):
+            with open(original_file_path, "wb") as f:
+                f.write(image_bytes)
 
         # Save processed image
         processed_dir = session_manager.get_processed_path_for_session(session_id)
         processed_file_path = processed_dir / processed_filename
-        with open(processed_file_path, "wb") as f:
-            f.write(processed_bytes)
+        with span("storage.write", kind="processed", bytes=len(processed_bytes)), server_timing.measure("storage"):
+            with open(processed_file_path, "wb") as f:
+                f.write(processed_bytes)
 
         # Save metadata to database
         original_relative_path = f"{session_id}/{original_filename}"
@@ -437,12 +661,10 @@ async def restore_image(
             model_id=model_id,
             original_path=original_relative_path,
             processed_path=processed_relative_path,
+            storage_bytes=len(image_bytes) + len(processed_bytes),
         )
 
-        logger.info(
-            f"Successfully processed image {processed_image.id} "
-            f"for session {session_id}"
-        )
+        logger.info("Successfully processed image %s for session %s", processed_image.id, session_id)
 
         # Return response with URLs
         return RestoreResponse(
@@ -457,7 +679,10 @@ async def restore_image(
 
     finally:
         # Always release concurrent slot
-        await release_concurrent_slot(session_id)
+        await release_concurrent_slot(lease)
+        # A half-open probe that never reached the provider frees its place
+        if circuit is not None:
+            breakers.release(*circuit)
 
 
 @router.get(
@@ -471,11 +696,32 @@ async def restore_image(
     Phase 2.4: Returns all images the user has ever processed, regardless of
     which session they were processed in. This allows users to access their
     complete history from any device.
+
+    Pagination: pass the returned `next_cursor` as `cursor` to fetch the next
+    page. Cursor pages cost the same at any depth; `offset` is still accepted
+    for compatibility but gets slower the deeper it goes. Set
+    `include_total=false` to skip counting the user's images.
+
+    Filters (all optional, combined with AND): `q` searches filenames,
+    `model_id` and `session_id` match exactly, `from`/`to` bound the
+    processing time (`from` inclusive, `to` exclusive). `total` counts the
+    filtered images.
     """,
 )
 async def get_history(
     limit: int = Query(50, ge=1, le=100, description="Maximum number of items to return (1-100)"),
     offset: int = Query(0, ge=0, description="Number of items to skip (must be >= 0)"),
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Whether to count the user's images"),
+    q: str | None = Query(None, min_length=1, max_length=200, description="Search original filenames"),
+    model_id: str | None = Query(None, description="Only images processed with this model"),
+    session_id: str | None = Query(None, description="Only images from this session"),
+    created_from: datetime | None = Query(
+        None, alias="from", description="Only images processed at or after this time"
+    ),
+    created_to: datetime | None = Query(
+        None, alias="to", description="Only images processed before this time"
+    ),
     db: AsyncSession = Depends(get_db),
     user: dict = Depends(get_current_user_validated()),
 ) -> HistoryResponse:
@@ -486,7 +732,14 @@ async def get_history(
 
     Args:
         limit: Maximum number of items to return
-        offset: Number of items to skip
+        offset: Number of items to skip (ignored when a cursor is given)
+        cursor: Keyset cursor from the previous page
+        include_total: Whether to compute the total item count
+        q: Filename search text
+        model_id: Model filter
+        session_id: Session identifier filter (must belong to the user)
+        created_from: Inclusive lower bound on created_at
+        created_to: Exclusive upper bound on created_at
         db: Database session
         user: Current authenticated user
 
@@ -503,34 +756,77 @@ async def get_history(
             detail="Invalid token: missing user information",
         )
 
+    position = None
+    if cursor is not None:
+        try:
+            position = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor",
+            )
+        offset = 0
+
     from sqlalchemy.exc import SQLAlchemyError
 
     try:
         # Get ALL user's images across ALL sessions, ordered by most recent first
-        # This ensures users can ONLY see their own images, not other users' images
-        logger.debug(f"Querying history for user_id {user_id}")
+        # This ensures users can ONLY see their own images, not other users' images.
+        # Filtering on the denormalized owner column walks the
+        # (user_id, created_at DESC, id DESC) index without joining sessions.
+        filters = [ProcessedImage.user_id == user_id]
+
+        if model_id is not None:
+            # Uses (user_id, model_id, created_at DESC, id DESC)
+            filters.append(ProcessedImage.model_id == model_id)
+        if session_id is not None:
+            # Resolve the session (scoped to this user) once; uses
+            # (session_id, created_at DESC, id DESC)
+            filters.append(
+                ProcessedImage.session_id
+                == select(Session.id)
+                .where(Session.session_id == session_id, Session.user_id == user_id)
+                .scalar_subquery()
+            )
+        if created_from is not None:
+            filters.append(ProcessedImage.created_at >= _to_naive_utc(created_from))
+        if created_to is not None:
+            filters.append(ProcessedImage.created_at < _to_naive_utc(created_to))
+        if q is not None:
+            # FTS5 index on SQLite, token-prefix regular expressions elsewhere
+            filters.append(filename_matches(q))
+
+        logger.debug("Querying history for user_id %s", user_id)
         query = (
             select(ProcessedImage)
-            .join(ProcessedImage.session)
-            .where(Session.user_id == user_id)
-            .order_by(ProcessedImage.created_at.desc())
+            .where(*filters)
+            .order_by(ProcessedImage.created_at.desc(), ProcessedImage.id.desc())
         )
 
-        # Get total count efficiently
-        logger.debug(f"Counting total images for user_id {user_id}")
-        count_query = (
-            select(func.count(ProcessedImage.id))
-            .join(ProcessedImage.session)
-            .where(Session.user_id == user_id)
-        )
-        count_result = await db.execute(count_query)
-        total = count_result.scalar()
-
-        # Get paginated results
-        paginated_query = query.offset(offset).limit(limit)
-        result = await db.execute(paginated_query)
+        if position is not None:
+            query = query.where(
+                after_cursor(ProcessedImage.created_at, ProcessedImage.id, position)
+            )
+        elif offset:
+            query = query.offset(offset)
+
+        total = None
+        if include_total:
+            logger.debug("Counting total images for user_id %s", user_id)
+            count_query = select(func.count(ProcessedImage.id)).where(*filters)
+            count_result = await db.execute(count_query)
+            total = count_result.scalar()
+
+        # Fetch one extra row to know whether another page exists
+        result = await db.execute(query.limit(limit + 1))
         images = result.scalars().all()
 
+        next_cursor = None
+        if len(images) > limit:
+            images = images[:limit]
+            last = images[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
         # Convert to response models
         items = [
             HistoryItemResponse(
@@ -546,8 +842,8 @@ async def get_history(
         ]
 
         logger.debug(
-            f"User {user['username']} (ID: {user_id}) retrieved {len(items)} images "
-            f"from {total} total (offset: {offset}, limit: {limit})"
+            "User %s (ID: %s) retrieved %d images from %s total (offset: %s, limit: %s, cursor: %s)",
+            user["username"], user_id, len(items), total, offset, limit, cursor is not None,
         )
 
         return HistoryResponse(
@@ -555,6 +851,7 @@ async def get_history(
             total=total,
             limit=limit,
             offset=offset,
+            next_cursor=next_cursor,
         )
 
     except SQLAlchemyError as e:
@@ -789,8 +1086,13 @@ async def delete_image(
             logger.warning(f"Failed to delete processed file {processed_path}: {e}")
 
     # Delete database record
-    await db.delete(image)
-    await db.commit()
+    async def _delete(write_db: AsyncSession) -> None:
+        result = await write_db.execute(delete(ProcessedImage).where(ProcessedImage.id == image_id))
+        # Only release usage once, even if two deletes race
+        if result.rowcount:
+            await release_images(write_db, [image])
+
+    await run_write(db, _delete)
 
     logger.info(f"Deleted image {image_id} and {files_deleted} files")
 
@@ -18,6 +18,7 @@ from app.api.v1.schemas.user import (
 from app.core.security import get_current_user, get_current_user_validated, get_password_hash, verify_password
 from app.db.database import get_db
 from app.db.models import Session, User
+from app.services.session_manager import SessionManager, SessionNotFoundError
 
 logger = logging.getLogger(__name__)
 
@@ -214,8 +215,14 @@ async def delete_my_session(
             detail="You can only delete your own sessions",
         )
 
-    # Delete session
-    await db.delete(session)
-    await db.commit()
+    # Delete the session with its images and files, releasing the images from
+    # the usage ledger (through the write queue when it is on)
+    try:
+        await SessionManager().delete_session(db, session_id)
+    except SessionNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {session_id} not found",
+        )
 
     logger.info(f"Session {session_id} deleted by user {current_user['username']}")
@@ -0,0 +1,18 @@
+"""Configuration schemas for API responses."""
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ConfigReloadStatus(BaseModel):
+    """Configuration hot reload state (this worker process)."""
+
+    watching: bool = Field(..., description="Whether the config files are checked for changes on a schedule")
+    files: list[str] = Field(..., description="Configuration files, in load order")
+    generation: int = Field(..., description="Configurations applied since startup (0 = the startup configuration)")
+    reloaded_at: datetime | None = Field(None, description="When the running configuration was applied")
+    last_error: str | None = Field(None, description="Why the most recent reload was rejected, if it was")
+    last_error_at: datetime | None = Field(None, description="When the most recent reload was rejected")
+    restart_required: list[str] = Field(
+        default_factory=list, description="Changed settings that keep their running value until a restart"
+    )
@@ -0,0 +1,69 @@
+"""Memory profiling schemas for API responses."""
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class GcStatus(BaseModel):
+    """Garbage collector state; lists are per generation (0, 1, 2)."""
+
+    counts: list[int] = Field(..., description="Allocations minus deallocations since each generation was last collected")
+    thresholds: list[int] = Field(..., description="Counts at which each generation is collected")
+    collections: list[int] = Field(..., description="Collections since startup")
+    collected: list[int] = Field(..., description="Unreachable objects freed since startup")
+    uncollectable: list[int] = Field(..., description="Unreachable objects that could not be freed")
+    garbage: int = Field(..., description="Objects in gc.garbage")
+
+
+class StoredSnapshot(BaseModel):
+    """A snapshot kept for diffing."""
+
+    id: int
+    taken_at: datetime
+    traced_bytes: int = Field(..., description="Traced memory in the snapshot")
+
+
+class MemoryStatus(BaseModel):
+    """Memory state of this worker process."""
+
+    pid: int = Field(..., description="Worker process ID")
+    rss_bytes: int | None = Field(None, description="Resident set size (None where /proc is not available)")
+    tracing: bool = Field(..., description="Whether allocations are being traced")
+    frames: int | None = Field(None, description="Frames recorded per allocation while tracing")
+    traced_bytes: int = Field(..., description="Memory currently allocated by traced allocations")
+    traced_peak_bytes: int = Field(..., description="Peak traced memory since tracing started")
+    tracemalloc_overhead_bytes: int = Field(..., description="Memory used by tracemalloc itself")
+    gc: GcStatus
+    snapshots: list[StoredSnapshot] = Field(default_factory=list, description="Stored snapshots, oldest first")
+
+
+class AllocationSite(BaseModel):
+    """Live memory allocated at one file, line or traceback."""
+
+    file: str
+    line: int | None = Field(None, description="Source line (None when grouped by file)")
+    size_bytes: int = Field(..., description="Live memory allocated here")
+    count: int = Field(..., description="Live memory blocks allocated here")
+    size_diff_bytes: int | None = Field(None, description="Change since the base snapshot (diffs only)")
+    count_diff: int | None = Field(None, description="Change in blocks since the base snapshot (diffs only)")
+    traceback: list[str] | None = Field(None, description="file:line frames, innermost first (grouped by traceback only)")
+
+
+class MemorySnapshotResponse(BaseModel):
+    """Largest allocation sites of a snapshot."""
+
+    id: int | None = Field(None, description="Snapshot ID to diff against (None when not stored)")
+    taken_at: datetime
+    traced_bytes: int = Field(..., description="Traced memory in the snapshot")
+    sites: list[AllocationSite] = Field(..., description="Largest sites first")
+
+
+class MemoryDiffResponse(BaseModel):
+    """Change in allocations between two snapshots."""
+
+    base: int = Field(..., description="ID of the earlier snapshot")
+    target: int | None = Field(None, description="ID of the later snapshot (None = the live heap)")
+    base_taken_at: datetime
+    target_taken_at: datetime
+    size_diff_bytes: int = Field(..., description="Change in traced memory")
+    sites: list[AllocationSite] = Field(..., description="Sites that changed most first")
@@ -1,4 +1,5 @@
 """Model schemas for API responses."""
+from datetime import datetime
 from typing import Any, Literal
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -50,6 +51,20 @@ class ModelParameters(BaseModel):
     model_config = {"extra": "allow"}
 
 
+class ModelReadiness(BaseModel):
+    """Readiness of a model as last probed by the warm-keeper."""
+
+    status: Literal["unknown", "ready", "loading", "error"] = Field(
+        "unknown",
+        description="ready = loaded, no cold start; loading = cold start in progress; "
+        "error = unavailable; unknown = not probed (or not a HuggingFace model)",
+    )
+    eta_seconds: float | None = Field(None, description="Estimated seconds until a loading model is ready")
+    checked_at: datetime | None = Field(None, description="When the model was last probed")
+    error: str | None = Field(None, description="Why the model is unavailable")
+    last_cold_start_seconds: float | None = Field(None, description="Duration of the most recent cold start")
+
+
 class ModelInfo(BaseModel):
     """Model information schema."""
 
@@ -77,6 +92,18 @@ class ModelInfo(BaseModel):
         serialization_alias="schema",
         description="Model schema (for Replicate models with parameter validation)"
     )
+    fallback_model: str | None = Field(
+        None, description="Model used instead while this model is unavailable"
+    )
+    keep_warm: bool = Field(False, description="Whether the model is kept loaded by keep-alive requests")
+    readiness: ModelReadiness = Field(
+        default_factory=ModelReadiness, description="Last known readiness from the warm-keeper's probes"
+    )
+    circuit_state: Literal["closed", "open", "half_open"] = Field(
+        "closed",
+        description="Circuit breaker state: open = failing, requests fail fast or go to the fallback; "
+        "half_open = recovering, a probe request is being let through",
+    )
 
 
 class ModelListResponse(BaseModel):
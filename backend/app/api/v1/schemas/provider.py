@@ -0,0 +1,82 @@
+"""Provider schemas for API responses."""
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class QueueWaitStats(BaseModel):
+    """Time provider calls spent waiting for a slot."""
+
+    count: int = Field(..., description="Calls granted a slot (including those that did not wait)")
+    sum_seconds: float = Field(..., description="Total seconds spent waiting")
+    max_seconds: float = Field(..., description="Longest wait in seconds")
+    buckets: dict[str, int] = Field(
+        ..., description="Cumulative histogram: calls that waited at most N seconds (\"+Inf\" = all)"
+    )
+
+
+class ModelConcurrency(BaseModel):
+    """Concurrency state for one model."""
+
+    limit: int = Field(..., description="Current (adaptive) in-flight limit")
+    max_limit: int = Field(..., description="Configured in-flight limit")
+    in_flight: int = Field(..., description="Calls currently running")
+    queued: int = Field(..., description="Calls waiting for a slot")
+
+
+class ProviderConcurrency(ModelConcurrency):
+    """Concurrency state for one provider."""
+
+    rate_limited: int = Field(..., description="Calls the provider rejected with a rate limit")
+    rejected: int = Field(..., description="Calls refused because the queue was full or the wait timed out")
+    queue_wait: QueueWaitStats
+    models: dict[str, ModelConcurrency] = Field(default_factory=dict, description="Per-model state")
+
+
+class ProviderConcurrencyResponse(BaseModel):
+    """Concurrency state for all limited providers (this worker process)."""
+
+    providers: dict[str, ProviderConcurrency]
+
+
+class CircuitBreakerStatus(BaseModel):
+    """State of one circuit breaker."""
+
+    state: Literal["closed", "open", "half_open"] = Field(..., description="Breaker state")
+    failures: int = Field(..., description="Consecutive failures counted")
+    opened: int = Field(..., description="Times the breaker has opened")
+    retry_after_seconds: int = Field(..., description="Seconds until a request will be let through")
+    last_error: str | None = Field(None, description="Most recent counted failure")
+
+
+class CircuitBreakerResponse(BaseModel):
+    """Circuit breaker state for providers and models (this worker process)."""
+
+    providers: dict[str, CircuitBreakerStatus]
+    models: dict[str, CircuitBreakerStatus]
+
+
+class HedgeGroupStatus(BaseModel):
+    """Hedging statistics for one primary model."""
+
+    secondary: str = Field(..., description="Model the primary's slow requests are hedged with")
+    requests: int = Field(..., description="Requests to the primary")
+    hedged: int = Field(..., description="Requests also sent to the secondary")
+    hedge_rate: float = Field(..., description="Fraction of requests hedged")
+    max_hedge_rate: float = Field(..., description="Configured cap on the hedge rate")
+    hedge_wins: int = Field(..., description="Hedged requests the secondary answered first")
+    skipped_budget: int = Field(..., description="Slow requests not hedged because the hedge rate cap was reached")
+    skipped_circuit: int = Field(..., description="Slow requests not hedged because the secondary's circuit was open")
+    wasted_calls: int = Field(..., description="Provider calls whose result was not used (cancelled losers, failed hedges)")
+    wasted_seconds: float = Field(..., description="Provider time spent on wasted calls, in seconds")
+    samples: int = Field(..., description="Primary latencies in the window")
+    hedge_delay_seconds: float | None = Field(
+        None, description="Current wait before hedging (null until enough latencies are known)"
+    )
+
+
+class HedgingResponse(BaseModel):
+    """Hedged request statistics (this worker process)."""
+
+    enabled: bool
+    groups: dict[str, HedgeGroupStatus]
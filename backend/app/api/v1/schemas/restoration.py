@@ -32,9 +32,14 @@ class HistoryResponse(BaseModel):
     """Response schema for history list endpoint."""
 
     items: list[HistoryItemResponse] = Field(..., description="List of processed images")
-    total: int = Field(..., description="Total number of items")
+    total: int | None = Field(
+        ..., description="Total number of items (null when include_total=false)"
+    )
     limit: int = Field(..., description="Items per page")
-    offset: int = Field(..., description="Offset from start")
+    offset: int = Field(..., description="Offset from start (0 when paging by cursor)")
+    next_cursor: str | None = Field(
+        None, description="Opaque cursor for the next page (null on the last page)"
+    )
 
 
 class ImageDetailResponse(BaseModel):
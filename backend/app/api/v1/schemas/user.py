@@ -144,3 +144,27 @@ class UserSessionsListResponse(BaseModel):
 
     sessions: list[UserSessionResponse]
     total: int
+
+
+class UserUsageResponse(BaseModel):
+    """Schema for a user's usage ledger entry."""
+
+    user_id: int
+    image_count: int
+    storage_bytes: int
+    provider_calls_today: int = Field(..., description="Provider calls made today (UTC)")
+    updated_at: Optional[datetime]
+    reconciled_at: Optional[datetime]
+
+
+class UsageListResponse(BaseModel):
+    """Schema for list of usage ledger entries."""
+
+    usage: list[UserUsageResponse]
+    total: int
+
+
+class UsageReconcileResponse(BaseModel):
+    """Schema for usage reconciliation result."""
+
+    corrected: int = Field(..., description="Number of ledger rows that were corrected")
@@ -55,6 +55,11 @@ def load_json_config(config_path: Path) -> dict[str, Any]:
         return json.load(f)
 
 
+def get_config_dir() -> Path:
+    """Directory holding default.json and the per-environment overrides."""
+    return Path(__file__).parent.parent.parent / "config"
+
+
 def load_config_from_files(app_env: str = "development") -> dict[str, Any]:
     """
     Load configuration from JSON files based on environment.
@@ -69,7 +74,7 @@ def load_config_from_files(app_env: str = "development") -> dict[str, Any]:
     Returns:
         Merged configuration dictionary
     """
-    config_dir = Path(__file__).parent.parent.parent / "config"
+    config_dir = get_config_dir()
 
     # Load default config
     default_config_path = config_dir / "default.json"
@@ -122,6 +127,7 @@ class Settings(BaseSettings):
     app_name: str = "Photo Restoration API"
     app_version: str = "1.8.2"
     debug: bool = False
+    log_level: str = "INFO"  # DEBUG when debug is set
 
     # Server
     host: str = "0.0.0.0"
@@ -138,9 +144,16 @@ class Settings(BaseSettings):
     # HuggingFace
     hf_api_timeout: int = 60
     hf_api_url: str = "https://api-inference.huggingface.co/models"
+    hf_retry_attempts: int = 3  # Retries after transient failures
+    hf_retry_delay_seconds: float = 2  # Base backoff delay (doubles per retry)
+    hf_retry_deadline_seconds: float = 180  # Overall budget for all attempts
+    hf_max_concurrent_requests: int = 8  # In-flight calls per worker (0 = unlimited)
+    hf_max_concurrent_requests_per_model: int = 4
 
     # Replicate (API token is secret, loaded from .env)
     replicate_api_timeout: int = 120
+    replicate_max_concurrent_requests: int = 8  # In-flight calls per worker (0 = unlimited)
+    replicate_max_concurrent_requests_per_model: int = 4
 
     # Models configuration (JSON string - DEPRECATED, use config files instead)
     models_config: str = """[
@@ -157,10 +170,17 @@ class Settings(BaseSettings):
     ]"""
     # Models API authentication (default: public access)
     models_require_auth: bool = False
+    models_cache_ttl_seconds: int = 300  # Browser cache lifetime of GET /models responses
 
     # Database
     # Note: Use 4 slashes (////) for absolute paths, 3 slashes (///) for relative paths
     database_url: str = "sqlite+aiosqlite:////data/photo_restoration.db"
+    database_pool_size: int = 5  # Read-only connections in the SQLite reader pool
+    database_max_overflow: int = 10
+    database_write_queue_enabled: bool = False  # Group-commit writer task
+    database_write_queue_max_batch: int = 32
+    database_write_queue_max_delay_ms: float = 5.0
+    database_reseed_on_startup: bool = False  # Self-healing seed on every startup
 
     # File storage
     upload_dir: Path = Path("./data/uploads")
@@ -176,10 +196,108 @@ class Settings(BaseSettings):
 
     # Processing limits
     max_concurrent_uploads_per_session: int = 3  # Concurrent processing limit per session
+    max_concurrent_uploads_per_user: int = 5  # Across all of a user's sessions (0 = unlimited)
+    concurrency_backend: str = "memory"  # memory, sqlite or redis
+    concurrency_lease_ttl_seconds: int = 600  # Unreleased upload slots expire after this long (held ones are renewed)
+    concurrency_sqlite_path: Path = Path("./data/concurrency.db")
+    concurrency_redis_url: str = "redis://localhost:6379/0"
+    provider_queue_size: int = 100  # Provider calls waiting for a slot, per provider
+    provider_queue_timeout_seconds: int = 120
+    provider_adaptive_concurrency: bool = True  # AIMD on provider rate limits
+
+    # Usage quotas (0 = unlimited)
+    quota_max_images_per_user: int = 0
+    quota_max_storage_bytes_per_user: int = 0
+    quota_max_provider_calls_per_day: int = 0
+    usage_reconcile_interval_hours: int = 24  # How often to recompute the usage ledger
+
+    # Rate limiting (token bucket per client and endpoint category)
+    rate_limit_enabled: bool = True
+    rate_limit_storage: str = "memory"  # memory or redis
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_models: str | None = "100/minute"
+    rate_limit_restore: str | None = "10/minute"
+    rate_limit_auth: str | None = "5/minute"
+    rate_limit_max_tracked_clients: int = 100000
+    rate_limit_trust_proxy_headers: bool = False
+
+    # Circuit breakers (per model and per provider)
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_failure_threshold: int = 5  # Consecutive model failures
+    circuit_breaker_provider_failure_threshold: int = 10  # Consecutive failures across a provider
+    circuit_breaker_recovery_seconds: int = 60  # Open time before a probe request
+
+    # Model warm-keeper (readiness probes and keep-alive requests)
+    warm_keeper_enabled: bool = True
+    warm_keeper_interval_seconds: int = 300
+
+    # Hedged requests (primary model backed by a secondary when slow)
+    hedging_enabled: bool = False
+    hedging_groups: list[dict[str, Any]] = []
+    hedging_latency_window: int = 200  # Recent primary latencies kept per model
+    hedging_min_samples: int = 20  # Latencies needed before hedging starts
+
+    # Configuration hot reload
+    config_reload_enabled: bool = True  # Watch the config files and apply changes
+    config_reload_interval_seconds: int = 5  # How often the files are checked
+
+    # Scheduler leader election (cluster-wide jobs run in one worker)
+    scheduler_leader_election: bool = True
+    scheduler_lease_seconds: int = 30  # Lease validity without renewal
+    scheduler_heartbeat_seconds: int = 10  # Renewal / acquisition interval
+
+    # Prometheus metrics
+    metrics_enabled: bool = True
+    metrics_multiprocess_dir: str = ""  # prometheus_client multiprocess directory for multiple workers
+    metrics_flush_interval_seconds: int = 5  # Callback gauge update interval per worker
+
+    # Tracing
+    tracing_enabled: bool = True
+    tracing_sample_ratio: float = 0.01  # Fraction of traces recorded
+    tracing_trust_traceparent: bool = False  # Follow the caller's sampled flag
+    tracing_exporter: str = "file"  # file or console
+    tracing_file_path: str = "./data/traces.jsonl"
+    tracing_file_max_mb: int = 100  # Rotation size of the span file
+
+    # Server-Timing response header
+    server_timing_enabled: bool = True
+    server_timing_paths: list[str] = ["/api/v1/restore", "/api/v1/auth"]  # Path prefixes
+    server_timing_exclude: list[str] = []  # Entries left out of the header
+
+    # Logging
+    logging_format: str = "text"  # text or json
+    logging_queue: bool = True  # Write log records from a background thread
+    logging_queue_size: int = 10000
+    logging_sample: dict[str, float] = {}  # Logger name/prefix -> fraction of DEBUG/INFO kept
+    logging_rate_limits: dict[str, int] = {}  # Logger name/prefix -> DEBUG/INFO records per second
+
+    # Admin CPU profiling
+    profiling_enabled: bool = True
+    profiling_max_seconds: int = 60  # Longest profile
+    profiling_min_interval_ms: int = 5  # Highest sample rate
+    profiling_max_overhead: float = 0.05  # Sampler CPU budget (fraction of one core)
+
+    # Event-loop stall detection
+    loop_watchdog_enabled: bool = True
+    loop_watchdog_interval_ms: int = 100  # Heartbeat interval
+    loop_watchdog_threshold_ms: int = 250  # Lag that counts as a stall
+    loop_watchdog_log_interval_seconds: float = 10.0  # Between stall stack logs
+
+    # Admin memory profiling
+    memory_profiling_enabled: bool = True
+    memory_profiling_trace_on_startup: bool = False
+    memory_profiling_frames: int = 1  # Default frames per traced allocation
+    memory_profiling_max_frames: int = 25
+    memory_profiling_max_snapshots: int = 5  # Per worker
+    memory_profiling_report_interval_seconds: int = 0  # Periodic memory report (0 = off)
+    memory_profiling_report_top: int = 10  # Growing sites per report
 
     # Internal flag to track if using new config system
     _using_json_config: bool = False
     _config_data: dict[str, Any] | None = None
+    _models_index: tuple[list[dict[str, Any]], dict[str, dict[str, Any]]] | None = None
+    # MODELS_CONFIG as parsed: (JSON text, models)
+    _parsed_models_config: tuple[str, list[dict[str, Any]]] | None = None
 
     def __init__(self, **kwargs: Any):
         """Initialize settings with config file support."""
@@ -298,6 +416,7 @@ class Settings(BaseSettings):
             "app_name": config.application.name,
             "app_version": config.application.version,
             "debug": config.application.debug,
+            "log_level": config.application.log_level,
 
             # Server
             "host": config.server.host,
@@ -313,13 +432,27 @@ class Settings(BaseSettings):
             # API Providers
             "hf_api_url": config.api_providers.huggingface.api_url,
             "hf_api_timeout": config.api_providers.huggingface.timeout_seconds,
+            "hf_retry_attempts": config.api_providers.huggingface.retry_attempts,
+            "hf_retry_delay_seconds": config.api_providers.huggingface.retry_delay_seconds,
+            "hf_retry_deadline_seconds": config.api_providers.huggingface.retry_deadline_seconds,
+            "hf_max_concurrent_requests": config.api_providers.huggingface.max_concurrent_requests,
+            "hf_max_concurrent_requests_per_model": config.api_providers.huggingface.max_concurrent_requests_per_model,
             "replicate_api_timeout": config.api_providers.replicate.timeout_seconds,
+            "replicate_max_concurrent_requests": config.api_providers.replicate.max_concurrent_requests,
+            "replicate_max_concurrent_requests_per_model": config.api_providers.replicate.max_concurrent_requests_per_model,
 
             # Models API
             "models_require_auth": config.models_api.require_auth,
+            "models_cache_ttl_seconds": config.models_api.cache_ttl_seconds,
 
             # Database
             "database_url": config.database.url,
+            "database_pool_size": config.database.pool_size,
+            "database_max_overflow": config.database.max_overflow,
+            "database_write_queue_enabled": config.database.write_queue_enabled,
+            "database_write_queue_max_batch": config.database.write_queue_max_batch,
+            "database_write_queue_max_delay_ms": config.database.write_queue_max_delay_ms,
+            "database_reseed_on_startup": config.database.reseed_on_startup,
 
             # File Storage
             "upload_dir": Path(config.file_storage.upload_dir),
@@ -333,6 +466,101 @@ class Settings(BaseSettings):
 
             # Processing
             "max_concurrent_uploads_per_session": config.processing.max_concurrent_uploads_per_session,
+            "max_concurrent_uploads_per_user": config.processing.max_concurrent_uploads_per_user,
+            "concurrency_backend": config.processing.concurrency_backend,
+            "concurrency_lease_ttl_seconds": config.processing.concurrency_lease_ttl_seconds,
+            "concurrency_sqlite_path": Path(config.processing.concurrency_sqlite_path),
+            "concurrency_redis_url": config.processing.concurrency_redis_url,
+            "provider_queue_size": config.processing.queue_size,
+            "provider_queue_timeout_seconds": config.processing.provider_queue_timeout_seconds,
+            "provider_adaptive_concurrency": config.processing.provider_adaptive_concurrency,
+
+            # Quotas
+            "quota_max_images_per_user": config.quotas.max_images_per_user,
+            "quota_max_storage_bytes_per_user": config.quotas.max_storage_mb_per_user * 1024 * 1024,
+            "quota_max_provider_calls_per_day": config.quotas.max_provider_calls_per_day,
+            "usage_reconcile_interval_hours": config.quotas.reconcile_interval_hours,
+
+            # Rate limiting
+            "rate_limit_enabled": config.rate_limit.enabled,
+            "rate_limit_storage": config.rate_limit.storage,
+            "rate_limit_redis_url": config.rate_limit.redis_url,
+            "rate_limit_models": config.rate_limit.models,
+            "rate_limit_restore": config.rate_limit.restore,
+            "rate_limit_auth": config.rate_limit.auth,
+            "rate_limit_max_tracked_clients": config.rate_limit.max_tracked_clients,
+            "rate_limit_trust_proxy_headers": config.rate_limit.trust_proxy_headers,
+
+            # Circuit breakers
+            "circuit_breaker_enabled": config.circuit_breaker.enabled,
+            "circuit_breaker_failure_threshold": config.circuit_breaker.failure_threshold,
+            "circuit_breaker_provider_failure_threshold": config.circuit_breaker.provider_failure_threshold,
+            "circuit_breaker_recovery_seconds": config.circuit_breaker.recovery_seconds,
+
+            # Model warm-keeper
+            "warm_keeper_enabled": config.warm_keeper.enabled,
+            "warm_keeper_interval_seconds": config.warm_keeper.interval_seconds,
+
+            # Hedged requests
+            "hedging_enabled": config.hedging.enabled,
+            "hedging_groups": [group.model_dump() for group in config.hedging.groups],
+            "hedging_latency_window": config.hedging.latency_window,
+            "hedging_min_samples": config.hedging.min_samples,
+
+            # Configuration hot reload
+            "config_reload_enabled": config.config_reload.enabled,
+            "config_reload_interval_seconds": config.config_reload.interval_seconds,
+
+            # Scheduler leader election
+            "scheduler_leader_election": config.scheduler.leader_election,
+            "scheduler_lease_seconds": config.scheduler.lease_seconds,
+            "scheduler_heartbeat_seconds": config.scheduler.heartbeat_seconds,
+
+            # Prometheus metrics
+            "metrics_enabled": config.metrics.enabled,
+            "metrics_multiprocess_dir": config.metrics.multiprocess_dir,
+            "metrics_flush_interval_seconds": config.metrics.flush_interval_seconds,
+
+            # Tracing
+            "tracing_enabled": config.tracing.enabled,
+            "tracing_sample_ratio": config.tracing.sample_ratio,
+            "tracing_trust_traceparent": config.tracing.trust_traceparent,
+            "tracing_exporter": config.tracing.exporter,
+            "tracing_file_path": config.tracing.file_path,
+            "tracing_file_max_mb": config.tracing.file_max_mb,
+
+            # Server-Timing response header
+            "server_timing_enabled": config.server_timing.enabled,
+            "server_timing_paths": config.server_timing.paths,
+            "server_timing_exclude": config.server_timing.exclude,
+
+            # Logging
+            "logging_format": config.logging.format,
+            "logging_queue": config.logging.queue,
+            "logging_queue_size": config.logging.queue_size,
+            "logging_sample": config.logging.sample,
+            "logging_rate_limits": config.logging.rate_limits,
+
+            # Admin CPU profiling
+            "profiling_enabled": config.profiling.enabled,
+            "profiling_max_seconds": config.profiling.max_seconds,
+            "profiling_min_interval_ms": config.profiling.min_interval_ms,
+            "profiling_max_overhead": config.profiling.max_overhead,
+
+            # Event-loop stall detection
+            "loop_watchdog_enabled": config.loop_watchdog.enabled,
+            "loop_watchdog_interval_ms": config.loop_watchdog.interval_ms,
+            "loop_watchdog_threshold_ms": config.loop_watchdog.threshold_ms,
+            "loop_watchdog_log_interval_seconds": config.loop_watchdog.log_interval_seconds,
+
+            # Admin memory profiling
+            "memory_profiling_enabled": config.memory_profiling.enabled,
+            "memory_profiling_trace_on_startup": config.memory_profiling.trace_on_startup,
+            "memory_profiling_frames": config.memory_profiling.frames,
+            "memory_profiling_max_frames": config.memory_profiling.max_frames,
+            "memory_profiling_max_snapshots": config.memory_profiling.max_snapshots,
+            "memory_profiling_report_interval_seconds": config.memory_profiling.report_interval_seconds,
+            "memory_profiling_report_top": config.memory_profiling.report_top,
         }
 
     @field_validator("models_config")
@@ -362,6 +590,9 @@ class Settings(BaseSettings):
         Parse and return models configuration.
 
         Returns models from JSON config if available, otherwise from .env MODELS_CONFIG.
+        Either way the same list (and model dicts) is returned on every call, so
+        caches keyed on a model dict's identity stay valid until the
+        configuration changes.
         """
         # Try to get from JSON config first
         if self._using_json_config and self._config_data:
@@ -369,16 +600,20 @@ class Settings(BaseSettings):
             if models:
                 return models
 
-        # Fallback to .env MODELS_CONFIG (deprecated)
-        return json.loads(self.models_config)
+        # Fallback to .env MODELS_CONFIG (deprecated), parsed once per value
+        parsed = self._parsed_models_config
+        if parsed is None or parsed[0] != self.models_config:
+            parsed = self._parsed_models_config = (self.models_config, json.loads(self.models_config))
+        return parsed[1]
 
     def get_model_by_id(self, model_id: str) -> dict[str, Any] | None:
-        """Get model configuration by ID."""
+        """Get model configuration by ID (indexed once per models list)."""
         models = self.get_models()
-        for model in models:
-            if model.get("id") == model_id:
-                return model
-        return None
+        index = self._models_index
+        if index is None or index[0] is not models:
+            # Reversed so the first of any duplicate IDs wins, as with a scan
+            index = self._models_index = (models, {model.get("id"): model for model in reversed(models)})
+        return index[1].get(model_id)
 
     def is_using_json_config(self) -> bool:
         """Check if using new JSON config system."""
@@ -399,6 +634,24 @@ def get_settings() -> Settings:
     return settings
 
 
+def set_settings(new_settings: Settings) -> Settings:
+    """
+    Replace the global settings instance (configuration reload).
+
+    Code that already holds the previous instance keeps using it, so a
+    request in flight sees one consistent configuration.
+
+    Args:
+        new_settings: Settings to use from now on
+
+    Returns:
+        The previous settings instance
+    """
+    global settings
+    previous, settings = settings, new_settings
+    return previous
+
+
 # Ensure directories exist
 settings.upload_dir.mkdir(parents=True, exist_ok=True)
 settings.processed_dir.mkdir(parents=True, exist_ok=True)
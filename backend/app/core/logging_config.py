@@ -0,0 +1,235 @@
+"""
+Application logging: formats, background delivery, sampling and request context.
+
+``configure_logging()`` installs one handler on the root logger:
+
+- Output is text (the classic ``asctime - name - level - message`` line) or
+  JSON, one object per line (``logging.format``).
+- With ``logging.queue`` the handler only puts records on a bounded queue;
+  a listener thread formats and writes them, so the event loop never blocks
+  on stderr. Records arriving while the queue is full are dropped.
+- ``logging.sample`` and ``logging.rate_limits`` thin out DEBUG/INFO records
+  per logger name or dotted prefix, before they are formatted. WARNING and
+  above always pass.
+
+Records carry the request context bound through ``bind()`` (request ID set
+by ``RequestContextMiddleware``, user and session set on authentication),
+and the trace ID when tracing is enabled.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core.config import Settings
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+TEXT_FORMAT_WITH_TRACE = "%(asctime)s - %(name)s - %(levelname)s - [trace=%(trace_id)s] %(message)s"
+
+# Attributes of every LogRecord; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "trace_id", "span_id"}
+
+_context: ContextVar[dict[str, Any] | None] = ContextVar("log_context", default=None)
+
+_listener: logging.handlers.QueueListener | None = None
+_handler: logging.Handler | None = None
+_stream: logging.StreamHandler | None = None
+
+
+def start_request(request_id: str) -> dict[str, Any]:
+    """Start the log context of a request; returns it."""
+    context = {"request_id": request_id}
+    _context.set(context)
+    return context
+
+
+def bind(**values: Any) -> None:
+    """Add values (user, session_id, ...) to the current request's log context."""
+    context = _context.get()
+    if context is None:
+        _context.set(dict(values))
+    else:
+        context.update(values)
+
+
+def get_context() -> dict[str, Any]:
+    """The current request's log context (empty outside a request)."""
+    return _context.get() or {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object with its request context and ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", None) or {})
+        if getattr(record, "trace_id", ""):
+            entry["trace_id"] = record.trace_id
+            entry["span_id"] = record.span_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key != "context":
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drops DEBUG/INFO records by per-logger sampling ratio and rate limit.
+
+    Rules apply to the logger name and to its children (``app.services``
+    covers ``app.services.hf_inference``); the longest matching name wins.
+
+    Args:
+        sample: Logger name or prefix -> fraction of records kept
+        rate_limits: Logger name or prefix -> records kept per second
+    """
+
+    def __init__(self, sample: dict[str, float], rate_limits: dict[str, int]):
+        super().__init__()
+        self.sample = sample
+        self.rate_limits = rate_limits
+        self._windows: dict[str, list[int]] = {}  # rule name -> [second, records kept]
+        self._lock = threading.Lock()
+
+    def _lookup(self, rules: dict, name: str) -> tuple[str, Any] | tuple[None, None]:
+        while name:
+            if name in rules:
+                return name, rules[name]
+            name = name.rpartition(".")[0]
+        return None, None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if not self.sample and not self.rate_limits:
+            return True
+
+        ratio = self._lookup(self.sample, record.name)[1]
+        if ratio is not None and random.random() >= ratio:
+            LOG_RECORDS_DROPPED.labels(record.name, "sampled").inc()
+            return False
+
+        rule, limit = self._lookup(self.rate_limits, record.name)
+        if limit is not None:
+            second = int(record.created)
+            with self._lock:
+                window = self._windows.setdefault(rule, [second, 0])
+                if window[0] != second:
+                    window[0], window[1] = second, 0
+                if window[1] >= limit:
+                    LOG_RECORDS_DROPPED.labels(record.name, "rate_limited").inc()
+                    return False
+                window[1] += 1
+        return True
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks: records are dropped while the queue is full.
+
+    Unlike the stdlib handler, prepare() keeps the exception as text
+    (``exc_text``) instead of merging it into the message, so the JSON
+    formatter can still report it separately.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.name, "queue_full").inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def _install_context_factory() -> None:
+    """Attach the request log context to every record."""
+    previous = logging.getLogRecordFactory()
+    if getattr(previous, "adds_log_context", False):
+        return
+
+    def factory(*args, **kwargs) -> logging.LogRecord:
+        record = previous(*args, **kwargs)
+        context = _context.get()
+        record.context = dict(context) if context else None
+        return record
+
+    factory.adds_log_context = True
+    logging.setLogRecordFactory(factory)
+
+
+def configure_logging(settings: Settings) -> None:
+    """
+    Install the application's log handler on the root logger.
+
+    Args:
+        settings: Application settings
+    """
+    global _listener, _handler, _stream
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        root.removeHandler(_handler)
+
+    if settings.logging_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT_WITH_TRACE if settings.tracing_enabled else TEXT_FORMAT)
+    _stream = logging.StreamHandler()
+    _stream.setFormatter(formatter)
+
+    if settings.logging_queue:
+        records: queue.Queue = queue.Queue(maxsize=settings.logging_queue_size)
+        _handler = BackgroundQueueHandler(records)
+        _listener = logging.handlers.QueueListener(records, _stream)
+        _listener.start()
+    else:
+        _handler = _stream
+    _handler.addFilter(SamplingFilter(settings.logging_sample, settings.logging_rate_limits))
+
+    _install_context_factory()
+    root.setLevel(logging.DEBUG if settings.debug else settings.log_level)
+    root.addHandler(_handler)
+
+
+def flush_logging() -> None:
+    """Write the queued records and stop the background thread; later records are written directly."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    root = logging.getLogger()
+    root.removeHandler(_handler)
+    for log_filter in _handler.filters:
+        _stream.addFilter(log_filter)
+    _handler = _stream
+    root.addHandler(_handler)
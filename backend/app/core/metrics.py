@@ -0,0 +1,298 @@
+"""
+Prometheus metrics.
+
+Metrics are ``prometheus_client`` counters, gauges and histograms; recording
+a value is an in-memory update with no I/O on the request path. Gauges for
+queue depths and in-flight counts are owned by other objects; they are
+registered with ``gauge_callback`` and read from their owners when the
+metrics are rendered, instead of being updated on every change.
+
+``GET /metrics`` renders every metric of this process. With several worker
+processes, set ``metrics.multiprocess_dir`` (or ``PROMETHEUS_MULTIPROC_DIR``)
+to a directory shared by the workers. The client then runs in its
+documented multiprocess mode: every worker writes its values to
+memory-mapped files in the directory as they are recorded, and the worker
+answering a scrape sums them. Counters and histograms keep the values of
+workers that have exited, so totals do not go backwards. Gauges only count
+live workers. A worker removes its live-gauge files on shutdown
+(``mark_process_dead``), and files left by workers that died are removed
+when another worker starts. Callback gauges are published every
+``metrics.flush_interval_seconds`` by each worker. Empty the directory
+before starting the server.
+
+Metric definitions live at the bottom of this module so the full set of
+series is visible in one place.
+"""
+import glob
+import logging
+import os
+import re
+import threading
+from typing import Callable
+
+from app.core.config import get_settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# The client picks its value storage when it is imported, so the directory
+# must be in the environment first
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or get_settings().metrics_multiprocess_dir
+if MULTIPROCESS_DIR:
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = MULTIPROCESS_DIR
+
+from prometheus_client import (  # noqa: E402
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.exposition import CONTENT_TYPE_PLAIN_0_0_4 as CONTENT_TYPE  # noqa: E402
+
+# Seconds; suits request and provider latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Seconds; for operations expected to take milliseconds (SQL statements, image codecs)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_LIVE_GAUGE_FILE = re.compile(r"gauge_live\w+_(\d+)\.db$")
+
+# Gauges read from their owners at render time: gauge -> (collector, label values last published)
+_gauge_callbacks: dict[Gauge, tuple[Callable[[], dict[tuple[str, ...], float]], set[tuple[str, ...]]]] = {}
+_callbacks_lock = threading.Lock()
+
+# Counters and histograms without the extra *_created series
+disable_created_metrics()
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this ID is running (on this host)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_dead_workers_gauges() -> None:
+    """
+    Remove live-gauge files of workers that are gone.
+
+    Also removes files carrying this process's ID: they were left by an
+    earlier process with the same ID, and the gauges defined below would
+    otherwise start from its values.
+    """
+    pids = set()
+    for path in glob.glob(os.path.join(MULTIPROCESS_DIR, "gauge_live*.db")):
+        match = _LIVE_GAUGE_FILE.search(path)
+        if match:
+            pids.add(int(match.group(1)))
+    for pid in pids:
+        if pid == os.getpid() or not _pid_alive(pid):
+            multiprocess.mark_process_dead(pid, MULTIPROCESS_DIR)
+
+
+if MULTIPROCESS_DIR:
+    _remove_dead_workers_gauges()
+
+
+def gauge_callback(gauge: Gauge, collector: Callable[[], dict[tuple[str, ...], float]]) -> None:
+    """
+    Read a gauge's values from a function when metrics are published.
+
+    Args:
+        gauge: Gauge to set
+        collector: Function returning ``{label values: value}``
+    """
+    with _callbacks_lock:
+        _gauge_callbacks[gauge] = (collector, set())
+
+
+def refresh_gauges() -> None:
+    """Set the callback gauges from their owners; series that disappeared are set to 0."""
+    with _callbacks_lock:
+        callbacks = list(_gauge_callbacks.items())
+    for gauge, (collector, published) in callbacks:
+        try:
+            values = collector()
+        except Exception as e:
+            logger.warning(f"Metrics collector for {gauge._name} failed: {e}")
+            continue
+        for labels in published - values.keys():
+            (gauge.labels(*labels) if labels else gauge).set(0)
+        for labels, value in values.items():
+            (gauge.labels(*labels) if labels else gauge).set(value)
+        published.clear()
+        published.update(values.keys())
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text format, summed across workers in multiprocess mode."""
+    refresh_gauges()
+    if not MULTIPROCESS_DIR:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, MULTIPROCESS_DIR)
+    return generate_latest(registry)
+
+
+def close_metrics() -> None:
+    """Remove this worker's live-gauge files (application shutdown)."""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid(), MULTIPROCESS_DIR)
+
+
+class ExecutorCall:
+    """
+    Blocking call counted in ``executor_calls_in_flight`` while queued or running.
+
+    The count covers the time from submission until the thread finishes,
+    including calls whose caller stopped waiting (a timed-out thread keeps
+    running). A call cancelled before a thread picked it up never runs;
+    ``discard_if_cancelled`` (a done callback on the asyncio future) drops it.
+
+    Args:
+        executor: Label identifying the thread pool user
+        call: Function to run in the executor
+    """
+
+    __slots__ = ("_call", "_gauge", "_lock", "_state")
+
+    def __init__(self, executor: str, call: Callable):
+        self._call = call
+        self._gauge = EXECUTOR_CALLS_IN_FLIGHT.labels(executor)
+        self._lock = threading.Lock()
+        self._state = "queued"
+        self._gauge.inc()
+
+    def __call__(self):
+        with self._lock:
+            counted = self._state == "queued"
+            self._state = "running"
+        try:
+            return self._call()
+        finally:
+            if counted:
+                self._gauge.dec()
+
+    def discard_if_cancelled(self, future) -> None:
+        """Stop counting a call cancelled before it started."""
+        if not future.cancelled():
+            return
+        with self._lock:
+            if self._state != "queued":
+                return
+            self._state = "discarded"
+        self._gauge.dec()
+
+
+# HTTP
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+)
+
+# Provider calls
+PROVIDER_CALL_DURATION = Histogram(
+    "provider_call_duration_seconds",
+    "Provider call latency by model and outcome (success, rate_limited, timeout, error, cancelled)",
+    ("provider", "model", "outcome"),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+PROVIDER_BYTES = Counter(
+    "provider_bytes_total", "Image bytes sent to and received from providers", ("provider", "model", "direction")
+)
+PROVIDER_QUEUE_WAIT = Histogram(
+    "provider_queue_wait_seconds", "Time calls waited for a provider slot", ("provider",)
+)
+PROVIDER_CALLS_IN_FLIGHT = Gauge(
+    "provider_calls_in_flight", "Provider calls currently running", ("provider",), multiprocess_mode="livesum"
+)
+PROVIDER_CALLS_QUEUED = Gauge(
+    "provider_calls_queued", "Provider calls waiting for a slot", ("provider",), multiprocess_mode="livesum"
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state by scope (provider, model): 0 closed, 1 half-open, 2 open; the worst worker's state",
+    ("scope", "name"),
+    multiprocess_mode="livemax",
+)
+
+# Queues and executors
+DB_WRITE_QUEUE_DEPTH = Gauge(
+    "db_write_queue_depth", "Mutation units waiting for a group commit", multiprocess_mode="livesum"
+)
+EXECUTOR_CALLS_IN_FLIGHT = Gauge(
+    "executor_calls_in_flight",
+    "Blocking calls submitted to a thread pool and not finished",
+    ("executor",),
+    multiprocess_mode="livesum",
+)
+
+# Upload slots
+UPLOADS_IN_FLIGHT = Gauge("uploads_in_flight", "Uploads holding a concurrency slot", multiprocess_mode="livesum")
+UPLOAD_SESSIONS_IN_FLIGHT = Gauge(
+    "upload_sessions_in_flight", "Sessions with at least one upload in flight", multiprocess_mode="livesum"
+)
+UPLOADS_IN_FLIGHT_PER_SESSION_MAX = Gauge(
+    "uploads_in_flight_per_session_max", "Most uploads in flight for a single session", multiprocess_mode="livemax"
+)
+UPLOAD_SLOTS_REJECTED = Counter(
+    "upload_slots_rejected_total", "Uploads rejected because a concurrency limit was full", ("scope",)
+)
+
+# Caches
+CACHE_REQUESTS = Counter("cache_requests_total", "In-process cache lookups by cache and result (hit, miss)", ("cache", "result"))
+
+# Database
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time by connection pool and statement type",
+    ("pool", "operation"),
+    buckets=FAST_BUCKETS,
+)
+
+# Images
+IMAGE_OPERATION_DURATION = Histogram(
+    "image_operation_duration_seconds", "Image decode and encode time", ("operation",), buckets=FAST_BUCKETS
+)
+
+# Scheduled jobs
+JOB_DURATION = Histogram(
+    "scheduled_job_duration_seconds",
+    "Duration of background job runs",
+    ("job",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+# Logging
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped by sampling or rate limits (DEBUG/INFO only), or because the log queue was full",
+    ("logger", "reason"),
+)
+
+# Event loop
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event-loop watchdog's heartbeat woke up", buckets=FAST_BUCKETS
+)
+EVENT_LOOP_STALLS = Counter("event_loop_stalls_total", "Heartbeats delayed by at least the stall threshold")
+EVENT_LOOP_STALL_DURATION = Histogram(
+    "event_loop_stall_duration_seconds", "Duration of event-loop stalls", buckets=DEFAULT_BUCKETS
+)
+
+# Memory
+TRACEMALLOC_TRACED_MEMORY = Gauge(
+    "tracemalloc_traced_bytes",
+    "Python memory traced by tracemalloc (0 unless an admin started tracing)",
+    multiprocess_mode="livesum",
+)
@@ -15,6 +15,7 @@ from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from app.core import logging_config, server_timing
 from app.core.config import get_settings
 
 # Password hashing context
@@ -135,12 +136,13 @@ async def get_current_user(
     )
 
     token = credentials.credentials
-    logger.info(f"Validating token: {token[:20]}...")
+    logger.debug("Validating token")
 
-    payload = verify_token(token)
+    with server_timing.measure("auth"):
+        payload = verify_token(token)
 
     if payload is None:
-        logger.error(f"Token verification failed for token: {token[:20]}...")
+        logger.warning("Token verification failed")
         raise credentials_exception
 
     username: str = payload.get("sub")
@@ -149,12 +151,14 @@ async def get_current_user(
     session_id: str = payload.get("session_id")
     password_must_change: bool = payload.get("password_must_change", False)
 
-    logger.info(f"Token verified - username: {username}, user_id: {user_id}, role: {role}, session_id: {session_id}")
+    logger.debug("Token verified - user_id: %s, role: %s, session_id: %s", user_id, role, session_id)
 
     if username is None or user_id is None:
         logger.error("Token payload missing required fields (username or user_id)")
         raise credentials_exception
 
+    logging_config.bind(user=username, user_id=user_id, session_id=session_id)
+
     # Return user data from token
     return {
         "username": username,
@@ -211,7 +215,7 @@ def get_current_user_validated():
         username = user_data["username"]
         session_id = user_data.get("session_id")
 
-        # Check if user still exists and is active
+        # Check if user still exists and is active (timed under db, not auth)
         result = await db.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
 
@@ -249,7 +253,7 @@ def get_current_user_validated():
                     headers={"WWW-Authenticate": "Bearer"},
                 )
      
-            logger.debug(f"Session and user validation passed for user: {username}")
+            logger.debug("Session and user validation passed for user: %s", username)
 
         return user_data
 
@@ -287,7 +291,9 @@ async def authenticate_user(username: str, password: str, db) -> Optional[dict]:
         return None
 
     # Verify password against hashed password
-    if not verify_password(password, user.hashed_password):
+    with server_timing.measure("auth"):
+        password_ok = verify_password(password, user.hashed_password)
+    if not password_ok:
         return None
 
     # Return user data (excluding sensitive fields)
@@ -0,0 +1,72 @@
+"""
+Per-request latency breakdown for the ``Server-Timing`` response header.
+
+``ServerTimingMiddleware`` gives each request on the configured paths a
+fresh timing context. Routes and services add to it through ``measure()``
+(a block) or ``record()`` (a known duration). Durations with the same name
+add up, so a request making ten database statements reports their total
+under ``db``. Outside such a request both are no-ops costing one context
+variable lookup.
+
+The context is a plain dict held by a context variable. It is shared by
+reference with threadpool dependencies and tasks started by the request,
+so time spent there is counted too. Work queued to other tasks (the group
+commit writer) is measured by the code waiting for it.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+# Entries in header order; anything else recorded is appended after them
+ENTRIES = ("auth", "db", "decode", "provider", "encode", "storage")
+
+_timings: ContextVar[dict[str, float] | None] = ContextVar("server_timings", default=None)
+
+
+def start() -> dict[str, float]:
+    """Start timing the current request; returns its (empty) timings."""
+    timings: dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a duration to the current request's entry."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """Add the time spent in a block to the current request's entry."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started)
+
+
+def format_header(timings: dict[str, float], total: float, exclude: list[str]) -> str:
+    """
+    Build the ``Server-Timing`` header value.
+
+    Args:
+        timings: Recorded durations in seconds
+        total: Time the request took until its response started, in seconds
+        exclude: Entry names to leave out
+
+    Returns:
+        Header value such as ``db;dur=3.1, provider;dur=812.4, total;dur=830.2``
+    """
+    names = [name for name in ENTRIES if name in timings]
+    names += [name for name in timings if name not in ENTRIES]
+    parts = [f"{name};dur={timings[name] * 1000:.1f}" for name in names if name not in exclude]
+    if "total" not in exclude:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,361 @@
+"""
+Span-based request tracing in the OpenTelemetry style.
+
+A trace is a tree of spans: one server span per HTTP request (started by
+``TracingMiddleware``) and one child span per pipeline stage (validation,
+decode, provider queueing and call, output download, file writes, database
+commits). Spans carry W3C-compatible IDs (128-bit trace ID, 64-bit span ID),
+attributes, a status and start/end times in nanoseconds. The current span
+lives in a context variable, so it follows the request through ``await``
+and into tasks started from it (hedged provider calls).
+
+Sampling is decided once per trace, at the root, with probability
+``tracing.sample_ratio``. A request carrying a ``traceparent`` header keeps
+the caller's trace ID; its sampled flag is only followed with
+``tracing.trust_traceparent``, so clients cannot force every request of
+theirs to be recorded. Spans of unsampled
+traces are not recorded or exported; they only carry the trace ID so it can
+still be logged. With tracing disabled ``span()`` returns a shared no-op
+span and does not touch the context at all.
+
+Finished spans of sampled traces are queued (non-blocking; spans are
+dropped if the queue is full) and written by a background thread as JSON
+lines to ``tracing.file_path`` (rotated to ``<file>.1`` at
+``tracing.file_max_mb``) or to standard output (``exporter: console``), so
+no collector is needed.
+
+Log records get ``trace_id`` and ``span_id`` attributes from the current
+span (empty outside a trace) once ``install_log_correlation()`` has run.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from app.core.config import Settings, get_settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Exporter queue size; spans finished while it is full are dropped
+MAX_QUEUED_SPANS = 10_000
+
+
+class Span:
+    """
+    One timed operation in a trace.
+
+    Attributes:
+        name: Operation name (for example ``restore.provider_call``)
+        trace_id: 32 hex characters, shared by every span of the trace
+        span_id: 16 hex characters
+        parent_id: Parent span ID (None for the root span)
+        sampled: Whether the span is recorded and exported
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, span_id: str, parent_id: str | None, sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes: dict[str, Any] = {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach a value (str, int, float or bool) to a recorded span."""
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        """Mark the span failed and record the exception type and message."""
+        if self.sampled:
+            self.status = "error"
+            self.attributes["exception.type"] = type(error).__name__
+            self.attributes["exception.message"] = str(error)[:500]
+
+    @property
+    def traceparent(self) -> str:
+        """W3C ``traceparent`` header value for this span."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> dict:
+        """Exported representation (one JSON line)."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Span returned while tracing is disabled."""
+
+    __slots__ = ()
+
+    trace_id = ""
+    span_id = ""
+    sampled = False
+    traceparent = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    """The span of the running operation, if any."""
+    return _current_span.get()
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Returns:
+        (trace_id, parent span_id, sampled), or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if version == "ff" or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id.lower(), span_id.lower(), sampled
+
+
+class SpanExporter:
+    """
+    Writes finished spans as JSON lines from a background thread.
+
+    Args:
+        exporter: ``file`` or ``console`` (standard output)
+        file_path: Output file for the ``file`` exporter
+        max_bytes: Size at which the file is rotated to ``<file>.1``
+    """
+
+    def __init__(self, exporter: str, file_path: str, max_bytes: int):
+        self.exporter = exporter
+        self.path = Path(file_path)
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue: queue.Queue[dict | None] = queue.Queue(maxsize=MAX_QUEUED_SPANS)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        """Queue a finished span (never blocks)."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [item for item in batch if item is not None]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list[dict]) -> None:
+        lines = "".join(json.dumps(item, default=str) + "\n" for item in batch)
+        if self.exporter == "console":
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"Failed to write {len(batch)} spans to {self.path}: {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Write the queued spans and stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class Tracer:
+    """
+    Starts spans and decides sampling.
+
+    Args:
+        settings: Application settings (uses global settings if not provided)
+    """
+
+    def __init__(self, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.enabled = settings.tracing_enabled
+        self.sample_ratio = settings.tracing_sample_ratio
+        self.trust_traceparent = settings.tracing_trust_traceparent
+        self.exporter = SpanExporter(
+            settings.tracing_exporter,
+            settings.tracing_file_path,
+            settings.tracing_file_max_mb * 1024 * 1024,
+        )
+
+    def _new_span(self, name: str, parent: Span | None, remote: tuple[str, str, bool] | None) -> Span:
+        if parent is not None:
+            return Span(name, parent.trace_id, f"{random.getrandbits(64):016x}", parent.span_id, parent.sampled)
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+            if not self.trust_traceparent:
+                sampled = random.random() < self.sample_ratio
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_ratio
+        return Span(name, trace_id, f"{random.getrandbits(64):016x}", parent_id, sampled)
+
+    @contextmanager
+    def span(self, name: str, traceparent: str | None = None, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+        """
+        Run a block as a span, child of the current span.
+
+        Args:
+            name: Operation name
+            traceparent: Incoming ``traceparent`` header (only used for a root span)
+            **attributes: Initial span attributes
+
+        Yields:
+            The span (a no-op span while tracing is disabled)
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = self._new_span(name, parent, parse_traceparent(traceparent) if parent is None else None)
+        if span.sampled and attributes:
+            span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            if span.sampled:
+                span.end_ns = time.time_ns()
+                self.exporter.export(span)
+
+    def shutdown(self) -> None:
+        """Flush queued spans (application shutdown)."""
+        self.exporter.shutdown()
+
+
+_tracer: Tracer | None = None
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer, creating it on first use."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, **attributes: Any):
+    """Context manager running a block as a span of the process-wide tracer."""
+    return get_tracer().span(name, **attributes)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator running every call of a function (sync or async) as a span.
+
+    Args:
+        name: Span name
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def install_log_correlation() -> None:
+    """Add ``trace_id`` and ``span_id`` (from the current span) to every log record."""
+    previous = logging.getLogRecordFactory()
+    if getattr(previous, "adds_trace_context", False):
+        return
+
+    def factory(*args, **kwargs) -> logging.LogRecord:
+        record = previous(*args, **kwargs)
+        span = _current_span.get()
+        record.trace_id = span.trace_id if span is not None else ""
+        record.span_id = span.span_id if span is not None else ""
+        return record
+
+    factory.adds_trace_context = True
+    logging.setLogRecordFactory(factory)
@@ -1,62 +1,79 @@
 """
 Database setup and configuration.
 
-This module provides async SQLAlchemy setup with SQLite,
-following best practices for WAL mode and proper configuration.
-
-IMPORTANT: SQLite-Only Implementation
-=====================================
-This module is designed specifically for SQLite databases and uses SQLite-specific
-features and SQL syntax. Key SQLite-specific implementations:
-
-1. Legacy Schema Detection (detect_legacy_schema):
+This module provides async SQLAlchemy setup for SQLite (default) and
+PostgreSQL, following best practices for each backend.
+
+Supported Backends
+==================
+- SQLite via aiosqlite (``sqlite+aiosqlite://``): single node, WAL mode
+- PostgreSQL via asyncpg (``postgresql+asyncpg://``; plain ``postgresql://``
+  URLs are upgraded to the asyncpg driver automatically)
+
+Dialect-specific behaviour is isolated in a few places:
+
+1. Engine Creation (create_engine, create_reader_engine):
+   - SQLite: one writer connection (StaticPool) plus a pool of read-only
+     connections (PRAGMA query_only) for SELECTs; WAL mode lets readers
+     proceed alongside the writer. In-memory databases cannot share state
+     across connections, so they use the writer for everything.
+   - PostgreSQL: a single engine with a real connection pool sized by
+     database.pool_size / database.max_overflow (MVCC handles concurrency)
+   - The session factory routes each statement to the right engine
+
+2. Connection Configuration (configure_sqlite):
+   - SQLite only: PRAGMAs for WAL mode, foreign keys and busy timeout
+   - No-op for other dialects
+
+3. Legacy Schema Detection (detect_legacy_schema):
    - Uses SQLAlchemy's inspector to detect pre-Alembic databases
    - Checks for core application tables without alembic_version
 
-2. Database Stamping (stamp_alembic_version):
-   - Uses SQLite-specific "INSERT OR IGNORE" syntax
-   - Validates dialect is SQLite before proceeding
-   - Raises ValueError if non-SQLite database is detected
-
-3. Migration Running (run_alembic_migrations):
-   - Converts async SQLite URL (sqlite+aiosqlite) to sync (sqlite)
-   - Validates dialect is SQLite before proceeding
-   - Raises ValueError if non-SQLite database is detected
-
-4. SQLite Configuration (configure_sqlite):
-   - Uses PRAGMA statements specific to SQLite
-   - Enables WAL mode, foreign keys, and optimizes performance
-
-If you need to support other databases (PostgreSQL, MySQL, etc.):
-- Use Alembic's built-in stamp command instead of stamp_alembic_version()
-- Implement dialect-aware SQL in stamping functions
-- Add proper async driver handling for each database type
-- Update validation logic to allow multiple dialects
+4. Database Stamping (stamp_alembic_version):
+   - Portable inspector check + plain INSERT into alembic_version
+   - Raises ValueError for unsupported dialects
+
+5. Migration Running (run_alembic_migrations):
+   - SQLite: converts the async URL (sqlite+aiosqlite) to sync (sqlite)
+   - PostgreSQL: passes the asyncpg URL through; alembic/env.py runs the
+     migrations on an async engine
+   - Raises ValueError for unsupported dialects
 """
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.sql import Select
 
 from app.core.config import get_settings
 from app.db.models import Base, SchemaMigration
 
-# Global engine and session factory
+# Global engines and session factory
+# _engine is the single writer; _reader_engine is the read-only pool
+# (None when the database cannot be shared across connections)
 _engine: AsyncEngine | None = None
+_reader_engine: AsyncEngine | None = None
 _async_session_factory: async_sessionmaker[AsyncSession] | None = None
 
+# Dialects the schema management helpers know how to handle
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
 
 def get_database_url() -> str:
     """
     Get database URL from settings.
 
-    Converts sync SQLite URL to async format for aiosqlite.
+    Converts sync URLs to their async driver:
+    - sqlite:// -> sqlite+aiosqlite://
+    - postgresql:// (or postgres://) -> postgresql+asyncpg://
 
     Returns:
         Async database URL
@@ -70,24 +87,56 @@ def get_database_url() -> str:
         return db_url.replace("sqlite://", "sqlite+aiosqlite://")
     elif db_url.startswith("sqlite+aiosqlite://"):
         return db_url
+    elif db_url.startswith("postgresql://"):
+        return db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    elif db_url.startswith("postgres://"):
+        return db_url.replace("postgres://", "postgresql+asyncpg://", 1)
     else:
         return db_url
 
 
+def get_dialect_name(database_url: str) -> str:
+    """
+    Get the dialect name (without driver) of a database URL.
+
+    Args:
+        database_url: SQLAlchemy database URL
+
+    Returns:
+        Dialect name, e.g. "sqlite" or "postgresql"
+    """
+    return make_url(database_url).get_backend_name()
+
+
 def create_engine() -> AsyncEngine:
     """
-    Create async SQLAlchemy engine with proper SQLite configuration.
+    Create the primary async SQLAlchemy engine for the configured database.
+
+    SQLite:
+    - StaticPool: a single writer connection shared by the process
+    - WAL mode, busy_timeout etc. are applied by configure_sqlite()
 
-    Configures:
-    - WAL mode for concurrent reads/writes
-    - StaticPool for connection reuse
-    - Proper timeout and busy_timeout settings
+    PostgreSQL:
+    - Connection pool sized by database.pool_size / database.max_overflow
+    - pool_pre_ping to survive server restarts and idle disconnects
 
     Returns:
         Configured AsyncEngine instance
     """
     database_url = get_database_url()
 
+    if get_dialect_name(database_url) != "sqlite":
+        settings = get_settings()
+        engine = create_async_engine(
+            database_url,
+            echo=False,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_pre_ping=True,
+        )
+        observe_statement_timings(engine, "writer")
+        return engine
+
     # Create engine with SQLite-specific settings
     engine = create_async_engine(
         database_url,
@@ -98,19 +147,202 @@ def create_engine() -> AsyncEngine:
             "timeout": 30.0,  # Connection timeout (seconds)
         },
     )
+    observe_statement_timings(engine, "writer")
+
+    return engine
+
+
+def observe_statement_timings(engine: AsyncEngine, pool: str) -> None:
+    """
+    Record every statement's execution time in the db_statement_duration_seconds metric
+    and in the current request's ``db`` Server-Timing entry.
+
+    Args:
+        engine: Engine to instrument
+        pool: Metric label for the engine ("writer" or "reader")
+    """
+    import time
+
+    from app.core import server_timing
+    from app.core.metrics import DB_STATEMENT_DURATION
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _observe(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        operation = statement.lstrip()[:6].upper()
+        if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+            operation = "OTHER"
+        elapsed = time.perf_counter() - started
+        DB_STATEMENT_DURATION.labels(pool, operation.lower()).observe(elapsed)
+        server_timing.record("db", elapsed)
+
+
+def validate_dialect(engine: AsyncEngine, operation: str) -> str:
+    """
+    Ensure the engine's dialect is supported by the schema management helpers.
+
+    Args:
+        engine: AsyncEngine to check
+        operation: Name of the calling function (for the error message)
+
+    Returns:
+        The dialect name
+
+    Raises:
+        ValueError: If the dialect is not supported
+    """
+    dialect_name = engine.dialect.name
+    if dialect_name not in SUPPORTED_DIALECTS:
+        raise ValueError(
+            f"{operation} only supports SQLite and PostgreSQL databases. "
+            f"Current dialect: {dialect_name}."
+        )
+    return dialect_name
+
+
+def is_memory_database(database_url: str) -> bool:
+    """
+    Check whether a SQLite URL points at an in-memory database.
+
+    Args:
+        database_url: SQLAlchemy database URL
+
+    Returns:
+        True for in-memory SQLite URLs
+    """
+    return database_url.startswith("sqlite") and (
+        ":memory:" in database_url
+        or "mode=memory" in database_url
+        or database_url.rstrip("/").endswith(":")
+    )
+
+
+def create_reader_engine() -> AsyncEngine | None:
+    """
+    Create the read-only connection pool used for SELECT queries.
+
+    With WAL mode, SQLite allows any number of readers to run alongside the
+    single writer. Each pooled connection is opened with ``query_only`` so a
+    misrouted mutation fails loudly instead of contending for the write lock.
+
+    Pool sizing comes from ``database.pool_size`` and ``database.max_overflow``.
+
+    Returns:
+        AsyncEngine for readers, or None when the primary engine should serve
+        reads too: in-memory SQLite (a separate connection would see an empty
+        database) and PostgreSQL (the primary engine is already pooled)
+    """
+    settings = get_settings()
+    database_url = get_database_url()
+
+    if get_dialect_name(database_url) != "sqlite" or is_memory_database(database_url):
+        return None
+
+    engine = create_async_engine(
+        database_url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,  # aiosqlite defaults to NullPool
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_pre_ping=False,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": 30.0,
+        },
+    )
+
+    observe_statement_timings(engine, "reader")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_reader_connection(dbapi_connection, connection_record) -> None:
+        """Apply per-connection PRAGMAs to every new reader connection."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
     return engine
 
 
+class RoutingSession(OrmSession):
+    """
+    ORM session that routes reads to the reader pool and writes to the writer.
+
+    Plain SELECTs go to the reader engine. Everything else (ORM flushes,
+    INSERT/UPDATE/DELETE, raw text statements) goes to the writer. Once a
+    transaction has touched the writer, later reads in the same transaction
+    stay on the writer so they see its uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw: Any):
+        """Pick the engine for the next statement."""
+        engines = self.info.get("engines")
+        if not engines:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+        writer, reader = engines
+        if reader is None or self.info.get("use_writer"):
+            return writer
+
+        if not self._flushing and isinstance(clause, Select) and not clause._for_update_arg:
+            return reader
+
+        self.info["use_writer"] = True
+        return writer
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writer_affinity(session: OrmSession, transaction) -> None:
+    """Drop writer affinity once the outermost transaction finishes."""
+    if transaction.parent is None:
+        session.info.pop("use_writer", None)
+
+
+def create_session_factory(
+    writer: AsyncEngine, reader: AsyncEngine | None = None
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Create the session factory, routing statements between writer and readers.
+
+    Args:
+        writer: Engine owning the single writer connection
+        reader: Optional read-only pool engine
+
+    Returns:
+        async_sessionmaker producing routed sessions
+    """
+    return async_sessionmaker(
+        bind=writer,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        info={"engines": (writer.sync_engine, reader.sync_engine if reader else None)},
+        expire_on_commit=False,  # Don't expire objects after commit
+        autoflush=False,  # Manual flush control
+        autocommit=False,  # Manual commit control
+    )
+
+
 async def configure_sqlite(engine: AsyncEngine) -> None:
     """
     Configure SQLite with WAL mode and optimal settings.
 
     This should be called once during application startup.
 
+    Does nothing for non-SQLite engines.
+
     Args:
         engine: AsyncEngine instance to configure
     """
+    if engine.dialect.name != "sqlite":
+        return
+
     async with engine.begin() as conn:
         # Enable WAL mode for concurrent access
         await conn.execute(text("PRAGMA journal_mode=WAL"))
@@ -209,38 +441,31 @@ async def stamp_alembic_version(engine: AsyncEngine, revision: str) -> None:
     This creates the alembic_version table and marks a specific revision as applied,
     allowing existing databases to adopt Alembic without re-running initial migrations.
 
-    IMPORTANT: This function is SQLite-specific and uses SQLite syntax.
-    The application currently only supports SQLite databases.
+    Uses only portable SQL (inspector table check + plain INSERT), so it works
+    for every dialect in SUPPORTED_DIALECTS.
 
     Args:
         engine: AsyncEngine instance
         revision: Alembic revision ID to stamp (e.g., '000_initial_schema')
 
     Raises:
-        ValueError: If the database is not SQLite
+        ValueError: If the database dialect is not supported
         RuntimeError: If stamping fails
     """
     import logging
+    from sqlalchemy import inspect
     logger = logging.getLogger(__name__)
 
-    # Validate that we're using SQLite
-    dialect_name = engine.dialect.name
-    if dialect_name != 'sqlite':
-        raise ValueError(
-            f"stamp_alembic_version only supports SQLite databases. "
-            f"Current dialect: {dialect_name}. "
-            f"For other databases, use Alembic's built-in stamp command."
-        )
+    validate_dialect(engine, "stamp_alembic_version")
 
     logger.info(f"Stamping database with Alembic revision: {revision}")
 
     try:
         async with engine.begin() as conn:
             # Check if alembic_version table already exists with a different revision
-            check_result = await conn.execute(
-                text("SELECT name FROM sqlite_master WHERE type='table' AND name='alembic_version'")
+            table_exists = await conn.run_sync(
+                lambda sync_conn: inspect(sync_conn).has_table("alembic_version")
             )
-            table_exists = check_result.fetchone() is not None
 
             if table_exists:
                 # Check current revision
@@ -257,19 +482,18 @@ async def stamp_alembic_version(engine: AsyncEngine, revision: str) -> None:
                 elif current_revision == revision:
                     logger.info(f"Database already stamped with revision: {revision}")
                     return  # Already at correct revision, nothing to do
+            else:
+                # Create alembic_version table (same layout Alembic creates)
+                await conn.execute(text("""
+                    CREATE TABLE alembic_version (
+                        version_num VARCHAR(32) NOT NULL,
+                        CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+                    )
+                """))
 
-            # Create alembic_version table if it doesn't exist
-            await conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS alembic_version (
-                    version_num VARCHAR(32) NOT NULL,
-                    CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
-                )
-            """))
-
-            # Insert the revision (SQLite-specific: INSERT OR REPLACE)
-            # Using REPLACE to handle the edge case where table exists but is empty
+            # Table is new or empty at this point, so a plain INSERT is safe
             await conn.execute(
-                text("INSERT OR REPLACE INTO alembic_version (version_num) VALUES (:version)"),
+                text("INSERT INTO alembic_version (version_num) VALUES (:version)"),
                 {"version": revision}
             )
 
@@ -374,6 +598,26 @@ async def record_migration(session: AsyncSession, version: str, description: str
         # This is fine, migration is recorded
 
 
+async def get_alembic_revisions(engine: AsyncEngine) -> set[str]:
+    """
+    Get the Alembic revisions recorded in the database.
+
+    Args:
+        engine: AsyncEngine instance
+
+    Returns:
+        Revisions in alembic_version (empty if the table does not exist)
+    """
+    from sqlalchemy import inspect
+
+    async with engine.connect() as conn:
+        has_table = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("alembic_version"))
+        if not has_table:
+            return set()
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        return {row[0] for row in result}
+
+
 async def run_alembic_migrations(engine: AsyncEngine) -> None:
     """
     Run Alembic migrations to upgrade database schema.
@@ -385,49 +629,50 @@ async def run_alembic_migrations(engine: AsyncEngine) -> None:
     URL as the application, preventing migrations from targeting a different
     database (especially important for tests and multi-tenant setups).
 
-    IMPORTANT: This function currently only supports SQLite databases.
-    The async-to-sync dialect conversion is SQLite-specific.
+    Dialect handling:
+    - SQLite: the async URL (sqlite+aiosqlite) is converted to sync (sqlite)
+    - PostgreSQL: the asyncpg URL is passed through; alembic/env.py runs the
+      migrations on an async engine
 
     Args:
         engine: AsyncEngine instance whose URL will be used for migrations
 
     Raises:
-        ValueError: If the database is not SQLite
+        ValueError: If the database dialect is not supported
 
     The function runs in a separate thread to avoid blocking the async event loop,
-    since alembic.command.upgrade() is synchronous.
+    since alembic.command.upgrade() is synchronous. When the database is
+    already at the head revision (the usual restart) the upgrade is skipped:
+    the recorded revisions are read on the application engine and compared
+    with the migration scripts' heads, without starting Alembic's environment.
     """
     import logging
     import asyncio
     logger = logging.getLogger(__name__)
 
-    # Validate that we're using SQLite
-    dialect_name = engine.dialect.name
-    if dialect_name != 'sqlite':
-        raise ValueError(
-            f"run_alembic_migrations only supports SQLite databases. "
-            f"Current dialect: {dialect_name}. "
-            f"For other databases, ensure the engine URL uses the appropriate sync driver."
-        )
+    dialect_name = validate_dialect(engine, "run_alembic_migrations")
+    current_revisions = await get_alembic_revisions(engine)
 
-    # Extract database URL from engine
-    database_url = str(engine.url)
+    # Extract database URL from engine (keep the password for Alembic's own engine)
+    database_url = engine.url.render_as_string(hide_password=False)
 
-    # Convert async dialect to sync for Alembic (SQLite-specific)
-    # SQLite async driver (aiosqlite) → sync driver (pysqlite)
-    if "sqlite+aiosqlite://" in database_url:
-        database_url = database_url.replace("sqlite+aiosqlite://", "sqlite://")
-    else:
-        logger.warning(
-            f"Expected SQLite async URL with aiosqlite driver, got: {database_url}. "
-            f"Proceeding without URL conversion."
-        )
+    if dialect_name == "sqlite":
+        # Convert async dialect to sync for Alembic
+        # SQLite async driver (aiosqlite) → sync driver (pysqlite)
+        if "sqlite+aiosqlite://" in database_url:
+            database_url = database_url.replace("sqlite+aiosqlite://", "sqlite://")
+        else:
+            logger.warning(
+                f"Expected SQLite async URL with aiosqlite driver, got: {database_url}. "
+                f"Proceeding without URL conversion."
+            )
 
     def _run_migrations_sync() -> None:
         """Synchronous wrapper for Alembic migrations."""
         try:
             from alembic import command
             from alembic.config import Config
+            from alembic.script import ScriptDirectory
             from pathlib import Path
 
             # Get alembic.ini path
@@ -439,10 +684,19 @@ async def run_alembic_migrations(engine: AsyncEngine) -> None:
 
             # Create Alembic config
             alembic_cfg = Config(str(alembic_cfg_path))
+            # Keep the application's log handlers and loggers (fileConfig would replace them)
+            alembic_cfg.attributes["configure_logger"] = False
 
             # CRITICAL: Override the database URL to match the engine being initialized
             # This ensures Alembic migrates the same database that the app will use
-            alembic_cfg.set_main_option("sqlalchemy.url", database_url)
+            # ("%" must be escaped for ConfigParser interpolation)
+            alembic_cfg.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+
+            # Fast path: nothing to do if the database is already at head
+            heads = set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+            if current_revisions == heads:
+                logger.info(f"Database at head revision {', '.join(sorted(heads))}, skipping Alembic upgrade")
+                return
 
             # Run migrations to head
             logger.info("Running Alembic migrations...")
@@ -475,8 +729,10 @@ async def init_db() -> None:
     This function is idempotent:
     - ALWAYS runs Alembic migrations (creates tables, handles column additions, etc.)
     - ALWAYS runs create_all() as fallback (creates missing tables not in migrations)
+    - Skips the Alembic upgrade when the database is already at head
     - Tracks initialization via schema_migrations to avoid re-seeding
-    - Re-runs seeding every startup for self-healing (seeding is idempotent)
+    - Re-runs seeding on later startups only if database.reseed_on_startup
+      is set (self-healing; seeding is idempotent)
 
     This should be called during application startup.
     Performs:
@@ -487,12 +743,13 @@ async def init_db() -> None:
     5. Creates session factory
     6. On first initialization: records migration and seeds data
     7. On subsequent startups: re-runs idempotent seeding for self-healing
+       when database.reseed_on_startup is set
     """
     import logging
     import os
     logger = logging.getLogger(__name__)
 
-    global _engine, _async_session_factory
+    global _engine, _reader_engine, _async_session_factory
 
     # Log database URL for debugging (redact credentials for security)
     database_url = get_database_url()
@@ -553,15 +810,19 @@ async def init_db() -> None:
 
     logger.info("Database schema synchronized")
 
-    # Create session factory
+    # Create the read-only pool only once WAL mode is on and the schema exists,
+    # so readers never observe a half-migrated database
+    if _reader_engine is None and not is_memory_database(str(_engine.url)):
+        _reader_engine = create_reader_engine()
+        if _reader_engine is not None:
+            logger.info(
+                f"Reader pool enabled: pool_size={_reader_engine.pool.size()}, "
+                f"max_overflow={get_settings().database_max_overflow}"
+            )
+
+    # Create session factory (routes SELECTs to readers, mutations to the writer)
     if _async_session_factory is None:
-        _async_session_factory = async_sessionmaker(
-            _engine,
-            class_=AsyncSession,
-            expire_on_commit=False,  # Don't expire objects after commit
-            autoflush=False,  # Manual flush control
-            autocommit=False,  # Manual commit control
-        )
+        _async_session_factory = create_session_factory(_engine, _reader_engine)
 
     # Check if this is first initialization
     db_initialized = await is_db_initialized(_engine)
@@ -584,6 +845,8 @@ async def init_db() -> None:
                     "Initial database schema with users, sessions, and processed_images tables"
                 )
                 logger.info("Database initialized successfully")
+            elif not get_settings().database_reseed_on_startup:
+                logger.info("Database already initialized, skipping seed (database.reseed_on_startup is off)")
             else:
                 # Subsequent startups: re-run idempotent seeding for self-healing
                 # This ensures admin user exists even if accidentally deleted
@@ -647,7 +910,11 @@ async def close_db() -> None:
 
     This should be called during application shutdown.
     """
-    global _engine, _async_session_factory
+    global _engine, _reader_engine, _async_session_factory
+
+    if _reader_engine is not None:
+        await _reader_engine.dispose()
+        _reader_engine = None
 
     if _engine is not None:
         await _engine.dispose()
@@ -674,6 +941,22 @@ def get_engine() -> AsyncEngine:
     return _engine
 
 
+def get_reader_engine() -> AsyncEngine:
+    """
+    Get the engine used for read-only queries.
+
+    Returns:
+        The reader pool engine, or the writer engine when no pool is configured
+
+    Raises:
+        RuntimeError: If database not initialized
+    """
+    if _reader_engine is not None:
+        return _reader_engine
+
+    return get_engine()
+
+
 def get_session_factory() -> async_sessionmaker[AsyncSession]:
     """
     Get the session factory.
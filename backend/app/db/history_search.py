@@ -0,0 +1,114 @@
+"""
+Filename search over processed image history.
+
+Every word of the search must match the start of a filename token, where
+tokens are runs of letters and digits ("IMG_12" matches "IMG_1234.jpg",
+"beach" matches "my-beach.jpg" but not "seabeach.jpg"). SQLite databases
+keep an FTS5 index of processed_images.original_filename (see
+PROCESSED_IMAGES_FTS_DDL in models.py), so a search resolves the matching
+row IDs from the full-text index instead of scanning every filename. Other
+dialects have no FTS5 table and match each word with a case-insensitive
+regular expression anchored at a token boundary; unlike FTS5 they do not
+fold accents.
+
+The choice is made when the statement is compiled, so callers build one query
+regardless of the configured database.
+"""
+import re
+
+from sqlalchemy import Boolean, and_, bindparam, literal_column, select, table
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from app.db.models import PROCESSED_IMAGES_FTS_TABLE, ProcessedImage
+
+# FTS5 unicode61 tokenizer splits on anything that is not a letter or digit
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+_fts_table = table(PROCESSED_IMAGES_FTS_TABLE)
+
+
+def build_fts_query(search: str) -> str | None:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word must match the start of a filename token ("IMG_12" matches
+    "IMG_1234.jpg"). Words are quoted, so FTS5 operators in user input are
+    treated as plain text.
+
+    Args:
+        search: Raw search text from the client
+
+    Returns:
+        MATCH expression, or None if the text contains no searchable words
+    """
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _token_prefix_pattern(token: str) -> str:
+    """Regular expression matching a filename token that starts with ``token``."""
+    # Tokens are letters and digits only, so they need no escaping
+    return f"(^|[^[:alnum:]]){token}"
+
+
+class FilenameMatch(ColumnElement[bool]):
+    """Boolean clause matching processed images whose filename matches a search."""
+
+    inherit_cache = True
+    type = Boolean()
+
+    _traverse_internals = [
+        ("fts_clause", InternalTraversal.dp_clauseelement),
+        ("regexp_clause", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, search: str):
+        fts_query = build_fts_query(search)
+        if fts_query is None:
+            # Nothing searchable: match nothing on every dialect
+            self.fts_clause = self.regexp_clause = literal_column("0") == literal_column("1")
+        else:
+            self.fts_clause = ProcessedImage.id.in_(
+                select(literal_column("rowid"))
+                .select_from(_fts_table)
+                .where(
+                    literal_column(PROCESSED_IMAGES_FTS_TABLE).op("MATCH")(
+                        bindparam("fts_query", fts_query)
+                    )
+                )
+            )
+            self.regexp_clause = and_(
+                *(
+                    ProcessedImage.original_filename.regexp_match(_token_prefix_pattern(token), flags="i")
+                    for token in _TOKEN_RE.findall(search)
+                )
+            )
+
+
+@compiles(FilenameMatch)
+def _compile_filename_match(element: FilenameMatch, compiler, **kw) -> str:
+    """Other dialects: a case-insensitive regular expression per word."""
+    return compiler.process(element.regexp_clause, **kw)
+
+
+@compiles(FilenameMatch, "sqlite")
+def _compile_filename_match_sqlite(element: FilenameMatch, compiler, **kw) -> str:
+    """SQLite: look the matching row IDs up in the FTS5 index."""
+    return compiler.process(element.fts_clause, **kw)
+
+
+def filename_matches(search: str) -> ColumnElement[bool]:
+    """
+    Build a WHERE clause matching processed images by filename.
+
+    Args:
+        search: Raw search text from the client
+
+    Returns:
+        SQL boolean expression
+    """
+    return FilenameMatch(search)
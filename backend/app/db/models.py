@@ -5,12 +5,28 @@ This module defines SQLAlchemy ORM models for:
 - User: User accounts with authentication
 - Session: User session tracking
 - ProcessedImage: Processed image metadata and history
+- UserUsage: Incrementally maintained per-user usage ledger (quotas)
+- SchedulerLease: Leader election lease for the background scheduler
 """
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    select,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -211,12 +227,31 @@ class Session(Base):
         }
 
 
+def _session_owner_id(context) -> int | None:
+    """
+    Default for ProcessedImage.user_id: the owner of the image's session.
+
+    Lets callers that only know the session keep inserting images while the
+    owner column stays populated.
+    """
+    session_id = context.get_current_parameters().get("session_id")
+    if session_id is None:
+        return None
+    return context.connection.execute(
+        select(Session.user_id).where(Session.id == session_id)
+    ).scalar()
+
+
 class ProcessedImage(Base):
     """
     Processed image metadata model.
 
     Stores information about images that have been processed through
     AI models, including original and processed file paths.
+
+    user_id duplicates sessions.user_id so history queries can page through a
+    user's images on the (user_id, created_at DESC, id DESC) index without
+    joining sessions.
     """
 
     __tablename__ = "processed_images"
@@ -229,6 +264,14 @@ class ProcessedImage(Base):
         Integer, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
+    # Owner (denormalized from the session; defaults to the session's user)
+    user_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        default=_session_owner_id,
+    )
+
     # Image metadata
     original_filename: Mapped[str] = mapped_column(String(255), nullable=False)
     model_id: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -240,6 +283,11 @@ class ProcessedImage(Base):
     # Optional: Store model parameters used
     model_parameters: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Bytes stored on disk for this image (original + processed files)
+    storage_bytes: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, default=datetime.utcnow
@@ -262,10 +310,168 @@ class ProcessedImage(Base):
         return {
             "id": self.id,
             "session_id": self.session_id,
+            "user_id": self.user_id,
             "original_filename": self.original_filename,
             "model_id": self.model_id,
             "original_path": self.original_path,
             "processed_path": self.processed_path,
             "model_parameters": self.model_parameters,
+            "storage_bytes": self.storage_bytes,
             "created_at": self.created_at.isoformat(),
         }
+
+
+class UserUsage(Base):
+    """
+    Per-user usage ledger.
+
+    One row per user, updated in the same transaction as every change to the
+    user's images, so quota checks and admin reports read a single row instead
+    of aggregating processed_images. A periodic reconciliation job recomputes
+    the image and storage totals to correct any drift.
+    """
+
+    __tablename__ = "user_usage"
+
+    # One row per user
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Stored images and their size on disk
+    image_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    storage_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    # Provider calls made on provider_calls_day (UTC); reset on the first call of a new day
+    provider_calls_day: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    provider_calls_today: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    reconciled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        """String representation of UserUsage."""
+        return (
+            f"<UserUsage(user_id={self.user_id}, images={self.image_count}, "
+            f"storage_bytes={self.storage_bytes})>"
+        )
+
+    def calls_on(self, day: date) -> int:
+        """Provider calls recorded for the given UTC day."""
+        return self.provider_calls_today if self.provider_calls_day == day else 0
+
+    def to_dict(self) -> dict:
+        """Convert usage to dictionary."""
+        return {
+            "user_id": self.user_id,
+            "image_count": self.image_count,
+            "storage_bytes": self.storage_bytes,
+            "provider_calls_day": (
+                self.provider_calls_day.isoformat() if self.provider_calls_day else None
+            ),
+            "provider_calls_today": self.provider_calls_today,
+            "updated_at": self.updated_at.isoformat(),
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+        }
+
+
+# History pagination index: equality on user_id, then newest first.
+# id breaks ties between images created in the same instant.
+Index(
+    "idx_processed_images_user_created",
+    ProcessedImage.user_id,
+    ProcessedImage.created_at.desc(),
+    ProcessedImage.id.desc(),
+)
+
+# History filter indexes: model filter within a user, and per-session listing
+Index(
+    "idx_processed_images_user_model_created",
+    ProcessedImage.user_id,
+    ProcessedImage.model_id,
+    ProcessedImage.created_at.desc(),
+    ProcessedImage.id.desc(),
+)
+Index(
+    "idx_processed_images_session_created",
+    ProcessedImage.session_id,
+    ProcessedImage.created_at.desc(),
+    ProcessedImage.id.desc(),
+)
+
+
+# Filename search (SQLite only): an external-content FTS5 index over
+# processed_images.original_filename, kept in sync by triggers.
+# Alembic migration d41c7a8e5f20 creates the same objects on migrated databases;
+# these listeners cover databases built with create_all().
+PROCESSED_IMAGES_FTS_TABLE = "processed_images_fts"
+
+PROCESSED_IMAGES_FTS_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {PROCESSED_IMAGES_FTS_TABLE} USING fts5(
+        original_filename,
+        content='processed_images',
+        content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS processed_images_fts_ai AFTER INSERT ON processed_images BEGIN
+        INSERT INTO {PROCESSED_IMAGES_FTS_TABLE}(rowid, original_filename)
+        VALUES (new.id, new.original_filename);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS processed_images_fts_ad AFTER DELETE ON processed_images BEGIN
+        INSERT INTO {PROCESSED_IMAGES_FTS_TABLE}({PROCESSED_IMAGES_FTS_TABLE}, rowid, original_filename)
+        VALUES ('delete', old.id, old.original_filename);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS processed_images_fts_au
+    AFTER UPDATE OF original_filename ON processed_images BEGIN
+        INSERT INTO {PROCESSED_IMAGES_FTS_TABLE}({PROCESSED_IMAGES_FTS_TABLE}, rowid, original_filename)
+        VALUES ('delete', old.id, old.original_filename);
+        INSERT INTO {PROCESSED_IMAGES_FTS_TABLE}(rowid, original_filename)
+        VALUES (new.id, new.original_filename);
+    END
+    """,
+)
+
+for _statement in PROCESSED_IMAGES_FTS_DDL:
+    event.listen(
+        ProcessedImage.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite"),
+    )
+event.listen(
+    ProcessedImage.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {PROCESSED_IMAGES_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
+
+
+class SchedulerLease(Base):
+    """
+    Named lease held by one worker process.
+
+    Workers sharing the database compete for the lease; the holder renews it
+    on a heartbeat and runs the cluster-wide periodic jobs. A lease whose
+    expires_at has passed can be taken over by any worker.
+    """
+
+    __tablename__ = "scheduler_leases"
+
+    # Lease name (one per group of leader-only jobs)
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    # Holder identity (host:pid:random) and lease timing (UTC)
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    acquired_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        """String representation of SchedulerLease."""
+        return f"<SchedulerLease(name={self.name}, holder={self.holder}, expires_at={self.expires_at})>"
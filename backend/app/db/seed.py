@@ -105,19 +105,26 @@ async def seed_admin_user(db: AsyncSession) -> None:
     normalized_username = settings.auth_username.lower()
     normalized_email = settings.auth_email.lower()
 
-    # Check if admin user already exists (case-insensitive lookup on both username and email)
-    # This ensures idempotency even if admin was previously created with mixed case
+    # Check if admin user already exists. Usernames and emails are stored
+    # normalized, so an exact match (served by the unique indexes) finds it;
+    # only if it misses fall back to a case-insensitive scan, which also
+    # matches an admin created with mixed case before normalization
     from sqlalchemy import func, or_
 
     result = await db.execute(
-        select(User).where(
-            or_(
-                func.lower(User.username) == normalized_username,
-                func.lower(User.email) == normalized_email
+        select(User).where(or_(User.username == normalized_username, User.email == normalized_email)).limit(1)
+    )
+    existing_user = result.scalars().first()
+    if existing_user is None:
+        result = await db.execute(
+            select(User).where(
+                or_(
+                    func.lower(User.username) == normalized_username,
+                    func.lower(User.email) == normalized_email
+                )
             )
         )
-    )
-    existing_user = result.scalar_one_or_none()
+        existing_user = result.scalar_one_or_none()
 
     if existing_user:
         logger.info(
@@ -0,0 +1,338 @@
+"""
+Group-commit writer queue for SQLite mutations.
+
+SQLite allows a single writer at a time. When many requests each open their
+own write transaction and commit, they queue up on the database lock and pay
+``busy_timeout`` stalls (or fail with "database is locked") under batch load.
+
+This module provides an optional background writer task instead:
+
+- Handlers submit *mutation units*: async callables that receive an
+  ``AsyncSession``, stage their changes (add/update/delete/flush) and return a
+  result. Units must NOT commit.
+- The writer collects units for up to ``max_delay_ms`` (or until
+  ``max_batch`` units are waiting), runs them in one transaction and commits
+  once for the whole group.
+- Every caller gets its own result or exception back. Each unit runs in
+  its own savepoint (``SAVEPOINT``/``RELEASE``); if one raises, only its
+  savepoint is rolled back, that caller receives its error, and the other
+  units still commit together. Units are expected to only touch the
+  database (no external side effects).
+
+When the queue is disabled, ``run_write`` runs the unit on the caller's own
+session and commits it directly, so call sites are identical either way.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import server_timing
+from app.core.metrics import DB_WRITE_QUEUE_DEPTH, gauge_callback
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MutationUnit = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteQueueError(Exception):
+    """Raised when the writer queue cannot accept or complete work."""
+
+    pass
+
+
+class _PendingWrite:
+    """A submitted mutation unit and the future its caller is awaiting."""
+
+    __slots__ = ("unit", "future")
+
+    def __init__(self, unit: MutationUnit, future: asyncio.Future):
+        self.unit = unit
+        self.future = future
+
+
+async def _begin(db: AsyncSession) -> None:
+    """
+    Open the group's transaction before its first savepoint.
+
+    The sqlite3 driver only sends BEGIN ahead of INSERT/UPDATE/DELETE. A
+    SAVEPOINT issued outside a transaction starts one itself, and releasing
+    it then commits, so every unit would commit on its own. Sending BEGIN
+    first makes the savepoints nest in one transaction.
+    """
+    conn = await db.connection()
+    if conn.dialect.name != "sqlite":
+        return
+    raw = await conn.get_raw_connection()
+    if not raw.driver_connection.in_transaction:
+        await conn.exec_driver_sql("BEGIN")
+
+
+class GroupCommitWriter:
+    """
+    Background task that commits mutation units in small groups.
+
+    Attributes:
+        max_batch: Maximum number of units committed together
+        max_delay_ms: How long to wait for more units after the first arrives
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_batch: int = 32,
+        max_delay_ms: float = 5.0,
+        max_queue_size: int = 1000,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            session_factory: Factory for the sessions that run each group
+            max_batch: Maximum units per commit
+            max_delay_ms: Batching window after the first unit arrives
+            max_queue_size: Pending units accepted before submit() waits
+        """
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self._queue: asyncio.Queue[_PendingWrite | None] = asyncio.Queue(maxsize=max_queue_size)
+        self._task: asyncio.Task | None = None
+
+        # Counters for monitoring
+        self.groups_committed = 0
+        self.units_committed = 0
+        self.units_failed = 0
+
+    @property
+    def depth(self) -> int:
+        """Units queued and not yet picked up for a commit group."""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        """Whether the writer task is active."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the background writer task on the running event loop."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="group-commit-writer")
+
+    async def stop(self) -> None:
+        """Drain queued units, then stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, unit: MutationUnit[T]) -> T:
+        """
+        Queue a mutation unit and wait for its group to commit.
+
+        Args:
+            unit: Async callable staging changes on the provided session
+
+        Returns:
+            Whatever the unit returned, once its group has committed
+
+        Raises:
+            WriteQueueError: If the writer is not running
+            Exception: Whatever the unit (or the group commit) raised
+        """
+        if not self.running:
+            raise WriteQueueError("Write queue is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingWrite(unit=unit, future=future))
+        return await future
+
+    async def _collect_group(self, first: _PendingWrite) -> tuple[list[_PendingWrite], bool]:
+        """Gather units arriving within the batching window; report whether stop was requested."""
+        group = [first]
+        deadline = time.perf_counter() + self.max_delay
+
+        while len(group) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            if item is None:
+                return group, True
+            group.append(item)
+
+        return group, False
+
+    async def _commit_group(self, group: list[_PendingWrite]) -> None:
+        """Run a group in one transaction, each unit in its own savepoint."""
+        pending = [item for item in group if not item.future.done()]
+        if not pending:
+            return
+
+        results: list[tuple[_PendingWrite, Any]] = []
+        async with self.session_factory() as db:
+            await _begin(db)
+            for item in pending:
+                try:
+                    async with db.begin_nested():
+                        result = await item.unit(db)
+                except Exception as e:
+                    # Only this unit's savepoint was rolled back
+                    self.units_failed += 1
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                    continue
+                results.append((item, result))
+
+            if not results:
+                await db.rollback()
+                return
+
+            try:
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Group commit of {len(results)} write(s) failed: {e}")
+                self.units_failed += len(results)
+                for item, _ in results:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                return
+
+        self.groups_committed += 1
+        self.units_committed += len(results)
+        for item, result in results:
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def _run(self) -> None:
+        """Writer loop: wait for work, batch it, commit it."""
+        logger.info(
+            f"Group-commit writer started (max_batch={self.max_batch}, "
+            f"max_delay={self.max_delay * 1000:.1f}ms)"
+        )
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                break
+
+            group, stop_requested = await self._collect_group(first)
+            try:
+                await self._commit_group(group)
+            except Exception as e:
+                # Never let the writer die with callers still waiting
+                logger.error(f"Unexpected write queue error: {e}", exc_info=True)
+                for item in group:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+            if stop_requested:
+                break
+
+        # Fail anything still queued after a stop request
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item.future.done():
+                item.future.set_exception(WriteQueueError("Write queue stopped"))
+
+        logger.info(
+            f"Group-commit writer stopped ({self.units_committed} writes in "
+            f"{self.groups_committed} commits)"
+        )
+
+
+# Global writer instance (None when the queue is disabled)
+_writer: GroupCommitWriter | None = None
+
+
+def start_write_queue(
+    session_factory: async_sessionmaker[AsyncSession],
+    max_batch: int = 32,
+    max_delay_ms: float = 5.0,
+) -> GroupCommitWriter:
+    """
+    Start the global group-commit writer.
+
+    This should be called during application startup, after init_db().
+    """
+    global _writer
+
+    if _writer is not None and _writer.running:
+        logger.warning("Write queue already running")
+        return _writer
+
+    _writer = GroupCommitWriter(session_factory, max_batch=max_batch, max_delay_ms=max_delay_ms)
+    _writer.start()
+    return _writer
+
+
+async def stop_write_queue() -> None:
+    """
+    Drain and stop the global group-commit writer.
+
+    This should be called during application shutdown, before close_db().
+    """
+    global _writer
+
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
+
+
+def get_write_queue() -> GroupCommitWriter | None:
+    """Get the running writer, or None when the queue is disabled."""
+    if _writer is not None and _writer.running:
+        return _writer
+    return None
+
+
+def _collect_queue_depth() -> dict[tuple, float]:
+    """Write queue depth for the metrics endpoint."""
+    writer = get_write_queue()
+    return {(): writer.depth if writer is not None else 0}
+
+
+gauge_callback(DB_WRITE_QUEUE_DEPTH, _collect_queue_depth)
+
+
+async def run_write(db: AsyncSession, unit: MutationUnit[T]) -> T:
+    """
+    Run a mutation unit and commit it.
+
+    Uses the group-commit writer when it is running; otherwise runs the unit on
+    the caller's session and commits immediately.
+
+    Args:
+        db: Caller's database session (used only when the queue is disabled)
+        unit: Async callable staging changes on a session; must not commit
+
+    Returns:
+        The unit's result after it has been committed
+    """
+    writer = get_write_queue()
+    if writer is not None:
+        # The writer task runs the statements; the caller's wait is its db time
+        with server_timing.measure("db"):
+            return await writer.submit(unit)
+
+    try:
+        result = await unit(db)
+        with server_timing.measure("db"):
+            await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return result
@@ -1,35 +1,60 @@
 """Main FastAPI application entry point."""
 from contextlib import asynccontextmanager
-from pathlib import Path
+import asyncio
 import logging
+import time
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
+from app.core.logging_config import configure_logging, flush_logging
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, close_metrics, render_metrics
+from app.core.tracing import get_tracer, install_log_correlation
 from app.api.v1.routes import auth_router, models_router, restoration_router
 from app.api.v1.routes.admin import router as admin_router
+from app.api.v1.routes.models import get_model_catalog
 from app.api.v1.routes.users import router as users_router
-from app.db.database import init_db, close_db
+from app.db.database import init_db, close_db, get_session_factory
+from app.db.write_queue import start_write_queue, stop_write_queue
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.middleware.server_timing import ServerTimingMiddleware
+from app.middleware.tracing import TracingMiddleware
+from app.services.concurrency_limiter import close_concurrency_limiter
+from app.services.config_reloader import get_config_reloader
+from app.services.leader_election import get_leader_election
+from app.services.loop_watchdog import close_loop_watchdog, get_loop_watchdog
+from app.services.memory_profiler import close_memory_profiler, get_memory_profiler
+from app.services.warm_keeper import close_warm_keeper
 from app.services.cleanup import (
     start_cleanup_scheduler,
     stop_cleanup_scheduler,
-    cleanup_old_sessions,
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG if settings.debug else logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+# Configure logging (with the current trace ID when tracing is enabled)
+if settings.tracing_enabled:
+    install_log_correlation()
+configure_logging(settings)
 logger = logging.getLogger(__name__)
 
 
+def preload_provider_sdks() -> None:
+    """Import the provider SDKs, which the inference services import lazily."""
+    try:
+        from huggingface_hub import InferenceClient  # noqa: F401
+        import replicate  # noqa: F401
+    except ImportError as e:
+        logger.warning(f"Provider SDK not available: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
+    started = time.perf_counter()
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Environment: {settings.app_env}")
     logger.info(f"Debug mode: {settings.debug}")
@@ -64,27 +89,59 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized successfully")
 
-    # Run initial cleanup
-    logger.info("Running initial session cleanup...")
-    await cleanup_old_sessions()
-    logger.info("Initial cleanup completed")
+    if settings.database_write_queue_enabled:
+        start_write_queue(
+            get_session_factory(),
+            max_batch=settings.database_write_queue_max_batch,
+            max_delay_ms=settings.database_write_queue_max_delay_ms,
+        )
+
+    # Validate and serialize the model catalog once, before the first request
+    get_model_catalog(settings)
+    logger.debug("Model catalog built")
 
-    # Start cleanup scheduler
+    # Remember the configuration files just loaded, so only later edits trigger a reload
+    get_config_reloader()
+
+    # Start cleanup scheduler (also runs the initial cleanup in the background)
     logger.info(
         f"Starting cleanup scheduler (interval: {settings.session_cleanup_interval_hours}h, "
         f"cleanup threshold: {settings.session_cleanup_hours}h)"
     )
     start_cleanup_scheduler()
-    logger.info("Application startup complete")
+
+    # Import the provider SDKs off the startup path, before the first request needs them
+    preload = asyncio.create_task(asyncio.to_thread(preload_provider_sdks))
+
+    # Report event-loop stalls with the blocking stack
+    if settings.loop_watchdog_enabled:
+        get_loop_watchdog().start()
+
+    # Allocation tracing and the periodic memory report
+    if settings.memory_profiling_trace_on_startup:
+        get_memory_profiler().start(settings.memory_profiling_frames)
+    if settings.memory_profiling_report_interval_seconds:
+        get_memory_profiler().start_report_task(settings.memory_profiling_report_interval_seconds)
+    logger.info(f"Application startup complete in {time.perf_counter() - started:.2f}s")
 
     yield
 
     # Shutdown
     logger.info("Shutting down application...")
+    preload.cancel()
+    await close_loop_watchdog()
+    await close_memory_profiler()
     stop_cleanup_scheduler()
     logger.debug("Cleanup scheduler stopped")
+    await get_leader_election().release()
+    await close_warm_keeper()
+    await close_concurrency_limiter()
+    await stop_write_queue()
+    close_metrics()
+    get_tracer().shutdown()
     await close_db()
     logger.info("Application shutdown complete")
+    flush_logging()
 
 
 # Create FastAPI app
@@ -98,6 +155,12 @@ app = FastAPI(
     openapi_url="/api/openapi.json",
 )
 
+# Server-Timing header (innermost; enabled and configured per request)
+app.add_middleware(ServerTimingMiddleware)
+
+# Rate limiting (added before CORS so 429 responses still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -105,8 +168,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-RateLimit-Reset",
+        "Retry-After",
+        "traceparent",
+        "Server-Timing",
+        "X-Request-ID",
+    ],
 )
 
+# Request tracing (outside rate limiting and CORS, so rejected requests are traced)
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
+# Request ID for log records (outside tracing, so the server span's logs carry it)
+app.add_middleware(RequestContextMiddleware)
+
+# Request metrics (outermost, so latency includes the other middlewares)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Mount static files for uploaded and processed images
 app.mount(
     "/uploads",
@@ -138,6 +221,14 @@ async def health_check():
     }
 
 
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        """Prometheus metrics (summed across workers with metrics.multiprocess_dir)."""
+        return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
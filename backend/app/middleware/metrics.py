@@ -0,0 +1,60 @@
+"""
+Request metrics middleware.
+
+Counts requests and observes their latency per route template (for example
+``/api/v1/restore/{image_id}``), so series stay bounded no matter which IDs
+clients request. Requests that match no route are grouped under
+``unmatched``; static file mounts under their mount path.
+
+This is a plain ASGI middleware added outermost, so the recorded latency
+includes the other middlewares (rate limiting, CORS) and rejected requests
+are counted with their status code.
+"""
+import time
+
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS
+
+
+def route_label(scope) -> str:
+    """Route template of a handled request."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    if "app_root_path" in scope:
+        # Matched a Mount (static files); root_path is the mount prefix
+        return scope.get("root_path", "") + "/{path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latencies.
+
+    Args:
+        app: Downstream ASGI application
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            method = scope["method"]
+            route = route_label(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
@@ -0,0 +1,367 @@
+"""
+Token-bucket rate limiting middleware.
+
+Requests are grouped into endpoint categories, each with its own limit
+(e.g. "10/minute"):
+
+- ``models``: GET /api/v1/models and /api/v1/models/{id}
+- ``restore``: POST /api/v1/restore (provider calls)
+- ``auth``: POST /api/v1/auth/login (password hashing)
+
+Every client gets one token bucket per category: capacity = the limit,
+refilled continuously at limit/period. Authenticated clients are identified
+by user ID (from a valid bearer token), everyone else by IP address. Other
+endpoints are not limited.
+
+Bucket state lives in a store:
+
+- ``memory``: an LRU map in this process. Lookups are O(1) and the map is
+  capped at ``rate_limit_max_tracked_clients`` entries; buckets that have
+  refilled completely carry no information and are evicted first.
+- ``redis``: one hash per bucket on a Redis-protocol server, updated by a
+  server-side script so all workers and hosts share the limits.
+
+Responses in a limited category carry X-RateLimit-Limit, X-RateLimit-Remaining
+and X-RateLimit-Reset (seconds until the bucket is full again). Rejected
+requests get 429 with Retry-After.
+
+This is a plain ASGI middleware (not BaseHTTPMiddleware) so unlimited
+requests pass straight through and limited ones pay only for one bucket
+update.
+"""
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import CACHE_REQUESTS
+from app.core.security import verify_token
+from app.services.resp_client import RespConnection, RespError, RespServerError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*$")
+
+# (category, methods, path) - path matches exactly or as a prefix followed by "/"
+CATEGORY_ROUTES: list[tuple[str, frozenset[str], str]] = [
+    ("restore", frozenset({"POST"}), "/api/v1/restore"),
+    ("auth", frozenset({"POST"}), "/api/v1/auth/login"),
+    ("models", frozenset({"GET", "HEAD"}), "/api/v1/models"),
+]
+
+
+class RateLimitRule:
+    """
+    A parsed rate limit such as "10/minute".
+
+    Attributes:
+        limit: Requests allowed per period (also the burst size)
+        period: Period length in seconds
+        rate: Tokens added per second
+    """
+
+    __slots__ = ("limit", "period", "rate", "text")
+
+    def __init__(self, limit: int, period: float, text: str = ""):
+        self.limit = limit
+        self.period = period
+        self.rate = limit / period
+        self.text = text or f"{limit}/{period}s"
+
+    @classmethod
+    def parse(cls, text: str) -> "RateLimitRule":
+        """
+        Parse "N/second|minute|hour|day".
+
+        Raises:
+            ValueError: If the text is not a valid limit
+        """
+        match = _RATE_RE.match(text)
+        if not match or int(match.group(1)) < 1:
+            raise ValueError(f"Invalid rate limit '{text}' (expected e.g. '10/minute')")
+        return cls(int(match.group(1)), _PERIODS[match.group(2)], text.strip())
+
+
+class RateLimitResult:
+    """Outcome of taking a token from a bucket."""
+
+    __slots__ = ("allowed", "remaining", "reset_after", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: int, reset_after: float, retry_after: float):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.reset_after = reset_after
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_tokens(cls, allowed: bool, tokens: float, rule: RateLimitRule) -> "RateLimitResult":
+        """Build a result from the bucket's token count after the request."""
+        return cls(
+            allowed=allowed,
+            remaining=int(tokens),
+            reset_after=(rule.limit - tokens) / rule.rate,
+            retry_after=0.0 if allowed else (1 - tokens) / rule.rate,
+        )
+
+
+class BucketStore(ABC):
+    """Base class for token-bucket storage."""
+
+    @abstractmethod
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        """Refill the bucket for key, then try to take one token."""
+
+    async def close(self) -> None:
+        """Release backend resources."""
+        pass
+
+
+class MemoryBucketStore(BucketStore):
+    """
+    Buckets in an LRU map bounded to max_entries.
+
+    Each entry is [tokens, updated_at, full_at]. The least recently used entry
+    is dropped when it is full again (its state equals a fresh bucket) or
+    when the map is over capacity.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        return self.hit_now(key, rule, time.monotonic())
+
+    def hit_now(self, key: str, rule: RateLimitRule, now: float) -> RateLimitResult:
+        """Synchronous hit at a given monotonic time."""
+        buckets = self._buckets
+        entry = buckets.get(key)
+        if entry is None:
+            tokens = float(rule.limit)
+        else:
+            tokens = min(rule.limit, entry[0] + (now - entry[1]) * rule.rate)
+            buckets.move_to_end(key)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        full_at = now + (rule.limit - tokens) / rule.rate
+        if entry is None:
+            buckets[key] = [tokens, now, full_at]
+        else:
+            entry[0], entry[1], entry[2] = tokens, now, full_at
+
+        # Amortized O(1) housekeeping on the oldest entry only
+        if buckets:
+            oldest_key, oldest = next(iter(buckets.items()))
+            if oldest[2] <= now or len(buckets) > self.max_entries:
+                del buckets[oldest_key]
+
+        return RateLimitResult.from_tokens(allowed, tokens, rule)
+
+
+class RedisBucketStore(BucketStore):
+    """
+    Buckets as hashes on a Redis-protocol server.
+
+    The refill-and-take runs in one server-side script, so concurrent workers
+    cannot double-spend a token. If the server is unreachable requests are
+    allowed (fail open) and a warning is logged at most once a minute.
+    """
+
+    KEY_PREFIX = "photo_restoration:ratelimit:"
+
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+    SCRIPT_SHA = hashlib.sha1(SCRIPT.encode()).hexdigest()
+
+    def __init__(self, url: str):
+        self._conn = RespConnection(url, timeout=1.0)
+        self._last_warning = 0.0
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitResult:
+        args = (1, self.KEY_PREFIX + key, rule.limit, repr(rule.rate), repr(time.time()))
+        try:
+            try:
+                allowed, tokens = await self._conn.execute("EVALSHA", self.SCRIPT_SHA, *args)
+            except RespServerError as e:
+                if not str(e).startswith("NOSCRIPT"):
+                    raise
+                allowed, tokens = await self._conn.execute("EVAL", self.SCRIPT, *args)
+        except RespError as e:
+            now = time.monotonic()
+            if now - self._last_warning > 60:
+                self._last_warning = now
+                logger.warning(f"Rate limit store unavailable, allowing requests: {e}")
+            return RateLimitResult(True, rule.limit, 0.0, 0.0)
+
+        return RateLimitResult.from_tokens(bool(allowed), float(tokens), rule)
+
+    async def close(self) -> None:
+        await self._conn.close()
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying per-category token-bucket limits.
+
+    Args:
+        app: Downstream ASGI application
+        settings: Application settings (defaults to global settings)
+        store: Bucket store (defaults to the configured backend)
+    """
+
+    def __init__(self, app, settings: Settings | None = None, store: BucketStore | None = None):
+        self.app = app
+        # Without explicit settings the limits follow configuration reloads
+        self._follow_reloads = settings is None
+        settings = settings or get_settings()
+        self.configure(settings)
+
+        if store is None:
+            if settings.rate_limit_storage == "redis":
+                store = RedisBucketStore(settings.rate_limit_redis_url)
+            else:
+                store = MemoryBucketStore(settings.rate_limit_max_tracked_clients)
+        self.store = store
+
+        # Verified bearer token -> user ID, so each token is decoded once
+        self._token_users: OrderedDict[bytes, int | None] = OrderedDict()
+        self._token_cache_size = 10_000
+
+    def configure(self, settings: Settings) -> None:
+        """Apply limits from settings; bucket state and the storage backend are kept."""
+        self.settings = settings
+        self.enabled = settings.rate_limit_enabled
+        self.trust_proxy_headers = settings.rate_limit_trust_proxy_headers
+
+        configured = {
+            "models": settings.rate_limit_models,
+            "restore": settings.rate_limit_restore,
+            "auth": settings.rate_limit_auth,
+        }
+        self.rules: dict[str, RateLimitRule] = {
+            category: RateLimitRule.parse(text) for category, text in configured.items() if text
+        }
+        self.routes = [route for route in CATEGORY_ROUTES if route[0] in self.rules]
+
+    def _category(self, method: str, path: str) -> str | None:
+        for category, methods, prefix in self.routes:
+            if method in methods and path.startswith(prefix):
+                if len(path) == len(prefix) or path[len(prefix)] == "/":
+                    return category
+        return None
+
+    def _user_id(self, token: bytes) -> int | None:
+        cache = self._token_users
+        if token in cache:
+            CACHE_REQUESTS.labels("rate_limit_token", "hit").inc()
+            cache.move_to_end(token)
+            return cache[token]
+
+        CACHE_REQUESTS.labels("rate_limit_token", "miss").inc()
+        payload = verify_token(token.decode("latin-1"))
+        user_id = payload.get("user_id") if payload else None
+        cache[token] = user_id
+        if len(cache) > self._token_cache_size:
+            cache.popitem(last=False)
+        return user_id
+
+    def _client_key(self, scope) -> str:
+        forwarded = None
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+            elif name == b"x-forwarded-for" and self.trust_proxy_headers:
+                forwarded = value
+
+        if authorization and authorization[:7].lower() == b"bearer ":
+            user_id = self._user_id(authorization[7:].strip())
+            if user_id is not None:
+                return f"user:{user_id}"
+
+        if forwarded:
+            # The trusted proxy appends the peer it saw; earlier entries are client-supplied
+            return "ip:" + forwarded.rsplit(b",", 1)[-1].strip().decode("latin-1")
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if self._follow_reloads:
+            settings = get_settings()
+            if settings is not self.settings:
+                self.configure(settings)
+
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        category = self._category(scope["method"], scope["path"])
+        if category is None:
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.rules[category]
+        result = await self.store.hit(f"{category}:{self._client_key(scope)}", rule)
+        headers = [
+            (b"x-ratelimit-limit", str(rule.limit).encode()),
+            (b"x-ratelimit-remaining", str(result.remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(result.reset_after)).encode()),
+        ]
+
+        if not result.allowed:
+            retry_after = max(1, math.ceil(result.retry_after))
+            body = json.dumps(
+                {
+                    "detail": f"Rate limit exceeded for {category}: {rule.text}. "
+                    f"Retry in {retry_after} seconds."
+                }
+            ).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": headers
+                    + [
+                        (b"retry-after", str(retry_after).encode()),
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
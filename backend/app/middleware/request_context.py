@@ -0,0 +1,60 @@
+"""
+Request context middleware.
+
+Gives every HTTP request a request ID, taken from a well-formed incoming
+``X-Request-ID`` header (so a proxy's ID carries through) or generated, and
+starts the request's log context with it. The ID is returned in the
+``X-Request-ID`` response header. Authentication adds the user and session
+to the same context (see ``app.core.logging_config.bind``).
+
+The request's task is also registered with the event-loop watchdog, so a
+stall report names the route being served.
+"""
+import re
+import uuid
+
+from app.core.logging_config import start_request
+from app.services.loop_watchdog import track_request, untrack_request
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware binding a request ID to the request's log records.
+
+    Args:
+        app: Downstream ASGI application
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers", ()):
+            if key == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+        start_request(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        task = track_request(scope)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            untrack_request(task)
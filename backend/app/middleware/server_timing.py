@@ -0,0 +1,53 @@
+"""
+Server-Timing response header middleware.
+
+Requests whose path starts with one of ``server_timing.paths`` get a timing
+context (see ``app.core.server_timing``); their response carries a
+``Server-Timing`` header with the recorded entries (auth, db, decode,
+provider, encode, storage) and ``total``, minus ``server_timing.exclude``.
+
+Settings are read per request, so enabling, disabling or changing the
+entries takes effect on configuration reload.
+"""
+import time
+
+from app.core import server_timing
+from app.core.config import get_settings
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a ``Server-Timing`` header to the configured paths.
+
+    Args:
+        app: Downstream ASGI application
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        if not settings.server_timing_enabled or not scope["path"].startswith(tuple(settings.server_timing_paths)):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = server_timing.start()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = server_timing.format_header(
+                    timings, time.perf_counter() - started, settings.server_timing_exclude
+                )
+                if value:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
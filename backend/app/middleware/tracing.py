@@ -0,0 +1,57 @@
+"""
+Request tracing middleware.
+
+Starts the root (server) span of every HTTP request, continuing the trace of
+an incoming W3C ``traceparent`` header, and returns the request's own
+``traceparent`` in the response so a slow request can be looked up in the
+span file. Spans are named ``{method} {route template}`` (see
+``route_label``), with the status code as an attribute.
+
+Added inside ``MetricsMiddleware`` and outside the rate limiter, so rejected
+requests are traced too.
+"""
+from app.core.tracing import get_tracer
+from app.middleware.metrics import route_label
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware running each HTTP request as a server span.
+
+    Args:
+        app: Downstream ASGI application
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        with get_tracer().span(method, traceparent=traceparent, **{"http.method": method}) as span:
+
+            async def send_with_traceparent(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if span.trace_id:
+                        headers = list(message.get("headers", ()))
+                        headers.append((b"traceparent", span.traceparent.encode("latin-1")))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_traceparent)
+            finally:
+                if span.sampled:
+                    route = route_label(scope)
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
@@ -0,0 +1,418 @@
+"""
+Circuit breakers for AI providers and models.
+
+Each model and each provider has a breaker with three states:
+
+- ``closed``: calls go through; consecutive failures are counted and a
+  success resets the count.
+- ``open``: after ``failure_threshold`` consecutive failures (or one failure
+  that cannot fix itself, such as 410 Gone or a rejected API key) calls fail
+  fast for ``recovery_seconds`` instead of paying for an upload and a
+  provider timeout.
+- ``half_open``: after the recovery time one probe call is let through. Its
+  success closes the breaker, its failure opens it again. If the probe never
+  reports back (for example the request failed validation first) another
+  probe is allowed after ``recovery_seconds``.
+
+Failures are classified by ``classify_failure()``: rate limits, models
+still loading (the warm keeper tracks those) and invalid user input do not
+count (the provider concurrency governor handles rate limits), auth errors count against the provider, everything else against
+the model. Transient model failures also count towards the provider's
+breaker, which a success on any of its models resets, so a provider-wide
+outage opens it without one broken model doing so.
+
+State is per worker process.
+"""
+import logging
+import math
+import time
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import CIRCUIT_BREAKER_STATE, gauge_callback
+from app.services.hf_inference import (
+    HFInferenceError,
+    HFModelError,
+    HFModelLoadingError,
+    HFRateLimitError,
+    HFTimeoutError,
+)
+from app.services.replicate_inference import (
+    ReplicateInferenceError,
+    ReplicateInputError,
+    ReplicateModelError,
+    ReplicateRateLimitError,
+    ReplicateTimeoutError,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Values of the circuit_breaker_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Failure scopes returned by classify_failure()
+MODEL = "model"
+PROVIDER = "provider"
+
+_AUTH_MARKERS = ("unauthorized", "401", "403", "forbidden", "invalid replicate api token")
+
+
+class CircuitOpenError(Exception):
+    """Raised when a model or its provider is failing and calls are short-circuited."""
+
+    def __init__(self, scope: str, name: str, retry_after: int):
+        """
+        Initialize the error.
+
+        Args:
+            scope: "model" or "provider"
+            name: Model ID or provider name
+            retry_after: Seconds until a probe call will be allowed
+        """
+        self.scope = scope
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"{scope.capitalize()} '{name}' is temporarily unavailable after repeated failures. "
+            f"Retry in {retry_after} seconds."
+        )
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Attributes:
+        failure_threshold: Consecutive failures that open the breaker
+        recovery_seconds: Time the breaker stays open before a probe
+        state: "closed", "open" or "half_open"
+        failures: Current consecutive failure count
+        opened: Times the breaker has opened
+    """
+
+    __slots__ = (
+        "failure_threshold",
+        "recovery_seconds",
+        "state",
+        "failures",
+        "opened",
+        "last_error",
+        "_opened_at",
+        "_probe_started",
+    )
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.last_error: str | None = None
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    def current_state(self, now: float | None = None) -> str:
+        """State as callers see it: an open breaker past its recovery time is half-open."""
+        if self.state == OPEN:
+            now = time.monotonic() if now is None else now
+            if now - self._opened_at >= self.recovery_seconds:
+                return HALF_OPEN
+        return self.state
+
+    def retry_after(self, now: float | None = None) -> int:
+        """Seconds until a call may be attempted (0 when closed or probing is allowed)."""
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN:
+            return max(0, math.ceil(self._opened_at + self.recovery_seconds - now))
+        if self.state == HALF_OPEN and now - self._probe_started < self.recovery_seconds:
+            return max(1, math.ceil(self._probe_started + self.recovery_seconds - now))
+        return 0
+
+    def available(self, now: float | None = None) -> bool:
+        """Whether a call would be allowed, without taking a probe."""
+        return self.retry_after(now) == 0
+
+    def allow(self, now: float | None = None) -> bool:
+        """
+        Decide whether a call may go ahead.
+
+        In half-open state the first caller becomes the probe; others are
+        refused until it reports back or the probe expires.
+        """
+        now = time.monotonic() if now is None else now
+        if self.state == CLOSED:
+            return True
+        if not self.available(now):
+            return False
+        self.state = HALF_OPEN
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        """Reset the failure count and close the breaker."""
+        if self.state != CLOSED:
+            logger.info("Circuit closed after successful probe")
+        self.state = CLOSED
+        self.failures = 0
+        self.last_error = None
+
+    def record_failure(self, error: str, fatal: bool = False, now: float | None = None) -> bool:
+        """
+        Count a failure.
+
+        Args:
+            error: Error description (kept for status output)
+            fatal: Open immediately (the failure cannot fix itself)
+            now: Current monotonic time
+
+        Returns:
+            True if this failure opened the breaker
+        """
+        self.failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or fatal or self.failures >= self.failure_threshold:
+            was_open = self.state == OPEN
+            self.state = OPEN
+            self._opened_at = time.monotonic() if now is None else now
+            if not was_open:
+                self.opened += 1
+            return not was_open
+        return False
+
+    def release_probe(self) -> None:
+        """Let another probe through after a call that neither succeeded nor failed."""
+        self._probe_started = 0.0
+
+    def snapshot(self, now: float | None = None) -> dict:
+        """Current state for status endpoints."""
+        now = time.monotonic() if now is None else now
+        return {
+            "state": self.current_state(now),
+            "failures": self.failures,
+            "opened": self.opened,
+            "retry_after_seconds": self.retry_after(now),
+            "last_error": self.last_error,
+        }
+
+
+def classify_failure(error: Exception) -> tuple[str, bool] | None:
+    """
+    Decide which breaker a provider error counts against.
+
+    Args:
+        error: Exception raised by a provider service
+
+    Returns:
+        (scope, fatal) with scope "model" or "provider" and fatal True if the
+        failure will not fix itself, or None if it should not count
+    """
+    if isinstance(error, (HFRateLimitError, ReplicateRateLimitError)):
+        return None
+    # A cold start is not a broken model, and invalid input is the caller's fault
+    if isinstance(error, (HFModelLoadingError, ReplicateInputError)):
+        return None
+
+    message = str(error).lower()
+    if any(marker in message for marker in _AUTH_MARKERS):
+        return PROVIDER, True
+    if isinstance(error, (HFModelError, ReplicateModelError)):
+        # Not found, gone, unsupported task: nothing to wait for
+        return MODEL, True
+    if isinstance(
+        error, (HFTimeoutError, ReplicateTimeoutError, HFInferenceError, ReplicateInferenceError)
+    ):
+        return MODEL, False
+    return None
+
+
+class CircuitBreakerRegistry:
+    """
+    Breakers for every provider and model, created on first use.
+
+    Args:
+        settings: Application settings (defaults to global settings)
+    """
+
+    def __init__(self, settings: Settings | None = None):
+        self.models: dict[str, CircuitBreaker] = {}
+        self.providers: dict[str, CircuitBreaker] = {}
+        self.configure(settings or get_settings())
+
+    def configure(self, settings: Settings) -> None:
+        """Apply thresholds from settings (configuration reload); breaker states are kept."""
+        self.enabled = settings.circuit_breaker_enabled
+        self.failure_threshold = settings.circuit_breaker_failure_threshold
+        self.provider_failure_threshold = settings.circuit_breaker_provider_failure_threshold
+        self.recovery_seconds = settings.circuit_breaker_recovery_seconds
+        for breakers, threshold in (
+            (self.models, self.failure_threshold),
+            (self.providers, self.provider_failure_threshold),
+        ):
+            for breaker in breakers.values():
+                breaker.failure_threshold = threshold
+                breaker.recovery_seconds = self.recovery_seconds
+
+    def model(self, model_id: str) -> CircuitBreaker:
+        """Breaker for a model."""
+        breaker = self.models.get(model_id)
+        if breaker is None:
+            breaker = self.models[model_id] = CircuitBreaker(self.failure_threshold, self.recovery_seconds)
+        return breaker
+
+    def provider(self, name: str) -> CircuitBreaker:
+        """Breaker for a provider."""
+        breaker = self.providers.get(name)
+        if breaker is None:
+            breaker = self.providers[name] = CircuitBreaker(
+                self.provider_failure_threshold, self.recovery_seconds
+            )
+        return breaker
+
+    def state(self, provider: str, model_id: str) -> str:
+        """Effective state of a model: the worse of its own and its provider's breaker."""
+        if not self.enabled:
+            return CLOSED
+        now = time.monotonic()
+        states = {self.provider(provider).current_state(now), self.model(model_id).current_state(now)}
+        for state in (OPEN, HALF_OPEN):
+            if state in states:
+                return state
+        return CLOSED
+
+    def available(self, provider: str, model_id: str) -> bool:
+        """Whether a call to the model would be allowed right now."""
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        return self.provider(provider).available(now) and self.model(model_id).available(now)
+
+    def allow(self, provider: str, model_id: str) -> None:
+        """
+        Admit a call to a model, taking a half-open probe if needed.
+
+        Raises:
+            CircuitOpenError: If the provider's or the model's breaker refuses the call
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        provider_breaker = self.provider(provider)
+        model_breaker = self.model(model_id)
+        if not provider_breaker.available(now):
+            raise CircuitOpenError(PROVIDER, provider, provider_breaker.retry_after(now))
+        if not model_breaker.available(now):
+            raise CircuitOpenError(MODEL, model_id, model_breaker.retry_after(now))
+        provider_breaker.allow(now)
+        model_breaker.allow(now)
+
+    def record_success(self, provider: str, model_id: str) -> None:
+        """Record a successful call."""
+        if self.enabled:
+            self.provider(provider).record_success()
+            self.model(model_id).record_success()
+
+    def record_failure(self, provider: str, model_id: str, error: Exception) -> None:
+        """Record a failed call, counting it against the breaker its classification names."""
+        if not self.enabled:
+            return
+        classification = classify_failure(error)
+        if classification is None:
+            self.release(provider, model_id)
+            return
+
+        scope, fatal = classification
+        description = f"{type(error).__name__}: {error}"
+        if scope == PROVIDER:
+            if self.provider(provider).record_failure(description, fatal):
+                logger.error(f"Circuit opened for provider {provider}: {description}")
+            self.model(model_id).release_probe()
+            return
+
+        if self.model(model_id).record_failure(description, fatal):
+            logger.error(f"Circuit opened for model {model_id}: {description}")
+        if fatal:
+            self.provider(provider).release_probe()
+        elif self.provider(provider).record_failure(description):
+            logger.error(f"Circuit opened for provider {provider}: {description}")
+
+    def release(self, provider: str, model_id: str) -> None:
+        """Record a call that ended without telling anything about the provider."""
+        if self.enabled:
+            self.provider(provider).release_probe()
+            self.model(model_id).release_probe()
+
+    def snapshot(self) -> dict:
+        """State of every breaker that has been used."""
+        now = time.monotonic()
+        return {
+            "providers": {name: breaker.snapshot(now) for name, breaker in sorted(self.providers.items())},
+            "models": {model_id: breaker.snapshot(now) for model_id, breaker in sorted(self.models.items())},
+        }
+
+
+def select_model(
+    registry: CircuitBreakerRegistry, settings: Settings, model_config: dict
+) -> dict:
+    """
+    Pick the model to call: the requested one, or its fallback while it is unavailable.
+
+    The fallback (``fallback_model`` in the model's configuration) must be
+    enabled, in the same category and itself available.
+
+    Args:
+        registry: Circuit breakers
+        settings: Application settings
+        model_config: Configuration of the requested model
+
+    Returns:
+        Configuration of the model to call (a call slot has been taken)
+
+    Raises:
+        CircuitOpenError: If neither the model nor a usable fallback is available
+    """
+    provider = model_config.get("provider", "huggingface")
+    try:
+        registry.allow(provider, model_config["id"])
+        return model_config
+    except CircuitOpenError as e:
+        fallback = settings.get_model_by_id(model_config.get("fallback_model") or "")
+        if (
+            fallback
+            and fallback.get("enabled", True)
+            and fallback.get("category") == model_config.get("category")
+            and registry.available(fallback.get("provider", "huggingface"), fallback["id"])
+        ):
+            registry.allow(fallback.get("provider", "huggingface"), fallback["id"])
+            logger.warning(f"{e} Routing to fallback model {fallback['id']}")
+            return fallback
+        raise
+
+
+_registry: CircuitBreakerRegistry | None = None
+
+
+def _collect_states() -> dict[tuple, float]:
+    """State of every breaker that has been used, for the metrics endpoint."""
+    if _registry is None:
+        return {}
+    now = time.monotonic()
+    states = {}
+    for scope, breakers in ((PROVIDER, _registry.providers), (MODEL, _registry.models)):
+        for name, breaker in list(breakers.items()):
+            states[(scope, name)] = STATE_VALUES[breaker.current_state(now)]
+    return states
+
+
+gauge_callback(CIRCUIT_BREAKER_STATE, _collect_states)
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """Get the process-wide breaker registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        _registry = CircuitBreakerRegistry()
+    return _registry
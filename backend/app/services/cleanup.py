@@ -3,16 +3,27 @@ Background cleanup service for old sessions and files.
 
 This module provides scheduled cleanup tasks to remove old sessions
 and their associated files from the system.
+
+Every worker process runs the scheduler. Cluster-wide jobs (session
+cleanup, usage reconciliation) are wrapped with ``leader_only`` and run in
+the worker holding the scheduler lease (see ``leader_election``); the
+per-process jobs (warm-keeper, configuration watcher) run everywhere.
 """
 import logging
 from datetime import datetime
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import undefined
 
 from app.core.config import get_settings
+from app.core.metrics import JOB_DURATION, refresh_gauges
 from app.db.database import get_session_factory
+from app.services.config_reloader import get_config_reloader
+from app.services.leader_election import get_leader_election, leader_only
 from app.services.session_manager import SessionManager
+from app.services.usage_ledger import reconcile_usage
+from app.services.warm_keeper import get_warm_keeper
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -37,12 +48,13 @@ async def cleanup_old_sessions() -> None:
             f"{settings.session_cleanup_hours} hours"
         )
 
-        async with session_factory() as db:
-            session_manager = SessionManager(settings)
-            sessions_deleted, files_deleted = await session_manager.cleanup_old_sessions(
-                db=db,
-                hours=settings.session_cleanup_hours,
-            )
+        with JOB_DURATION.labels("cleanup_old_sessions").time():
+            async with session_factory() as db:
+                session_manager = SessionManager(settings)
+                sessions_deleted, files_deleted = await session_manager.cleanup_old_sessions(
+                    db=db,
+                    hours=settings.session_cleanup_hours,
+                )
 
         if sessions_deleted > 0 or files_deleted > 0:
             logger.info(
@@ -56,6 +68,35 @@ async def cleanup_old_sessions() -> None:
         logger.error(f"Error during cleanup task: {e}", exc_info=True)
 
 
+async def reconcile_usage_ledger() -> None:
+    """
+    Reconciliation task for the per-user usage ledger.
+
+    Recomputes stored image counts and sizes from processed_images and
+    corrects any drift in the ledger.
+    """
+    session_factory = get_session_factory()
+
+    try:
+        with JOB_DURATION.labels("reconcile_usage").time():
+            async with session_factory() as db:
+                corrected = await reconcile_usage(db)
+
+        if corrected > 0:
+            logger.info(f"Usage reconciliation corrected {corrected} ledger rows")
+        else:
+            logger.debug("Usage reconciliation completed: ledger is consistent")
+
+    except Exception as e:
+        logger.error(f"Error during usage reconciliation: {e}", exc_info=True)
+
+
+def run_cleanup_now() -> None:
+    """Run the session cleanup right away (a newly elected leader catches up)."""
+    if _scheduler is not None and _scheduler.get_job("cleanup_old_sessions") is not None:
+        _scheduler.modify_job("cleanup_old_sessions", next_run_time=datetime.now())
+
+
 def start_cleanup_scheduler() -> None:
     """
     Start the background cleanup scheduler.
@@ -71,17 +112,72 @@ def start_cleanup_scheduler() -> None:
 
     # Create scheduler
     _scheduler = AsyncIOScheduler()
+    election = get_leader_election()
 
-    # Add cleanup job
+    # Add cleanup job (first run in the background, so startup does not wait for it:
+    # right away, or as soon as this worker is elected when leader election is on)
     interval_hours = settings.session_cleanup_interval_hours
     _scheduler.add_job(
-        cleanup_old_sessions,
+        leader_only(cleanup_old_sessions),
         trigger=IntervalTrigger(hours=interval_hours),
         id="cleanup_old_sessions",
         name="Cleanup old sessions and files",
         replace_existing=True,
+        next_run_time=undefined if election.enabled else datetime.now(),
     )
 
+    # Add usage ledger reconciliation job
+    _scheduler.add_job(
+        leader_only(reconcile_usage_ledger),
+        trigger=IntervalTrigger(hours=settings.usage_reconcile_interval_hours),
+        id="reconcile_usage",
+        name="Reconcile per-user usage ledger",
+        replace_existing=True,
+    )
+
+    # Add model readiness probes / keep-alive job (first run right away)
+    if settings.warm_keeper_enabled:
+        _scheduler.add_job(
+            get_warm_keeper().run_once,
+            trigger=IntervalTrigger(seconds=settings.warm_keeper_interval_seconds),
+            id="warm_models",
+            name="Probe model readiness and keep models warm",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+
+    # Add configuration file watcher (hot reload)
+    if settings.config_reload_enabled:
+        _scheduler.add_job(
+            get_config_reloader().watch,
+            trigger=IntervalTrigger(seconds=settings.config_reload_interval_seconds),
+            id="reload_config",
+            name="Apply changes to the configuration files",
+            replace_existing=True,
+        )
+
+    # Publish this worker's callback gauges (read by whichever worker answers GET /metrics)
+    if settings.metrics_enabled and settings.metrics_multiprocess_dir:
+        _scheduler.add_job(
+            refresh_gauges,
+            trigger=IntervalTrigger(seconds=settings.metrics_flush_interval_seconds),
+            id="refresh_gauges",
+            name="Publish this worker's queue and in-flight gauges",
+            replace_existing=True,
+        )
+
+    # Add scheduler lease heartbeat (first attempt right away)
+    if election.enabled:
+        election.on_elected(run_cleanup_now)
+        _scheduler.add_job(
+            election.heartbeat,
+            trigger=IntervalTrigger(seconds=settings.scheduler_heartbeat_seconds),
+            id="scheduler_lease",
+            name="Acquire or renew the scheduler lease",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+
     # Start scheduler
     _scheduler.start()
     logger.info(
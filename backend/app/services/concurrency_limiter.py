@@ -0,0 +1,495 @@
+"""
+Concurrency limiter for image processing requests.
+
+Upload slots are tracked as *leases*: each admitted request holds one entry
+per limited key (its session and its user) with an expiry time. While the
+request holds its lease, the lease is renewed every third of
+``concurrency_lease_ttl_seconds``, so a provider call slower than the TTL
+keeps its slot. Releasing a lease removes its entries. A worker that dies
+before releasing stops renewing, and its entries expire after the TTL, so
+slots are never leaked permanently. The same holds for a lease object that
+is dropped without being released: renewal only holds a weak reference.
+
+Three backends share the same interface:
+
+- ``memory``: a dict in this process. Correct only with a single worker.
+- ``sqlite``: a lease table in a separate SQLite file. Every check runs in one
+  ``BEGIN IMMEDIATE`` transaction, so all worker processes on the host share
+  the limits.
+- ``redis``: sorted sets (member = lease ID, score = expiry) on any server
+  speaking the Redis protocol, so several hosts share the limits.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import (
+    UPLOAD_SESSIONS_IN_FLIGHT,
+    UPLOAD_SLOTS_REJECTED,
+    UPLOADS_IN_FLIGHT,
+    UPLOADS_IN_FLIGHT_PER_SESSION_MAX,
+    gauge_callback,
+)
+from app.services.resp_client import RespConnection, RespError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a session or user has no free processing slot."""
+
+    def __init__(self, scope: str, limit: int):
+        """
+        Initialize the error.
+
+        Args:
+            scope: Which limit was hit ("session" or "user")
+            limit: Configured limit for that scope
+        """
+        self.scope = scope
+        self.limit = limit
+        super().__init__(f"Maximum {limit} concurrent uploads allowed per {scope}")
+
+
+class ConcurrencyLimiterError(Exception):
+    """Raised when the limiter backend cannot be reached."""
+
+    pass
+
+
+class Lease:
+    """
+    Slots held by one admitted request.
+
+    Attributes:
+        lease_id: Unique ID of this lease
+        keys: Limited keys the lease holds a slot in
+        expires_at: Unix time after which the slots are considered free
+        session_id: Session of an upload lease (counted in this process's metrics)
+        renewal: Task extending expires_at while the lease is held
+    """
+
+    __slots__ = ("lease_id", "keys", "expires_at", "session_id", "renewal", "__weakref__")
+
+    def __init__(self, lease_id: str, keys: list[str], expires_at: float):
+        self.lease_id = lease_id
+        self.keys = keys
+        self.expires_at = expires_at
+        self.session_id: str | None = None
+        self.renewal: asyncio.Task | None = None
+
+    def __repr__(self) -> str:
+        """String representation of Lease."""
+        return f"<Lease(lease_id={self.lease_id}, keys={self.keys})>"
+
+
+class ConcurrencyLimiter(ABC):
+    """
+    Base class for lease-based concurrency limiters.
+
+    Subclasses implement ``_acquire`` (atomically take a slot in every key or
+    in none), ``_renew`` and ``_release``.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            ttl_seconds: Lifetime of a lease that is never released
+        """
+        self.ttl_seconds = ttl_seconds
+        # Uploads in flight in this process, per session (for metrics)
+        self.uploads_in_flight: dict[str, int] = {}
+        self._renewals: set[asyncio.Task] = set()
+
+    async def acquire(self, limits: list[tuple[str, str, int]]) -> Lease:
+        """
+        Take one slot in each limited key.
+
+        Args:
+            limits: (scope, key, limit) triples; a limit of 0 is not enforced
+
+        Returns:
+            Lease to pass to release()
+
+        Raises:
+            ConcurrencyLimitExceeded: If any key is full (no slot is taken)
+            ConcurrencyLimiterError: If the backend fails
+        """
+        enforced = [(scope, key, limit) for scope, key, limit in limits if limit > 0]
+        lease = Lease(
+            lease_id=uuid.uuid4().hex,
+            keys=[key for _, key, _ in enforced],
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        if not enforced:
+            return lease
+
+        full_scope = await self._acquire(lease, enforced)
+        if full_scope is not None:
+            limit = next(limit for scope, _, limit in enforced if scope == full_scope)
+            raise ConcurrencyLimitExceeded(full_scope, limit)
+
+        lease.renewal = asyncio.create_task(self._renew_while_held(weakref.ref(lease)))
+        self._renewals.add(lease.renewal)
+        lease.renewal.add_done_callback(self._renewals.discard)
+        return lease
+
+    async def _renew_while_held(self, lease_ref: weakref.ref) -> None:
+        """Push a lease's expiry out every third of the TTL until it is released or dropped."""
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            lease = lease_ref()
+            if lease is None:
+                return
+            lease.expires_at = time.time() + self.ttl_seconds
+            try:
+                await self._renew(lease)
+            except Exception as e:
+                logger.warning(f"Failed to renew lease {lease.lease_id}: {e}")
+            del lease
+
+    async def release(self, lease: Lease) -> None:
+        """
+        Return a lease's slots. Errors are logged, not raised (the lease expires anyway).
+
+        Args:
+            lease: Lease returned by acquire()
+        """
+        if lease.session_id is not None:
+            remaining = self.uploads_in_flight.get(lease.session_id, 1) - 1
+            if remaining > 0:
+                self.uploads_in_flight[lease.session_id] = remaining
+            else:
+                self.uploads_in_flight.pop(lease.session_id, None)
+            lease.session_id = None
+        if lease.renewal is not None:
+            lease.renewal.cancel()
+            lease.renewal = None
+        if not lease.keys:
+            return
+        try:
+            await self._release(lease)
+        except Exception as e:
+            logger.warning(f"Failed to release lease {lease.lease_id}, it will expire: {e}")
+
+    async def acquire_upload(self, session_id: str, user_id: int | None, settings: Settings) -> Lease:
+        """
+        Take an upload slot for a session and its user.
+
+        Args:
+            session_id: Session identifier
+            user_id: Owning user's ID (None skips the per-user limit)
+            settings: Application settings with the configured limits
+
+        Returns:
+            Lease to pass to release()
+        """
+        limits = [("session", f"session:{session_id}", settings.max_concurrent_uploads_per_session)]
+        if user_id is not None:
+            limits.append(("user", f"user:{user_id}", settings.max_concurrent_uploads_per_user))
+        try:
+            lease = await self.acquire(limits)
+        except ConcurrencyLimitExceeded as e:
+            UPLOAD_SLOTS_REJECTED.labels(e.scope).inc()
+            raise
+        lease.session_id = session_id
+        self.uploads_in_flight[session_id] = self.uploads_in_flight.get(session_id, 0) + 1
+        return lease
+
+    async def close(self) -> None:
+        """Stop renewing leases and release backend resources."""
+        for task in list(self._renewals):
+            task.cancel()
+        await asyncio.gather(*self._renewals, return_exceptions=True)
+
+    @abstractmethod
+    async def _acquire(self, lease: Lease, limits: list[tuple[str, str, int]]) -> str | None:
+        """Take the slots; return the scope of the first full key, or None on success."""
+
+    @abstractmethod
+    async def _renew(self, lease: Lease) -> None:
+        """Set the expiry of the lease's slots that are still held to ``lease.expires_at``."""
+
+    @abstractmethod
+    async def _release(self, lease: Lease) -> None:
+        """Remove the lease's slots."""
+
+
+class MemoryConcurrencyLimiter(ConcurrencyLimiter):
+    """Limiter keeping leases in this process (single worker only)."""
+
+    def __init__(self, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        # key -> {lease_id: expires_at}
+        self._leases: dict[str, dict[str, float]] = {}
+
+    async def _acquire(self, lease: Lease, limits: list[tuple[str, str, int]]) -> str | None:
+        # No awaits below: the check-and-take is atomic on the event loop
+        now = time.time()
+        for scope, key, limit in limits:
+            holders = self._leases.get(key)
+            if holders:
+                for lease_id in [lid for lid, expires in holders.items() if expires <= now]:
+                    del holders[lease_id]
+                if len(holders) >= limit:
+                    return scope
+
+        for key in lease.keys:
+            self._leases.setdefault(key, {})[lease.lease_id] = lease.expires_at
+        return None
+
+    async def _renew(self, lease: Lease) -> None:
+        for key in lease.keys:
+            holders = self._leases.get(key)
+            if holders is not None and lease.lease_id in holders:
+                holders[lease.lease_id] = lease.expires_at
+
+    async def _release(self, lease: Lease) -> None:
+        for key in lease.keys:
+            holders = self._leases.get(key)
+            if holders is not None:
+                holders.pop(lease.lease_id, None)
+                if not holders:
+                    del self._leases[key]
+
+
+class SQLiteConcurrencyLimiter(ConcurrencyLimiter):
+    """Limiter keeping leases in a SQLite file shared by all local workers."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS concurrency_leases (
+            lease_key TEXT NOT NULL,
+            lease_id TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (lease_key, lease_id)
+        )
+    """
+
+    def __init__(self, ttl_seconds: float, path: Path):
+        """
+        Initialize the limiter.
+
+        Args:
+            ttl_seconds: Lifetime of a lease that is never released
+            path: SQLite file holding the lease table
+        """
+        super().__init__(ttl_seconds)
+        self.path = Path(path)
+        self._conn: sqlite3.Connection | None = None
+        # One statement sequence at a time on the shared connection
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the lease database on first use."""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.path), timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self._SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _acquire_sync(self, lease: Lease, limits: list[tuple[str, str, int]]) -> str | None:
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            # BEGIN IMMEDIATE takes the write lock up front, so the count and
+            # the insert below are atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for scope, key, limit in limits:
+                    conn.execute(
+                        "DELETE FROM concurrency_leases WHERE lease_key = ? AND expires_at <= ?",
+                        (key, now),
+                    )
+                    (held,) = conn.execute(
+                        "SELECT COUNT(*) FROM concurrency_leases WHERE lease_key = ?", (key,)
+                    ).fetchone()
+                    if held >= limit:
+                        conn.execute("COMMIT")
+                        return scope
+
+                conn.executemany(
+                    "INSERT INTO concurrency_leases (lease_key, lease_id, expires_at) VALUES (?, ?, ?)",
+                    [(key, lease.lease_id, lease.expires_at) for key in lease.keys],
+                )
+                conn.execute("COMMIT")
+                return None
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _renew_sync(self, lease: Lease) -> None:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE concurrency_leases SET expires_at = ? WHERE lease_id = ?",
+                (lease.expires_at, lease.lease_id),
+            )
+
+    def _release_sync(self, lease: Lease) -> None:
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM concurrency_leases WHERE lease_id = ?", (lease.lease_id,)
+            )
+
+    async def _acquire(self, lease: Lease, limits: list[tuple[str, str, int]]) -> str | None:
+        try:
+            return await asyncio.to_thread(self._acquire_sync, lease, limits)
+        except sqlite3.Error as e:
+            raise ConcurrencyLimiterError(f"SQLite limiter failed: {e}") from e
+
+    async def _renew(self, lease: Lease) -> None:
+        await asyncio.to_thread(self._renew_sync, lease)
+
+    async def _release(self, lease: Lease) -> None:
+        await asyncio.to_thread(self._release_sync, lease)
+
+    async def close(self) -> None:
+        await super().close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RedisConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    Limiter keeping leases in sorted sets on a Redis-protocol server.
+
+    Each key is taken with add-then-check: purge expired members, add this
+    lease, count. If the count is over the limit the lease is removed again.
+    Two racing requests can therefore both be turned away, but the limit is
+    never exceeded, and no server-side scripting is required.
+    """
+
+    KEY_PREFIX = "photo_restoration:uploads:"
+
+    def __init__(self, ttl_seconds: float, url: str):
+        """
+        Initialize the limiter.
+
+        Args:
+            ttl_seconds: Lifetime of a lease that is never released
+            url: Redis-protocol server URL
+        """
+        super().__init__(ttl_seconds)
+        self._conn = RespConnection(url)
+
+    async def _acquire(self, lease: Lease, limits: list[tuple[str, str, int]]) -> str | None:
+        now = time.time()
+        ttl_ms = int(self.ttl_seconds * 1000)
+        taken: list[str] = []
+        try:
+            for scope, key, limit in limits:
+                redis_key = self.KEY_PREFIX + key
+                _, _, held, _ = await self._conn.pipeline(
+                    [
+                        ("ZREMRANGEBYSCORE", redis_key, "-inf", repr(now)),
+                        ("ZADD", redis_key, repr(lease.expires_at), lease.lease_id),
+                        ("ZCARD", redis_key),
+                        ("PEXPIRE", redis_key, ttl_ms),
+                    ]
+                )
+                taken.append(redis_key)
+                if held > limit:
+                    await self._remove(lease, taken)
+                    return scope
+        except RespError as e:
+            if taken:
+                await self._remove(lease, taken)
+            raise ConcurrencyLimiterError(f"Redis limiter failed: {e}") from e
+        return None
+
+    async def _remove(self, lease: Lease, redis_keys: list[str]) -> None:
+        try:
+            await self._conn.pipeline([("ZREM", key, lease.lease_id) for key in redis_keys])
+        except RespError as e:
+            logger.warning(f"Failed to remove lease {lease.lease_id}, it will expire: {e}")
+
+    async def _renew(self, lease: Lease) -> None:
+        ttl_ms = int(self.ttl_seconds * 1000)
+        commands = []
+        for key in lease.keys:
+            redis_key = self.KEY_PREFIX + key
+            # XX: only update a member that is still there
+            commands.append(("ZADD", redis_key, "XX", repr(lease.expires_at), lease.lease_id))
+            commands.append(("PEXPIRE", redis_key, ttl_ms))
+        await self._conn.pipeline(commands)
+
+    async def _release(self, lease: Lease) -> None:
+        await self._conn.pipeline(
+            [("ZREM", self.KEY_PREFIX + key, lease.lease_id) for key in lease.keys]
+        )
+
+    async def close(self) -> None:
+        await super().close()
+        await self._conn.close()
+
+
+def create_concurrency_limiter(settings: Settings | None = None) -> ConcurrencyLimiter:
+    """
+    Create the limiter selected by ``concurrency_backend``.
+
+    Args:
+        settings: Application settings (defaults to global settings)
+
+    Returns:
+        Configured limiter
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    settings = settings or get_settings()
+    ttl = settings.concurrency_lease_ttl_seconds
+    backend = settings.concurrency_backend
+
+    if backend == "memory":
+        return MemoryConcurrencyLimiter(ttl)
+    if backend == "sqlite":
+        return SQLiteConcurrencyLimiter(ttl, settings.concurrency_sqlite_path)
+    if backend == "redis":
+        return RedisConcurrencyLimiter(ttl, settings.concurrency_redis_url)
+    raise ValueError(f"Unknown concurrency backend: {backend}")
+
+
+# Global limiter instance
+_limiter: ConcurrencyLimiter | None = None
+
+
+def get_concurrency_limiter() -> ConcurrencyLimiter:
+    """Get the process-wide limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        _limiter = create_concurrency_limiter()
+        logger.info(f"Concurrency limiter backend: {get_settings().concurrency_backend}")
+    return _limiter
+
+
+def _uploads_in_flight() -> dict[str, int]:
+    """Uploads in flight in this process, per session."""
+    return _limiter.uploads_in_flight if _limiter is not None else {}
+
+
+gauge_callback(UPLOADS_IN_FLIGHT, lambda: {(): sum(_uploads_in_flight().values())})
+gauge_callback(UPLOAD_SESSIONS_IN_FLIGHT, lambda: {(): len(_uploads_in_flight())})
+gauge_callback(UPLOADS_IN_FLIGHT_PER_SESSION_MAX, lambda: {(): max(_uploads_in_flight().values(), default=0)})
+
+
+async def close_concurrency_limiter() -> None:
+    """Close the process-wide limiter (application shutdown)."""
+    global _limiter
+    if _limiter is not None:
+        await _limiter.close()
+        _limiter = None
@@ -0,0 +1,274 @@
+"""
+Hot reload of the JSON configuration files.
+
+A reload reads ``config/default.json`` and ``config/{APP_ENV}.json``,
+validates them with ``ConfigFile`` (plus every model's ``replicate_schema``)
+and builds a complete new ``Settings`` before anything changes. Invalid
+files are rejected and the running configuration is left untouched.
+
+A valid configuration is applied by swapping the global settings instance
+and re-configuring the process-wide components that derive state from it
+(rate limits, provider concurrency limits, circuit breaker thresholds,
+hedge groups, the warm-keeper's model list). Requests already in flight
+keep the settings instance they started with. Caches keyed by the settings
+or model configuration objects (the model catalog served by ``GET /models``
+and compiled parameter validators) are rebuilt on next use.
+
+Settings read once at startup (server, database, storage directories,
+scheduler intervals, storage backends, secrets) keep their running values;
+changes to them are reported as needing a restart.
+
+The files are polled by a scheduled job (``config_reload.enabled``) and a
+reload can be triggered with ``POST /admin/config/reload``. Both act on the
+worker process they run in; with several workers each one's watcher picks
+up the change.
+"""
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from app.core.config import Settings, get_config_dir, get_settings, load_config_from_files, set_settings
+from app.core.config_schema import ConfigFile
+from app.core.replicate_schema import ReplicateModelSchema
+from app.services.circuit_breaker import get_circuit_breakers
+from app.services.hedging import get_hedging
+from app.services.memory_profiler import get_memory_profiler
+from app.services.provider_governor import get_provider_governor
+from app.services.schema_validator import get_compiled_schema
+from app.services.warm_keeper import get_warm_keeper
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Settings only read at startup; a reload keeps their running values
+RESTART_REQUIRED_FIELDS = (
+    "app_env",
+    "app_name",
+    "app_version",
+    "debug",
+    "log_level",
+    "host",
+    "port",
+    "cors_origins",
+    "hf_api_key",
+    "replicate_api_token",
+    "secret_key",
+    "algorithm",
+    "auth_username",
+    "auth_password",
+    "auth_email",
+    "auth_full_name",
+    "database_url",
+    "database_pool_size",
+    "database_max_overflow",
+    "database_write_queue_enabled",
+    "database_write_queue_max_batch",
+    "database_write_queue_max_delay_ms",
+    "upload_dir",
+    "processed_dir",
+    "session_cleanup_interval_hours",
+    "usage_reconcile_interval_hours",
+    "concurrency_backend",
+    "concurrency_lease_ttl_seconds",
+    "concurrency_sqlite_path",
+    "concurrency_redis_url",
+    "rate_limit_storage",
+    "rate_limit_redis_url",
+    "rate_limit_max_tracked_clients",
+    "warm_keeper_enabled",
+    "warm_keeper_interval_seconds",
+    "config_reload_enabled",
+    "config_reload_interval_seconds",
+    "scheduler_leader_election",
+    "scheduler_lease_seconds",
+    "scheduler_heartbeat_seconds",
+    "metrics_enabled",
+    "metrics_multiprocess_dir",
+    "metrics_flush_interval_seconds",
+    "tracing_enabled",
+    "tracing_sample_ratio",
+    "tracing_trust_traceparent",
+    "tracing_exporter",
+    "tracing_file_path",
+    "tracing_file_max_mb",
+    "logging_format",
+    "logging_queue",
+    "logging_queue_size",
+    "logging_sample",
+    "logging_rate_limits",
+    "loop_watchdog_enabled",
+    "loop_watchdog_interval_ms",
+    "loop_watchdog_threshold_ms",
+    "loop_watchdog_log_interval_seconds",
+    "memory_profiling_trace_on_startup",
+    "memory_profiling_report_interval_seconds",
+)
+
+
+class ConfigReloadError(Exception):
+    """Raised when the configuration files cannot be applied."""
+
+
+class ConfigReloader:
+    """
+    Watches the configuration files and applies valid changes.
+
+    Args:
+        app_env: Environment whose override file is watched (defaults to the running one)
+    """
+
+    def __init__(self, app_env: str | None = None):
+        self.app_env = app_env or get_settings().app_env
+        self.generation = 0
+        self.reloaded_at: datetime | None = None
+        self.last_error: str | None = None
+        self.last_error_at: datetime | None = None
+        self.restart_required: list[str] = []
+        self._signature = self.file_signature()
+
+    def files(self) -> list[Path]:
+        """Configuration files, in load order."""
+        config_dir = get_config_dir()
+        return [config_dir / "default.json", config_dir / f"{self.app_env}.json"]
+
+    def file_signature(self) -> tuple:
+        """Modification time and size of each file, to detect changes cheaply."""
+        signature = []
+        for path in self.files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self) -> Settings:
+        """
+        Read, validate and build settings from the configuration files.
+
+        Returns:
+            New settings (not yet applied)
+
+        Raises:
+            ConfigReloadError: If the files are missing or invalid
+        """
+        try:
+            config_data = load_config_from_files(self.app_env)
+            if not config_data:
+                raise ConfigReloadError(f"No configuration found in {get_config_dir()}")
+            ConfigFile(**config_data)
+            for model in config_data.get("models", []):
+                if model.get("replicate_schema"):
+                    try:
+                        ReplicateModelSchema(**model["replicate_schema"])
+                    except ValidationError as e:
+                        raise ConfigReloadError(f"Model '{model.get('id')}': invalid replicate_schema: {e}") from e
+        except ConfigReloadError:
+            raise
+        except (OSError, ValueError) as e:
+            # JSON syntax errors and pydantic ValidationError are both ValueErrors
+            raise ConfigReloadError(f"Invalid configuration: {e}") from e
+
+        new_settings = Settings()
+        if new_settings._config_data != config_data:
+            raise ConfigReloadError("Configuration files changed while reloading; will retry")
+        return new_settings
+
+    def reload(self) -> Settings:
+        """
+        Reload the configuration files and apply them.
+
+        Returns:
+            The settings now in use
+
+        Raises:
+            ConfigReloadError: If the files are invalid (the running configuration is kept)
+        """
+        signature = self.file_signature()
+        try:
+            new_settings = self.load()
+        except ConfigReloadError as e:
+            self._signature = signature
+            self.last_error = str(e)
+            self.last_error_at = datetime.now(timezone.utc)
+            logger.error(f"Configuration reload rejected, keeping the running configuration: {e}")
+            raise
+
+        current = get_settings()
+        restart_required = []
+        for field in RESTART_REQUIRED_FIELDS:
+            value = getattr(current, field)
+            if getattr(new_settings, field) != value:
+                restart_required.append(field)
+                object.__setattr__(new_settings, field, value)
+
+        # Compile parameter validators before the first request needs them
+        for model in new_settings.get_models():
+            if model.get("replicate_schema"):
+                get_compiled_schema(model)
+
+        set_settings(new_settings)
+        get_circuit_breakers().configure(new_settings)
+        get_provider_governor().configure(new_settings)
+        get_hedging().configure(new_settings)
+        get_warm_keeper().settings = new_settings
+        get_memory_profiler().settings = new_settings
+
+        self._signature = signature
+        self.generation += 1
+        self.reloaded_at = datetime.now(timezone.utc)
+        self.last_error = self.last_error_at = None
+        self.restart_required = restart_required
+        logger.info(
+            f"Configuration reloaded (generation {self.generation}, {len(new_settings.get_models())} models)"
+        )
+        if restart_required:
+            logger.warning(f"Configuration changes that need a restart: {', '.join(restart_required)}")
+        return new_settings
+
+    def check(self) -> bool:
+        """
+        Reload if the files changed since the last load attempt.
+
+        A rejected file is not retried until it changes again.
+
+        Returns:
+            True if a new configuration was applied
+        """
+        if self.file_signature() == self._signature:
+            return False
+        try:
+            self.reload()
+        except ConfigReloadError:
+            return False
+        return True
+
+    async def watch(self) -> None:
+        """Check the files once (the scheduled job)."""
+        self.check()
+
+    def snapshot(self) -> dict:
+        """Reload status for the admin API."""
+        return {
+            "watching": get_settings().config_reload_enabled,
+            "files": [str(path) for path in self.files()],
+            "generation": self.generation,
+            "reloaded_at": self.reloaded_at,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "restart_required": self.restart_required,
+        }
+
+
+_reloader: ConfigReloader | None = None
+
+
+def get_config_reloader() -> ConfigReloader:
+    """Get the process-wide reloader, creating it on first use."""
+    global _reloader
+    if _reloader is None:
+        _reloader = ConfigReloader()
+    return _reloader
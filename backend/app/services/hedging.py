@@ -0,0 +1,334 @@
+"""
+Hedged requests for latency-critical models.
+
+A hedge group pairs a primary model with a secondary model of the same
+category (usually on the other provider). A request to the primary is sent
+as usual; if it has not completed after the primary's observed latency
+percentile (p90 by default), the same image is also sent to the secondary.
+The first successful result wins and the other call is cancelled, which for
+Replicate cancels the prediction remotely so it stops billing.
+
+Hedging costs provider calls, so it is capped: every request to a primary
+earns ``max_hedge_rate`` of a hedge and a hedge spends one, so at most that
+fraction of requests is hedged over time. Until ``min_samples`` latencies
+have been observed for the primary no hedge is sent. The secondary is only
+called while its circuit breakers allow it.
+
+Hedges sent, hedges that won and the calls wasted on the losing side (with
+the provider-seconds they ran for) are reported by ``snapshot()``.
+
+State is per worker process.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from app.core.config import Settings, get_settings
+from app.services.circuit_breaker import (
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    get_circuit_breakers,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Hedges a quiet group can save up for a burst of slow requests
+HEDGE_BURST = 3.0
+
+
+class LatencyWindow:
+    """
+    Latencies of the most recent successful calls to one model.
+
+    Kept in arrival order (to evict the oldest) and sorted (for percentiles).
+    """
+
+    __slots__ = ("size", "_recent", "_sorted")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._recent: deque[float] = deque()
+        self._sorted: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def add(self, seconds: float) -> None:
+        """Record a latency, evicting the oldest once the window is full."""
+        if len(self._recent) >= self.size:
+            oldest = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._recent.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        """Latency below which ``percentile`` percent of the window falls (nearest rank)."""
+        if not self._sorted:
+            return None
+        rank = max(0, min(len(self._sorted) - 1, int(len(self._sorted) * percentile / 100)))
+        return self._sorted[rank]
+
+
+class HedgeGroup:
+    """
+    A primary model, the secondary it is hedged with, and hedging statistics.
+
+    Attributes:
+        primary: Primary model ID
+        secondary: Secondary model ID
+        secondary_provider: Provider of the secondary model
+        percentile: Primary latency percentile after which the hedge is sent
+        min_delay: Never hedge sooner than this many seconds
+        max_hedge_rate: Maximum fraction of requests that may be hedged
+    """
+
+    def __init__(
+        self,
+        primary: str,
+        secondary: str,
+        secondary_provider: str,
+        percentile: float = 90,
+        min_delay: float = 1.0,
+        max_hedge_rate: float = 0.1,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.secondary_provider = secondary_provider
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_hedge_rate = max_hedge_rate
+        self._budget = 0.0
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped_budget = 0
+        self.skipped_circuit = 0
+        self.wasted_calls = 0
+        self.wasted_seconds = 0.0
+
+    def earn_budget(self) -> None:
+        """Credit one request's share of a hedge."""
+        self._budget = min(max(1.0, HEDGE_BURST * self.max_hedge_rate), self._budget + self.max_hedge_rate)
+
+    def has_budget(self) -> bool:
+        """Whether a hedge may be sent without exceeding ``max_hedge_rate``."""
+        return self._budget >= 1.0
+
+    def spend_budget(self) -> None:
+        """Take one hedge from the budget."""
+        self._budget -= 1.0
+
+    def snapshot(self) -> dict:
+        """Statistics for status endpoints."""
+        return {
+            "secondary": self.secondary,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "max_hedge_rate": self.max_hedge_rate,
+            "hedge_wins": self.hedge_wins,
+            "skipped_budget": self.skipped_budget,
+            "skipped_circuit": self.skipped_circuit,
+            "wasted_calls": self.wasted_calls,
+            "wasted_seconds": round(self.wasted_seconds, 3),
+        }
+
+
+def _consume_result(task: asyncio.Task) -> None:
+    """Retrieve a cancelled loser's outcome so it is not reported as never retrieved."""
+    if not task.cancelled():
+        task.exception()
+
+
+class HedgingPolicy:
+    """
+    Hedge groups by primary model and the latency windows that time their hedges.
+
+    Args:
+        settings: Application settings (defaults to global settings)
+        breakers: Circuit breakers consulted before a hedge is sent
+    """
+
+    def __init__(self, settings: Settings | None = None, breakers: CircuitBreakerRegistry | None = None):
+        self.breakers = breakers or get_circuit_breakers()
+        self.groups: dict[str, HedgeGroup] = {}
+        self.latencies: dict[str, LatencyWindow] = {}
+        self.latency_window = None
+        self.configure(settings or get_settings())
+
+    def configure(self, settings: Settings) -> None:
+        """
+        Apply hedge groups from settings (configuration reload).
+
+        A group whose primary and secondary are unchanged keeps its
+        statistics and its primary's latencies; requests already being
+        hedged finish with the group they started with.
+
+        Args:
+            settings: Application settings
+        """
+        self.enabled = settings.hedging_enabled
+        self.min_samples = settings.hedging_min_samples
+        if settings.hedging_latency_window != self.latency_window:
+            self.latency_window = settings.hedging_latency_window
+            self.latencies = {}
+
+        groups = {}
+        for group in settings.hedging_groups:
+            secondary = settings.get_model_by_id(group["secondary"])
+            if secondary is None or not secondary.get("enabled", True):
+                logger.warning(
+                    f"Hedging disabled for {group['primary']}: secondary model {group['secondary']} is not available"
+                )
+                continue
+            hedge_group = self.groups.get(group["primary"])
+            if hedge_group is None or hedge_group.secondary != group["secondary"]:
+                hedge_group = HedgeGroup(
+                    primary=group["primary"],
+                    secondary=group["secondary"],
+                    secondary_provider=secondary.get("provider", "huggingface"),
+                )
+            hedge_group.secondary_provider = secondary.get("provider", "huggingface")
+            hedge_group.percentile = group.get("percentile", 90)
+            hedge_group.min_delay = group.get("min_delay_seconds", 1.0)
+            hedge_group.max_hedge_rate = group.get("max_hedge_rate", 0.1)
+            groups[group["primary"]] = hedge_group
+
+        self.groups = groups
+        self.latencies = {model_id: window for model_id, window in self.latencies.items() if model_id in groups}
+
+    def group_for(self, model_id: str) -> HedgeGroup | None:
+        """Hedge group whose primary is ``model_id``, if hedging is enabled."""
+        if not self.enabled:
+            return None
+        return self.groups.get(model_id)
+
+    def record_latency(self, model_id: str, seconds: float) -> None:
+        """Record the latency of a successful call to a hedged primary (others are ignored)."""
+        if model_id not in self.groups:
+            return
+        window = self.latencies.get(model_id)
+        if window is None:
+            window = self.latencies[model_id] = LatencyWindow(self.latency_window)
+        window.add(seconds)
+
+    def hedge_delay(self, group: HedgeGroup) -> float | None:
+        """Seconds to wait for the primary before hedging, or None until enough latencies are known."""
+        window = self.latencies.get(group.primary)
+        if window is None or len(window) < self.min_samples:
+            return None
+        return max(group.min_delay, window.percentile(group.percentile))
+
+    def _admit_secondary(self, group: HedgeGroup) -> bool:
+        """Take the hedge budget and a circuit breaker admission for the secondary."""
+        if not group.has_budget():
+            group.skipped_budget += 1
+            return False
+        try:
+            self.breakers.allow(group.secondary_provider, group.secondary)
+        except CircuitOpenError as e:
+            group.skipped_circuit += 1
+            logger.debug(f"Not hedging {group.primary}: {e}")
+            return False
+        group.spend_budget()
+        return True
+
+    async def run(self, group: HedgeGroup, call: Callable[[str], Awaitable[T]]) -> tuple[T, str]:
+        """
+        Call the primary model, hedging with the secondary if it is slow.
+
+        Args:
+            group: Hedge group of the requested model
+            call: Coroutine factory calling the model with the given ID. It must
+                record its own outcome with the circuit breakers, including
+                releasing its admission when cancelled.
+
+        Returns:
+            (result, model ID that produced it)
+
+        Raises:
+            Exception: The primary's error if no call succeeded (the
+                secondary's if the primary was cancelled)
+        """
+        group.requests += 1
+        group.earn_budget()
+
+        primary = asyncio.create_task(call(group.primary))
+        delay = self.hedge_delay(group)
+        if delay is None:
+            return await primary, group.primary
+
+        started = {primary: time.monotonic()}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done or not self._admit_secondary(group):
+            return await primary, group.primary
+
+        group.hedged += 1
+        logger.info(f"Hedging {group.primary} with {group.secondary} after {delay:.2f}s")
+        secondary = asyncio.create_task(call(group.secondary))
+        started[secondary] = time.monotonic()
+        model_ids = {primary: group.primary, secondary: group.secondary}
+
+        pending = {primary, secondary}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    now = time.monotonic()
+                    for loser in pending:
+                        group.wasted_calls += 1
+                        group.wasted_seconds += now - started[loser]
+                    if task is secondary:
+                        group.hedge_wins += 1
+                        # Keep the slow primary in its latency window, or the
+                        # percentile would only ever see the calls that beat it
+                        self.record_latency(group.primary, now - started[primary])
+                    return task.result(), model_ids[task]
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_consume_result)
+
+        # Both calls failed: both ran to completion, so both count as spent
+        group.wasted_calls += 1
+        group.wasted_seconds += time.monotonic() - started[secondary]
+        if primary.cancelled():
+            return await secondary, group.secondary
+        return await primary, group.primary
+
+    def snapshot(self) -> dict:
+        """Statistics and current hedge delay for every group."""
+        groups = {}
+        for primary, group in sorted(self.groups.items()):
+            window = self.latencies.get(primary)
+            delay = self.hedge_delay(group)
+            groups[primary] = {
+                **group.snapshot(),
+                "samples": len(window) if window else 0,
+                "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+            }
+        return {"enabled": self.enabled, "groups": groups}
+
+
+_policy: HedgingPolicy | None = None
+
+
+def get_hedging() -> HedgingPolicy:
+    """Get the process-wide hedging policy, creating it on first use."""
+    global _policy
+    if _policy is None:
+        _policy = HedgingPolicy()
+    return _policy
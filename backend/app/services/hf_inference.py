@@ -3,18 +3,30 @@ HuggingFace Inference API service.
 
 This module provides integration with HuggingFace's Inference API
 for image processing tasks such as upscaling and enhancement.
+
+Transient failures (model loading, 5xx, timeouts, connection errors) are
+retried with exponential backoff and jitter, waiting for the model's
+``estimated_time`` when HuggingFace reports it is loading. All attempts
+together stay within ``hf_retry_deadline_seconds``. Client errors (4xx,
+including rate limits) are not retried. A model still loading when the
+retries run out raises ``HFModelLoadingError`` carrying the estimated time.
 """
 import asyncio
 import io
 import logging
+import random
+import re
+import time
 from typing import Any
 
 import httpx
 from fastapi import HTTPException, status
-from huggingface_hub import InferenceClient
 from PIL import Image
 
 from app.core.config import Settings, get_settings
+from app.core import server_timing
+from app.core.metrics import IMAGE_OPERATION_DURATION, ExecutorCall
+from app.core.tracing import span
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -44,6 +56,70 @@ class HFTimeoutError(HFInferenceError):
     pass
 
 
+class HFModelLoadingError(HFInferenceError):
+    """
+    Raised when the model is still loading once the retries are used up.
+
+    Args:
+        message: Error message
+        retry_after: HuggingFace's estimated seconds until the model is loaded, if reported
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# HTTP statuses worth retrying: the request may succeed unchanged later
+RETRYABLE_STATUS_CODES = frozenset({500, 502, 503, 504})
+
+_ESTIMATED_TIME_RE = re.compile(r"estimated_time\W+(\d+(?:\.\d+)?)")
+
+
+def _status_code(error: Exception) -> int | None:
+    """HTTP status of a failed inference call, if the error carries a response."""
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def estimated_load_time(error: Exception) -> float | None:
+    """
+    Seconds until the model is loaded, from a 503 "model is loading" reply.
+
+    Args:
+        error: Exception raised by the inference call
+
+    Returns:
+        HuggingFace's ``estimated_time``, or None if the error does not carry one
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            value = response.json().get("estimated_time")
+            if isinstance(value, (int, float)):
+                return float(value)
+        except Exception:
+            pass
+    match = _ESTIMATED_TIME_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed inference call may succeed if repeated unchanged.
+
+    Args:
+        error: Exception raised by the inference call
+
+    Returns:
+        True for model loading, server errors, timeouts and connection errors;
+        errors without an HTTP status are judged by their type only
+    """
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS_CODES
+
+
 class HFInferenceService:
     """
     Service for interacting with HuggingFace Inference API.
@@ -61,16 +137,24 @@ class HFInferenceService:
         """
         self.settings = settings or get_settings()
         self.api_key = self.settings.hf_api_key
+        self.api_url = self.settings.hf_api_url.rstrip("/")
         self.timeout = self.settings.hf_api_timeout
+        self.retry_attempts = self.settings.hf_retry_attempts
+        self.retry_delay = self.settings.hf_retry_delay_seconds
+        self.retry_deadline = self.settings.hf_retry_deadline_seconds
 
         if not self.api_key:
             raise ValueError("HuggingFace API key is required")
 
-        # Initialize InferenceClient
+        # Initialize InferenceClient (huggingface_hub is imported on first use,
+        # keeping it off the application startup path)
         # Note: Don't use provider="auto" as it causes StopIteration for some models
         # Let the library use the default HuggingFace Inference API
+        from huggingface_hub import InferenceClient
+
         self.client = InferenceClient(
             token=self.api_key,
+            timeout=self.timeout,
         )
 
     def _get_model_url(self, model_path: str) -> str:
@@ -85,6 +169,65 @@ class HFInferenceService:
         """
         return f"{self.api_url}/{model_path}"
 
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """
+        Seconds to wait before retrying after the given failed attempt.
+
+        A loading model is retried once its estimated load time has passed;
+        anything else backs off exponentially from ``retry_delay``. Random
+        jitter keeps concurrent requests from retrying in lockstep.
+        """
+        estimated = estimated_load_time(error)
+        if estimated is not None:
+            return estimated + random.uniform(0, self.retry_delay)
+        backoff = self.retry_delay * 2 ** (attempt - 1)
+        return random.uniform(backoff / 2, backoff)
+
+    async def _run_with_retry(self, call, model_path: str):
+        """
+        Run a blocking inference call in the executor, retrying transient failures.
+
+        Args:
+            call: Zero-argument callable performing one inference request
+            model_path: Model path (for logging)
+
+        Returns:
+            Result of the first successful call
+
+        Raises:
+            Exception: The last error if it is not retryable, attempts are
+                exhausted or the next retry would miss the deadline
+        """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.retry_deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            try:
+                # The executor thread cannot be interrupted; past the deadline
+                # we stop waiting for it and its result is discarded
+                with span("hf.inference_attempt", attempt=attempt):
+                    tracked = ExecutorCall("hf_inference", call)
+                    future = loop.run_in_executor(None, tracked)
+                    future.add_done_callback(tracked.discard_if_cancelled)
+                    return await asyncio.wait_for(future, remaining)
+            except Exception as e:
+                if attempt > self.retry_attempts or not is_retryable(e):
+                    raise
+                delay = self._retry_delay(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    logger.warning(
+                        f"Not retrying {model_path}: next attempt in {delay:.1f}s "
+                        f"would pass the {self.retry_deadline}s deadline"
+                    )
+                    raise
+                logger.warning(
+                    f"Attempt {attempt} for {model_path} failed ({e}); "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
     async def process_image(
         self,
         model_id: str,
@@ -104,6 +247,7 @@ class HFInferenceService:
 
         Raises:
             HFModelError: If model not found or invalid
+            HFModelLoadingError: If the model is still loading after the retries
             HFRateLimitError: If rate limit exceeded
             HFTimeoutError: If request times out
             HFInferenceError: For other API errors
@@ -119,12 +263,13 @@ class HFInferenceService:
         # Get model parameters
         request_params = parameters or model_config.get("parameters", {})
 
-        logger.info(f"Processing image with model: {model_path}, category: {model_category}")
+        logger.info("Processing image with model: %s, category: %s", model_path, model_category)
 
         try:
             # Validate input image (just for logging)
-            input_image = Image.open(io.BytesIO(image_bytes))
-            logger.info(f"Input image: {input_image.format}, {input_image.size}, {input_image.mode}")
+            with span("hf.decode_input"):
+                input_image = Image.open(io.BytesIO(image_bytes))
+            logger.debug("Input image: %s, %s, %s", input_image.format, input_image.size, input_image.mode)
 
             # Helper function to call InferenceClient synchronously
             # Note: InferenceClient expects bytes, not PIL Image!
@@ -133,7 +278,7 @@ class HFInferenceService:
                     if model_category == "enhance":
                         # For enhancement models (like Qwen), use image_to_image with prompt
                         prompt = request_params.get("prompt", "enhance details, remove noise and artifacts")
-                        logger.info(f"Using image_to_image with prompt: {prompt}")
+                        logger.debug("Using image_to_image with prompt: %s", prompt)
                         return self.client.image_to_image(
                             image_bytes,  # Use bytes, not PIL Image
                             prompt=prompt,
@@ -141,14 +286,14 @@ class HFInferenceService:
                         )
                     elif model_category == "upscale":
                         # For upscaling models (like Swin2SR), use image_to_image without prompt
-                        logger.info(f"Using image_to_image for upscaling")
+                        logger.debug("Using image_to_image for upscaling")
                         return self.client.image_to_image(
                             image_bytes,  # Use bytes, not PIL Image
                             model=model_path,
                         )
                     else:
                         # Default: try image_to_image
-                        logger.info(f"Using image_to_image (default)")
+                        logger.debug("Using image_to_image (default)")
                         return self.client.image_to_image(
                             image_bytes,  # Use bytes, not PIL Image
                             model=model_path,
@@ -157,29 +302,39 @@ class HFInferenceService:
                     # Convert StopIteration to a regular exception
                     raise RuntimeError(f"Inference call failed with StopIteration: {e}")
 
-            # Run inference in executor to avoid blocking async loop
-            loop = asyncio.get_event_loop()
-            output_image = await loop.run_in_executor(None, call_inference)
+            # Run inference in executor to avoid blocking async loop. Retries
+            # reuse the same input bytes; nothing is re-read or re-encoded.
+            output_image = await self._run_with_retry(call_inference, model_path)
 
             # InferenceClient returns a PIL Image, convert to bytes
             if isinstance(output_image, Image.Image):
                 output_bytes = io.BytesIO()
                 output_format = input_image.format or "PNG"
-                output_image.save(output_bytes, format=output_format)
+                with (
+                    span("hf.encode_output", format=output_format),
+                    IMAGE_OPERATION_DURATION.labels("encode").time(),
+                    server_timing.measure("encode"),
+                ):
+                    output_image.save(output_bytes, format=output_format)
                 output_bytes.seek(0)
-                logger.info(f"Successfully processed image with {model_path}")
+                logger.info("Successfully processed image with %s", model_path)
                 return output_bytes.read()
             else:
                 # If it's already bytes, return as-is
-                logger.info(f"Successfully processed image with {model_path} (returned as bytes)")
+                logger.info("Successfully processed image with %s (returned as bytes)", model_path)
                 return output_image
 
         except Exception as e:
             error_msg = str(e).lower()
+            status_code = _status_code(e)
             logger.error(f"HuggingFace API error: {e}", exc_info=True)
 
             # Map common errors
-            if "rate limit" in error_msg or "429" in error_msg:
+            if isinstance(e, asyncio.TimeoutError):
+                raise HFTimeoutError(
+                    f"HuggingFace API did not respond within {self.retry_deadline}s (including retries)"
+                )
+            elif "rate limit" in error_msg or "429" in error_msg:
                 raise HFRateLimitError("HuggingFace API rate limit exceeded")
             elif "timeout" in error_msg:
                 raise HFTimeoutError(
@@ -187,8 +342,11 @@ class HFInferenceService:
                 )
             elif "not found" in error_msg or "404" in error_msg:
                 raise HFModelError(f"Model '{model_path}' not found on HuggingFace")
-            elif "loading" in error_msg or "503" in error_msg:
-                raise HFModelError(f"Model '{model_path}' is still loading. Please try again in a moment.")
+            elif status_code == 503 or "loading" in error_msg or "503" in error_msg:
+                raise HFModelLoadingError(
+                    f"Model '{model_path}' is still loading. Please try again in a moment.",
+                    retry_after=estimated_load_time(e),
+                )
             elif "410" in error_msg or "gone" in error_msg:
                 raise HFModelError(
                     f"Model '{model_path}' is not available via Inference API. "
@@ -204,15 +362,21 @@ class HFInferenceService:
             else:
                 raise HFInferenceError(f"HuggingFace API error: {str(e)}")
 
-    async def check_model_status(self, model_id: str) -> dict[str, Any]:
+    async def check_model_status(self, model_id: str, content: bytes = b"") -> dict[str, Any]:
         """
         Check if a model is available and loaded.
 
+        A request to a model that is not loaded makes HuggingFace start
+        loading it, so sending a small real input also keeps a model warm.
+
         Args:
             model_id: Model ID from models configuration
+            content: Request body (empty checks status only, an image runs the model)
 
         Returns:
-            Dictionary with model status information
+            Dictionary with model status information: "status" is "ready",
+            "loading" (with "estimated_time" in seconds), "rate_limited" or
+            "error" (with "error")
 
         Raises:
             HFModelError: If model not found
@@ -228,11 +392,10 @@ class HFInferenceService:
 
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
-                # Send a small dummy request to check status
                 response = await client.post(
                     model_url,
                     headers=headers,
-                    content=b"",  # Empty content just to check status
+                    content=content,
                 )
 
                 if response.status_code == 503:
@@ -245,6 +408,13 @@ class HFInferenceService:
                     except Exception:
                         return {"status": "loading", "estimated_time": None}
 
+                if response.status_code == 429:
+                    return {"status": "rate_limited"}
+
+                if response.status_code in (401, 403, 404, 410):
+                    return {"status": "error", "error": f"HuggingFace API returned {response.status_code}"}
+
+                # Anything else (including a 400 for the empty body) came from a loaded model
                 return {"status": "ready"}
 
         except Exception as e:
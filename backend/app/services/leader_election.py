@@ -0,0 +1,200 @@
+"""
+Lease-based leader election for the background scheduler.
+
+Every worker process runs a scheduler, but cluster-wide jobs (session
+cleanup, usage reconciliation) must run in one of them only: with several
+workers or replicas sharing a database, concurrent runs contend for the
+write lock and race on file unlinks. The workers compete for a named lease
+row in ``scheduler_leases``:
+
+- the holder renews the lease on every heartbeat, pushing ``expires_at``
+  forward by ``scheduler.lease_seconds``;
+- any worker may take the lease over once ``expires_at`` has passed, so a
+  crashed leader is replaced within one lease period (a leader that shuts
+  down cleanly releases the lease and is replaced on the next heartbeat).
+
+Acquisition and renewal are one conditional UPDATE (``WHERE holder = me OR
+expires_at < now``), so two workers can never both succeed. A worker treats
+itself as leader only until one heartbeat interval before its lease expires,
+which tolerates that much clock skew between hosts.
+
+Jobs opt in by being wrapped with ``leader_only``; jobs that maintain
+per-process state (the warm-keeper's readiness, the configuration watcher)
+keep running in every worker.
+"""
+import asyncio
+import functools
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import case, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import Settings, get_settings
+from app.db.database import get_session_factory
+from app.db.models import SchedulerLease
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    One worker's participation in the election for a named lease.
+
+    Args:
+        name: Lease name (workers competing for the same name elect one leader)
+        settings: Application settings (uses global settings if not provided)
+    """
+
+    def __init__(self, name: str = "scheduler", settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.name = name
+        self.enabled = settings.scheduler_leader_election
+        self.lease_seconds = settings.scheduler_lease_seconds
+        self.heartbeat_seconds = settings.scheduler_heartbeat_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.elected_at: datetime | None = None
+        self._valid_until = 0.0
+        self._lock = asyncio.Lock()
+        self._on_elected: list[Callable[[], None]] = []
+
+    def is_leader(self) -> bool:
+        """Whether this worker holds the lease (always True with election disabled)."""
+        if not self.enabled:
+            return True
+        return time.monotonic() < self._valid_until
+
+    def on_elected(self, callback: Callable[[], None]) -> None:
+        """Register a callback run when this worker becomes the leader."""
+        if callback not in self._on_elected:
+            self._on_elected.append(callback)
+
+    async def _try_acquire(self, now: datetime, expires_at: datetime) -> bool:
+        """Renew the lease, take it over if expired, or create it; True if held."""
+        session_factory = get_session_factory()
+        async with session_factory() as db:
+            result = await db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name)
+                .where(or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now))
+                .values(
+                    holder=self.holder,
+                    expires_at=expires_at,
+                    acquired_at=case(
+                        (SchedulerLease.holder == self.holder, SchedulerLease.acquired_at),
+                        else_=now,
+                    ),
+                )
+            )
+            if result.rowcount == 1:
+                await db.commit()
+                return True
+
+            # Held by another worker, or no lease row yet (first start)
+            if await db.get(SchedulerLease, self.name) is not None:
+                return False
+            db.add(SchedulerLease(name=self.name, holder=self.holder, acquired_at=now, expires_at=expires_at))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker created it first
+                await db.rollback()
+                return False
+            return True
+
+    async def heartbeat(self) -> bool:
+        """
+        Acquire or renew the lease (the scheduled heartbeat job).
+
+        A database error keeps the current state: a leader stays leader until
+        its lease would lapse, and no other worker can take it over meanwhile.
+
+        Returns:
+            True if this worker is the leader
+        """
+        if not self.enabled:
+            return True
+
+        async with self._lock:
+            started = time.monotonic()
+            now = datetime.utcnow()
+            try:
+                held = await self._try_acquire(now, now + timedelta(seconds=self.lease_seconds))
+            except Exception as e:
+                logger.error(f"Scheduler lease '{self.name}' heartbeat failed: {e}", exc_info=True)
+                return self.is_leader()
+
+            if not held:
+                if self.elected_at is not None:
+                    logger.warning(f"Lost scheduler lease '{self.name}' ({self.holder})")
+                self.elected_at = None
+                self._valid_until = 0.0
+                return False
+
+            self._valid_until = started + self.lease_seconds - self.heartbeat_seconds
+            if self.elected_at is None:
+                self.elected_at = now
+                logger.info(f"Acquired scheduler lease '{self.name}': {self.holder} is the leader")
+                for callback in self._on_elected:
+                    callback()
+            return True
+
+    async def release(self) -> None:
+        """Give up the lease (on shutdown) so another worker can take over right away."""
+        if not self.enabled or self.elected_at is None:
+            return
+
+        async with self._lock:
+            self.elected_at = None
+            self._valid_until = 0.0
+            try:
+                session_factory = get_session_factory()
+                async with session_factory() as db:
+                    await db.execute(
+                        update(SchedulerLease)
+                        .where(SchedulerLease.name == self.name)
+                        .where(SchedulerLease.holder == self.holder)
+                        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+                    )
+                    await db.commit()
+                logger.info(f"Released scheduler lease '{self.name}'")
+            except Exception as e:
+                logger.warning(f"Failed to release scheduler lease '{self.name}': {e}")
+
+
+def leader_only(job: Callable[[], Awaitable[None]]) -> Callable[[], Awaitable[None]]:
+    """
+    Wrap a scheduled job so it only runs in the elected worker.
+
+    Args:
+        job: Coroutine function taking no arguments
+
+    Returns:
+        Coroutine function that skips the job in followers
+    """
+
+    @functools.wraps(job)
+    async def run() -> None:
+        if not get_leader_election().is_leader():
+            logger.debug(f"Skipping {job.__name__}: not the scheduler leader")
+            return
+        await job()
+
+    return run
+
+
+_election: LeaderElection | None = None
+
+
+def get_leader_election() -> LeaderElection:
+    """Get the process-wide scheduler election, creating it on first use."""
+    global _election
+    if _election is None:
+        _election = LeaderElection()
+    return _election
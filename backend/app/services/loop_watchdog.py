@@ -0,0 +1,183 @@
+"""
+Event-loop stall detector.
+
+A heartbeat task sleeps ``interval_ms`` at a time on the event loop and
+measures how late it wakes up. That lag is how long something kept the
+loop from running other tasks, for example a synchronous provider call, a
+bcrypt hash, a PIL decode or encode, a file write or ``Path.unlink``. Every
+lag is observed in ``event_loop_lag_seconds``. Lags of at least
+``threshold_ms`` count as stalls in ``event_loop_stalls_total`` and
+``event_loop_stall_duration_seconds``.
+
+The blocked loop cannot report on itself, so a monitor thread checks the
+heartbeat. When the heartbeat is overdue by ``threshold_ms``, the monitor
+captures the loop thread's stack through ``sys._current_frames()``. It logs
+that stack, which shows the blocking call while the stall is still
+happening, together with the route of the request being served. Stack logs
+are limited to one per ``log_interval_seconds``; stalls are always counted.
+
+Costs: one timer wake-up on the loop per interval, and one thread that
+wakes twice per threshold. State is per worker process.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALL_DURATION, EVENT_LOOP_STALLS
+from app.middleware.metrics import route_label
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Stack frames included in a stall report (innermost frames are kept)
+MAX_STACK_FRAMES = 40
+
+# ASGI scope of the request each task is serving, for stall reports
+_task_scopes: dict[asyncio.Task, dict] = {}
+
+
+def track_request(scope: dict) -> asyncio.Task | None:
+    """
+    Remember which request the current task is serving.
+
+    Args:
+        scope: ASGI scope of the request
+
+    Returns:
+        The task, to pass to untrack_request() when the request is done
+    """
+    task = asyncio.current_task()
+    if task is not None:
+        _task_scopes[task] = scope
+    return task
+
+
+def untrack_request(task: asyncio.Task | None) -> None:
+    """Forget a task's request."""
+    if task is not None:
+        _task_scopes.pop(task, None)
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag and reports stalls with the blocking stack.
+
+    Args:
+        settings: Application settings (uses global settings if not provided)
+    """
+
+    def __init__(self, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self.interval = settings.loop_watchdog_interval_ms / 1000
+        self.threshold = settings.loop_watchdog_threshold_ms / 1000
+        self.log_interval = settings.loop_watchdog_log_interval_seconds
+        self.stalls = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._heartbeat: asyncio.Task | None = None
+        self._monitor: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._beat = time.monotonic()
+        self._reported_beat: float | None = None
+        self._last_report = float("-inf")
+
+    def start(self) -> None:
+        """Start the heartbeat task and the monitor thread (call from the event loop)."""
+        if self._heartbeat is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat(), name="loop-watchdog")
+        self._monitor = threading.Thread(target=self._run_monitor, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+        logger.info(
+            f"Event-loop watchdog started (interval {self.interval * 1000:.0f}ms, "
+            f"threshold {self.threshold * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the heartbeat task and the monitor thread."""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._monitor is not None:
+            self._monitor.join(timeout=1.0)
+            self._monitor = None
+
+    async def _run_heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                EVENT_LOOP_STALLS.inc()
+                EVENT_LOOP_STALL_DURATION.observe(lag)
+                if self._reported_beat == self._beat:
+                    logger.warning(f"Event loop stall ended after {lag * 1000:.0f}ms")
+            self._beat = now
+
+    def _run_monitor(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == self._reported_beat:
+                continue
+            now = time.monotonic()
+            if now - self._last_report < self.log_interval:
+                continue
+            self._reported_beat = beat
+            self._last_report = now
+            self.report(overdue)
+
+    def report(self, overdue: float) -> None:
+        """Log the loop thread's current stack and the request being served."""
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame)[-MAX_STACK_FRAMES:])
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        scope = _task_scopes.get(task) if task is not None else None
+        if scope is not None:
+            serving = f"{scope.get('method', '')} {route_label(scope)} ({scope.get('path', '')})"
+        elif task is not None:
+            serving = f"task {task.get_name()}"
+        else:
+            serving = "no task (loop callback)"
+        logger.warning(
+            f"Event loop blocked for {overdue * 1000:.0f}ms so far while serving {serving}; "
+            f"loop thread stack:\n{stack}"
+        )
+
+
+_loop_watchdog: LoopWatchdog | None = None
+
+
+def get_loop_watchdog() -> LoopWatchdog:
+    """Get the process-wide loop watchdog, creating it on first use."""
+    global _loop_watchdog
+    if _loop_watchdog is None:
+        _loop_watchdog = LoopWatchdog()
+    return _loop_watchdog
+
+
+async def close_loop_watchdog() -> None:
+    """Stop the loop watchdog if it was started (application shutdown)."""
+    if _loop_watchdog is not None:
+        await _loop_watchdog.stop()
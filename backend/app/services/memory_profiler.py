@@ -0,0 +1,350 @@
+"""
+Memory profiling of the running worker process.
+
+Allocation tracing uses ``tracemalloc``, which records the source line (or
+the last few frames) of every Python allocation while it runs. That
+includes ``bytes`` buffers and the pixel buffers of PIL images, which are
+allocated through Python's allocator. Tracing costs CPU on every
+allocation and memory per live block, so it is off until an admin starts
+it (or ``memory_profiling.trace_on_startup`` is set).
+
+While tracing, admins can take snapshots, list the largest live
+allocation sites, and diff two snapshots (or a snapshot against the live
+heap) grouped by file, line or traceback. A site that keeps growing across
+snapshots is the code path to look at. Snapshots are kept in this worker
+process, up to ``max_snapshots``, oldest first out.
+
+The optional periodic report (``report_interval_seconds``) logs RSS, the
+garbage collector's generation counts and collections and, while tracing,
+the sites that grew most since the previous report.
+"""
+import asyncio
+import gc
+import logging
+import os
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import TRACEMALLOC_TRACED_MEMORY, gauge_callback
+from app.services.profiler import short_path
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Ways to group allocations (tracemalloc statistics keys)
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Allocations of the import system and of tracemalloc itself are left out
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+class TracingNotStartedError(Exception):
+    """Raised when allocation data is requested while tracemalloc is not tracing."""
+
+
+class UnknownSnapshotError(Exception):
+    """Raised when a snapshot ID is not (or no longer) stored."""
+
+
+def rss_bytes() -> int | None:
+    """Resident set size of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def gc_status() -> dict:
+    """Garbage collector state, per generation (0, 1, 2)."""
+    stats = gc.get_stats()
+    return {
+        "counts": list(gc.get_count()),
+        "thresholds": list(gc.get_threshold()),
+        "collections": [generation["collections"] for generation in stats],
+        "collected": [generation["collected"] for generation in stats],
+        "uncollectable": [generation["uncollectable"] for generation in stats],
+        "garbage": len(gc.garbage),
+    }
+
+
+def _site(stat, group_by: str) -> dict:
+    """Allocation site of a Statistic or StatisticDiff."""
+    frame = stat.traceback[-1]  # Most recent frame (tracebacks are oldest first)
+    site = {
+        "file": short_path(frame.filename),
+        "line": frame.lineno if group_by != "filename" else None,
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if group_by == "traceback":
+        site["traceback"] = [f"{short_path(f.filename)}:{f.lineno}" for f in reversed(stat.traceback)]
+    if isinstance(stat, tracemalloc.StatisticDiff):
+        site["size_diff_bytes"] = stat.size_diff
+        site["count_diff"] = stat.count_diff
+    return site
+
+
+class MemoryProfiler:
+    """
+    Allocation tracing, stored snapshots and the periodic memory report.
+
+    Methods taking or comparing snapshots block for a while on a large
+    heap; call them through ``asyncio.to_thread``.
+
+    Args:
+        settings: Application settings (uses global settings if not provided)
+    """
+
+    def __init__(self, settings: Settings | None = None):
+        self.settings = settings or get_settings()
+        # ID -> (time taken, snapshot, traced bytes)
+        self._snapshots: OrderedDict[int, tuple[datetime, tracemalloc.Snapshot, int]] = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._report_task: asyncio.Task | None = None
+        self._last_rss: int | None = None
+        self._last_report_snapshot: tracemalloc.Snapshot | None = None
+
+    @property
+    def tracing(self) -> bool:
+        """Whether tracemalloc is tracing allocations."""
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int) -> None:
+        """
+        Start tracing allocations.
+
+        Changing the frame count restarts tracing, which forgets the live
+        allocations and drops the stored snapshots.
+
+        Args:
+            frames: Frames recorded per allocation (1 is enough to group by line)
+        """
+        if tracemalloc.is_tracing():
+            if tracemalloc.get_traceback_limit() == frames:
+                return
+            # The traceback limit can only be changed by restarting tracing
+            self.stop()
+        tracemalloc.start(frames)
+        logger.info(f"Started tracing memory allocations ({frames} frame(s) per allocation)")
+
+    def stop(self) -> None:
+        """Stop tracing and drop the stored snapshots, releasing their memory."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("Stopped tracing memory allocations")
+        with self._lock:
+            self._snapshots.clear()
+        self._last_report_snapshot = None
+
+    def status(self) -> dict:
+        """Process memory, garbage collector and tracing state."""
+        traced, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshots = [
+                {"id": snapshot_id, "taken_at": taken_at, "traced_bytes": traced_bytes}
+                for snapshot_id, (taken_at, _, traced_bytes) in self._snapshots.items()
+            ]
+        return {
+            "pid": os.getpid(),
+            "rss_bytes": rss_bytes(),
+            "tracing": self.tracing,
+            "frames": tracemalloc.get_traceback_limit() if self.tracing else None,
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "gc": gc_status(),
+            "snapshots": snapshots,
+        }
+
+    def _take(self, collect: bool) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise TracingNotStartedError("Memory tracing is not started in this worker")
+        if collect:
+            gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    def take_snapshot(self, group_by: str = "lineno", limit: int = 20, collect: bool = False) -> dict:
+        """
+        Take and store a snapshot.
+
+        Args:
+            group_by: ``lineno``, ``filename`` or ``traceback``
+            limit: Largest sites to return
+            collect: Run a full garbage collection first, so unreachable
+                cycles do not show up as live memory
+
+        Returns:
+            The snapshot's ID, time, traced size and largest sites
+
+        Raises:
+            TracingNotStartedError: If tracing is not started
+        """
+        snapshot = self._take(collect)
+        taken_at = datetime.now(timezone.utc)
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+        summary = self._summary(snapshot_id, taken_at, snapshot, group_by, limit)
+        with self._lock:
+            self._snapshots[snapshot_id] = (taken_at, snapshot, summary["traced_bytes"])
+            while len(self._snapshots) > self.settings.memory_profiling_max_snapshots:
+                self._snapshots.popitem(last=False)
+        return summary
+
+    def top(self, group_by: str = "lineno", limit: int = 20, collect: bool = False) -> dict:
+        """
+        Largest live allocation sites, from a snapshot that is not stored.
+
+        Raises:
+            TracingNotStartedError: If tracing is not started
+        """
+        snapshot = self._take(collect)
+        return self._summary(None, datetime.now(timezone.utc), snapshot, group_by, limit)
+
+    def _summary(self, snapshot_id, taken_at, snapshot, group_by: str, limit: int) -> dict:
+        stats = snapshot.statistics(group_by)
+        return {
+            "id": snapshot_id,
+            "taken_at": taken_at,
+            "traced_bytes": sum(stat.size for stat in stats),
+            "sites": [_site(stat, group_by) for stat in stats[:limit]],
+        }
+
+    def _stored(self, snapshot_id: int) -> tuple[datetime, tracemalloc.Snapshot]:
+        with self._lock:
+            stored = self._snapshots.get(snapshot_id)
+        if stored is None:
+            raise UnknownSnapshotError(f"Snapshot {snapshot_id} is not stored in this worker")
+        return stored[0], stored[1]
+
+    def compare(
+        self,
+        base: int,
+        target: int | None = None,
+        group_by: str = "lineno",
+        limit: int = 20,
+        collect: bool = False,
+    ) -> dict:
+        """
+        Diff two snapshots, largest growth first.
+
+        Args:
+            base: ID of the earlier snapshot
+            target: ID of the later snapshot, or None for the live heap
+            group_by: ``lineno``, ``filename`` or ``traceback``
+            limit: Sites to return
+            collect: Run a full garbage collection before a live snapshot
+
+        Returns:
+            Both snapshots' times, the total size change and the sites that
+            changed most
+
+        Raises:
+            UnknownSnapshotError: If a snapshot ID is not stored
+            TracingNotStartedError: If target is None and tracing is not started
+        """
+        base_taken_at, base_snapshot = self._stored(base)
+        if target is None:
+            target_taken_at, target_snapshot = datetime.now(timezone.utc), self._take(collect)
+        else:
+            target_taken_at, target_snapshot = self._stored(target)
+        stats = target_snapshot.compare_to(base_snapshot, group_by)
+        return {
+            "base": base,
+            "target": target,
+            "base_taken_at": base_taken_at,
+            "target_taken_at": target_taken_at,
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "sites": [_site(stat, group_by) for stat in stats[:limit]],
+        }
+
+    def report(self) -> None:
+        """Log RSS, garbage collector state and, while tracing, the fastest-growing sites."""
+        rss = rss_bytes()
+        gc_state = gc_status()
+        message = []
+        if rss is not None:
+            growth = f" ({(rss - self._last_rss) / 2**20:+.1f} MB)" if self._last_rss is not None else ""
+            message.append(f"RSS {rss / 2**20:.1f} MB{growth}")
+            self._last_rss = rss
+        message.append(
+            f"GC counts {gc_state['counts']}, collections {gc_state['collections']}, "
+            f"uncollectable {gc_state['uncollectable']}, garbage {gc_state['garbage']}"
+        )
+        if tracemalloc.is_tracing():
+            traced, peak = tracemalloc.get_traced_memory()
+            message.append(f"traced {traced / 2**20:.1f} MB (peak {peak / 2**20:.1f} MB)")
+            snapshot = self._take(collect=False)
+            if self._last_report_snapshot is not None:
+                stats = snapshot.compare_to(self._last_report_snapshot, "lineno")
+                growing = [stat for stat in stats[: self.settings.memory_profiling_report_top] if stat.size_diff > 0]
+                if growing:
+                    message.append(
+                        "grown since last report:\n"
+                        + "\n".join(
+                            f"  {short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}: "
+                            f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks), "
+                            f"{stat.size / 1024:.1f} KiB live"
+                            for stat in growing
+                        )
+                    )
+            self._last_report_snapshot = snapshot
+        logger.info("Memory report: " + "; ".join(message))
+
+    def start_report_task(self, interval: float) -> None:
+        """Log a memory report every ``interval`` seconds (call from the event loop)."""
+        if self._report_task is None:
+            self._report_task = asyncio.create_task(self._run_reports(interval), name="memory-report")
+
+    async def _run_reports(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.report)
+            except Exception as e:
+                logger.warning(f"Memory report failed: {e}")
+
+    async def close(self) -> None:
+        """Stop the periodic report."""
+        if self._report_task is not None:
+            self._report_task.cancel()
+            try:
+                await self._report_task
+            except asyncio.CancelledError:
+                pass
+            self._report_task = None
+
+
+_memory_profiler: MemoryProfiler | None = None
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """Get the process-wide memory profiler, creating it on first use."""
+    global _memory_profiler
+    if _memory_profiler is None:
+        _memory_profiler = MemoryProfiler()
+    return _memory_profiler
+
+
+async def close_memory_profiler() -> None:
+    """Stop the periodic memory report (application shutdown)."""
+    if _memory_profiler is not None:
+        await _memory_profiler.close()
+
+
+gauge_callback(TRACEMALLOC_TRACED_MEMORY, lambda: {(): tracemalloc.get_traced_memory()[0]})
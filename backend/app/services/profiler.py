@@ -0,0 +1,194 @@
+"""
+On-demand CPU profiling of the running worker process.
+
+A sampling profiler: a background thread wakes every ``interval`` seconds,
+reads every other thread's Python stack through ``sys._current_frames()``
+and counts identical stacks. Nothing is installed in the profiled code, so
+the cost is the sampler's own CPU time. That is measured while profiling.
+Whenever it exceeds ``max_overhead`` (a fraction of one core), the
+sampling interval is doubled.
+
+The result is in the collapsed-stack format read by flamegraph tools
+(``flamegraph.pl``, speedscope, inferno). Each line is a semicolon-separated
+stack from the thread name down to the sampled function, then the number
+of samples. Threads blocked in a lock, queue or selector wait are left out
+unless ``include_idle`` is set, so executor threads waiting for work do not
+drown the busy stacks.
+
+Only one profile runs per process at a time.
+"""
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Frames recorded per stack (innermost frames are kept)
+MAX_STACK_DEPTH = 128
+
+# Longest sampling interval reached by throttling
+MAX_INTERVAL = 1.0
+
+# Samples taken before the overhead is checked (the first ones are noisy)
+WARMUP_SAMPLES = 10
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+# Leaf functions of a thread that is waiting rather than running Python code
+IDLE_FUNCTIONS = frozenset(
+    {
+        ("threading.py", "wait"),
+        ("threading.py", "_wait_for_tstate_lock"),
+        ("queue.py", "get"),
+        ("selectors.py", "select"),
+        ("thread.py", "_worker"),
+    }
+)
+
+_running = threading.Lock()
+
+
+def short_path(path: str) -> str:
+    """Source path relative to site-packages, the standard library or the working directory."""
+    if "site-packages" in path:
+        return path.rsplit("site-packages" + os.sep, 1)[-1]
+    if path.startswith(_STDLIB):
+        return path[len(_STDLIB):]
+    if path.startswith(os.getcwd()):
+        return os.path.relpath(path)
+    return path
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+class StackSampler:
+    """
+    Samples the stacks of all other threads at a fixed interval.
+
+    Args:
+        interval: Seconds between samples
+        max_overhead: Sampler CPU time allowed, as a fraction of wall time
+        include_idle: Also count threads blocked in a wait
+    """
+
+    def __init__(self, interval: float, max_overhead: float, include_idle: bool = False):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.include_idle = include_idle
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self.overhead = 0.0
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, frame: FrameType) -> bool:
+        return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FUNCTIONS
+
+    def sample(self) -> None:
+        """Record the current stack of every other thread."""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (not self.include_idle and self._is_idle(frame)):
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> None:
+        """Sample until ``seconds`` have passed or stop() is called (blocking)."""
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        deadline = started + seconds
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            self.sample()
+            self.overhead = (time.thread_time() - cpu_started) / (now - started)
+            if self.samples >= WARMUP_SAMPLES and self.overhead > self.max_overhead and self.interval < MAX_INTERVAL:
+                self.interval = min(self.interval * 2, MAX_INTERVAL)
+                logger.info(f"Profiler overhead {self.overhead:.1%}; sampling every {self.interval * 1000:.0f}ms")
+        self.duration = time.monotonic() - started
+
+    def stop(self) -> None:
+        """Stop a running run()."""
+        self._stop.set()
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed-stack format, most frequent stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+async def profile_cpu(
+    seconds: float,
+    interval: float,
+    max_overhead: float,
+    include_idle: bool = False,
+) -> StackSampler:
+    """
+    Profile this process for a number of seconds.
+
+    The sampler runs in its own thread (not the shared executor, which may
+    be saturated by the load being profiled). Cancelling the call, for
+    example because the client disconnected, stops it.
+
+    Args:
+        seconds: Profiling duration
+        interval: Seconds between samples (doubled while over max_overhead)
+        max_overhead: Sampler CPU time allowed, as a fraction of wall time
+        include_idle: Also count threads blocked in a wait
+
+    Returns:
+        The finished sampler, with its collapsed stacks and statistics
+
+    Raises:
+        ProfilerBusyError: If another profile is running in this process
+    """
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusyError("A CPU profile is already running in this worker")
+
+    sampler = StackSampler(interval, max_overhead, include_idle)
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+
+    def run() -> None:
+        try:
+            sampler.run(seconds)
+        finally:
+            _running.release()
+            try:
+                loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+            except RuntimeError:
+                pass  # Event loop closed while profiling
+
+    logger.info(f"Starting CPU profile for {seconds}s (interval {interval * 1000:.0f}ms)")
+    threading.Thread(target=run, name="cpu-profiler", daemon=True).start()
+    try:
+        await finished
+    except asyncio.CancelledError:
+        sampler.stop()
+        raise
+    logger.info(f"CPU profile finished: {sampler.samples} samples, overhead {sampler.overhead:.2%}")
+    return sampler
@@ -0,0 +1,509 @@
+"""
+Provider concurrency governor.
+
+Caps the number of outstanding calls to each AI provider (HuggingFace,
+Replicate) and to each model on it, across all users of this process:
+
+- Each provider and each model has an adaptive in-flight limit (AIMD). A
+  successful call raises the limit by 1/limit (about +1 per window of calls)
+  up to the configured maximum; a provider rate limit (429) halves it, at
+  most once per window, down to 1.
+- Calls that cannot start immediately wait in a weighted fair queue: each
+  waiter gets a virtual finish tag ``max(virtual_time, user's last tag) +
+  1/weight`` and the smallest tag whose model has a free slot goes next. A
+  user who queues 50 uploads therefore interleaves with everyone else
+  instead of delaying them by 50 calls.
+- Time spent queued is recorded per provider (count, sum, max and a
+  cumulative histogram) and exposed through ``snapshot()``.
+
+Limits are per worker process: with N workers the provider sees at most
+N times the configured maximum.
+"""
+import asyncio
+import bisect
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import PROVIDER_CALLS_IN_FLIGHT, PROVIDER_CALLS_QUEUED, gauge_callback
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the queue wait histogram buckets
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, math.inf)
+
+# Multiplicative decrease applied on a provider rate limit
+DECREASE_FACTOR = 0.5
+
+
+class ProviderBusyError(Exception):
+    """Raised when a provider call cannot get a slot (queue full or wait too long)."""
+
+    def __init__(self, provider: str, reason: str, retry_after: int):
+        """
+        Initialize the error.
+
+        Args:
+            provider: Provider name
+            reason: Why the call was not admitted
+            retry_after: Suggested seconds before retrying
+        """
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(f"{provider} is busy: {reason}")
+
+
+class AdaptiveLimit:
+    """
+    In-flight counter with an AIMD limit.
+
+    Attributes:
+        max_limit: Configured maximum
+        limit: Current (fractional) limit; ``int(limit)`` calls may run
+        in_flight: Calls currently running
+        epoch: Incremented on every decrease, so calls started before a
+            decrease cannot trigger another one
+    """
+
+    __slots__ = ("max_limit", "limit", "in_flight", "epoch", "adaptive")
+
+    def __init__(self, max_limit: int, adaptive: bool = True):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.epoch = 0
+        self.adaptive = adaptive
+
+    @property
+    def available(self) -> bool:
+        """Whether another call may start."""
+        return self.in_flight < int(self.limit)
+
+    def on_success(self) -> None:
+        """Additive increase."""
+        if self.adaptive and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def resize(self, max_limit: int, adaptive: bool) -> None:
+        """Change the configured maximum, keeping a limit lowered by rate limits below it."""
+        lowered = self.adaptive and adaptive and self.limit < self.max_limit
+        self.limit = min(self.limit, float(max_limit)) if lowered else float(max_limit)
+        self.max_limit = max_limit
+        self.adaptive = adaptive
+
+    def on_rate_limited(self, epoch: int) -> bool:
+        """Multiplicative decrease, once per window. Returns True if the limit shrank."""
+        if not self.adaptive or epoch != self.epoch:
+            return False
+        self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+        self.epoch += 1
+        return True
+
+
+class WaitStats:
+    """Queue wait time distribution."""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(WAIT_BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        """Record one wait."""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> dict:
+        """Cumulative histogram in Prometheus style (bucket counts include smaller buckets)."""
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.total, 6),
+            "max_seconds": round(self.max, 6),
+            "buckets": {
+                ("+Inf" if bound == math.inf else str(bound)): count
+                for bound, count in zip(WAIT_BUCKETS, itertools.accumulate(self.buckets))
+            },
+        }
+
+
+class ProviderSlot:
+    """
+    A granted provider call.
+
+    Call ``mark_rate_limited()`` if the provider rejected the call with a
+    rate limit, so the governor backs off.
+
+    Attributes:
+        provider: Provider name
+        model_id: Model ID
+        waited: Seconds spent queued before the slot was granted
+    """
+
+    __slots__ = ("provider", "model_id", "waited", "rate_limited", "_epochs", "_released")
+
+    def __init__(self, provider: str, model_id: str, waited: float, epochs: tuple[int, int]):
+        self.provider = provider
+        self.model_id = model_id
+        self.waited = waited
+        self.rate_limited = False
+        self._epochs = epochs
+        self._released = False
+
+    def mark_rate_limited(self) -> None:
+        """Report that the provider answered this call with a rate limit."""
+        self.rate_limited = True
+
+
+class _Waiter:
+    __slots__ = ("model_id", "future", "enqueued_at")
+
+    def __init__(self, model_id: str, future: asyncio.Future, enqueued_at: float):
+        self.model_id = model_id
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class ProviderPool:
+    """
+    Limits, fair queue and statistics for one provider.
+
+    Args:
+        name: Provider name
+        max_in_flight: Maximum concurrent calls to the provider
+        max_in_flight_per_model: Maximum concurrent calls to one model (0 = same as provider)
+        max_queued: Maximum waiting calls
+        adaptive: Whether limits adapt to rate limits (AIMD)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_in_flight_per_model: int,
+        max_queued: int,
+        adaptive: bool = True,
+    ):
+        self.name = name
+        self.adaptive = adaptive
+        self.max_queued = max_queued
+        self.max_in_flight_per_model = min(max_in_flight_per_model or max_in_flight, max_in_flight)
+        self.limit = AdaptiveLimit(max_in_flight, adaptive)
+        self.models: dict[str, AdaptiveLimit] = {}
+        self.wait_stats = WaitStats()
+        self.rate_limited = 0
+        self.rejected = 0
+
+        # Per-model heaps of (tag, seq, waiter); only models with waiters are present
+        self._queues: dict[str, list] = {}
+        self._queued = 0
+        self._virtual_time = 0.0
+        self._user_tags: dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def _model(self, model_id: str) -> AdaptiveLimit:
+        model = self.models.get(model_id)
+        if model is None:
+            model = self.models[model_id] = AdaptiveLimit(self.max_in_flight_per_model, self.adaptive)
+        return model
+
+    def _grant(self, model_id: str, waited: float) -> ProviderSlot:
+        model = self.models[model_id]
+        self.limit.in_flight += 1
+        model.in_flight += 1
+        self.wait_stats.observe(waited)
+        return ProviderSlot(self.name, model_id, waited, (self.limit.epoch, model.epoch))
+
+    def resize(self, max_in_flight: int, max_in_flight_per_model: int, max_queued: int, adaptive: bool) -> None:
+        """Apply new limits (configuration reload) and start queued calls they allow."""
+        self.adaptive = adaptive
+        self.max_queued = max_queued
+        self.max_in_flight_per_model = min(max_in_flight_per_model or max_in_flight, max_in_flight)
+        self.limit.resize(max_in_flight, adaptive)
+        for model in self.models.values():
+            model.resize(self.max_in_flight_per_model, adaptive)
+        self._dispatch()
+
+    def drain(self) -> None:
+        """Start every queued call regardless of limits (the provider is no longer limited)."""
+        for heap in self._queues.values():
+            for _, _, waiter in heap:
+                if not waiter.future.done():
+                    waiter.future.set_result(self._grant(waiter.model_id, time.monotonic() - waiter.enqueued_at))
+        self._queues.clear()
+        self._queued = 0
+        self._user_tags.clear()
+
+    def _retry_after(self) -> int:
+        stats = self.wait_stats
+        mean = stats.total / stats.count if stats.count else 1.0
+        return max(1, math.ceil(mean))
+
+    async def acquire(self, model_id: str, user_key: str, weight: float, timeout: float) -> ProviderSlot:
+        """Wait for a slot; see ProviderGovernor.acquire()."""
+        model = self._model(model_id)
+        if self.limit.available and model.available and model_id not in self._queues:
+            return self._grant(model_id, 0.0)
+
+        if self._queued >= self.max_queued:
+            self.rejected += 1
+            raise ProviderBusyError(self.name, f"{self._queued} calls already queued", self._retry_after())
+
+        tag = max(self._virtual_time, self._user_tags.get(user_key, 0.0)) + 1.0 / weight
+        self._user_tags[user_key] = tag
+        waiter = _Waiter(model_id, asyncio.get_running_loop().create_future(), time.monotonic())
+        heapq.heappush(self._queues.setdefault(model_id, []), (tag, next(self._seq), waiter))
+        self._queued += 1
+        self._dispatch()
+
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected += 1
+            raise ProviderBusyError(
+                self.name, f"no free slot within {timeout:g}s", self._retry_after()
+            ) from None
+        except asyncio.CancelledError:
+            # Granted just before the caller was cancelled: hand the slot back
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(waiter.future.result(), success=False)
+            else:
+                self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Forget a waiter that gave up (it stays in its heap and is skipped)."""
+        if not waiter.future.done():
+            waiter.future.cancel()
+        self._queued -= 1
+        if not self._queued:
+            self._user_tags.clear()
+
+    def release(self, slot: ProviderSlot, success: bool) -> None:
+        """Return a slot, adapt the limits and start queued calls."""
+        if slot._released:
+            return
+        slot._released = True
+
+        model = self.models[slot.model_id]
+        self.limit.in_flight -= 1
+        model.in_flight -= 1
+
+        if slot.rate_limited:
+            self.rate_limited += 1
+            provider_epoch, model_epoch = slot._epochs
+            if self.limit.on_rate_limited(provider_epoch):
+                logger.warning(f"{self.name} rate limited: concurrency limit lowered to {int(self.limit.limit)}")
+            model.on_rate_limited(model_epoch)
+        elif success:
+            self.limit.on_success()
+            model.on_success()
+
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Start queued calls in fair-queue order while slots are free."""
+        while self._queued and self.limit.available:
+            best_heap = None
+            for model_id, heap in list(self._queues.items()):
+                while heap and heap[0][2].future.done():
+                    heapq.heappop(heap)
+                if not heap:
+                    del self._queues[model_id]
+                    continue
+                if self.models[model_id].available and (best_heap is None or heap[0] < best_heap[0]):
+                    best_heap = heap
+            if best_heap is None:
+                return
+
+            tag, _, waiter = heapq.heappop(best_heap)
+            if not best_heap:
+                del self._queues[waiter.model_id]
+            self._virtual_time = tag
+            self._queued -= 1
+            if not self._queued:
+                self._user_tags.clear()
+            waiter.future.set_result(self._grant(waiter.model_id, time.monotonic() - waiter.enqueued_at))
+
+    def snapshot(self) -> dict:
+        """Current limits, load and queue wait statistics."""
+        queued_by_model: dict[str, int] = {}
+        for model_id, heap in self._queues.items():
+            queued_by_model[model_id] = sum(1 for _, _, waiter in heap if not waiter.future.done())
+        return {
+            "limit": int(self.limit.limit),
+            "max_limit": self.limit.max_limit,
+            "in_flight": self.limit.in_flight,
+            "queued": self._queued,
+            "rate_limited": self.rate_limited,
+            "rejected": self.rejected,
+            "queue_wait": self.wait_stats.snapshot(),
+            "models": {
+                model_id: {
+                    "limit": int(model.limit),
+                    "max_limit": model.max_limit,
+                    "in_flight": model.in_flight,
+                    "queued": queued_by_model.get(model_id, 0),
+                }
+                for model_id, model in sorted(self.models.items())
+            },
+        }
+
+
+class ProviderGovernor:
+    """
+    Process-wide governor for provider calls.
+
+    Usage::
+
+        async with governor.slot("replicate", model_id, f"user:{user_id}") as slot:
+            try:
+                result = await call_provider()
+            except ProviderRateLimitError:
+                slot.mark_rate_limited()
+                raise
+
+    Args:
+        settings: Application settings (defaults to global settings)
+    """
+
+    def __init__(self, settings: Settings | None = None):
+        self.pools: dict[str, ProviderPool] = {}
+        self.configure(settings or get_settings())
+
+    def configure(self, settings: Settings) -> None:
+        """
+        Apply limits from settings (configuration reload).
+
+        Pools are resized in place, so calls in flight keep their slots and
+        queued calls keep their place; a provider whose limit becomes 0
+        (unlimited) starts all of its queued calls.
+
+        Args:
+            settings: Application settings
+        """
+        self.queue_timeout = settings.provider_queue_timeout_seconds
+        configured = {
+            "huggingface": (settings.hf_max_concurrent_requests, settings.hf_max_concurrent_requests_per_model),
+            "replicate": (
+                settings.replicate_max_concurrent_requests,
+                settings.replicate_max_concurrent_requests_per_model,
+            ),
+        }
+        for name, (max_in_flight, per_model) in configured.items():
+            pool = self.pools.get(name)
+            if max_in_flight <= 0:
+                if pool is not None:
+                    del self.pools[name]
+                    pool.drain()
+            elif pool is None:
+                self.pools[name] = ProviderPool(
+                    name,
+                    max_in_flight,
+                    per_model,
+                    max_queued=settings.provider_queue_size,
+                    adaptive=settings.provider_adaptive_concurrency,
+                )
+            else:
+                pool.resize(
+                    max_in_flight,
+                    per_model,
+                    max_queued=settings.provider_queue_size,
+                    adaptive=settings.provider_adaptive_concurrency,
+                )
+
+    async def acquire(
+        self, provider: str, model_id: str, user_key: str, weight: float = 1.0
+    ) -> ProviderSlot | None:
+        """
+        Wait for a slot to call a model.
+
+        Args:
+            provider: Provider name
+            model_id: Model ID
+            user_key: Fair-queuing identity (e.g. "user:7")
+            weight: Relative share of queued capacity for this user
+
+        Returns:
+            Slot to pass to release(), or None if the provider is not limited
+
+        Raises:
+            ProviderBusyError: If the queue is full or no slot frees up in time
+        """
+        pool = self.pools.get(provider)
+        if pool is None:
+            return None
+        return await pool.acquire(model_id, user_key, weight, self.queue_timeout)
+
+    def release(self, slot: ProviderSlot | None, success: bool) -> None:
+        """
+        Return a slot taken by acquire().
+
+        Args:
+            slot: Slot (None is ignored)
+            success: Whether the call succeeded (grows the limit unless it was rate limited)
+        """
+        if slot is None or slot._released:
+            return
+        pool = self.pools.get(slot.provider)
+        if pool is None:
+            # The provider's limit was removed by a configuration reload
+            slot._released = True
+            return
+        pool.release(slot, success)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model_id: str, user_key: str, weight: float = 1.0):
+        """Hold a slot for the duration of the block; success means no exception."""
+        slot = await self.acquire(provider, model_id, user_key, weight)
+        if slot is None:
+            slot = ProviderSlot(provider, model_id, 0.0, (0, 0))
+            slot._released = True
+        try:
+            yield slot
+        except BaseException:
+            self.release(slot, success=False)
+            raise
+        self.release(slot, success=True)
+
+    def snapshot(self) -> dict:
+        """Per-provider limits, load and queue wait statistics."""
+        return {name: pool.snapshot() for name, pool in self.pools.items()}
+
+
+_governor: ProviderGovernor | None = None
+
+
+def _collect_in_flight() -> dict[tuple, float]:
+    """Running calls per provider for the metrics endpoint."""
+    pools = _governor.pools if _governor is not None else {}
+    return {(name,): pool.limit.in_flight for name, pool in pools.items()}
+
+
+def _collect_queued() -> dict[tuple, float]:
+    """Waiting calls per provider for the metrics endpoint."""
+    pools = _governor.pools if _governor is not None else {}
+    return {(name,): pool._queued for name, pool in pools.items()}
+
+
+gauge_callback(PROVIDER_CALLS_IN_FLIGHT, _collect_in_flight)
+gauge_callback(PROVIDER_CALLS_QUEUED, _collect_queued)
+
+
+def get_provider_governor() -> ProviderGovernor:
+    """Get the process-wide governor, creating it on first use."""
+    global _governor
+    if _governor is None:
+        _governor = ProviderGovernor()
+    return _governor
@@ -4,17 +4,17 @@ Replicate API service.
 This module provides integration with Replicate's API
 for image processing tasks such as restoration, upscaling, and enhancement.
 """
+import asyncio
 import base64
 import io
 import logging
 from typing import Any
 
-import replicate
 from PIL import Image
 
 from app.core.config import Settings, get_settings
-from app.core.replicate_schema import ReplicateModelSchema
-from app.services.schema_validator import SchemaValidator
+from app.core.tracing import span
+from app.services.schema_validator import get_compiled_schema
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -44,6 +44,12 @@ class ReplicateTimeoutError(ReplicateInferenceError):
     pass
 
 
+class ReplicateInputError(ReplicateInferenceError):
+    """Raised when the image or parameters fail the model's schema validation."""
+
+    pass
+
+
 class ReplicateInferenceService:
     """
     Service for interacting with Replicate API.
@@ -61,12 +67,56 @@ class ReplicateInferenceService:
         """
         self.settings = settings or get_settings()
         self.api_token = self.settings.replicate_api_token
+        self.timeout = self.settings.replicate_api_timeout
 
         if not self.api_token:
             raise ValueError("Replicate API token is required")
 
-        # Set Replicate API token
-        replicate.Client(api_token=self.api_token)
+        # The SDK is imported on first use, keeping it off the application startup path
+        import replicate
+
+        self.client = replicate.Client(api_token=self.api_token)
+
+    async def _run_prediction(self, model_path: str, replicate_input: dict[str, Any]) -> Any:
+        """
+        Run a prediction and return its output without blocking the event loop.
+
+        If the wait is cancelled (for example the losing side of a hedged
+        request) or times out, the prediction is cancelled on Replicate as
+        well so it stops running and billing.
+
+        Args:
+            model_path: "owner/name" or "owner/name:version"
+            replicate_input: Prediction input
+
+        Returns:
+            Prediction output
+        """
+        owner_name, _, version = model_path.partition(":")
+        if version:
+            prediction = await self.client.predictions.async_create(version=version, input=replicate_input)
+        else:
+            prediction = await self.client.models.predictions.async_create(model=owner_name, input=replicate_input)
+
+        try:
+            await asyncio.wait_for(prediction.async_wait(), self.timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            try:
+                await asyncio.shield(prediction.async_cancel())
+                logger.info(f"Cancelled Replicate prediction {prediction.id}")
+            except Exception as cancel_error:
+                logger.warning(f"Failed to cancel Replicate prediction {prediction.id}: {cancel_error}")
+            if isinstance(e, asyncio.TimeoutError):
+                raise ReplicateTimeoutError(f"Request to Replicate API timed out after {self.timeout}s")
+            raise
+
+        if prediction.status == "failed":
+            from replicate.exceptions import ModelError
+
+            raise ModelError(prediction)
+        if prediction.status == "canceled":
+            raise ReplicateInferenceError(f"Replicate prediction {prediction.id} was canceled")
+        return prediction.output
 
     async def process_image(
         self,
@@ -89,8 +139,8 @@ class ReplicateInferenceService:
             ReplicateModelError: If model not found or invalid
             ReplicateRateLimitError: If rate limit exceeded
             ReplicateTimeoutError: If request times out
+            ReplicateInputError: If parameters or image validation fails
             ReplicateInferenceError: For other API errors
-            ValueError: If parameters or image validation fails
         """
         # Get model configuration
         model_config = self.settings.get_model_by_id(model_id)
@@ -100,70 +150,63 @@ class ReplicateInferenceService:
         model_path = model_config["model"]
         model_category = model_config.get("category", "restore")
 
-        logger.info(f"Processing image with Replicate model: {model_path}, category: {model_category}")
+        logger.info("Processing image with Replicate model: %s, category: %s", model_path, model_category)
+
+        from replicate.exceptions import ReplicateError
 
         try:
             # Validate input image
-            input_image = Image.open(io.BytesIO(image_bytes))
-            logger.info(f"Input image: {input_image.format}, {input_image.size}, {input_image.mode}")
-
-            # Check if model has replicate_schema
-            schema_config = model_config.get("replicate_schema")
-            if schema_config:
-                # Use schema-based validation
-                logger.info("Using schema-based parameter validation")
-                schema = ReplicateModelSchema(**schema_config)
-                validator = SchemaValidator(schema)
-
-                # Validate image constraints
-                validator.validate_image_constraints(
-                    image_bytes,
-                    input_image.format or "png"
-                )
-
-                # Merge user parameters with model defaults
-                user_params = parameters or {}
-                model_defaults = model_config.get("parameters", {})
-                merged_params = {**model_defaults, **user_params}
-
-                # Validate and normalize parameters
-                validated_params = validator.validate_parameters(merged_params)
+            with span("replicate.decode_input"):
+                input_image = Image.open(io.BytesIO(image_bytes))
+            logger.debug("Input image: %s, %s, %s", input_image.format, input_image.size, input_image.mode)
+
+            # Check if model has replicate_schema (compiled once per model)
+            compiled = get_compiled_schema(model_config)
+            if compiled:
+                with span("replicate.validate"):
+                    try:
+                        # Validate image constraints
+                        compiled.validate_image_constraints(
+                            image_bytes,
+                            input_image.format or "png"
+                        )
+
+                        # Validate user parameters and merge them over the model defaults
+                        validated_params, warnings = compiled.validate_parameters(parameters)
+                    except ValueError as e:
+                        raise ReplicateInputError(str(e)) from e
 
                 # Get image parameter name from schema
-                input_param_name = schema.input.image.param_name
+                input_param_name = compiled.input_param_name
 
                 # Log warnings if any
-                if validator.has_warnings():
+                if warnings:
                     logger.warning(
                         f"Parameter validation warnings: "
-                        f"{[str(w) for w in validator.get_warnings()]}"
+                        f"{[str(w) for w in warnings]}"
                     )
             else:
                 # Fallback to legacy behavior (for backward compatibility)
-                logger.info("No schema found, using legacy parameter handling")
+                logger.debug("No schema found, using legacy parameter handling")
                 input_param_name = model_config.get("input_param_name", "image")
                 validated_params = parameters or model_config.get("parameters", {})
 
             # Convert image bytes to data URI for Replicate
-            image_data_uri = f"data:image/{input_image.format.lower()};base64,{base64.b64encode(image_bytes).decode()}"
+            with span("replicate.encode_input", bytes=len(image_bytes)):
+                image_data_uri = f"data:image/{input_image.format.lower()};base64,{base64.b64encode(image_bytes).decode()}"
 
             # Build Replicate API input
             replicate_input = {input_param_name: image_data_uri}
             replicate_input.update(validated_params)
 
-            logger.info(
-                f"Calling Replicate model {model_path} with parameters: "
-                f"{list(replicate_input.keys())}"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Calling Replicate model %s with parameters: %s", model_path, list(replicate_input))
 
             # Run the model
-            # Note: replicate.run is synchronous, we're wrapping it for async compatibility
-            output = replicate.run(
-                model_path,
-                input=replicate_input
-            )
+            with span("replicate.prediction", model=model_path):
+                output = await self._run_prediction(model_path, replicate_input)
 
-            logger.info(f"Replicate model returned output type: {type(output)}")
+            logger.debug("Replicate model returned output type: %s", type(output).__name__)
 
             # Process output based on type
             # Replicate models can return different output types
@@ -171,18 +214,19 @@ class ReplicateInferenceService:
                 # If output is a URL, download the image
                 if output.startswith("http://") or output.startswith("https://"):
                     import httpx
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(output)
-                        response.raise_for_status()
-                        output_bytes = response.content
-                        logger.info(f"Downloaded output image from URL: {len(output_bytes)} bytes")
+                    with span("replicate.download"):
+                        async with httpx.AsyncClient() as client:
+                            response = await client.get(output)
+                            response.raise_for_status()
+                            output_bytes = response.content
+                        logger.debug("Downloaded output image from URL: %d bytes", len(output_bytes))
                         return output_bytes
                 # If output is a data URI, decode it
                 elif output.startswith("data:"):
                     # Extract base64 data from data URI
                     base64_data = output.split(",", 1)[1]
                     output_bytes = base64.b64decode(base64_data)
-                    logger.info(f"Decoded output image from data URI: {len(output_bytes)} bytes")
+                    logger.debug("Decoded output image from data URI: %d bytes", len(output_bytes))
                     return output_bytes
                 else:
                     raise ReplicateInferenceError(f"Unexpected string output format: {output[:100]}")
@@ -195,16 +239,17 @@ class ReplicateInferenceService:
                         # Recursively process the URL/data URI
                         if first_output.startswith("http://") or first_output.startswith("https://"):
                             import httpx
-                            async with httpx.AsyncClient() as client:
-                                response = await client.get(first_output)
-                                response.raise_for_status()
-                                output_bytes = response.content
-                                logger.info(f"Downloaded output image from URL (list): {len(output_bytes)} bytes")
+                            with span("replicate.download"):
+                                async with httpx.AsyncClient() as client:
+                                    response = await client.get(first_output)
+                                    response.raise_for_status()
+                                    output_bytes = response.content
+                                logger.debug("Downloaded output image from URL (list): %d bytes", len(output_bytes))
                                 return output_bytes
                         elif first_output.startswith("data:"):
                             base64_data = first_output.split(",", 1)[1]
                             output_bytes = base64.b64decode(base64_data)
-                            logger.info(f"Decoded output image from data URI (list): {len(output_bytes)} bytes")
+                            logger.debug("Decoded output image from data URI (list): %d bytes", len(output_bytes))
                             return output_bytes
                     else:
                         raise ReplicateInferenceError(f"Unexpected list item type: {type(first_output)}")
@@ -213,20 +258,20 @@ class ReplicateInferenceService:
 
             elif isinstance(output, bytes):
                 # If output is already bytes, return as-is
-                logger.info(f"Model returned bytes directly: {len(output)} bytes")
+                logger.debug("Model returned bytes directly: %d bytes", len(output))
                 return output
 
             elif hasattr(output, 'aread'):
                 # If output is a FileOutput object (from replicate.helpers)
                 # It has an aread() method to get bytes asynchronously
                 output_bytes = await output.aread()
-                logger.info(f"Read output from FileOutput object: {len(output_bytes)} bytes")
+                logger.debug("Read output from FileOutput object: %d bytes", len(output_bytes))
                 return output_bytes
 
             else:
                 raise ReplicateInferenceError(f"Unexpected output type: {type(output)}")
 
-        except replicate.exceptions.ReplicateError as e:
+        except ReplicateError as e:
             error_msg = str(e).lower()
             logger.error(f"Replicate API error: {e}", exc_info=True)
 
@@ -242,6 +287,9 @@ class ReplicateInferenceService:
             else:
                 raise ReplicateInferenceError(f"Replicate API error: {str(e)}")
 
+        except ReplicateInferenceError:
+            raise
+
         except Exception as e:
             logger.error(f"Unexpected error processing image with Replicate: {e}", exc_info=True)
             raise ReplicateInferenceError(f"Unexpected error: {str(e)}")
@@ -0,0 +1,209 @@
+"""
+Minimal asyncio client for servers speaking the Redis protocol (RESP2).
+
+Used by the components that share state between worker processes (upload
+concurrency leases, rate-limit buckets) so no Redis client library is
+required. Only what those components need is supported: pipelined commands
+whose replies are integers, simple/bulk strings, arrays or errors.
+
+Many coroutines can use one connection at once. Commands are written in
+call order and a single reader task hands replies back in the same order, so
+concurrent callers are pipelined instead of waiting for each other's round
+trips.
+"""
+import asyncio
+import logging
+from collections import deque
+from urllib.parse import unquote, urlparse
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class RespError(Exception):
+    """Raised when the server cannot be reached or returns an error."""
+
+    pass
+
+
+class RespServerError(RespError):
+    """Error reply from the server (for example NOSCRIPT)."""
+
+    pass
+
+
+class RespConnection:
+    """
+    Lazily opened, pipelining connection to a Redis-protocol server.
+
+    Attributes:
+        host: Server host
+        port: Server port
+        db: Logical database selected after connecting
+        timeout: Seconds to wait for connecting and for each reply
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        """
+        Initialize the connection (opened on first use).
+
+        Args:
+            url: redis://[:password@]host[:port][/db]
+            timeout: Seconds to wait for connect and each reply
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode()
+        if prefix == b"-":
+            return RespServerError(payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected reply: {line!r}")
+
+    async def _read_loop(self) -> None:
+        """Resolve pending futures with replies, in order."""
+        try:
+            while True:
+                reply = await self._read_reply()
+                future = self._pending.popleft()
+                if not future.done():
+                    if isinstance(reply, RespServerError):
+                        future.set_exception(reply)
+                    else:
+                        future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_pending(RespError(f"Connection to {self.host}:{self.port} lost: {e}"))
+            self._drop_connection()
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    def _drop_connection(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        self._reader_task = None
+
+    async def _ensure_connected(self) -> None:
+        if self._writer is not None:
+            return
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise RespError(f"Cannot connect to {self.host}:{self.port}: {e}") from e
+
+            self._reader, self._writer = reader, writer
+            self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                await self._send(setup)
+
+    async def _send(self, commands: list[tuple]) -> list:
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+        # Register before writing and write synchronously: replies match
+        # futures in order, and concurrent callers never interleave
+        self._pending.extend(futures)
+        self._writer.write(b"".join(self._encode(command) for command in commands))
+        try:
+            await self._writer.drain()
+            return await asyncio.wait_for(asyncio.gather(*futures), self.timeout)
+        except RespServerError:
+            raise
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            # The stream can no longer be trusted to be in sync
+            if self._reader_task is not None:
+                self._reader_task.cancel()
+            self._fail_pending(RespError(f"Request to {self.host}:{self.port} failed: {e}"))
+            self._drop_connection()
+            raise RespError(f"Request to {self.host}:{self.port} failed: {e}") from e
+
+    async def pipeline(self, commands: list[tuple]) -> list:
+        """
+        Send several commands in one write and return their replies in order.
+
+        Args:
+            commands: Commands as tuples of arguments, e.g. ("ZCARD", "key")
+
+        Returns:
+            One reply per command
+
+        Raises:
+            RespServerError: If the server answers a command with an error
+            RespError: If the server is unreachable or the connection breaks
+        """
+        await self._ensure_connected()
+        return await self._send(commands)
+
+    async def execute(self, *command):
+        """Send one command and return its reply."""
+        (reply,) = await self.pipeline([command])
+        return reply
+
+    async def close(self) -> None:
+        """Close the connection."""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._fail_pending(RespError("Connection closed"))
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+        self._reader = self._writer = None
+        self._reader_task = None
@@ -7,6 +7,7 @@ and image constraint checking for Replicate models.
 import logging
 from typing import Any
 
+from app.core.metrics import CACHE_REQUESTS
 from app.core.replicate_schema import ParameterSchema, ReplicateModelSchema
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,188 @@ class ValidationWarning:
         return f"{self.field}: {self.message}"
 
 
+def _check_number(param: ParameterSchema, accepted: type | tuple[type, ...], type_name: str):
+    """Build the check for an integer or float parameter."""
+    name, default, low, high = param.name, param.default, param.min, param.max
+
+    def check(value: Any) -> tuple[Any, ValidationWarning | None]:
+        if not isinstance(value, accepted) or isinstance(value, bool):
+            return default, ValidationWarning(name, f"Expected {type_name}, got {type(value).__name__}", default)
+        if low is not None and value < low:
+            return low, ValidationWarning(name, f"Value {value} below minimum {low}", low)
+        if high is not None and value > high:
+            return high, ValidationWarning(name, f"Value {value} above maximum {high}", high)
+        return value, None
+
+    return check
+
+
+def _check_type(param: ParameterSchema, accepted: type, type_name: str):
+    """Build the check for a boolean or string parameter."""
+    name, default = param.name, param.default
+
+    def check(value: Any) -> tuple[Any, ValidationWarning | None]:
+        if not isinstance(value, accepted):
+            return default, ValidationWarning(name, f"Expected {type_name}, got {type(value).__name__}", default)
+        return value, None
+
+    return check
+
+
+def _check_enum(param: ParameterSchema):
+    """Build the check for an enum parameter."""
+    name, default, values = param.name, param.default, param.values
+    allowed = frozenset(values)
+
+    def check(value: Any) -> tuple[Any, ValidationWarning | None]:
+        try:
+            valid = value in allowed
+        except TypeError:  # unhashable value
+            valid = False
+        if not valid:
+            return default, ValidationWarning(
+                name, f"Value '{value}' not in allowed values {values}", default
+            )
+        return value, None
+
+    return check
+
+
+def compile_parameter_check(param: ParameterSchema):
+    """
+    Build a function validating one parameter's value.
+
+    The function takes the user-provided value and returns the value to use
+    (the value itself, a clamped bound or the default) and a warning if the
+    value was replaced.
+
+    Args:
+        param: Parameter schema
+
+    Returns:
+        Check function for the parameter
+    """
+    if param.type == "integer":
+        return _check_number(param, int, "integer")
+    if param.type == "float":
+        return _check_number(param, (int, float), "float")
+    if param.type == "boolean":
+        return _check_type(param, bool, "boolean")
+    if param.type == "string":
+        return _check_type(param, str, "string")
+    return _check_enum(param)
+
+
+class CompiledSchema:
+    """
+    A Replicate model schema compiled for the request path.
+
+    Each parameter gets a prebuilt check function, and the defaults (schema
+    defaults overlaid with the model's configured parameters, already
+    validated) are merged once. Validating a request is then one pass over
+    the user's parameters. Instances are immutable and safe to share between
+    concurrent requests.
+
+    Args:
+        schema: Replicate model schema
+        model_defaults: The model's configured ``parameters``
+    """
+
+    __slots__ = (
+        "schema",
+        "input_param_name",
+        "defaults",
+        "default_warnings",
+        "_checks",
+        "_required",
+        "_configured",
+        "_max_bytes",
+        "_max_file_size_mb",
+        "_supported_formats",
+    )
+
+    def __init__(self, schema: ReplicateModelSchema, model_defaults: dict[str, Any] | None = None):
+        self.schema = schema
+        self.input_param_name = schema.input.image.param_name
+        self._checks = {param.name: compile_parameter_check(param) for param in schema.input.parameters}
+        self._required = tuple(param.name for param in schema.input.parameters if param.required)
+        self._max_file_size_mb = schema.custom.max_file_size_mb
+        self._max_bytes = schema.custom.max_file_size_mb * 1024 * 1024
+        self._supported_formats = frozenset(schema.custom.supported_formats)
+
+        defaults = {
+            param.name: param.default for param in schema.input.parameters if param.default is not None
+        }
+        self._configured = frozenset(model_defaults or ())
+        self.defaults, self.default_warnings = self._apply(defaults, model_defaults or {})
+
+    def _apply(
+        self, base: dict[str, Any], parameters: dict[str, Any]
+    ) -> tuple[dict[str, Any], list[ValidationWarning]]:
+        """Validate parameters on top of already-valid base values."""
+        validated = dict(base)
+        warnings = []
+        checks = self._checks
+        for name, value in parameters.items():
+            check = checks.get(name)
+            if check is None:
+                warnings.append(ValidationWarning(name, "Unknown parameter (not in schema), ignoring"))
+                continue
+            value, warning = check(value)
+            if warning is not None:
+                warnings.append(warning)
+            validated[name] = value
+        return validated, warnings
+
+    def validate_parameters(
+        self, parameters: dict[str, Any] | None
+    ) -> tuple[dict[str, Any], list[ValidationWarning]]:
+        """
+        Validate user parameters and merge them over the model's defaults.
+
+        Args:
+            parameters: User-provided parameters
+
+        Returns:
+            (validated parameters, warnings for replaced or ignored values)
+
+        Raises:
+            ValueError: If required parameters are missing
+        """
+        parameters = parameters or {}
+        for name in self._required:
+            if name not in parameters and name not in self._configured:
+                raise ValueError(f"Required parameter '{name}' is missing")
+        if not parameters:
+            return dict(self.defaults), []
+        return self._apply(self.defaults, parameters)
+
+    def validate_image_constraints(self, image_bytes: bytes, image_format: str) -> None:
+        """
+        Validate image against custom constraints.
+
+        Args:
+            image_bytes: Image file bytes
+            image_format: Image format (e.g., 'jpg', 'png')
+
+        Raises:
+            ValueError: If image violates constraints
+        """
+        if len(image_bytes) > self._max_bytes:
+            raise ValueError(
+                f"Image size {len(image_bytes) / (1024 * 1024):.2f}MB exceeds maximum "
+                f"{self._max_file_size_mb}MB"
+            )
+
+        # Normalize format (remove dot, lowercase)
+        normalized_format = image_format.lower().lstrip(".")
+        if normalized_format not in self._supported_formats:
+            raise ValueError(
+                f"Image format '{image_format}' not supported. "
+                f"Supported formats: {', '.join(self.schema.custom.supported_formats)}"
+            )
+
+
 class SchemaValidator:
     """Validator for Replicate model parameters and constraints."""
 
@@ -37,6 +220,7 @@ class SchemaValidator:
             schema: Replicate model schema
         """
         self.schema = schema
+        self.compiled = CompiledSchema(schema)
         self.warnings: list[ValidationWarning] = []
 
     def validate_parameters(
@@ -59,46 +243,7 @@ class SchemaValidator:
             ValueError: If required parameters are missing
         """
         self.warnings = []
-        validated = {}
-
-        # Check required parameters
-        for param_schema in self.schema.get_required_parameters():
-            if param_schema.name not in parameters:
-                raise ValueError(
-                    f"Required parameter '{param_schema.name}' is missing"
-                )
-
-        # Validate each parameter in schema
-        for param_schema in self.schema.input.parameters:
-            param_name = param_schema.name
-
-            if param_name in parameters:
-                # Validate provided value
-                value = parameters[param_name]
-                validated_value = self._validate_parameter_value(
-                    param_schema, value
-                )
-                validated[param_name] = validated_value
-            elif param_schema.default is not None:
-                # Apply default for optional parameter
-                validated[param_name] = param_schema.default
-                logger.debug(
-                    f"Parameter '{param_name}' not provided, using default: "
-                    f"{param_schema.default}"
-                )
-
-        # Warn about unknown parameters (not in schema)
-        for param_name in parameters:
-            if not self.schema.get_parameter(param_name):
-                self.warnings.append(
-                    ValidationWarning(
-                        param_name,
-                        f"Unknown parameter (not in schema), ignoring"
-                    )
-                )
-                logger.warning(
-                    f"Parameter '{param_name}' not in schema, ignoring"
-                )
+        validated, self.warnings = self.compiled.validate_parameters(parameters)
 
         # Log warnings
         if self.warnings:
@@ -109,125 +254,6 @@ class SchemaValidator:
 
         return validated
 
-    def _validate_parameter_value(
-        self,
-        param_schema: ParameterSchema,
-        value: Any
-    ) -> Any:
-        """
-        Validate a single parameter value.
-
-        Logs warnings and applies defaults for invalid values.
-
-        Args:
-            param_schema: Parameter schema
-            value: User-provided value
-
-        Returns:
-            Validated value (or default if invalid)
-        """
-        param_name = param_schema.name
-
-        # Type validation
-        if param_schema.type == "integer":
-            if not isinstance(value, int) or isinstance(value, bool):
-                warning = ValidationWarning(
-                    param_name,
-                    f"Expected integer, got {type(value).__name__}",
-                    param_schema.default
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.default
-
-            # Min/max constraints
-            if param_schema.min is not None and value < param_schema.min:
-                warning = ValidationWarning(
-                    param_name,
-                    f"Value {value} below minimum {param_schema.min}",
-                    param_schema.min
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.min
-
-            if param_schema.max is not None and value > param_schema.max:
-                warning = ValidationWarning(
-                    param_name,
-                    f"Value {value} above maximum {param_schema.max}",
-                    param_schema.max
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.max
-
-        elif param_schema.type == "float":
-            if not isinstance(value, (int, float)) or isinstance(value, bool):
-                warning = ValidationWarning(
-                    param_name,
-                    f"Expected float, got {type(value).__name__}",
-                    param_schema.default
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.default
-
-            # Min/max constraints
-            if param_schema.min is not None and value < param_schema.min:
-                warning = ValidationWarning(
-                    param_name,
-                    f"Value {value} below minimum {param_schema.min}",
-                    param_schema.min
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.min
-
-            if param_schema.max is not None and value > param_schema.max:
-                warning = ValidationWarning(
-                    param_name,
-                    f"Value {value} above maximum {param_schema.max}",
-                    param_schema.max
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.max
-
-        elif param_schema.type == "boolean":
-            if not isinstance(value, bool):
-                warning = ValidationWarning(
-                    param_name,
-                    f"Expected boolean, got {type(value).__name__}",
-                    param_schema.default
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.default
-
-        elif param_schema.type == "string":
-            if not isinstance(value, str):
-                warning = ValidationWarning(
-                    param_name,
-                    f"Expected string, got {type(value).__name__}",
-                    param_schema.default
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.default
-
-        elif param_schema.type == "enum":
-            if value not in param_schema.values:
-                warning = ValidationWarning(
-                    param_name,
-                    f"Value '{value}' not in allowed values {param_schema.values}",
-                    param_schema.default
-                )
-                self.warnings.append(warning)
-                logger.warning(str(warning))
-                return param_schema.default
-
-        return value
-
     def validate_image_constraints(
         self,
         image_bytes: bytes,
@@ -243,29 +269,7 @@ class SchemaValidator:
         Raises:
             ValueError: If image violates constraints
         """
-        custom = self.schema.custom
-
-        # Check file size
-        size_mb = len(image_bytes) / (1024 * 1024)
-        if size_mb > custom.max_file_size_mb:
-            raise ValueError(
-                f"Image size {size_mb:.2f}MB exceeds maximum "
-                f"{custom.max_file_size_mb}MB"
-            )
-
-        # Check format
-        # Normalize format (remove dot, lowercase)
-        normalized_format = image_format.lower().lstrip(".")
-
-        if normalized_format not in custom.supported_formats:
-            raise ValueError(
-                f"Image format '{image_format}' not supported. "
-                f"Supported formats: {', '.join(custom.supported_formats)}"
-            )
-
-        logger.debug(
-            f"Image constraints validated: {size_mb:.2f}MB, format={normalized_format}"
-        )
+        self.compiled.validate_image_constraints(image_bytes, image_format)
 
     def get_warnings(self) -> list[ValidationWarning]:
         """Get list of validation warnings."""
@@ -274,3 +278,35 @@ class SchemaValidator:
     def has_warnings(self) -> bool:
         """Check if validation produced warnings."""
         return len(self.warnings) > 0
+
+
+_compiled: dict[str, tuple[dict, CompiledSchema]] = {}
+
+
+def get_compiled_schema(model_config: dict[str, Any]) -> CompiledSchema | None:
+    """
+    Get a model's compiled schema, compiling it on first use.
+
+    Entries are keyed by model ID and rebuilt when the model's configuration
+    object changes (a configuration reload).
+
+    Args:
+        model_config: Model configuration
+
+    Returns:
+        Compiled schema, or None if the model has no ``replicate_schema``
+    """
+    entry = _compiled.get(model_config["id"])
+    if entry is not None and entry[0] is model_config:
+        CACHE_REQUESTS.labels("compiled_schema", "hit").inc()
+        return entry[1]
+
+    schema_config = model_config.get("replicate_schema")
+    if not schema_config:
+        return None
+    CACHE_REQUESTS.labels("compiled_schema", "miss").inc()
+    compiled = CompiledSchema(ReplicateModelSchema(**schema_config), model_config.get("parameters"))
+    for warning in compiled.default_warnings:
+        logger.warning(f"Model {model_config['id']} configured parameters: {warning}")
+    _compiled[model_config["id"]] = (model_config, compiled)
+    return compiled
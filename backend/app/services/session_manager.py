@@ -15,12 +15,53 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.config import Settings, get_settings
+from app.core.tracing import traced
 from app.db.models import ProcessedImage, Session
+from app.db.write_queue import run_write
+from app.services.usage_ledger import apply_usage_delta, release_images
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+async def _delete_sessions(write_db: AsyncSession, ids: list[int]) -> tuple[int, list]:
+    """
+    Delete sessions and their images, releasing the images from the usage ledger.
+
+    A mutation unit body: runs on the writer's session and does not commit.
+    Only images this transaction actually deleted are released, so racing
+    deletes cannot release an image twice.
+
+    Args:
+        write_db: Database session of the write
+        ids: Primary keys of the sessions to delete
+
+    Returns:
+        (sessions deleted, deleted image rows with user_id, storage_bytes and file paths)
+    """
+    if not ids:
+        return 0, []
+
+    result = await write_db.execute(
+        delete(ProcessedImage)
+        .where(ProcessedImage.session_id.in_(ids))
+        .returning(
+            ProcessedImage.user_id,
+            ProcessedImage.storage_bytes,
+            ProcessedImage.original_path,
+            ProcessedImage.processed_path,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    images = list(result.all())
+    await release_images(write_db, images)
+
+    result = await write_db.execute(
+        delete(Session).where(Session.id.in_(ids)).execution_options(synchronize_session=False)
+    )
+    return result.rowcount, images
+
+
 class SessionManagerError(Exception):
     """Base exception for session manager errors."""
 
@@ -65,6 +106,7 @@ class SessionManager:
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.processed_path.mkdir(parents=True, exist_ok=True)
 
+    @traced("session.create")
     async def create_session(self, db: AsyncSession, user_id: int) -> Session:
         """
         Create a new user session.
@@ -83,26 +125,26 @@ class SessionManager:
             # Generate unique session ID
             session_id = str(uuid.uuid4())
 
-            # Create session object
-            session = Session(
-                session_id=session_id,
-                user_id=user_id,
-                created_at=datetime.utcnow(),
-                last_accessed=datetime.utcnow(),
-            )
-
-            # Add to database
-            db.add(session)
-            await db.commit()
-            await db.refresh(session)
+            async def _create(write_db: AsyncSession) -> Session:
+                session = Session(
+                    session_id=session_id,
+                    user_id=user_id,
+                    created_at=datetime.utcnow(),
+                    last_accessed=datetime.utcnow(),
+                )
+                write_db.add(session)
+                await write_db.flush()
+                return session
 
-            return session
+            # Commits directly, or as part of a group when the write queue is on
+            return await run_write(db, _create)
 
         except Exception as e:
             logger.error(f"Failed to create session for user_id {user_id}: {type(e).__name__}: {str(e)}")
             await db.rollback()
             raise SessionManagerError(f"Failed to create session: {str(e)}") from e
 
+    @traced("session.get")
     async def get_session(
         self,
         db: AsyncSession,
@@ -154,6 +196,7 @@ class SessionManager:
             await db.rollback()
             raise SessionManagerError(f"Failed to get session: {str(e)}") from e
 
+    @traced("session.history")
     async def get_session_history(
         self,
         db: AsyncSession,
@@ -204,6 +247,7 @@ class SessionManager:
                 f"Failed to get session history: {str(e)}"
             ) from e
 
+    @traced("session.save_processed_image")
     async def save_processed_image(
         self,
         db: AsyncSession,
@@ -213,6 +257,7 @@ class SessionManager:
         original_path: str,
         processed_path: str,
         model_parameters: dict[str, Any] | None = None,
+        storage_bytes: int = 0,
     ) -> ProcessedImage:
         """
         Save processed image metadata to database.
@@ -225,6 +270,8 @@ class SessionManager:
             original_path: Relative path to original image
             processed_path: Relative path to processed image
             model_parameters: Model parameters used (optional)
+            storage_bytes: Bytes stored for the original and processed files,
+                charged to the session owner's usage ledger
 
         Returns:
             Created ProcessedImage object
@@ -233,35 +280,40 @@ class SessionManager:
             SessionNotFoundError: If session not found
             SessionManagerError: If save fails
         """
-        try:
-            # Get session (validates it exists and updates access time)
-            session = await self.get_session(db, session_id, update_access=True)
+        # Convert parameters to JSON string if provided
+        params_json = None
+        if model_parameters:
+            import json
 
-            # Convert parameters to JSON string if provided
-            params_json = None
-            if model_parameters:
-                import json
+            params_json = json.dumps(model_parameters)
 
-                params_json = json.dumps(model_parameters)
+        async def _save(write_db: AsyncSession) -> ProcessedImage:
+            # Get session (validates it exists) and touch its access time
+            session = await self.get_session(write_db, session_id, update_access=False)
+            session.last_accessed = datetime.utcnow()
 
-            # Create processed image record
             processed_image = ProcessedImage(
                 session_id=session.id,
+                user_id=session.user_id,
                 original_filename=original_filename,
                 model_id=model_id,
                 original_path=original_path,
                 processed_path=processed_path,
                 model_parameters=params_json,
+                storage_bytes=storage_bytes,
                 created_at=datetime.utcnow(),
             )
-
-            # Add to database
-            db.add(processed_image)
-            await db.commit()
-            await db.refresh(processed_image)
-
+            write_db.add(processed_image)
+            await write_db.flush()
+            await apply_usage_delta(
+                write_db, session.user_id, images=1, storage_bytes=storage_bytes
+            )
             return processed_image
 
+        try:
+            # Commits directly, or as part of a group when the write queue is on
+            return await run_write(db, _save)
+
         except SessionNotFoundError:
             raise
         except Exception as e:
@@ -270,6 +322,7 @@ class SessionManager:
                 f"Failed to save processed image: {str(e)}"
             ) from e
 
+    @traced("session.cleanup")
     async def cleanup_old_sessions(
         self, db: AsyncSession, hours: int = 24
     ) -> tuple[int, int]:
@@ -292,61 +345,23 @@ class SessionManager:
             # Calculate cutoff time
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
 
-            # Query old sessions with processed_images eagerly loaded
-            stmt = (
-                select(Session)
-                .where(Session.last_accessed < cutoff_time)
-                .options(selectinload(Session.processed_images))
-            )
-            result = await db.execute(stmt)
-            old_sessions = list(result.scalars().all())
+            async def _delete(write_db: AsyncSession) -> tuple[int, list]:
+                result = await write_db.execute(
+                    select(Session.id).where(Session.last_accessed < cutoff_time)
+                )
+                return await _delete_sessions(write_db, list(result.scalars().all()))
 
-            sessions_deleted = 0
-            files_deleted = 0
+            # Commits directly, or as part of a group when the write queue is on
+            sessions_deleted, images = await run_write(db, _delete)
 
-            for session in old_sessions:
-                # Query images separately to ensure they're loaded
-                img_stmt = select(ProcessedImage).where(
-                    ProcessedImage.session_id == session.id
-                )
-                img_result = await db.execute(img_stmt)
-                images = list(img_result.scalars().all())
-
-                # Delete associated files
-                for image in images:
-                    # Delete original file
-                    original_file = self.storage_path / image.original_path
-                    if original_file.exists():
-                        try:
-                            original_file.unlink()
-                            files_deleted += 1
-                        except OSError:
-                            # Log error but continue
-                            pass
-
-                    # Delete processed file
-                    processed_file = self.processed_path / image.processed_path
-                    if processed_file.exists():
-                        try:
-                            processed_file.unlink()
-                            files_deleted += 1
-                        except OSError:
-                            # Log error but continue
-                            pass
-
-                # Delete session (cascade will delete processed_images)
-                await db.delete(session)
-                sessions_deleted += 1
-
-            # Commit all deletions
-            await db.commit()
-
-            return (sessions_deleted, files_deleted)
+            # Files go once their rows are gone
+            return (sessions_deleted, self._delete_image_files(images))
 
         except Exception as e:
             await db.rollback()
             raise SessionManagerError(f"Failed to cleanup sessions: {str(e)}") from e
 
+    @traced("session.delete")
     async def delete_session(self, db: AsyncSession, session_id: str) -> int:
         """
         Delete a specific session and its files.
@@ -362,56 +377,50 @@ class SessionManager:
             SessionNotFoundError: If session not found
             SessionManagerError: If deletion fails
         """
+
+        async def _delete(write_db: AsyncSession) -> tuple[int, list]:
+            result = await write_db.execute(select(Session.id).where(Session.session_id == session_id))
+            return await _delete_sessions(write_db, list(result.scalars().all()))
+
         try:
-            # Query session
-            stmt = select(Session).where(Session.session_id == session_id)
-            result = await db.execute(stmt)
-            session = result.scalar_one_or_none()
+            # Commits directly, or as part of a group when the write queue is on
+            sessions_deleted, images = await run_write(db, _delete)
+        except Exception as e:
+            await db.rollback()
+            raise SessionManagerError(f"Failed to delete session: {str(e)}") from e
 
-            if session is None:
-                raise SessionNotFoundError(f"Session '{session_id}' not found")
+        if not sessions_deleted:
+            raise SessionNotFoundError(f"Session '{session_id}' not found")
 
-            # Query images separately to ensure they're loaded
-            img_stmt = select(ProcessedImage).where(
-                ProcessedImage.session_id == session.id
-            )
-            img_result = await db.execute(img_stmt)
-            images = list(img_result.scalars().all())
+        # Files go once their rows are gone
+        return self._delete_image_files(images)
 
-            files_deleted = 0
+    def _delete_image_files(self, images: list) -> int:
+        """
+        Delete the original and processed files of deleted images.
 
-            # Delete associated files
-            for image in images:
-                # Delete original file
-                original_file = self.storage_path / image.original_path
-                if original_file.exists():
-                    try:
-                        original_file.unlink()
-                        files_deleted += 1
-                    except OSError:
-                        pass
+        Args:
+            images: Rows returned by _delete_sessions
 
-                # Delete processed file
-                processed_file = self.processed_path / image.processed_path
-                if processed_file.exists():
+        Returns:
+            Number of files deleted
+        """
+        files_deleted = 0
+        for image in images:
+            for file_path in (
+                self.storage_path / image.original_path,
+                self.processed_path / image.processed_path,
+            ):
+                if file_path.exists():
                     try:
-                        processed_file.unlink()
+                        file_path.unlink()
                         files_deleted += 1
                     except OSError:
-                        pass
-
-            # Delete session from database
-            await db.delete(session)
-            await db.commit()
-
-            return files_deleted
-
-        except SessionNotFoundError:
-            raise
-        except Exception as e:
-            await db.rollback()
-            raise SessionManagerError(f"Failed to delete session: {str(e)}") from e
+                        # Log error but continue
+                        logger.warning(f"Failed to delete file {file_path}")
+        return files_deleted
 
+    @traced("session.storage_path")
     def get_storage_path_for_session(self, session_id: str) -> Path:
         """
         Get storage directory path for a session.
@@ -426,6 +435,7 @@ class SessionManager:
         session_dir.mkdir(parents=True, exist_ok=True)
         return session_dir
 
+    @traced("session.processed_path")
     def get_processed_path_for_session(self, session_id: str) -> Path:
         """
         Get processed images directory path for a session.
@@ -0,0 +1,333 @@
+"""
+Per-user usage ledger and quota enforcement.
+
+Usage (stored images, stored bytes, provider calls per UTC day) is kept in
+the user_usage table, one row per user. Every code path that adds or removes
+images applies a delta to the owner's row inside the same transaction, so:
+
+- Quota checks in restore_image read a single row by primary key
+- The admin usage API lists ledger rows without aggregating processed_images
+- reconcile_usage() periodically recomputes image/storage totals from
+  processed_images (the only full scan) and corrects any drift
+
+Ledger functions never commit (except reconcile_usage); callers commit them
+together with the change they account for.
+"""
+import logging
+from collections.abc import Iterable
+from datetime import date, datetime
+
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings, get_settings
+from app.db.models import ProcessedImage, UserUsage
+from app.db.write_queue import run_write
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceededError(Exception):
+    """Raised when a user has reached one of their usage quotas."""
+
+    def __init__(self, quota: str, limit: int, current: int):
+        """
+        Initialize the error.
+
+        Args:
+            quota: Which quota was hit ("images", "storage_bytes" or "provider_calls")
+            limit: Configured limit
+            current: Current usage
+        """
+        self.quota = quota
+        self.limit = limit
+        self.current = current
+        super().__init__(f"Quota exceeded for {quota}: {current} of {limit} used")
+
+
+def utc_today() -> date:
+    """Current UTC date (provider call counters roll over at UTC midnight)."""
+    return datetime.utcnow().date()
+
+
+async def _ensure_row(db: AsyncSession, user_id: int) -> None:
+    """
+    Create the user's ledger row if it does not exist yet.
+
+    Runs as INSERT ... ON CONFLICT DO NOTHING, so two concurrent first
+    requests of a new user cannot both insert the row; the second one
+    leaves the row created by the first in place.
+    """
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        insert(UserUsage)
+        .values(user_id=user_id, image_count=0, storage_bytes=0, provider_calls_today=0)
+        .on_conflict_do_nothing(index_elements=[UserUsage.user_id])
+    )
+
+
+def _clamped_add(column, delta: int):
+    """column + delta, never below zero (portable across SQLite and PostgreSQL)."""
+    return case((column + delta < 0, 0), else_=column + delta)
+
+
+async def apply_usage_delta(
+    db: AsyncSession, user_id: int, images: int = 0, storage_bytes: int = 0
+) -> None:
+    """
+    Add (or subtract, with negative values) to a user's image and storage totals.
+
+    Runs as a single relative UPDATE, so concurrent writers cannot lose
+    increments. Does not commit.
+
+    Args:
+        db: Database session (the caller's transaction)
+        user_id: Owner of the images
+        images: Change in stored image count
+        storage_bytes: Change in stored bytes
+    """
+    if images == 0 and storage_bytes == 0:
+        return
+
+    stmt = (
+        update(UserUsage)
+        .where(UserUsage.user_id == user_id)
+        .values(
+            image_count=_clamped_add(UserUsage.image_count, images),
+            storage_bytes=_clamped_add(UserUsage.storage_bytes, storage_bytes),
+            updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+
+    if result.rowcount == 0:
+        await _ensure_row(db, user_id)
+        await db.execute(stmt)
+
+
+async def release_images(db: AsyncSession, images: Iterable[ProcessedImage]) -> None:
+    """
+    Subtract images that are about to be deleted from their owners' totals.
+
+    Args:
+        db: Database session (the caller's transaction)
+        images: Images being deleted (may belong to several users)
+    """
+    totals: dict[int, list[int]] = {}
+    for image in images:
+        user_totals = totals.setdefault(image.user_id, [0, 0])
+        user_totals[0] += 1
+        user_totals[1] += image.storage_bytes or 0
+
+    for user_id, (count, size) in totals.items():
+        await apply_usage_delta(db, user_id, images=-count, storage_bytes=-size)
+
+
+async def record_provider_call(
+    db: AsyncSession, user_id: int, day: date | None = None, limit: int = 0
+) -> date:
+    """
+    Count one provider call for the user on the given UTC day.
+
+    The counter resets on the first call of a new day. With a limit, the
+    call is only counted while the user is below it; the check and the
+    increment are one conditional UPDATE, so concurrent requests cannot
+    both take the last call. Does not commit.
+
+    Args:
+        db: Database session (the caller's transaction)
+        user_id: User making the call
+        day: UTC day to count against (defaults to today)
+        limit: Maximum calls per day (0 = not enforced)
+
+    Returns:
+        The day the call was counted against (pass it to release_provider_call)
+
+    Raises:
+        QuotaExceededError: If the user has already made ``limit`` calls that day
+    """
+    day = day or utc_today()
+    stmt = (
+        update(UserUsage)
+        .where(UserUsage.user_id == user_id)
+        .values(
+            provider_calls_today=case(
+                (UserUsage.provider_calls_day == day, UserUsage.provider_calls_today + 1),
+                else_=1,
+            ),
+            provider_calls_day=day,
+            updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if limit:
+        stmt = stmt.where(
+            or_(
+                UserUsage.provider_calls_day.is_(None),
+                UserUsage.provider_calls_day != day,
+                UserUsage.provider_calls_today < limit,
+            )
+        )
+    result = await db.execute(stmt)
+
+    if result.rowcount == 0 and await db.get(UserUsage, user_id) is None:
+        await _ensure_row(db, user_id)
+        result = await db.execute(stmt)
+    if result.rowcount == 0:
+        current = await db.scalar(select(UserUsage.provider_calls_today).where(UserUsage.user_id == user_id))
+        raise QuotaExceededError("provider_calls", limit, current)
+    return day
+
+
+async def release_provider_call(db: AsyncSession, user_id: int, day: date) -> None:
+    """
+    Give back a provider call that never reached the provider.
+
+    Does nothing once the counter has moved on to another day. Does not commit.
+
+    Args:
+        db: Database session (the caller's transaction)
+        user_id: User whose call is refunded
+        day: Day returned by record_provider_call
+    """
+    await db.execute(
+        update(UserUsage)
+        .where(
+            UserUsage.user_id == user_id,
+            UserUsage.provider_calls_day == day,
+            UserUsage.provider_calls_today > 0,
+        )
+        .values(provider_calls_today=UserUsage.provider_calls_today - 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_usage(db: AsyncSession, user_id: int) -> UserUsage | None:
+    """
+    Get a user's ledger row (single primary-key lookup).
+
+    Args:
+        db: Database session
+        user_id: User ID
+
+    Returns:
+        UserUsage, or None if the user has no recorded usage yet
+    """
+    result = await db.execute(select(UserUsage).where(UserUsage.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+async def check_quota(
+    db: AsyncSession,
+    user_id: int,
+    incoming_bytes: int = 0,
+    settings: Settings | None = None,
+) -> None:
+    """
+    Verify the user may process another image.
+
+    Reads one ledger row. Limits set to 0 are not enforced. The provider
+    call check only rejects early: record_provider_call enforces the limit
+    when the call is counted.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        incoming_bytes: Bytes the new upload will add (the original file)
+        settings: Application settings (defaults to global settings)
+
+    Raises:
+        QuotaExceededError: If any quota would be exceeded
+    """
+    settings = settings or get_settings()
+    max_images = settings.quota_max_images_per_user
+    max_bytes = settings.quota_max_storage_bytes_per_user
+    max_calls = settings.quota_max_provider_calls_per_day
+
+    if not (max_images or max_bytes or max_calls):
+        return
+
+    usage = await get_usage(db, user_id)
+    image_count = usage.image_count if usage else 0
+    storage_bytes = usage.storage_bytes if usage else 0
+    calls_today = usage.calls_on(utc_today()) if usage else 0
+
+    if max_images and image_count >= max_images:
+        raise QuotaExceededError("images", max_images, image_count)
+    if max_bytes and storage_bytes + incoming_bytes > max_bytes:
+        raise QuotaExceededError("storage_bytes", max_bytes, storage_bytes)
+    if max_calls and calls_today >= max_calls:
+        raise QuotaExceededError("provider_calls", max_calls, calls_today)
+
+
+async def reconcile_usage(db: AsyncSession) -> int:
+    """
+    Recompute image and storage totals from processed_images and fix drift.
+
+    This is the only place that aggregates processed_images; it is meant to
+    run periodically in the background. Provider call counters are left as is
+    (they are not derivable from stored images).
+
+    Each ledger row is compared with its aggregate in a single statement, so
+    both come from the same snapshot, and drift is corrected with a relative
+    UPDATE (``apply_usage_delta``): images added or deleted while the
+    reconciliation runs change the ledger and the aggregate alike and are
+    kept. Commits its changes through the write queue.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of ledger rows that were corrected
+    """
+    actual = (
+        select(
+            ProcessedImage.user_id.label("user_id"),
+            func.count(ProcessedImage.id).label("image_count"),
+            func.coalesce(func.sum(ProcessedImage.storage_bytes), 0).label("storage_bytes"),
+        )
+        .group_by(ProcessedImage.user_id)
+        .subquery()
+    )
+
+    ledger_result = await db.execute(
+        select(
+            UserUsage.user_id,
+            UserUsage.image_count,
+            UserUsage.storage_bytes,
+            func.coalesce(actual.c.image_count, 0),
+            func.coalesce(actual.c.storage_bytes, 0),
+        ).outerjoin(actual, actual.c.user_id == UserUsage.user_id)
+    )
+    missing_result = await db.execute(
+        select(actual.c.user_id, actual.c.image_count, actual.c.storage_bytes).where(
+            ~select(UserUsage.user_id).where(UserUsage.user_id == actual.c.user_id).exists()
+        )
+    )
+
+    drift: dict[int, tuple[int, int]] = {}
+    for user_id, ledger_images, ledger_bytes, image_count, storage_bytes in ledger_result.all():
+        ledger_images, ledger_bytes = ledger_images or 0, ledger_bytes or 0
+        if ledger_images == image_count and ledger_bytes == storage_bytes:
+            continue
+        logger.warning(
+            f"Usage drift for user {user_id}: ledger {ledger_images} images / "
+            f"{ledger_bytes} bytes, actual {image_count} / {storage_bytes}"
+        )
+        drift[user_id] = (image_count - ledger_images, storage_bytes - ledger_bytes)
+    for user_id, image_count, storage_bytes in missing_result.all():
+        drift[user_id] = (image_count, storage_bytes)
+
+    async def _correct(session: AsyncSession) -> None:
+        for user_id, (images, size) in drift.items():
+            await apply_usage_delta(session, user_id, images=images, storage_bytes=size)
+        await session.execute(
+            update(UserUsage).values(reconciled_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        )
+
+    await run_write(db, _correct)
+    return len(drift)
@@ -0,0 +1,276 @@
+"""
+Background warm-keeper for HuggingFace models.
+
+Every ``interval_seconds`` each enabled HuggingFace model is probed with
+``HFInferenceService.check_model_status()`` and its readiness recorded:
+
+- ``ready``: the model answered, requests will not wait for a cold start.
+- ``loading``: HuggingFace is loading the model, with its estimated time.
+- ``error``: the model is unavailable (not found, gone, unauthorized) or
+  could not be reached.
+- ``unknown``: not probed yet, or not a HuggingFace model.
+
+Models marked ``keep_warm`` are sent a tiny image instead of an empty probe,
+which runs the model and keeps HuggingFace from unloading it while idle.
+With several workers only the scheduler leader sends the image (one
+keep-alive per interval is enough); followers send empty probes, which
+keep their own readiness current without running the model.
+
+While a model is loading it is probed again once its estimated load time has
+passed, until it is ready, so cold-start durations (first ``loading`` answer
+to first ``ready`` answer) are measured to within a few seconds.
+
+Readiness is published in ``GET /models`` so clients can prefer warm models.
+State is per worker process.
+"""
+import asyncio
+import io
+import logging
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from PIL import Image
+
+from app.core.config import Settings, get_settings
+from app.services.hf_inference import HFInferenceService
+from app.services.leader_election import get_leader_election
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "unknown"
+READY = "ready"
+LOADING = "loading"
+ERROR = "error"
+
+# Bounds for re-probing a loading model at its estimated load time
+MIN_FOLLOW_UP_SECONDS = 5.0
+MAX_COLD_START_SECONDS = 900.0
+
+
+@lru_cache(maxsize=1)
+def keep_alive_image() -> bytes:
+    """Smallest useful input for a keep-alive request: an 8x8 PNG."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color=(128, 128, 128)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ModelReadiness:
+    """
+    Last known readiness of one model.
+
+    Attributes:
+        status: "unknown", "ready", "loading" or "error"
+        checked_at: When the model was last probed
+        error: Reason for the "error" status
+        cold_starts: Cold starts observed
+        last_cold_start_seconds: Duration of the most recent cold start
+    """
+
+    __slots__ = (
+        "status",
+        "checked_at",
+        "error",
+        "cold_starts",
+        "last_cold_start_seconds",
+        "_loading_since",
+        "_ready_at",
+    )
+
+    def __init__(self):
+        self.status = UNKNOWN
+        self.checked_at: datetime | None = None
+        self.error: str | None = None
+        self.cold_starts = 0
+        self.last_cold_start_seconds: float | None = None
+        self._loading_since: float | None = None
+        self._ready_at: float | None = None
+
+    def record(self, result: dict, now: float | None = None) -> None:
+        """
+        Update from a check_model_status() result.
+
+        Args:
+            result: Status dictionary from the probe
+            now: Current monotonic time
+        """
+        now = time.monotonic() if now is None else now
+        self.checked_at = datetime.now(timezone.utc)
+        status = result.get("status")
+
+        if status == "rate_limited":
+            # Says nothing about the model; keep the last known state
+            return
+        if status == LOADING:
+            if self.status != LOADING:
+                self._loading_since = now
+            estimated_time = result.get("estimated_time")
+            self._ready_at = now + estimated_time if estimated_time else None
+            self.status = LOADING
+            self.error = None
+        elif status == READY:
+            if self.status == LOADING and self._loading_since is not None:
+                self.last_cold_start_seconds = now - self._loading_since
+                self.cold_starts += 1
+            self.status = READY
+            self.error = None
+            self._loading_since = self._ready_at = None
+        else:
+            self.status = ERROR
+            self.error = result.get("error") or "Unknown error"
+            self._loading_since = self._ready_at = None
+
+    def eta_seconds(self, now: float | None = None) -> float | None:
+        """Estimated seconds until a loading model is ready."""
+        if self.status != LOADING or self._ready_at is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._ready_at - now)
+
+    def loading_for(self, now: float | None = None) -> float:
+        """Seconds since the model was first seen loading (0 if it is not loading)."""
+        if self._loading_since is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return now - self._loading_since
+
+    def snapshot(self, now: float | None = None) -> dict:
+        """Readiness for API responses."""
+        eta = self.eta_seconds(now)
+        return {
+            "status": self.status,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "checked_at": self.checked_at,
+            "error": self.error,
+            "last_cold_start_seconds": (
+                round(self.last_cold_start_seconds, 1) if self.last_cold_start_seconds is not None else None
+            ),
+        }
+
+
+class WarmKeeper:
+    """
+    Probes HuggingFace models on a schedule and keeps ``keep_warm`` models loaded.
+
+    Args:
+        settings: Application settings (defaults to global settings)
+    """
+
+    def __init__(self, settings: Settings | None = None):
+        self.settings = settings or get_settings()
+        self.interval = self.settings.warm_keeper_interval_seconds
+        self.readiness: dict[str, ModelReadiness] = {}
+        self._follow_ups: dict[str, asyncio.Task] = {}
+
+    def models(self) -> list[dict]:
+        """Enabled HuggingFace models to probe."""
+        return [
+            model
+            for model in self.settings.get_models()
+            if model.get("enabled", True) and model.get("provider", "huggingface") == "huggingface"
+        ]
+
+    def get(self, model_id: str) -> ModelReadiness | None:
+        """Readiness of a model, or None if it has never been probed."""
+        return self.readiness.get(model_id)
+
+    async def probe(self, service: HFInferenceService, model: dict) -> ModelReadiness:
+        """
+        Probe one model and record the result.
+
+        Args:
+            service: HuggingFace service used for the request
+            model: Model configuration
+
+        Returns:
+            Updated readiness of the model
+        """
+        keep_alive = model.get("keep_warm") and get_leader_election().is_leader()
+        content = keep_alive_image() if keep_alive else b""
+        result = await service.check_model_status(model["id"], content=content)
+
+        readiness = self.readiness.get(model["id"])
+        if readiness is None:
+            readiness = self.readiness[model["id"]] = ModelReadiness()
+        previous = readiness.status
+        readiness.record(result)
+
+        if readiness.status != previous:
+            if readiness.status == READY and previous == LOADING:
+                logger.info(
+                    f"Model {model['id']} is ready after a {readiness.last_cold_start_seconds:.1f}s cold start"
+                )
+            elif readiness.status == ERROR:
+                logger.warning(f"Model {model['id']} is unavailable: {readiness.error}")
+            else:
+                logger.info(f"Model {model['id']} is {readiness.status}")
+
+        if readiness.status == LOADING and model["id"] not in self._follow_ups:
+            task = asyncio.create_task(self._follow_up(service, model))
+            self._follow_ups[model["id"]] = task
+            task.add_done_callback(lambda _: self._follow_ups.pop(model["id"], None))
+        return readiness
+
+    async def _follow_up(self, service: HFInferenceService, model: dict) -> None:
+        """Re-probe a loading model at its estimated load time until it is ready."""
+        readiness = self.readiness[model["id"]]
+        while readiness.status == LOADING and readiness.loading_for() < MAX_COLD_START_SECONDS:
+            eta = readiness.eta_seconds()
+            delay = min(max(eta or 0.0, MIN_FOLLOW_UP_SECONDS), self.interval)
+            await asyncio.sleep(delay)
+            try:
+                result = await service.check_model_status(model["id"])
+            except Exception as e:
+                logger.debug(f"Follow-up probe of {model['id']} failed: {e}")
+                return
+            readiness.record(result)
+            if readiness.status == READY:
+                logger.info(
+                    f"Model {model['id']} is ready after a {readiness.last_cold_start_seconds:.1f}s cold start"
+                )
+
+    async def run_once(self) -> None:
+        """Probe every model once (the scheduled job)."""
+        models = self.models()
+        if not models:
+            return
+        try:
+            service = HFInferenceService(self.settings)
+        except ValueError as e:
+            logger.debug(f"Skipping model probes: {e}")
+            return
+
+        results = await asyncio.gather(
+            *(self.probe(service, model) for model in models), return_exceptions=True
+        )
+        for model, result in zip(models, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error probing model {model['id']}: {result}", exc_info=result)
+
+    async def close(self) -> None:
+        """Cancel follow-up probes (application shutdown)."""
+        tasks = list(self._follow_ups.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_warm_keeper: WarmKeeper | None = None
+
+
+def get_warm_keeper() -> WarmKeeper:
+    """Get the process-wide warm-keeper, creating it on first use."""
+    global _warm_keeper
+    if _warm_keeper is None:
+        _warm_keeper = WarmKeeper()
+    return _warm_keeper
+
+
+async def close_warm_keeper() -> None:
+    """Close the process-wide warm-keeper (application shutdown)."""
+    global _warm_keeper
+    if _warm_keeper is not None:
+        await _warm_keeper.close()
+        _warm_keeper = None
@@ -12,6 +12,8 @@ from PIL import Image
 from fastapi import HTTPException, UploadFile, status
 
 from app.core.config import Settings, get_settings
+from app.core import server_timing
+from app.core.metrics import IMAGE_OPERATION_DURATION
 
 
 class ImageValidationError(Exception):
@@ -138,7 +140,8 @@ def pil_image_to_bytes(image: Image.Image, format: str = "PNG") -> bytes:
     """
     try:
         buffer = io.BytesIO()
-        image.save(buffer, format=format)
+        with IMAGE_OPERATION_DURATION.labels("encode").time(), server_timing.measure("encode"):
+            image.save(buffer, format=format)
         buffer.seek(0)
         return buffer.read()
     except Exception as e:
@@ -160,9 +163,10 @@ def bytes_to_pil_image(image_bytes: bytes) -> Image.Image:
     """
     try:
         buffer = io.BytesIO(image_bytes)
-        image = Image.open(buffer)
-        # Verify it's a valid image by loading it
-        image.load()
+        with IMAGE_OPERATION_DURATION.labels("decode").time(), server_timing.measure("decode"):
+            image = Image.open(buffer)
+            # Verify it's a valid image by loading it
+            image.load()
         return image
     except Exception as e:
         raise ImageValidationError(f"Invalid or corrupted image data: {str(e)}")
@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination utilities.
+
+History lists are ordered newest first by (created_at DESC, id DESC). A page
+ends at some row; the next page starts strictly after that row's
+(created_at, id) pair. Unlike OFFSET, the database seeks directly to that
+position on the (user_id, created_at DESC, id DESC) index, so every page costs
+the same no matter how deep the client has paged.
+
+Cursors are opaque to clients: URL-safe base64 of a small JSON document.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql import ColumnElement
+
+
+class InvalidCursorError(ValueError):
+    """Exception raised when a pagination cursor cannot be decoded."""
+
+    pass
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """
+    Encode the position of the last item on a page as an opaque cursor.
+
+    Args:
+        created_at: Creation timestamp of the last item
+        item_id: Database ID of the last item
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({"c": created_at.isoformat(), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Args:
+        cursor: Cursor string from a previous page
+
+    Returns:
+        Tuple of (created_at, item_id)
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def after_cursor(created_at_column, id_column, cursor: tuple[datetime, int]) -> ColumnElement[bool]:
+    """
+    Build the WHERE clause selecting rows after a cursor in newest-first order.
+
+    Uses a row-value comparison so both SQLite and PostgreSQL can turn it into
+    a single index range seek.
+
+    Args:
+        created_at_column: Timestamp column the list is ordered by
+        id_column: Tie-breaking ID column
+        cursor: Decoded (created_at, id) position
+
+    Returns:
+        SQL boolean expression
+    """
+    created_at, item_id = cursor
+    return tuple_(created_at_column, id_column) < tuple_(created_at, item_id)
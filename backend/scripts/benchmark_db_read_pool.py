@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Reader pool concurrency benchmark.
+
+Seeds a temporary file-based SQLite database with history rows, then runs the
+same concurrent history-style query load against the single writer connection
+(the pre-pool setup) and against reader pools of increasing size. Read
+throughput should scale with the pool size until CPU cores are saturated
+(sqlite3 releases the GIL while stepping a query, so each reader connection's
+thread runs in parallel); on a single-core host the numbers stay flat.
+
+Usage:
+    python scripts/benchmark_db_read_pool.py
+    python scripts/benchmark_db_read_pool.py --rows 20000 --queries 2000 --pool-sizes 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.database import (  # noqa: E402
+    configure_sqlite,
+    create_engine,
+    create_reader_engine,
+    create_session_factory,
+)
+from app.db.models import Base, ProcessedImage, Session, User  # noqa: E402
+
+
+async def seed(writer: AsyncEngine, rows: int) -> None:
+    """Create the schema and insert one user, one session and `rows` images."""
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(User).values(
+                id=1,
+                username="bench",
+                email="bench@example.com",
+                full_name="Bench",
+                hashed_password="x",
+                role="user",
+                is_active=True,
+                password_must_change=False,
+                created_at=datetime.utcnow(),
+            )
+        )
+        now = datetime.utcnow()
+        await conn.execute(
+            insert(Session).values(
+                id=1, user_id=1, session_id="bench-session", created_at=now, last_accessed=now
+            )
+        )
+        await conn.execute(
+            insert(ProcessedImage),
+            [
+                {
+                    "session_id": 1,
+                    "user_id": 1,
+                    "original_filename": f"photo_{i}.jpg",
+                    "model_id": "swin2sr-2x",
+                    "original_path": f"bench/{i}.jpg",
+                    "processed_path": f"bench/{i}_processed.jpg",
+                    "created_at": now - timedelta(seconds=i),
+                }
+                for i in range(rows)
+            ],
+        )
+
+
+async def run_load(factory, queries: int, concurrency: int, offset: int) -> float:
+    """Run `queries` history page + count queries with `concurrency` workers; return queries/sec."""
+    remaining = queries
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            async with factory() as db:
+                await db.execute(
+                    select(func.count(ProcessedImage.id)).where(ProcessedImage.user_id == 1)
+                )
+                result = await db.execute(
+                    select(ProcessedImage)
+                    .where(ProcessedImage.user_id == 1)
+                    .order_by(ProcessedImage.created_at.desc(), ProcessedImage.id.desc())
+                    .offset(offset)
+                    .limit(50)
+                )
+                result.scalars().all()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return queries / (time.perf_counter() - start)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SQLite reader pool throughput")
+    parser.add_argument("--rows", type=int, default=20000, help="History rows to seed")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries per measurement")
+    parser.add_argument("--offset", type=int, default=5000, help="History page offset (deep pages are DB-bound)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent request workers")
+    parser.add_argument(
+        "--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="Reader pool sizes to measure"
+    )
+    args = parser.parse_args()
+
+    settings = get_settings()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.database_url = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        settings.database_max_overflow = 0
+
+        writer = create_engine()
+        await configure_sqlite(writer)
+        await seed(writer, args.rows)
+
+        baseline = await run_load(
+            create_session_factory(writer), args.queries, args.concurrency, args.offset
+        )
+        print(f"{'writer only':>14}: {baseline:8.1f} queries/s")
+
+        for size in args.pool_sizes:
+            settings.database_pool_size = size
+            reader = create_reader_engine()
+            throughput = await run_load(
+                create_session_factory(writer, reader), args.queries, args.concurrency, args.offset
+            )
+            print(f"{f'pool_size={size}':>14}: {throughput:8.1f} queries/s ({throughput / baseline:.2f}x)")
+            await reader.dispose()
+
+        await writer.dispose()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Replicate parameter validation benchmark.
+
+Compares the per-request cost of validating a restore request's parameters
+the uncompiled way (scan the models list, parse the model's replicate_schema
+with Pydantic, build a validator, merge defaults, validate) with the
+compiled path used by the Replicate service (indexed model lookup, compiled
+schema from the registry, one validation pass).
+
+The model has a schema with one parameter of every type, and the request
+sets half of them, one to an out-of-range value.
+
+Exits with status 1 if the compiled path exceeds --budget-us, so it can run
+as a regression check.
+
+Usage:
+    python scripts/benchmark_param_validation.py
+    python scripts/benchmark_param_validation.py --requests 50000 --models 50 --budget-us 10
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.replicate_schema import ReplicateModelSchema  # noqa: E402
+from app.services.schema_validator import SchemaValidator, get_compiled_schema  # noqa: E402
+
+SCHEMA = {
+    "input": {
+        "image": {"param_name": "input_image"},
+        "parameters": [
+            {"name": "seed", "type": "integer"},
+            {"name": "steps", "type": "integer", "min": 1, "max": 50, "default": 28},
+            {"name": "guidance", "type": "float", "min": 0, "max": 10, "default": 3.5},
+            {"name": "output_format", "type": "enum", "values": ["jpg", "png", "webp"], "default": "png"},
+            {"name": "output_quality", "type": "integer", "min": 0, "max": 100, "default": 90},
+            {"name": "safety_tolerance", "type": "integer", "min": 0, "max": 2, "default": 2},
+            {"name": "prompt", "type": "string", "default": "restore this photo"},
+            {"name": "upscale", "type": "boolean", "default": False},
+        ],
+    },
+    "output": {"type": "uri", "format": "image"},
+}
+
+PARAMETERS = {"steps": 80, "output_format": "jpg", "prompt": "fix scratches", "upscale": True}
+
+
+def models_list(count: int) -> list[dict]:
+    """Configured models, with the benchmarked one last (worst case for a scan)."""
+    models = [{"id": f"model-{i}", "model": f"owner/model-{i}", "parameters": {}} for i in range(count - 1)]
+    models.append(
+        {
+            "id": "target",
+            "model": "owner/target",
+            "parameters": {"output_quality": 95},
+            "replicate_schema": SCHEMA,
+        }
+    )
+    return models
+
+
+def uncompiled(models: list[dict], requests: int) -> float:
+    """Microseconds per request for the per-request parse-and-validate path."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        model_config = next(model for model in models if model.get("id") == "target")
+        schema = ReplicateModelSchema(**model_config["replicate_schema"])
+        validator = SchemaValidator(schema)
+        validator.validate_parameters({**model_config.get("parameters", {}), **PARAMETERS})
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def compiled(models: list[dict], requests: int) -> float:
+    """Microseconds per request for the compiled registry path."""
+    index = {model["id"]: model for model in models}
+    start = time.perf_counter()
+    for _ in range(requests):
+        get_compiled_schema(index["target"]).validate_parameters(PARAMETERS)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure per-request parameter validation cost")
+    parser.add_argument("--requests", type=int, default=20_000, help="Requests per measurement")
+    parser.add_argument("--models", type=int, default=20, help="Configured models")
+    parser.add_argument("--budget-us", type=float, default=10.0, help="Maximum compiled path cost (microseconds)")
+    args = parser.parse_args()
+
+    # Validation warnings are expected (steps is out of range); keep output readable
+    import logging
+
+    logging.disable(logging.WARNING)
+    models = models_list(args.models)
+
+    # The two paths must agree before their speed is compared
+    expected, _ = get_compiled_schema(models[-1]).validate_parameters(PARAMETERS)
+    validator = SchemaValidator(ReplicateModelSchema(**SCHEMA))
+    assert validator.validate_parameters({"output_quality": 95, **PARAMETERS}) == expected
+
+    # Warm up both paths, then take the best of three runs each
+    uncompiled(models, args.requests // 10)
+    compiled(models, args.requests // 10)
+    before = min(uncompiled(models, args.requests) for _ in range(3))
+    after = min(compiled(models, args.requests) for _ in range(3))
+
+    print(f"{'uncompiled':>12}: {before:8.2f} us/request")
+    print(f"{'compiled':>12}: {after:8.2f} us/request (budget {args.budget_us:.1f} us)")
+    print(f"{'speedup':>12}: {before / after:8.1f}x")
+
+    if after > args.budget_us:
+        print("FAIL: compiled path exceeds budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
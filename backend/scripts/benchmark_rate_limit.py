@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Rate limiting middleware overhead benchmark.
+
+Calls a trivial ASGI endpoint directly (no network, no server) with and
+without RateLimitMiddleware in front of it, using the in-memory bucket store,
+and reports the added time per request. Requests are spread over many client
+IPs so the bucket map is exercised at realistic sizes, and the limit is high
+enough that every request is admitted (the common path).
+
+Exits with status 1 if the overhead exceeds --budget-us, so it can run as a
+regression check.
+
+Usage:
+    python scripts/benchmark_rate_limit.py
+    python scripts/benchmark_rate_limit.py --requests 200000 --clients 50000 --budget-us 25
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import get_settings  # noqa: E402
+from app.middleware.rate_limit import MemoryBucketStore, RateLimitMiddleware  # noqa: E402
+
+
+async def endpoint(scope, receive, send) -> None:
+    """Minimal ASGI app returning an empty 200."""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def run(app, requests: int, clients: int) -> float:
+    """Send `requests` calls to `app`; return microseconds per request."""
+    scopes = [
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/models",
+            "headers": [(b"host", b"bench")],
+            "client": (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 1234),
+        }
+        for i in range(clients)
+    ]
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scopes[i % clients], receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure per-request overhead of RateLimitMiddleware")
+    parser.add_argument("--requests", type=int, default=100_000, help="Requests per measurement")
+    parser.add_argument("--clients", type=int, default=10_000, help="Distinct client IPs")
+    parser.add_argument("--budget-us", type=float, default=20.0, help="Maximum allowed overhead (microseconds)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.rate_limit_enabled = True
+    # High enough that every request is admitted, low enough that buckets stay tracked
+    settings.rate_limit_models = "1000000/day"
+
+    limited = RateLimitMiddleware(
+        endpoint, settings=settings, store=MemoryBucketStore(settings.rate_limit_max_tracked_clients)
+    )
+
+    # Warm up both paths, then take the best of three runs each
+    await run(endpoint, args.requests // 10, args.clients)
+    await run(limited, args.requests // 10, args.clients)
+    baseline = min([await run(endpoint, args.requests, args.clients) for _ in range(3)])
+    with_limit = min([await run(limited, args.requests, args.clients) for _ in range(3)])
+    overhead = with_limit - baseline
+
+    print(f"{'no middleware':>20}: {baseline:7.2f} us/request")
+    print(f"{'rate limited':>20}: {with_limit:7.2f} us/request")
+    print(f"{'overhead':>20}: {overhead:7.2f} us/request (budget {args.budget_us:.1f} us)")
+    print(f"{'tracked buckets':>20}: {len(limited.store)}")
+
+    if overhead > args.budget_us:
+        print("FAIL: overhead exceeds budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
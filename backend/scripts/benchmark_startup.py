@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Application startup benchmark.
+
+Starts the application in fresh interpreter processes against a temporary
+file-based SQLite database and measures, for each start, the time to import
+``app.main`` and the time the lifespan takes until the application is ready
+to accept connections. The first start creates the database (migrations and
+seeding); the following ones are restarts of an up-to-date database, which
+should take the fast path (no Alembic upgrade, no reseeding, cleanup in the
+background).
+
+Exits with status 1 if the median restart (import + lifespan) exceeds
+--budget-ms, so it can run as a regression check.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --restarts 10 --budget-ms 2500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Runs in the child process: argv[1] is the database URL
+CHILD = """
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+
+from app.core.config import get_settings
+object.__setattr__(get_settings(), "database_url", sys.argv[1])
+
+
+async def start() -> float:
+    started = time.perf_counter()
+    async with app.main.lifespan(app.main.app):
+        return time.perf_counter() - started
+
+
+ready = asyncio.run(start())
+print(json.dumps({"import": imported, "lifespan": ready}))
+"""
+
+
+def start_once(workdir: Path) -> dict[str, float]:
+    """Start and stop the application once; seconds spent importing and starting."""
+    env = {
+        **os.environ,
+        "APP_ENV": os.environ.get("APP_ENV", "testing"),
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "PROCESSED_DIR": str(workdir / "processed"),
+    }
+    database_url = f"sqlite+aiosqlite:///{workdir / 'startup.db'}"
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, database_url],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Application failed to start (exit {result.returncode})")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure application startup time")
+    parser.add_argument("--restarts", type=int, default=5, help="Restarts of the initialized database")
+    parser.add_argument("--budget-ms", type=float, default=2500.0, help="Maximum median restart time (milliseconds)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        first = start_once(workdir)
+        restarts = [start_once(workdir) for _ in range(args.restarts)]
+
+    def row(label: str, imported: float, lifespan: float) -> str:
+        return (
+            f"{label:>16}: import {imported * 1000:7.0f} ms   lifespan {lifespan * 1000:7.0f} ms   "
+            f"total {(imported + lifespan) * 1000:7.0f} ms"
+        )
+
+    print(row("first start", first["import"], first["lifespan"]))
+    imported = statistics.median(run["import"] for run in restarts)
+    lifespan = statistics.median(run["lifespan"] for run in restarts)
+    print(row("restart (median)", imported, lifespan))
+
+    total_ms = (imported + lifespan) * 1000
+    print(f"{'budget':>16}: {args.budget_ms:.0f} ms")
+    if total_ms > args.budget_ms:
+        print("FAIL: restart exceeds budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
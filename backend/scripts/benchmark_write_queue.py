@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Group-commit writer queue benchmark.
+
+Runs the same concurrent insert load (one ProcessedImage row per simulated
+request, the shape of save_processed_image) against a temporary file-based
+SQLite database twice:
+
+1. Per-request commits: every request opens its own session and commits.
+2. Group commits: every request submits a mutation unit to the writer queue.
+
+Reports sustained inserts/second and the number of failed writes
+("database is locked") for each mode.
+
+Usage:
+    python scripts/benchmark_write_queue.py
+    python scripts/benchmark_write_queue.py --writes 5000 --concurrency 64 --max-batch 64
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.database import (  # noqa: E402
+    configure_sqlite,
+    create_engine,
+    create_session_factory,
+)
+from app.db.models import Base, ProcessedImage, Session, User  # noqa: E402
+from app.db.write_queue import GroupCommitWriter  # noqa: E402
+
+
+def make_unit(i: int):
+    """Mutation unit inserting one processed image row."""
+
+    async def unit(db: AsyncSession) -> None:
+        db.add(
+            ProcessedImage(
+                session_id=1,
+                user_id=1,
+                original_filename=f"photo_{i}.jpg",
+                model_id="swin2sr-2x",
+                original_path=f"bench/{i}.jpg",
+                processed_path=f"bench/{i}_processed.jpg",
+                created_at=datetime.utcnow(),
+            )
+        )
+        await db.flush()
+
+    return unit
+
+
+async def run_load(submit, writes: int, concurrency: int) -> tuple[float, int]:
+    """Run `writes` submissions across `concurrency` workers; return (writes/sec, failures)."""
+    counter = iter(range(writes))
+    failures = 0
+
+    async def worker() -> None:
+        nonlocal failures
+        for i in counter:
+            try:
+                await submit(make_unit(i))
+            except Exception:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return writes / (time.perf_counter() - start), failures
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark group commits against per-request commits")
+    parser.add_argument("--writes", type=int, default=2000, help="Inserts per measurement")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent simulated requests")
+    parser.add_argument("--max-batch", type=int, default=32, help="Writer queue group size")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="Writer queue batching window")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.database_url = f"sqlite+aiosqlite:///{tmp}/bench.db"
+
+        engine = create_engine()
+        await configure_sqlite(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            now = datetime.utcnow()
+            await conn.execute(
+                insert(User).values(
+                    id=1, username="bench", email="bench@example.com", full_name="Bench",
+                    hashed_password="x", role="user", is_active=True,
+                    password_must_change=False, created_at=now,
+                )
+            )
+            await conn.execute(
+                insert(Session).values(
+                    id=1, user_id=1, session_id="bench-session", created_at=now, last_accessed=now
+                )
+            )
+
+        factory = create_session_factory(engine)
+
+        async def per_request_commit(unit) -> None:
+            async with factory() as db:
+                await unit(db)
+                await db.commit()
+
+        rate, failures = await run_load(per_request_commit, args.writes, args.concurrency)
+        print(f"{'per-request commit':>20}: {rate:8.1f} writes/s, {failures} failed")
+
+        writer = GroupCommitWriter(factory, max_batch=args.max_batch, max_delay_ms=args.max_delay_ms)
+        writer.start()
+        grouped_rate, failures = await run_load(writer.submit, args.writes, args.concurrency)
+        await writer.stop()
+        print(
+            f"{'group commit':>20}: {grouped_rate:8.1f} writes/s, {failures} failed "
+            f"({grouped_rate / rate:.2f}x, {writer.units_committed / max(writer.groups_committed, 1):.1f} writes/commit)"
+        )
+
+        await engine.dispose()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,233 @@
+"""
+Tests for /restore/history pagination and filtering.
+
+Calls the route function directly with an authenticated user payload, so the
+tests exercise the query logic without going through JWT validation.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.routes.restoration import get_history
+from app.db.models import ProcessedImage, Session as DBSession, User
+
+
+async def _create_user_with_images(
+    db: AsyncSession, username: str, count: int, same_timestamp: bool = False
+) -> User:
+    """Create a user with two sessions and `count` images spread across them."""
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        full_name=username.title(),
+        hashed_password="x",
+    )
+    db.add(user)
+    await db.flush()
+
+    sessions = [
+        DBSession(user_id=user.id, session_id=f"{username}-a"),
+        DBSession(user_id=user.id, session_id=f"{username}-b"),
+    ]
+    db.add_all(sessions)
+    await db.flush()
+
+    base = datetime(2025, 1, 1)
+    for i in range(count):
+        db.add(
+            ProcessedImage(
+                session_id=sessions[i % 2].id,
+                original_filename=f"{username}_{i}.jpg",
+                model_id="swin2sr-2x" if i % 3 else "qwen-edit",
+                original_path=f"{username}/{i}.jpg",
+                processed_path=f"{username}/{i}_processed.jpg",
+                created_at=base if same_timestamp else base + timedelta(minutes=i),
+            )
+        )
+    await db.commit()
+    return user
+
+
+def _payload(user: User) -> dict:
+    return {"user_id": user.id, "username": user.username}
+
+
+async def _history(db: AsyncSession, user: User, **params):
+    defaults = {
+        "limit": 50,
+        "offset": 0,
+        "cursor": None,
+        "include_total": True,
+        "q": None,
+        "model_id": None,
+        "session_id": None,
+        "created_from": None,
+        "created_to": None,
+    }
+    defaults.update(params)
+    return await get_history(db=db, user=_payload(user), **defaults)
+
+
+@pytest.mark.asyncio
+class TestHistoryPagination:
+    """Tests for keyset and offset pagination of the history list."""
+
+    async def test_owner_column_populated_from_session(self, db_session):
+        """Test that images inserted with only a session get the session's owner."""
+        user = await _create_user_with_images(db_session, "owner", 3)
+
+        response = await _history(db_session, user)
+
+        assert response.total == 3
+        assert [item.original_filename for item in response.items] == [
+            "owner_2.jpg", "owner_1.jpg", "owner_0.jpg"
+        ]
+
+    async def test_cursor_walks_all_pages_without_gaps(self, db_session):
+        """Test that following next_cursor visits every image exactly once, newest first."""
+        user = await _create_user_with_images(db_session, "walker", 7)
+        await _create_user_with_images(db_session, "other", 4)
+
+        seen = []
+        response = await _history(db_session, user, limit=3)
+        seen.extend(item.id for item in response.items)
+        while response.next_cursor:
+            response = await _history(db_session, user, limit=3, cursor=response.next_cursor)
+            seen.extend(item.id for item in response.items)
+
+        offset_page = await _history(db_session, user, limit=50)
+        assert seen == [item.id for item in offset_page.items]
+        assert len(seen) == 7
+
+    async def test_cursor_breaks_timestamp_ties_by_id(self, db_session):
+        """Test that images sharing a timestamp are neither skipped nor repeated."""
+        user = await _create_user_with_images(db_session, "ties", 5, same_timestamp=True)
+
+        first = await _history(db_session, user, limit=2)
+        second = await _history(db_session, user, limit=2, cursor=first.next_cursor)
+        third = await _history(db_session, user, limit=2, cursor=second.next_cursor)
+
+        ids = [item.id for page in (first, second, third) for item in page.items]
+        assert ids == sorted(ids, reverse=True)
+        assert len(set(ids)) == 5
+        assert third.next_cursor is None
+
+    async def test_offset_mode_still_supported(self, db_session):
+        """Test that offset pagination keeps working and also returns a cursor."""
+        user = await _create_user_with_images(db_session, "offset", 5)
+
+        response = await _history(db_session, user, limit=2, offset=2)
+
+        assert response.offset == 2
+        assert response.total == 5
+        assert [item.original_filename for item in response.items] == [
+            "offset_2.jpg", "offset_1.jpg"
+        ]
+        assert response.next_cursor is not None
+
+    async def test_total_can_be_skipped(self, db_session):
+        """Test that include_total=False skips the count."""
+        user = await _create_user_with_images(db_session, "nototal", 2)
+
+        response = await _history(db_session, user, include_total=False)
+
+        assert response.total is None
+        assert len(response.items) == 2
+
+    async def test_invalid_cursor_returns_400(self, db_session):
+        """Test that a tampered cursor is rejected."""
+        user = await _create_user_with_images(db_session, "badcursor", 1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await _history(db_session, user, cursor="garbage")
+
+        assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+class TestHistoryFilters:
+    """Tests for server-side history filters."""
+
+    async def test_filename_search(self, db_session):
+        """Test that q matches filename words by prefix, only within the user's images."""
+        user = await _create_user_with_images(db_session, "search", 3)
+        await _create_user_with_images(db_session, "searchother", 3)
+
+        response = await _history(db_session, user, q="search_1")
+
+        assert [item.original_filename for item in response.items] == ["search_1.jpg"]
+        assert response.total == 1
+
+    async def test_filename_search_follows_updates_and_deletes(self, db_session):
+        """Test that the FTS index stays in sync with the table."""
+        user = await _create_user_with_images(db_session, "sync", 2)
+        images = (await _history(db_session, user)).items
+
+        renamed = await db_session.get(ProcessedImage, images[0].id)
+        renamed.original_filename = "wedding.png"
+        await db_session.delete(await db_session.get(ProcessedImage, images[1].id))
+        await db_session.commit()
+
+        assert [i.id for i in (await _history(db_session, user, q="wedding")).items] == [images[0].id]
+        assert (await _history(db_session, user, q="sync")).items == []
+
+    async def test_search_without_words_matches_nothing(self, db_session):
+        """Test that punctuation-only searches return an empty page instead of an error."""
+        user = await _create_user_with_images(db_session, "punct", 2)
+
+        response = await _history(db_session, user, q='"*')
+
+        assert response.items == []
+        assert response.total == 0
+
+    async def test_model_filter(self, db_session):
+        """Test filtering by model."""
+        user = await _create_user_with_images(db_session, "model", 6)
+
+        response = await _history(db_session, user, model_id="qwen-edit")
+
+        assert [item.original_filename for item in response.items] == ["model_3.jpg", "model_0.jpg"]
+        assert response.total == 2
+
+    async def test_session_filter(self, db_session):
+        """Test filtering by session identifier, scoped to the user's own sessions."""
+        user = await _create_user_with_images(db_session, "sess", 4)
+        other = await _create_user_with_images(db_session, "sessother", 2)
+
+        own = await _history(db_session, user, session_id="sess-b")
+        foreign = await _history(db_session, user, session_id="sessother-a")
+
+        assert [item.original_filename for item in own.items] == ["sess_3.jpg", "sess_1.jpg"]
+        assert foreign.items == []
+        assert (await _history(db_session, other, session_id="sessother-a")).total == 1
+
+    async def test_time_range_filter(self, db_session):
+        """Test that from is inclusive, to is exclusive and timezones are honoured."""
+        user = await _create_user_with_images(db_session, "range", 5)
+
+        response = await _history(
+            db_session,
+            user,
+            created_from=datetime(2025, 1, 1, 0, 1),
+            created_to=datetime(2025, 1, 1, 2, 3, tzinfo=timezone(timedelta(hours=2))),
+        )
+
+        assert [item.original_filename for item in response.items] == ["range_2.jpg", "range_1.jpg"]
+
+    async def test_filters_combine_with_cursor_paging(self, db_session):
+        """Test that cursor pages of a filtered list contain only matches, without gaps."""
+        user = await _create_user_with_images(db_session, "combo", 12)
+
+        first = await _history(db_session, user, model_id="swin2sr-2x", limit=3)
+        second = await _history(
+            db_session, user, model_id="swin2sr-2x", limit=3, cursor=first.next_cursor
+        )
+        rest = await _history(
+            db_session, user, model_id="swin2sr-2x", limit=10, cursor=second.next_cursor
+        )
+
+        names = [item.original_filename for page in (first, second, rest) for item in page.items]
+        assert names == [f"combo_{i}.jpg" for i in (11, 10, 8, 7, 5, 4, 2, 1)]
+        assert rest.next_cursor is None
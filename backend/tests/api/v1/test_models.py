@@ -364,3 +364,82 @@ class TestModelsCaching:
         data2 = response2.json()
         assert data2["total"] == 1
         assert data2["models"][0]["id"] == "new-model"
+
+
+class TestModelsETag:
+    """Tests for the precompiled catalog and conditional requests."""
+
+    def test_not_modified_with_current_etag(self, client: TestClient):
+        """Test that If-None-Match with the current ETag returns 304 without a body."""
+        response = client.get("/api/v1/models")
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["etag"]
+        # testing.json sets models_api.cache_ttl_seconds to 0
+        assert response.headers["cache-control"] == "public, no-cache"
+
+        cached = client.get("/api/v1/models", headers={"If-None-Match": etag})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+        stale = client.get("/api/v1/models", headers={"If-None-Match": '"stale"'})
+        assert stale.status_code == status.HTTP_200_OK
+        assert stale.json() == response.json()
+
+    def test_single_model_etag(self, client: TestClient):
+        """Test that GET /models/{id} has its own ETag and honours If-None-Match."""
+        model_id = client.get("/api/v1/models").json()["models"][0]["id"]
+
+        response = client.get(f"/api/v1/models/{model_id}")
+        assert response.json()["id"] == model_id
+        cached = client.get(f"/api/v1/models/{model_id}", headers={"If-None-Match": f'W/{response.headers["etag"]}'})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_catalog_built_once(self, client: TestClient, monkeypatch):
+        """Test that models are built once per configuration, not per request."""
+        from app.api.v1.routes import models as models_routes
+
+        calls = []
+        build_models = models_routes.build_models
+        monkeypatch.setattr(models_routes, "build_models", lambda s: calls.append(s) or build_models(s))
+        monkeypatch.setattr(models_routes, "_catalog", None)
+
+        for _ in range(3):
+            assert client.get("/api/v1/models").status_code == status.HTTP_200_OK
+        assert len(calls) == 1
+
+    def test_live_state_changes_etag(self, client: TestClient, monkeypatch):
+        """Test that a circuit breaker state change invalidates the ETag."""
+        from app.services.circuit_breaker import get_circuit_breakers
+
+        response = client.get("/api/v1/models")
+        model = response.json()["models"][0]
+
+        breakers = get_circuit_breakers()
+        monkeypatch.setattr(breakers, "enabled", True)
+        breakers.model(model["id"]).record_failure("410 Gone", fatal=True)
+        try:
+            changed = client.get("/api/v1/models", headers={"If-None-Match": response.headers["etag"]})
+            assert changed.status_code == status.HTTP_200_OK
+            assert changed.json()["models"][0]["circuit_state"] == "open"
+        finally:
+            breakers.models.pop(model["id"], None)
+
+    def test_reprobe_keeps_etag(self, client: TestClient, monkeypatch):
+        """Test that probes which only move checked_at or the ETA within a step keep the ETag."""
+        from app.services.warm_keeper import ModelReadiness, get_warm_keeper
+
+        model_id = client.get("/api/v1/models").json()["models"][0]["id"]
+        readiness = ModelReadiness()
+        monkeypatch.setitem(get_warm_keeper().readiness, model_id, readiness)
+
+        readiness.record({"status": "loading", "estimated_time": 25.0})
+        first = client.get(f"/api/v1/models/{model_id}")
+        readiness.record({"status": "loading", "estimated_time": 23.0})
+        again = client.get(f"/api/v1/models/{model_id}", headers={"If-None-Match": first.headers["etag"]})
+        assert again.status_code == status.HTTP_304_NOT_MODIFIED
+
+        readiness.record({"status": "ready"})
+        ready = client.get(f"/api/v1/models/{model_id}", headers={"If-None-Match": first.headers["etag"]})
+        assert ready.status_code == status.HTTP_200_OK
+        assert ready.json()["readiness"]["status"] == "ready"
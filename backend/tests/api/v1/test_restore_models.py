@@ -13,6 +13,7 @@ from unittest.mock import AsyncMock, patch
 from app.services.hf_inference import (
     HFInferenceError,
     HFModelError,
+    HFModelLoadingError,
     HFRateLimitError,
     HFTimeoutError,
 )
@@ -160,10 +161,10 @@ class TestRestoreModels:
     async def test_hf_model_loading_503(
         self, auth_client, test_image_jpeg, mock_hf_service
     ):
-        """Test HF model loading (503) returns appropriate error."""
+        """Test a model still loading after the retries returns 503 with its estimated time."""
         # Mock HF model loading error
-        mock_hf_service.process_image.side_effect = HFModelError(
-            "Model is loading. Estimated time: 20s"
+        mock_hf_service.process_image.side_effect = HFModelLoadingError(
+            "Model 'x' is still loading. Please try again in a moment.", retry_after=19.2
         )
 
         response = await auth_client.post(
@@ -172,9 +173,10 @@ class TestRestoreModels:
             files={"file": ("test.jpg", test_image_jpeg, "image/jpeg")},
         )
 
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "20"
         data = response.json()
-        assert "model" in data["detail"].lower()
+        assert "loading" in data["detail"].lower()
 
     async def test_response_includes_all_required_fields(
         self, auth_client, test_image_jpeg, mock_hf_service
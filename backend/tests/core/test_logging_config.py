@@ -0,0 +1,100 @@
+"""Tests for structured logging, log sampling and the request log context."""
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core import logging_config
+from app.core.logging_config import BackgroundQueueHandler, JsonFormatter, SamplingFilter
+from app.middleware.request_context import RequestContextMiddleware
+
+
+def make_record(name: str, level: int = logging.INFO, created: float = 1000.0) -> logging.LogRecord:
+    """Log record from the given logger at a fixed time."""
+    record = logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level)})
+    record.created = created
+    return record
+
+
+class TestSamplingFilter:
+    """Tests for per-logger sampling and rate limits."""
+
+    def test_rate_limit_applies_per_second_to_logger_and_children(self):
+        """Test that a prefix rule caps its loggers' records per second."""
+        log_filter = SamplingFilter({}, {"app.services": 2})
+
+        kept = [log_filter.filter(make_record(f"app.services.s{i}")) for i in range(3)]
+        next_second = log_filter.filter(make_record("app.services.s0", created=1001.0))
+        other_logger = log_filter.filter(make_record("app.core.security"))
+
+        assert kept == [True, True, False]
+        assert next_second and other_logger
+
+    def test_warnings_are_never_dropped(self):
+        """Test that WARNING and above bypass sampling and rate limits."""
+        log_filter = SamplingFilter({"app": 0.0}, {"app": 1})
+
+        assert not log_filter.filter(make_record("app.x"))
+        assert log_filter.filter(make_record("app.x", logging.WARNING))
+        assert log_filter.filter(make_record("app.x", logging.ERROR))
+
+
+def test_queued_json_records_keep_context_extra_and_exception():
+    """Test that records written by the listener thread are complete JSON objects."""
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    records: queue.Queue = queue.Queue()
+    listener = logging.handlers.QueueListener(records, output)
+    logger = logging.getLogger("test.structured")
+    handler = BackgroundQueueHandler(records)
+    logger.addHandler(handler)
+    logger.propagate = False
+    logging_config._install_context_factory()
+    listener.start()
+    try:
+        logging_config.start_request("req-1")
+        logging_config.bind(user="alice")
+        logger.warning("slow call to %s", "model-a", extra={"duration_ms": 812})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("call failed")
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+        logger.propagate = True
+        logging_config._context.set(None)
+
+    first, second = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert first["message"] == "slow call to model-a"
+    assert first["request_id"] == "req-1" and first["user"] == "alice"
+    assert first["duration_ms"] == 812
+    assert second["message"] == "call failed"
+    assert "ValueError: boom" in second["exception"]
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_taken_from_header_or_generated():
+    """Test that requests get a request ID in their log context and response."""
+    app = FastAPI()
+
+    @app.get("/context")
+    async def context():
+        return logging_config.get_context()
+
+    app.add_middleware(RequestContextMiddleware)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        given = await client.get("/context", headers={"X-Request-ID": "abc-123"})
+        generated = await client.get("/context", headers={"X-Request-ID": "not valid!"})
+
+    assert given.json() == {"request_id": "abc-123"}
+    assert given.headers["x-request-id"] == "abc-123"
+    assert len(generated.json()["request_id"]) == 32
+    assert generated.headers["x-request-id"] == generated.json()["request_id"]
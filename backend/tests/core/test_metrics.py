@@ -0,0 +1,82 @@
+"""Tests for metric publishing, callback gauges and multiprocess mode."""
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge
+
+from app.core import metrics
+from app.core.metrics import ExecutorCall, gauge_callback, refresh_gauges
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def sample(name: str, labels: dict | None = None) -> float:
+    """Current value of a series in the default registry (0 if absent)."""
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def test_callback_gauge_is_read_when_refreshed():
+    """Test that callback gauges take their owner's values and drop series that disappeared."""
+    registry = CollectorRegistry()
+    gauge = Gauge("pool_depth", "Depth", ("pool",), registry=registry)
+    depth = {("a",): 1, ("b",): 2}
+    gauge_callback(gauge, lambda: dict(depth))
+    try:
+        refresh_gauges()
+        depth[("a",)] = 7
+        del depth[("b",)]
+        refresh_gauges()
+    finally:
+        metrics._gauge_callbacks.pop(gauge)
+
+    assert registry.get_sample_value("pool_depth", {"pool": "a"}) == 7
+    assert registry.get_sample_value("pool_depth", {"pool": "b"}) == 0
+
+
+def test_multiprocess_sums_workers_and_drops_dead_gauges(tmp_path):
+    """Test that counters add up across workers and exited workers' live gauges are removed."""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def run(code: str) -> str:
+        return subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+
+    worker = (
+        "import os\nfrom app.core.metrics import EVENT_LOOP_STALLS, DB_WRITE_QUEUE_DEPTH\n"
+        "EVENT_LOOP_STALLS.inc()\nDB_WRITE_QUEUE_DEPTH.set(3)\nprint(os.getpid())"
+    )
+    run(worker)
+    second = run(worker).strip()
+    # The second worker removed the exited first one's gauges when it started
+    assert [path.name for path in tmp_path.glob("gauge_livesum_*.db")] == [f"gauge_livesum_{second}.db"]
+
+    text = run("import sys\nfrom app.core.metrics import render_metrics\nsys.stdout.write(render_metrics().decode())")
+
+    assert "event_loop_stalls_total 2.0" in text
+    assert "db_write_queue_depth 0.0" in text
+    assert not (tmp_path / f"gauge_livesum_{second}.db").exists()
+
+
+@pytest.mark.asyncio
+async def test_executor_call_counts_until_finished():
+    """Test that executor calls are counted while queued or running, and discarded if cancelled unstarted."""
+    labels = {"executor": "test"}
+    loop = asyncio.get_running_loop()
+
+    tracked = ExecutorCall("test", lambda: sample("executor_calls_in_flight", labels))
+    future = loop.run_in_executor(None, tracked)
+    future.add_done_callback(tracked.discard_if_cancelled)
+    assert await future == 1.0
+    assert sample("executor_calls_in_flight", labels) == 0
+
+    unstarted = ExecutorCall("test", lambda: None)
+    cancelled = loop.create_future()
+    cancelled.add_done_callback(unstarted.discard_if_cancelled)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    assert sample("executor_calls_in_flight", labels) == 0
@@ -0,0 +1,130 @@
+"""Tests for span-based tracing, its exporter and the tracing middleware."""
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+import app.core.tracing as tracing
+from app.core.tracing import Tracer, install_log_correlation, parse_traceparent, traced
+from app.middleware.tracing import TracingMiddleware
+
+
+@pytest.fixture
+def tracer(test_settings, tmp_path, monkeypatch):
+    """Tracer recording every trace to a file, installed as the process-wide tracer."""
+    settings = test_settings.model_copy(
+        update={
+            "tracing_enabled": True,
+            "tracing_sample_ratio": 1.0,
+            "tracing_exporter": "file",
+            "tracing_file_path": str(tmp_path / "traces.jsonl"),
+        }
+    )
+    tracer = Tracer(settings)
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    yield tracer
+    tracer.shutdown()
+
+
+def exported_spans(tracer) -> list[dict]:
+    """Flush the exporter and read back the exported spans."""
+    tracer.shutdown()
+    if not tracer.exporter.path.exists():
+        return []
+    return [json.loads(line) for line in tracer.exporter.path.read_text().splitlines()]
+
+
+class TestSpans:
+    """Tests for span nesting, sampling and export."""
+
+    @pytest.mark.asyncio
+    async def test_child_spans_share_trace_and_link_to_parent(self, tracer):
+        """Test that nested spans (including decorated coroutines) form one trace."""
+
+        @traced("child")
+        async def child():
+            return 1
+
+        with tracer.span("root", route="/x"):
+            await child()
+
+        spans = {span["name"]: span for span in exported_spans(tracer)}
+        assert spans["child"]["trace_id"] == spans["root"]["trace_id"]
+        assert spans["child"]["parent_span_id"] == spans["root"]["span_id"]
+        assert spans["root"]["parent_span_id"] is None
+        assert spans["root"]["attributes"] == {"route": "/x"}
+
+    def test_exception_marks_span_failed(self, tracer):
+        """Test that an exception leaving a span is recorded on it."""
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("bad input")
+
+        (span,) = exported_spans(tracer)
+        assert span["status"] == "error"
+        assert span["attributes"]["exception.type"] == "ValueError"
+
+    def test_unsampled_trace_is_not_exported(self, tracer):
+        """Test that spans of an unsampled trace keep a trace ID but are not exported."""
+        tracer.sample_ratio = 0.0
+
+        with tracer.span("root") as root:
+            with tracer.span("child") as child:
+                pass
+
+        assert not root.sampled and not child.sampled
+        assert child.trace_id == root.trace_id
+        assert exported_spans(tracer) == []
+
+    def test_incoming_traceparent_is_continued(self, tracer):
+        """Test that a root span continues the caller's trace, sampled by sample_ratio unless trusted."""
+        tracer.sample_ratio = 0.0
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+        with tracer.span("root", traceparent=header) as root:
+            pass
+        tracer.trust_traceparent = True
+        with tracer.span("root", traceparent=header) as trusted:
+            pass
+
+        assert not root.sampled
+        assert root.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert root.parent_id == "00f067aa0ba902b7"
+        assert trusted.sampled
+        assert parse_traceparent("00-zz-00f067aa0ba902b7-01") is None
+
+
+def test_log_records_carry_trace_id(tracer, caplog):
+    """Test that log records emitted inside a span carry its trace and span IDs."""
+    install_log_correlation()
+
+    with caplog.at_level(logging.INFO):
+        with tracer.span("root") as root:
+            logging.getLogger("test").info("inside")
+        logging.getLogger("test").info("outside")
+
+    inside, outside = caplog.records
+    assert inside.trace_id == root.trace_id and inside.span_id == root.span_id
+    assert outside.trace_id == ""
+
+
+@pytest.mark.asyncio
+async def test_middleware_names_span_by_route_and_returns_traceparent(tracer):
+    """Test that each request is a server span named after its route template."""
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/items/1")
+
+    (span,) = exported_spans(tracer)
+    assert span["name"] == "GET /items/{item_id}"
+    assert span["attributes"]["http.status_code"] == 200
+    assert response.headers["traceparent"] == f"00-{span['trace_id']}-{span['span_id']}-01"
@@ -302,10 +302,13 @@ class TestInitDbWithMigrations:
             assert len(migrations) == 1
 
     @pytest.mark.asyncio
-    async def test_init_db_runs_self_healing_seeding_on_restart(self, test_engine: AsyncEngine, monkeypatch):
-        """Test that init_db runs seeding on every restart for self-healing."""
+    async def test_init_db_runs_self_healing_seeding_on_restart(
+        self, test_engine: AsyncEngine, test_settings, monkeypatch
+    ):
+        """Test that init_db runs seeding on every restart when reseed_on_startup is set."""
         import app.db.database
 
+        monkeypatch.setattr(test_settings, "database_reseed_on_startup", True)
         monkeypatch.setattr(app.db.database, "_engine", None)
         monkeypatch.setattr(app.db.database, "_async_session_factory", None)
         monkeypatch.setattr(app.db.database, "create_engine", lambda: test_engine)
@@ -331,6 +334,32 @@ class TestInitDbWithMigrations:
         await init_db()
         assert len(seed_calls) == 2  # Called twice: initial + self-healing
 
+    @pytest.mark.asyncio
+    async def test_init_db_skips_seeding_on_restart_by_default(
+        self, test_engine: AsyncEngine, test_settings, monkeypatch
+    ):
+        """Test that an initialized database is not re-seeded unless asked."""
+        import app.db.database
+
+        monkeypatch.setattr(test_settings, "database_reseed_on_startup", False)
+        monkeypatch.setattr(app.db.database, "_engine", None)
+        monkeypatch.setattr(app.db.database, "_async_session_factory", None)
+        monkeypatch.setattr(app.db.database, "create_engine", lambda: test_engine)
+
+        seed_calls = []
+
+        async def mock_seed_database(session):
+            seed_calls.append(1)
+
+        monkeypatch.setattr("app.db.seed.seed_database", mock_seed_database)
+
+        await init_db()
+        monkeypatch.setattr(app.db.database, "_engine", None)
+        monkeypatch.setattr(app.db.database, "_async_session_factory", None)
+        await init_db()
+
+        assert len(seed_calls) == 1
+
     @pytest.mark.asyncio
     async def test_init_db_preserves_existing_data(self, test_engine: AsyncEngine, monkeypatch):
         """Test that init_db preserves existing data on restart."""
@@ -506,14 +535,16 @@ class TestInitDbWithMigrations:
             assert migrations[0].version == "001_initial_schema"
 
     @pytest.mark.asyncio
-    async def test_init_db_self_healing_admin_user(self, test_engine: AsyncEngine, monkeypatch):
+    async def test_init_db_self_healing_admin_user(self, test_engine: AsyncEngine, test_settings, monkeypatch):
         """Test that init_db re-creates admin user if deleted (self-healing).
 
-        Regression test for: seeding should run on every startup for self-healing.
+        Regression test for: seeding should run on every startup for self-healing
+        (when database.reseed_on_startup is set).
         """
         import app.db.database
         from sqlalchemy.ext.asyncio import async_sessionmaker
 
+        monkeypatch.setattr(test_settings, "database_reseed_on_startup", True)
         monkeypatch.setattr(app.db.database, "_engine", None)
         monkeypatch.setattr(app.db.database, "_async_session_factory", None)
         monkeypatch.setattr(app.db.database, "create_engine", lambda: test_engine)
@@ -888,7 +919,7 @@ class TestAlembicCLI:
             # Verify we're at the latest revision
             result = conn.execute(text("SELECT version_num FROM alembic_version"))
             version = result.scalar()
-            assert version == "71d4b833ee76", f"Should be at latest revision, got {version}"
+            assert version == "f5c9d2e7a384", f"Should be at latest revision, got {version}"
 
         engine.dispose()
 
@@ -928,10 +959,10 @@ class TestAlembicCLI:
         with engine.connect() as conn:
             result = conn.execute(text("SELECT version_num FROM alembic_version"))
             version = result.scalar()
-            assert version == "71d4b833ee76", "Should be at latest revision"
+            assert version == "f5c9d2e7a384", "Should be at latest revision"
 
-        # Downgrade one step (remove user_id migration)
-        command.downgrade(alembic_cfg, "-1")
+        # Downgrade to the base revision (remove user_id migrations)
+        command.downgrade(alembic_cfg, "000_initial_schema")
 
         with engine.connect() as conn:
             result = conn.execute(text("SELECT version_num FROM alembic_version"))
@@ -1016,7 +1047,7 @@ class TestAlembicCLI:
             # Verify Alembic tracking prevents re-running
             result = conn.execute(text("SELECT version_num FROM alembic_version"))
             version = result.scalar()
-            assert version == "71d4b833ee76", "Should be at latest revision"
+            assert version == "f5c9d2e7a384", "Should be at latest revision"
 
 
 class TestLegacySchemaDetectionAndStamping:
@@ -1264,7 +1295,7 @@ class TestLegacySchemaDetectionAndStamping:
             result = await conn.execute(text("SELECT version_num FROM alembic_version"))
             version = result.scalar()
             # Should be at latest revision after migrations ran
-            assert version == "71d4b833ee76", f"Should be at latest revision, got: {version}"
+            assert version == "f5c9d2e7a384", f"Should be at latest revision, got: {version}"
 
             # Verify sessions table was upgraded with user_id column
             result = await conn.execute(text("PRAGMA table_info(sessions)"))
@@ -1272,6 +1303,11 @@ class TestLegacySchemaDetectionAndStamping:
             column_names = [col[1] for col in columns]
             assert "user_id" in column_names, "sessions should have user_id after migration"
 
+            # Verify processed_images got the denormalized owner column
+            result = await conn.execute(text("PRAGMA table_info(processed_images)"))
+            column_names = [col[1] for col in result.fetchall()]
+            assert "user_id" in column_names, "processed_images should have user_id after migration"
+
         await legacy_engine.dispose()
 
     @pytest.mark.asyncio
@@ -1306,23 +1342,48 @@ class TestLegacySchemaDetectionAndStamping:
         # The full verification that it uses the correct database is done in
         # test_init_db_upgrades_legacy_database which uses file-based databases
 
+    @pytest.mark.asyncio
+    async def test_run_alembic_migrations_skips_database_at_head(self, tmp_path, monkeypatch):
+        """Test that an up-to-date database does not run the Alembic upgrade again."""
+        from alembic import command
+        from app.db.database import get_alembic_revisions, run_alembic_migrations
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'head.db'}")
+        try:
+            assert await get_alembic_revisions(engine) == set()
+            await run_alembic_migrations(engine)
+            assert len(await get_alembic_revisions(engine)) == 1
+
+            upgrades = []
+            monkeypatch.setattr(command, "upgrade", lambda *args: upgrades.append(args))
+            await run_alembic_migrations(engine)
+            assert upgrades == []
+
+            # A database behind head is upgraded
+            async with engine.begin() as conn:
+                await conn.execute(text("UPDATE alembic_version SET version_num = '000_initial_schema'"))
+            await run_alembic_migrations(engine)
+            assert len(upgrades) == 1
+        finally:
+            await engine.dispose()
+
     @pytest.mark.asyncio
     async def test_stamp_alembic_version_validates_sqlite_dialect(self, empty_test_engine: AsyncEngine, monkeypatch):
-        """Test that stamp_alembic_version raises ValueError for non-SQLite databases."""
+        """Test that stamp_alembic_version raises ValueError for unsupported databases."""
         from app.db.database import stamp_alembic_version
 
-        # Mock the dialect to simulate a non-SQLite database
+        # Mock the dialect to simulate an unsupported database
         class MockDialect:
-            name = "postgresql"
+            name = "mysql"
 
         monkeypatch.setattr(empty_test_engine, "dialect", MockDialect())
 
-        # Should raise ValueError for non-SQLite database
+        # Should raise ValueError for unsupported database
         with pytest.raises(ValueError) as exc_info:
             await stamp_alembic_version(empty_test_engine, "000_initial_schema")
 
         assert "only supports SQLite" in str(exc_info.value)
-        assert "postgresql" in str(exc_info.value)
+        assert "mysql" in str(exc_info.value)
 
     @pytest.mark.asyncio
     async def test_run_alembic_migrations_validates_sqlite_dialect(self, empty_test_engine: AsyncEngine, monkeypatch):
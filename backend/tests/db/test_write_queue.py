@@ -0,0 +1,132 @@
+"""Tests for the group-commit writer queue."""
+import asyncio
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.db.models import User
+from app.db.write_queue import GroupCommitWriter, WriteQueueError, run_write
+
+
+def _make_user_unit(name: str):
+    """Build a mutation unit that inserts a user with the given name."""
+
+    async def unit(db: AsyncSession) -> User:
+        user = User(
+            username=name,
+            email=f"{name}@example.com",
+            full_name=name.title(),
+            hashed_password="x",
+        )
+        db.add(user)
+        await db.flush()
+        return user
+
+    return unit
+
+
+@pytest.fixture
+def session_factory(test_engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """Session factory bound to the in-memory test engine."""
+    return async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _count_users(factory: async_sessionmaker[AsyncSession]) -> int:
+    async with factory() as db:
+        return (await db.execute(select(func.count(User.id)))).scalar()
+
+
+@pytest.mark.asyncio
+class TestGroupCommitWriter:
+    """Tests for GroupCommitWriter."""
+
+    async def test_commits_concurrent_units_in_groups(self, session_factory):
+        """Concurrent submissions share commits and each caller gets its own result."""
+        writer = GroupCommitWriter(session_factory, max_batch=16, max_delay_ms=20)
+        writer.start()
+
+        users = await asyncio.gather(
+            *(writer.submit(_make_user_unit(f"user{i}")) for i in range(20))
+        )
+        await writer.stop()
+
+        assert [u.username for u in users] == [f"user{i}" for i in range(20)]
+        assert all(u.id is not None for u in users)
+        assert writer.units_committed == 20
+        assert writer.groups_committed < 20
+        assert await _count_users(session_factory) == 20
+
+    async def test_failing_unit_only_affects_its_caller(self, session_factory):
+        """A unit that raises is reported to its caller; the rest of the group commits."""
+        writer = GroupCommitWriter(session_factory, max_batch=16, max_delay_ms=20)
+        writer.start()
+
+        results = await asyncio.gather(
+            writer.submit(_make_user_unit("alice")),
+            writer.submit(_make_user_unit("alice")),  # duplicate username
+            writer.submit(_make_user_unit("bob")),
+            return_exceptions=True,
+        )
+        await writer.stop()
+
+        assert results[0].username == "alice"
+        assert isinstance(results[1], IntegrityError)
+        assert results[2].username == "bob"
+        assert writer.units_failed == 1
+        assert await _count_users(session_factory) == 2
+
+    async def test_failed_commit_keeps_no_unit(self, session_factory):
+        """Units share the group's transaction: released savepoints are not committed on their own."""
+
+        async def fail_commit(db: AsyncSession) -> None:
+            def boom(session) -> None:
+                if not session.in_nested_transaction():
+                    raise RuntimeError("commit failed")
+
+            event.listen(db.sync_session, "before_commit", boom)
+
+        writer = GroupCommitWriter(session_factory, max_batch=16, max_delay_ms=20)
+        writer.start()
+
+        results = await asyncio.gather(
+            writer.submit(_make_user_unit("alice")),
+            writer.submit(fail_commit),
+            return_exceptions=True,
+        )
+        await writer.stop()
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await _count_users(session_factory) == 0
+
+    async def test_submit_requires_running_writer(self, session_factory):
+        """Submitting to a stopped writer raises WriteQueueError."""
+        writer = GroupCommitWriter(session_factory)
+
+        with pytest.raises(WriteQueueError):
+            await writer.submit(_make_user_unit("nobody"))
+
+
+@pytest.mark.asyncio
+class TestRunWrite:
+    """Tests for run_write without a running queue."""
+
+    async def test_commits_on_caller_session(self, db_session, session_factory):
+        """Without the queue, the unit runs and commits on the caller's session."""
+        user = await run_write(db_session, _make_user_unit("direct"))
+
+        assert user.id is not None
+        assert await _count_users(session_factory) == 1
+
+    async def test_rolls_back_on_error(self, db_session, session_factory):
+        """Errors roll back the caller's session and propagate."""
+
+        async def failing(db: AsyncSession) -> None:
+            await _make_user_unit("partial")(db)
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await run_write(db_session, failing)
+
+        assert await _count_users(session_factory) == 0
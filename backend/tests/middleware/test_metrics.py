@@ -0,0 +1,46 @@
+"""Tests for the request metrics middleware and the /metrics endpoint."""
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from app.middleware.metrics import MetricsMiddleware
+
+
+def requests_total(route: str, status: str) -> float:
+    """Requests counted for a GET route and status."""
+    labels = {"method": "GET", "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_counted_by_route_template():
+    """Test that requests are labelled with the route template, not the raw path."""
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    before = requests_total("/items/{item_id}", "200"), requests_total("unmatched", "404")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/missing")
+
+    assert requests_total("/items/{item_id}", "200") - before[0] == 2
+    assert requests_total("unmatched", "404") - before[1] == 1
+
+
+def test_metrics_endpoint(client):
+    """Test that GET /metrics serves the Prometheus text format."""
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert '# TYPE http_requests_total counter' in response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in response.text
@@ -0,0 +1,232 @@
+"""Tests for the token-bucket rate limiting middleware."""
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.security import create_access_token
+from app.middleware.rate_limit import (
+    MemoryBucketStore,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RedisBucketStore,
+)
+from tests.mocks.resp_server import MockRespServer
+
+
+def _token_bucket_script(server, keys, args):
+    """Python equivalent of RedisBucketStore.SCRIPT for the RESP stand-in."""
+    capacity, rate, now = float(args[0]), float(args[1]), float(args[2])
+    state = server.data.setdefault(keys[0], {})
+    tokens = state.get("t", capacity)
+    updated = state.get("u", now)
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    allowed = 0
+    if tokens >= 1:
+        tokens -= 1
+        allowed = 1
+    state["t"], state["u"] = tokens, now
+    return [allowed, repr(tokens)]
+
+
+def _make_app(test_settings, monkeypatch, store=None, **limits) -> FastAPI:
+    """Build a minimal app with one route per category behind the middleware."""
+    monkeypatch.setattr(test_settings, "rate_limit_enabled", True)
+    for category in ("models", "restore", "auth"):
+        monkeypatch.setattr(test_settings, f"rate_limit_{category}", limits.get(category, "2/minute"))
+
+    app = FastAPI()
+
+    @app.get("/api/v1/models")
+    async def models():
+        return {"ok": True}
+
+    @app.post("/api/v1/restore")
+    async def restore():
+        return {"ok": True}
+
+    @app.get("/api/v1/restore/history")
+    async def history():
+        return {"ok": True}
+
+    @app.post("/api/v1/auth/login")
+    async def login():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, settings=test_settings, store=store)
+    return app
+
+
+def _client(app: FastAPI, ip: str = "10.0.0.1") -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app, client=(ip, 1234)), base_url="http://test")
+
+
+class TestRateLimitRule:
+    """Tests for limit parsing."""
+
+    def test_parse(self):
+        """Test that limits parse into capacity and refill rate."""
+        rule = RateLimitRule.parse("10/minute")
+
+        assert rule.limit == 10
+        assert rule.period == 60
+        assert rule.rate == pytest.approx(10 / 60)
+        assert RateLimitRule.parse(" 5 / seconds ").period == 1
+
+    @pytest.mark.parametrize("text", ["", "10", "0/minute", "10/fortnight", "-1/second"])
+    def test_parse_rejects_invalid(self, text):
+        """Test that malformed limits are rejected."""
+        with pytest.raises(ValueError):
+            RateLimitRule.parse(text)
+
+
+class TestMemoryBucketStore:
+    """Tests for the in-process token bucket store."""
+
+    def test_burst_then_refill(self):
+        """Test that a bucket allows a burst of `limit` and refills at limit/period."""
+        store = MemoryBucketStore()
+        rule = RateLimitRule.parse("2/minute")
+
+        assert store.hit_now("k", rule, 0.0).allowed
+        assert store.hit_now("k", rule, 0.0).allowed
+        denied = store.hit_now("k", rule, 0.0)
+        assert not denied.allowed
+        assert denied.remaining == 0
+        assert denied.retry_after == pytest.approx(30.0)
+
+        # One token refills after period / limit seconds
+        assert store.hit_now("k", rule, 30.0).allowed
+        assert not store.hit_now("k", rule, 30.0).allowed
+
+    def test_refilled_buckets_are_evicted(self):
+        """Test that idle buckets which have refilled completely are dropped."""
+        store = MemoryBucketStore()
+        rule = RateLimitRule.parse("1/second")
+
+        store.hit_now("idle", rule, 0.0)
+        store.hit_now("active", rule, 5.0)
+
+        assert len(store) == 1
+
+    def test_memory_is_bounded(self):
+        """Test that the store never holds more than max_entries buckets."""
+        store = MemoryBucketStore(max_entries=100)
+        rule = RateLimitRule.parse("10/hour")
+
+        for i in range(1000):
+            store.hit_now(f"client-{i}", rule, 0.0)
+
+        assert len(store) == 100
+
+
+@pytest.mark.asyncio
+class TestRateLimitMiddleware:
+    """Tests for the ASGI middleware."""
+
+    async def test_headers_and_429(self, test_settings, monkeypatch):
+        """Test X-RateLimit headers and the 429 response with Retry-After."""
+        app = _make_app(test_settings, monkeypatch)
+
+        async with _client(app) as client:
+            first = await client.post("/api/v1/restore")
+            second = await client.post("/api/v1/restore")
+            third = await client.post("/api/v1/restore")
+
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Limit"] == "2"
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert int(first.headers["X-RateLimit-Reset"]) == 30
+        assert second.headers["X-RateLimit-Remaining"] == "0"
+
+        assert third.status_code == 429
+        assert third.headers["Retry-After"] == "30"
+        assert third.headers["X-RateLimit-Remaining"] == "0"
+        assert "Rate limit exceeded for restore" in third.json()["detail"]
+
+    async def test_categories_are_independent(self, test_settings, monkeypatch):
+        """Test that each category has its own bucket and limit."""
+        app = _make_app(test_settings, monkeypatch, models="5/minute", restore="1/minute")
+
+        async with _client(app) as client:
+            assert (await client.post("/api/v1/restore")).status_code == 200
+            assert (await client.post("/api/v1/restore")).status_code == 429
+            response = await client.get("/api/v1/models")
+
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Limit"] == "5"
+
+    async def test_uncategorized_routes_are_not_limited(self, test_settings, monkeypatch):
+        """Test that routes outside the categories pass through untouched."""
+        app = _make_app(test_settings, monkeypatch, restore="1/minute")
+
+        async with _client(app) as client:
+            for _ in range(3):
+                response = await client.get("/api/v1/restore/history")
+                assert response.status_code == 200
+                assert "X-RateLimit-Limit" not in response.headers
+
+    async def test_per_ip_and_per_user_buckets(self, test_settings, monkeypatch):
+        """Test that clients are keyed by user when authenticated, otherwise by IP."""
+        app = _make_app(test_settings, monkeypatch, models="1/minute")
+        token = create_access_token({"sub": "alice", "user_id": 42})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async with _client(app, ip="10.0.0.1") as first_ip, _client(app, ip="10.0.0.2") as second_ip:
+            assert (await first_ip.get("/api/v1/models")).status_code == 200
+            assert (await first_ip.get("/api/v1/models")).status_code == 429
+            assert (await second_ip.get("/api/v1/models")).status_code == 200
+
+            # The same user is limited across IP addresses
+            assert (await first_ip.get("/api/v1/models", headers=headers)).status_code == 200
+            assert (await second_ip.get("/api/v1/models", headers=headers)).status_code == 429
+
+    async def test_disabled_passes_through(self, test_settings, monkeypatch):
+        """Test that nothing is limited when rate limiting is disabled."""
+        app = _make_app(test_settings, monkeypatch, auth="1/minute")
+        monkeypatch.setattr(test_settings, "rate_limit_enabled", False)
+
+        async with _client(app) as client:
+            for _ in range(3):
+                response = await client.post("/api/v1/auth/login")
+                assert response.status_code == 200
+                assert "X-RateLimit-Limit" not in response.headers
+
+
+@pytest.mark.asyncio
+class TestRedisBucketStore:
+    """Tests for the shared Redis-protocol bucket store."""
+
+    @pytest.fixture
+    async def resp_server(self):
+        server = MockRespServer()
+        server.register_script(RedisBucketStore.SCRIPT, _token_bucket_script)
+        await server.start()
+        yield server
+        await server.stop()
+
+    async def test_workers_share_buckets(self, resp_server):
+        """Test that two stores (worker processes) draw from the same bucket."""
+        rule = RateLimitRule.parse("2/minute")
+        worker_a = RedisBucketStore(resp_server.url)
+        worker_b = RedisBucketStore(resp_server.url)
+
+        assert (await worker_a.hit("restore:ip:1", rule)).allowed
+        assert (await worker_b.hit("restore:ip:1", rule)).allowed
+        result = await worker_a.hit("restore:ip:1", rule)
+
+        assert not result.allowed
+        assert result.retry_after > 0
+        # First call per connection falls back from EVALSHA to EVAL
+        assert [c[0] for c in resp_server.commands[:2]] == [b"EVALSHA", b"EVAL"]
+
+        await worker_a.close()
+        await worker_b.close()
+
+    async def test_fails_open_when_unreachable(self):
+        """Test that an unreachable store allows requests instead of failing them."""
+        store = RedisBucketStore("redis://127.0.0.1:1/0")
+
+        result = await store.hit("restore:ip:1", RateLimitRule.parse("1/minute"))
+
+        assert result.allowed
+        await store.close()
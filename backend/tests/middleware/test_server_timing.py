@@ -0,0 +1,99 @@
+"""Tests for the Server-Timing response header."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+import app.middleware.server_timing as server_timing_middleware
+from app.core import server_timing
+from app.core.security import authenticate_user, get_current_user_validated, get_password_hash
+from app.db.models import Session, User
+from app.middleware.server_timing import ServerTimingMiddleware
+
+
+@pytest.fixture
+def timed_app(test_settings, monkeypatch):
+    """App with one timed route under /api/v1/restore and one untimed route."""
+
+    def use_settings(**update):
+        settings = test_settings.model_copy(update={"server_timing_enabled": True, **update})
+        monkeypatch.setattr(server_timing_middleware, "get_settings", lambda: settings)
+
+    use_settings()
+    app = FastAPI()
+
+    @app.get("/api/v1/restore/history")
+    async def history():
+        with server_timing.measure("db"):
+            pass
+        server_timing.record("db", 0.002)
+        server_timing.record("provider", 0.5)
+        return {}
+
+    @app.get("/health")
+    async def health():
+        server_timing.record("db", 0.5)
+        return {}
+
+    app.add_middleware(ServerTimingMiddleware)
+    app.state.use_settings = use_settings
+    return app
+
+
+@pytest.mark.asyncio
+async def test_entries_are_summed_and_ordered(timed_app):
+    """Test that durations recorded under one name add up and total comes last."""
+    async with AsyncClient(transport=ASGITransport(app=timed_app), base_url="http://test") as client:
+        timed = await client.get("/api/v1/restore/history")
+        untimed = await client.get("/health")
+
+    entries = [entry.split(";dur=") for entry in timed.headers["server-timing"].split(", ")]
+    assert [name for name, _ in entries] == ["db", "provider", "total"]
+    assert float(entries[0][1]) >= 2.0
+    assert entries[1][1] == "500.0"
+    assert "server-timing" not in untimed.headers
+
+
+@pytest.mark.asyncio
+async def test_excluded_entries_are_left_out(timed_app):
+    """Test that server_timing.exclude removes entries from the header."""
+    timed_app.state.use_settings(server_timing_exclude=["provider", "total"])
+
+    async with AsyncClient(transport=ASGITransport(app=timed_app), base_url="http://test") as client:
+        response = await client.get("/api/v1/restore/history")
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert "provider" not in response.headers["server-timing"]
+    assert "total" not in response.headers["server-timing"]
+
+
+def test_auth_endpoint_reports_auth_time(client):
+    """Test that token validation time is reported on the auth endpoints."""
+    response = client.get("/api/v1/auth/me", headers={"Authorization": "Bearer not-a-token"})
+
+    assert response.status_code == 401
+    assert "auth;dur=" in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_auth_excludes_database_lookups(db_session):
+    """Test that auth covers password checks but not the user and session lookups (counted under db)."""
+    user = User(username="timed", email="timed@example.com", full_name="Timed", hashed_password=get_password_hash("pw"))
+    db_session.add(user)
+    await db_session.flush()
+    db_session.add(Session(user_id=user.id, session_id="timed-session"))
+    await db_session.commit()
+    user_data = {"user_id": user.id, "username": "timed", "session_id": "timed-session"}
+
+    async def timed(call):
+        # In a task of its own, so the timing context does not outlive the call
+        timings = server_timing.start()
+        await call
+        return timings
+
+    validated = await asyncio.create_task(timed(get_current_user_validated()(user_data, db_session)))
+    login = await asyncio.create_task(timed(authenticate_user("timed", "pw", db_session)))
+
+    assert "auth" not in validated
+    assert login["auth"] > 0
@@ -0,0 +1,136 @@
+"""Local stand-in for a Redis-protocol server (sorted-set subset) for testing."""
+import asyncio
+import hashlib
+from typing import Any, Callable
+
+
+class MockRespServer:
+    """
+    Tiny in-process server speaking RESP2.
+
+    Implements only the commands the app's shared-state backends use: ZADD
+    (optionally XX), ZREM, ZCARD, ZREMRANGEBYSCORE, PEXPIRE, SELECT, AUTH,
+    PING, EVAL and EVALSHA. Key expiry is not simulated (PEXPIRE is accepted and ignored).
+
+    There is no Lua interpreter: scripts must be registered with a Python
+    implementation via register_script(). EVALSHA of a script that has not
+    been loaded with EVAL yet answers NOSCRIPT, as Redis does.
+    """
+
+    def __init__(self):
+        self.data: dict[bytes, Any] = {}
+        self.commands: list[list[bytes]] = []
+        self._script_handlers: dict[str, Callable] = {}
+        self._loaded_scripts: set[str] = set()
+        self._server: asyncio.AbstractServer | None = None
+        self.port: int | None = None
+
+    @property
+    def url(self) -> str:
+        """Connection URL for the running server."""
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def start(self) -> None:
+        """Listen on a free local port."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def register_script(self, script: str, handler: Callable) -> None:
+        """
+        Provide the Python equivalent of a Lua script.
+
+        Args:
+            script: Script source as sent by the client
+            handler: Callable(server, keys, args) returning the script's reply
+        """
+        self._script_handlers[hashlib.sha1(script.encode()).hexdigest()] = handler
+
+    @classmethod
+    def _encode_reply(cls, value: Any) -> bytes:
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, (list, tuple)):
+            return b"*%d\r\n" % len(value) + b"".join(cls._encode_reply(v) for v in value)
+        data = value if isinstance(value, bytes) else str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _run_script(self, sha: str, args: list[bytes]) -> bytes:
+        handler = self._script_handlers.get(sha)
+        if handler is None:
+            return b"-ERR no Python handler registered for script\r\n"
+        numkeys = int(args[0])
+        return self._encode_reply(handler(self, args[1 : 1 + numkeys], args[1 + numkeys :]))
+
+    @staticmethod
+    def _score(value: bytes) -> float:
+        # float() understands "-inf"/"+inf" as Redis does
+        return float(value.decode())
+
+    def _execute(self, args: list[bytes]) -> bytes:
+        name = args[0].upper()
+        self.commands.append(args)
+
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"SELECT", b"AUTH"):
+            return b"+OK\r\n"
+        if name == b"ZADD":
+            update_only = args[2].upper() == b"XX"
+            pairs = args[3:] if update_only else args[2:]
+            members = self.data.setdefault(args[1], {})
+            added = 0
+            for score, member in zip(pairs[::2], pairs[1::2]):
+                if update_only and member not in members:
+                    continue
+                added += member not in members
+                members[member] = self._score(score)
+            return b":%d\r\n" % added
+        if name == b"ZREM":
+            members = self.data.get(args[1], {})
+            removed = sum(members.pop(member, None) is not None for member in args[2:])
+            return b":%d\r\n" % removed
+        if name == b"ZCARD":
+            return b":%d\r\n" % len(self.data.get(args[1], {}))
+        if name == b"ZREMRANGEBYSCORE":
+            members = self.data.get(args[1], {})
+            low, high = self._score(args[2]), self._score(args[3])
+            doomed = [m for m, score in members.items() if low <= score <= high]
+            for member in doomed:
+                del members[member]
+            return b":%d\r\n" % len(doomed)
+        if name == b"EVAL":
+            sha = hashlib.sha1(args[1]).hexdigest()
+            self._loaded_scripts.add(sha)
+            return self._run_script(sha, args[2:])
+        if name == b"EVALSHA":
+            sha = args[1].decode()
+            if sha not in self._loaded_scripts:
+                return b"-NOSCRIPT No matching script. Please use EVAL.\r\n"
+            return self._run_script(sha, args[2:])
+        if name == b"PEXPIRE":
+            return b":1\r\n" if args[1] in self.data else b":0\r\n"
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                count = int(header[1:-2])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
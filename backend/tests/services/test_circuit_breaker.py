@@ -0,0 +1,205 @@
+"""Tests for provider and model circuit breakers."""
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.metrics import refresh_gauges
+from app.services import circuit_breaker
+from app.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    classify_failure,
+    select_model,
+)
+from app.services.hf_inference import HFInferenceError, HFModelError, HFModelLoadingError, HFRateLimitError
+from app.services.replicate_inference import ReplicateInferenceError, ReplicateInputError, ReplicateModelError
+
+
+class ModelCatalog:
+    """Minimal stand-in for Settings.get_model_by_id()."""
+
+    def __init__(self, *models: dict):
+        self.models = {model["id"]: model for model in models}
+
+    def get_model_by_id(self, model_id: str) -> dict | None:
+        return self.models.get(model_id)
+
+
+@pytest.fixture
+def registry(test_settings, monkeypatch):
+    """Registry with small thresholds."""
+    monkeypatch.setattr(test_settings, "circuit_breaker_enabled", True)
+    monkeypatch.setattr(test_settings, "circuit_breaker_failure_threshold", 3)
+    monkeypatch.setattr(test_settings, "circuit_breaker_provider_failure_threshold", 5)
+    monkeypatch.setattr(test_settings, "circuit_breaker_recovery_seconds", 30)
+    return CircuitBreakerRegistry(test_settings)
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the threshold of consecutive failures opens the breaker."""
+        breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=30)
+
+        breaker.record_failure("502", now=0)
+        breaker.record_failure("502", now=0)
+        breaker.record_success()
+        breaker.record_failure("502", now=0)
+        breaker.record_failure("502", now=0)
+        assert breaker.current_state(now=1) == CLOSED
+
+        assert breaker.record_failure("502", now=1) is True
+        assert breaker.current_state(now=2) == OPEN
+        assert breaker.allow(now=2) is False
+        assert breaker.retry_after(now=2) == 29
+
+    def test_fatal_failure_opens_immediately(self):
+        """Test that a failure that cannot fix itself skips the threshold."""
+        breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=30)
+
+        breaker.record_failure("410 Gone", fatal=True, now=0)
+        assert breaker.current_state(now=0) == OPEN
+
+    def test_half_open_single_probe(self):
+        """Test that one probe is let through after recovery and decides the state."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30)
+        breaker.record_failure("502", now=0)
+
+        assert breaker.current_state(now=30) == HALF_OPEN
+        assert breaker.allow(now=30) is True
+        assert breaker.allow(now=31) is False
+
+        breaker.record_failure("502", now=32)
+        assert breaker.current_state(now=33) == OPEN
+        assert breaker.allow(now=62) is True
+        breaker.record_success()
+        assert breaker.current_state(now=63) == CLOSED
+        assert breaker.opened == 2
+
+    def test_released_probe_allows_another(self):
+        """Test that a probe which never reached the provider does not block recovery."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30)
+        breaker.record_failure("502", now=0)
+        breaker.allow(now=30)
+
+        breaker.release_probe()
+        assert breaker.allow(now=31) is True
+
+        # An abandoned probe expires after the recovery time
+        assert breaker.allow(now=40) is False
+        assert breaker.allow(now=61) is True
+
+
+class TestClassifyFailure:
+    """Tests for deciding which breaker an error counts against."""
+
+    def test_classification(self):
+        """Test model, provider, fatal and ignored errors."""
+        assert classify_failure(HFRateLimitError("rate limit")) is None
+        assert classify_failure(HFModelError("Model 'x' is not available via Inference API (410)")) == ("model", True)
+        assert classify_failure(HFModelLoadingError("Model 'x' is still loading", retry_after=20.0)) is None
+        assert classify_failure(HFInferenceError("HuggingFace API error: 502")) == ("model", False)
+        assert classify_failure(ReplicateModelError("Invalid Replicate API token")) == ("provider", True)
+
+    def test_caller_errors_are_ignored(self):
+        """Test that input validation failures do not count, but errors raised while handling a ValueError do."""
+        assert classify_failure(ReplicateInputError("Required parameter 'scale' is missing")) is None
+        try:
+            try:
+                raise ValueError("unrelated")
+            except ValueError:
+                raise ReplicateInferenceError("Replicate API error: 502")
+        except ReplicateInferenceError as error:
+            assert classify_failure(error) == ("model", False)
+
+
+class TestRegistry:
+    """Tests for per-model and per-provider breakers."""
+
+    def test_model_failures_do_not_block_other_models(self, registry):
+        """Test that one failing model opens only its own breaker."""
+        for _ in range(3):
+            registry.allow("huggingface", "broken")
+            registry.record_failure("huggingface", "broken", HFInferenceError("502"))
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            registry.allow("huggingface", "broken")
+        assert exc_info.value.scope == "model"
+        assert exc_info.value.retry_after > 0
+
+        registry.allow("huggingface", "healthy")
+        assert registry.state("huggingface", "broken") == OPEN
+        assert registry.state("huggingface", "healthy") == CLOSED
+
+    def test_provider_outage_opens_provider(self, registry):
+        """Test that failures across several models open the provider breaker."""
+        for index in range(5):
+            model_id = f"model-{index}"
+            registry.allow("replicate", model_id)
+            registry.record_failure("replicate", model_id, ReplicateInferenceError("timed out"))
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            registry.allow("replicate", "never-called")
+        assert exc_info.value.scope == "provider"
+        assert registry.state("replicate", "never-called") == OPEN
+
+    def test_auth_error_opens_provider(self, registry):
+        """Test that a rejected API key opens the provider breaker at once."""
+        registry.allow("replicate", "a")
+        registry.record_failure("replicate", "a", ReplicateModelError("Invalid Replicate API token"))
+
+        assert registry.state("replicate", "b") == OPEN
+
+    def test_disabled(self, registry):
+        """Test that a disabled registry never refuses calls."""
+        registry.enabled = False
+        for _ in range(10):
+            registry.allow("huggingface", "m")
+            registry.record_failure("huggingface", "m", HFModelError("410 gone"))
+        assert registry.state("huggingface", "m") == CLOSED
+
+    def test_state_gauge(self, registry, monkeypatch):
+        """Test that breaker states are exported when metrics are published."""
+        monkeypatch.setattr(circuit_breaker, "_registry", registry)
+        registry.allow("huggingface", "ok")
+        registry.record_failure("huggingface", "gone", HFModelError("410 gone"))
+
+        refresh_gauges()
+
+        def state(scope: str, name: str) -> float | None:
+            return REGISTRY.get_sample_value("circuit_breaker_state", {"scope": scope, "name": name})
+
+        assert state("model", "gone") == 2
+        assert state("model", "ok") == 0
+        assert state("provider", "huggingface") == 0
+
+
+class TestSelectModel:
+    """Tests for fallback routing."""
+
+    PRIMARY = {"id": "primary", "provider": "replicate", "category": "restore", "fallback_model": "backup"}
+    BACKUP = {"id": "backup", "provider": "huggingface", "category": "restore"}
+
+    def test_uses_fallback_while_open(self, registry):
+        """Test that an open model routes to its fallback in the same category."""
+        catalog = ModelCatalog(self.PRIMARY, self.BACKUP)
+        assert select_model(registry, catalog, self.PRIMARY)["id"] == "primary"
+
+        registry.record_failure("replicate", "primary", ReplicateModelError("Model not found on Replicate"))
+        assert select_model(registry, catalog, self.PRIMARY)["id"] == "backup"
+
+    def test_fails_fast_without_usable_fallback(self, registry):
+        """Test that a fallback in another category, or itself open, is not used."""
+        other_category = dict(self.BACKUP, category="upscale")
+        registry.record_failure("replicate", "primary", ReplicateModelError("Model not found on Replicate"))
+
+        with pytest.raises(CircuitOpenError):
+            select_model(registry, ModelCatalog(self.PRIMARY, other_category), self.PRIMARY)
+
+        registry.record_failure("huggingface", "backup", HFModelError("410 gone"))
+        with pytest.raises(CircuitOpenError):
+            select_model(registry, ModelCatalog(self.PRIMARY, self.BACKUP), self.PRIMARY)
@@ -0,0 +1,160 @@
+"""Tests for the lease-based concurrency limiter backends."""
+import asyncio
+
+import pytest
+
+from app.services.concurrency_limiter import (
+    ConcurrencyLimiterError,
+    ConcurrencyLimitExceeded,
+    MemoryConcurrencyLimiter,
+    RedisConcurrencyLimiter,
+    SQLiteConcurrencyLimiter,
+    create_concurrency_limiter,
+)
+from tests.mocks.resp_server import MockRespServer
+
+
+@pytest.fixture
+async def resp_server():
+    """Run a local Redis-protocol stand-in."""
+    server = MockRespServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+async def make_limiter(request, tmp_path, resp_server):
+    """Factory building limiters of each backend; all instances share state where the backend does."""
+    created = []
+
+    def _make(ttl_seconds: float = 60):
+        if request.param == "memory":
+            limiter = MemoryConcurrencyLimiter(ttl_seconds)
+        elif request.param == "sqlite":
+            limiter = SQLiteConcurrencyLimiter(ttl_seconds, tmp_path / "leases.db")
+        else:
+            limiter = RedisConcurrencyLimiter(ttl_seconds, resp_server.url)
+        created.append(limiter)
+        return limiter
+
+    _make.backend = request.param
+    yield _make
+
+    for limiter in created:
+        await limiter.close()
+
+
+class TestConcurrencyLimiter:
+    """Behaviour shared by every backend."""
+
+    @pytest.mark.asyncio
+    async def test_limit_and_release(self, make_limiter):
+        """Test that a full key rejects until a lease is released."""
+        limiter = make_limiter()
+        limits = [("session", "session:a", 2)]
+
+        first = await limiter.acquire(limits)
+        await limiter.acquire(limits)
+        with pytest.raises(ConcurrencyLimitExceeded) as exc_info:
+            await limiter.acquire(limits)
+        assert exc_info.value.scope == "session"
+        assert exc_info.value.limit == 2
+
+        await limiter.release(first)
+        await limiter.acquire(limits)
+
+    @pytest.mark.asyncio
+    async def test_user_limit_spans_sessions(self, make_limiter, test_settings, monkeypatch):
+        """Test that one user cannot bypass the limit with several sessions."""
+        monkeypatch.setattr(test_settings, "max_concurrent_uploads_per_session", 3)
+        monkeypatch.setattr(test_settings, "max_concurrent_uploads_per_user", 2)
+        limiter = make_limiter()
+
+        await limiter.acquire_upload("s1", 7, test_settings)
+        await limiter.acquire_upload("s2", 7, test_settings)
+        with pytest.raises(ConcurrencyLimitExceeded) as exc_info:
+            await limiter.acquire_upload("s3", 7, test_settings)
+        assert exc_info.value.scope == "user"
+
+        # The rejected request must not hold a session slot
+        for other_user in (8, 9, 10):
+            await limiter.acquire_upload("s3", other_user, test_settings)
+
+    @pytest.mark.asyncio
+    async def test_leaked_lease_expires(self, make_limiter):
+        """Test that a lease which is never released frees its slot after the TTL."""
+        limiter = make_limiter(ttl_seconds=0.05)
+        limits = [("session", "session:a", 1)]
+
+        await limiter.acquire(limits)
+        with pytest.raises(ConcurrencyLimitExceeded):
+            await limiter.acquire(limits)
+
+        await asyncio.sleep(0.1)
+        await limiter.acquire(limits)
+
+    @pytest.mark.asyncio
+    async def test_held_lease_is_renewed(self, make_limiter):
+        """Test that a lease held longer than the TTL keeps its slot until released."""
+        limiter = make_limiter(ttl_seconds=0.15)
+        limits = [("session", "session:a", 1)]
+
+        lease = await limiter.acquire(limits)
+        await asyncio.sleep(0.4)
+        with pytest.raises(ConcurrencyLimitExceeded):
+            await limiter.acquire(limits)
+
+        await limiter.release(lease)
+        await limiter.acquire(limits)
+
+    @pytest.mark.asyncio
+    async def test_zero_limit_is_unlimited(self, make_limiter):
+        """Test that a limit of 0 is not enforced."""
+        limiter = make_limiter()
+
+        for _ in range(5):
+            lease = await limiter.acquire([("user", "user:1", 0)])
+            assert lease.keys == []
+
+    @pytest.mark.asyncio
+    async def test_instances_share_limits(self, make_limiter):
+        """Test that separate limiter instances (worker processes) see each other's leases."""
+        if make_limiter.backend == "memory":
+            pytest.skip("memory backend is per process by design")
+        worker_a = make_limiter()
+        worker_b = make_limiter()
+        limits = [("session", "session:a", 1)]
+
+        lease = await worker_a.acquire(limits)
+        with pytest.raises(ConcurrencyLimitExceeded):
+            await worker_b.acquire(limits)
+
+        await worker_a.release(lease)
+        await worker_b.acquire(limits)
+
+
+class TestBackendSelection:
+    """Tests for backend configuration."""
+
+    def test_creates_configured_backend(self, test_settings, monkeypatch, tmp_path):
+        """Test that concurrency_backend picks the limiter class."""
+        monkeypatch.setattr(test_settings, "concurrency_sqlite_path", tmp_path / "leases.db")
+        expected = {
+            "memory": MemoryConcurrencyLimiter,
+            "sqlite": SQLiteConcurrencyLimiter,
+            "redis": RedisConcurrencyLimiter,
+        }
+        for backend, limiter_class in expected.items():
+            monkeypatch.setattr(test_settings, "concurrency_backend", backend)
+            assert isinstance(create_concurrency_limiter(test_settings), limiter_class)
+
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_raises(self):
+        """Test that a dead server surfaces as ConcurrencyLimiterError."""
+        limiter = RedisConcurrencyLimiter(60, "redis://127.0.0.1:1/0")
+
+        with pytest.raises(ConcurrencyLimiterError):
+            await limiter.acquire([("session", "session:a", 1)])
+
+        await limiter.close()
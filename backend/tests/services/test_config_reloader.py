@@ -0,0 +1,90 @@
+"""Tests for configuration hot reload."""
+import json
+import os
+import shutil
+
+import pytest
+
+from app.core import config
+from app.core.config import get_settings
+from app.services.config_reloader import ConfigReloader, ConfigReloadError
+
+
+@pytest.fixture
+def config_dir(tmp_path, test_settings, monkeypatch):
+    """Copy of the config files, with fresh process-wide components around each reload."""
+    for name in ("default.json", f"{test_settings.app_env}.json"):
+        shutil.copy(config.get_config_dir() / name, tmp_path / name)
+    monkeypatch.setattr("app.core.config.get_config_dir", lambda: tmp_path)
+    monkeypatch.setattr("app.services.config_reloader.get_config_dir", lambda: tmp_path)
+    monkeypatch.setattr(config, "settings", test_settings)
+    for singleton in (
+        "app.services.circuit_breaker._registry",
+        "app.services.provider_governor._governor",
+        "app.services.hedging._policy",
+        "app.services.warm_keeper._warm_keeper",
+    ):
+        monkeypatch.setattr(singleton, None)
+    return tmp_path
+
+
+def edit(path, **sections) -> None:
+    """Merge sections into a JSON config file and give it a new modification time."""
+    data = json.loads(path.read_text())
+    for section, values in sections.items():
+        data[section] = {**data.get(section, {}), **values} if isinstance(values, dict) else values
+    path.write_text(json.dumps(data))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestConfigReloader:
+    """Tests for validating, applying and rejecting configuration changes."""
+
+    def test_reload_swaps_models_and_limits(self, config_dir, test_settings):
+        """Test that a change is applied to new requests while old holders keep their snapshot."""
+        reloader = ConfigReloader(test_settings.app_env)
+        models = json.loads((config_dir / "default.json").read_text())["models"]
+        models[0]["name"] = "Renamed model"
+        edit(
+            config_dir / f"{test_settings.app_env}.json",
+            models=models,
+            api_providers={"replicate": {"max_concurrent_requests": 3}},
+            warm_keeper={"interval_seconds": 600},
+        )
+
+        assert reloader.check() is True
+
+        current = get_settings()
+        assert current is not test_settings
+        assert current.get_model_by_id(models[0]["id"])["name"] == "Renamed model"
+        assert test_settings.get_model_by_id(models[0]["id"])["name"] != "Renamed model"
+        assert current.replicate_max_concurrent_requests == 3
+
+        # Restart-only settings keep their running value and are reported
+        assert current.warm_keeper_interval_seconds == test_settings.warm_keeper_interval_seconds
+        assert reloader.restart_required == ["warm_keeper_interval_seconds"]
+        assert reloader.generation == 1
+
+    def test_invalid_file_is_rejected(self, config_dir, test_settings):
+        """Test that an invalid file leaves the running configuration untouched."""
+        reloader = ConfigReloader(test_settings.app_env)
+        edit(config_dir / f"{test_settings.app_env}.json", rate_limit={"restore": "ten per minute"})
+
+        assert reloader.check() is False
+        assert get_settings() is test_settings
+        assert "rate_limit" in reloader.last_error
+
+        # Not retried until the file changes again
+        assert reloader.check() is False
+        (config_dir / "default.json").write_text("{not json")
+        with pytest.raises(ConfigReloadError):
+            reloader.reload()
+        assert get_settings() is test_settings
+
+    def test_unchanged_files_are_not_reloaded(self, config_dir, test_settings):
+        """Test that polling without changes does nothing."""
+        reloader = ConfigReloader(test_settings.app_env)
+
+        assert reloader.check() is False
+        assert reloader.snapshot()["generation"] == 0
@@ -0,0 +1,150 @@
+"""Tests for hedged requests across providers."""
+import asyncio
+
+import pytest
+
+from app.services.circuit_breaker import CircuitBreakerRegistry
+from app.services.hedging import HedgingPolicy, LatencyWindow
+from app.services.hf_inference import HFInferenceError
+
+PRIMARY = "swin2sr-2x"
+SECONDARY = "swin2sr-4x"
+
+
+@pytest.fixture
+def policy(test_settings, monkeypatch):
+    """Policy hedging the primary with the secondary after its p90 latency."""
+    monkeypatch.setattr(test_settings, "hedging_enabled", True)
+    monkeypatch.setattr(test_settings, "hedging_min_samples", 10)
+    monkeypatch.setattr(
+        test_settings,
+        "hedging_groups",
+        [{"primary": PRIMARY, "secondary": SECONDARY, "min_delay_seconds": 0.0, "max_hedge_rate": 1.0}],
+    )
+    policy = HedgingPolicy(test_settings, breakers=CircuitBreakerRegistry(test_settings))
+    for _ in range(10):
+        policy.record_latency(PRIMARY, 0.02)
+    return policy
+
+
+def fake_call(latencies: dict[str, float], failures: tuple[str, ...] = (), cancelled: list | None = None):
+    """Model call that sleeps for the model's latency, optionally failing."""
+
+    async def call(model_id: str) -> str:
+        try:
+            await asyncio.sleep(latencies[model_id])
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.append(model_id)
+            raise
+        if model_id in failures:
+            raise HFInferenceError(f"{model_id} failed")
+        return f"result from {model_id}"
+
+    return call
+
+
+class TestLatencyWindow:
+    """Tests for the rolling latency window."""
+
+    def test_percentile_and_eviction(self):
+        """Test nearest-rank percentiles over the most recent latencies."""
+        window = LatencyWindow(size=10)
+        assert window.percentile(90) is None
+
+        for seconds in range(1, 11):
+            window.add(float(seconds))
+        assert window.percentile(90) == 10.0
+        assert window.percentile(50) == 6.0
+
+        for _ in range(10):
+            window.add(1.0)
+        assert len(window) == 10
+        assert window.percentile(90) == 1.0
+
+
+class TestHedgingPolicy:
+    """Tests for sending, winning and capping hedges."""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, policy):
+        """Test that a primary answering before its p90 is used alone."""
+        group = policy.group_for(PRIMARY)
+        result, model_id = await policy.run(group, fake_call({PRIMARY: 0.0, SECONDARY: 0.0}))
+
+        assert (result, model_id) == (f"result from {PRIMARY}", PRIMARY)
+        assert group.hedged == 0
+
+    @pytest.mark.asyncio
+    async def test_secondary_wins_and_primary_is_cancelled(self, policy):
+        """Test that a slow primary is hedged and the loser cancelled."""
+        group = policy.group_for(PRIMARY)
+        cancelled = []
+
+        result, model_id = await policy.run(
+            group, fake_call({PRIMARY: 5.0, SECONDARY: 0.01}, cancelled=cancelled)
+        )
+        await asyncio.sleep(0)
+
+        assert model_id == SECONDARY
+        assert cancelled == [PRIMARY]
+        snapshot = policy.snapshot()["groups"][PRIMARY]
+        assert snapshot["hedged"] == 1
+        assert snapshot["hedge_wins"] == 1
+        assert snapshot["wasted_calls"] == 1
+        assert snapshot["wasted_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_primary_still_wins_after_hedge(self, policy):
+        """Test that the primary's result is used if it beats the hedge."""
+        group = policy.group_for(PRIMARY)
+        cancelled = []
+
+        _, model_id = await policy.run(group, fake_call({PRIMARY: 0.05, SECONDARY: 5.0}, cancelled=cancelled))
+        await asyncio.sleep(0)
+
+        assert model_id == PRIMARY
+        assert cancelled == [SECONDARY]
+        assert group.hedged == 1
+        assert group.hedge_wins == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self, policy):
+        """Test that a hedge answers when the primary fails, and both failing raises."""
+        group = policy.group_for(PRIMARY)
+
+        _, model_id = await policy.run(
+            group, fake_call({PRIMARY: 0.05, SECONDARY: 0.1}, failures=(PRIMARY,))
+        )
+        assert model_id == SECONDARY
+
+        with pytest.raises(HFInferenceError, match=PRIMARY):
+            await policy.run(group, fake_call({PRIMARY: 0.05, SECONDARY: 0.1}, failures=(PRIMARY, SECONDARY)))
+
+    @pytest.mark.asyncio
+    async def test_hedge_rate_is_capped(self, policy):
+        """Test that no more than max_hedge_rate of requests are hedged."""
+        group = policy.group_for(PRIMARY)
+        group.max_hedge_rate = 0.25
+
+        for _ in range(8):
+            await policy.run(group, fake_call({PRIMARY: 0.04, SECONDARY: 0.0}))
+
+        assert group.hedged == 2
+        assert group.skipped_budget == 6
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_enough_samples(self, policy):
+        """Test that hedging waits until the primary's p90 is known."""
+        policy.latencies.clear()
+        group = policy.group_for(PRIMARY)
+
+        _, model_id = await policy.run(group, fake_call({PRIMARY: 0.05, SECONDARY: 0.0}))
+
+        assert model_id == PRIMARY
+        assert group.hedged == 0
+
+    def test_disabled(self, policy):
+        """Test that a disabled policy hedges nothing."""
+        policy.enabled = False
+        assert policy.group_for(PRIMARY) is None
@@ -1,5 +1,6 @@
 """Tests for HuggingFace Inference API service."""
 import json
+import time
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -11,10 +12,14 @@ from app.services.hf_inference import (
     HFInferenceError,
     HFInferenceService,
     HFModelError,
+    HFModelLoadingError,
     HFRateLimitError,
     HFTimeoutError,
+    estimated_load_time,
+    is_retryable,
 )
 from tests.mocks.hf_api import (
+    MockHFResponse,
     create_test_image_bytes,
     mock_connection_error,
     mock_invalid_response,
@@ -290,3 +295,130 @@ class TestResponseValidation:
 
                 result = await hf_service.process_image("test-model", test_image_bytes)
                 assert result == image_bytes
+
+
+class ProviderHTTPError(Exception):
+    """Stand-in for the client library's HTTP error (carries the response)."""
+
+    def __init__(self, message: str, response):
+        super().__init__(message)
+        self.response = response
+
+
+def loading_error(estimated_time: float) -> ProviderHTTPError:
+    return ProviderHTTPError(
+        "503 Service Unavailable: model is currently loading",
+        MockHFResponse(503, json_data={"error": "loading", "estimated_time": estimated_time}),
+    )
+
+
+class TestRetry:
+    """Tests for retrying transient provider failures."""
+
+    # Configured HuggingFace model (the settings fixture's models_config is
+    # superseded by the JSON config files)
+    MODEL_ID = "swin2sr-2x"
+
+    @pytest.fixture
+    def retrying_service(self, hf_service):
+        hf_service.retry_attempts = 3
+        hf_service.retry_delay = 0.01
+        hf_service.retry_deadline = 5
+        return hf_service
+
+    def test_classifies_errors(self):
+        """Test which failures are retried."""
+        assert is_retryable(loading_error(1.0))
+        assert is_retryable(ProviderHTTPError("502", MockHFResponse(502)))
+        assert is_retryable(httpx.ConnectTimeout("timed out"))
+        assert is_retryable(ConnectionResetError())
+        assert not is_retryable(ProviderHTTPError("429", MockHFResponse(429)))
+        assert not is_retryable(ProviderHTTPError("400 Bad Request", MockHFResponse(400)))
+        assert not is_retryable(ProviderHTTPError("Timeout in model config", MockHFResponse(400)))
+        assert not is_retryable(RuntimeError("410 Gone"))
+        assert not is_retryable(RuntimeError("connection pool config invalid"))
+
+    def test_estimated_load_time(self):
+        """Test reading estimated_time from the response body or the message."""
+        assert estimated_load_time(loading_error(12.5)) == 12.5
+        assert estimated_load_time(RuntimeError('{"error":"loading","estimated_time":7.0}')) == 7.0
+        assert estimated_load_time(RuntimeError("502 Bad Gateway")) is None
+
+    def test_backoff_is_exponential_with_jitter(self, retrying_service):
+        """Test that delays double per attempt and stay within the jitter range."""
+        retrying_service.retry_delay = 2
+        error = RuntimeError("502 Bad Gateway")
+
+        for attempt, backoff in ((1, 2), (2, 4), (3, 8)):
+            delays = {retrying_service._retry_delay(attempt, error) for _ in range(20)}
+            assert all(backoff / 2 <= delay <= backoff for delay in delays)
+            assert len(delays) > 1
+
+        delay = retrying_service._retry_delay(1, loading_error(30.0))
+        assert 30.0 <= delay <= 32.0
+
+    @pytest.mark.asyncio
+    async def test_retries_loading_model_with_same_bytes(self, retrying_service, test_image_bytes):
+        """Test that a loading model is retried after its estimated time with the original bytes."""
+        output = create_test_image_bytes()
+        calls = []
+
+        def image_to_image(image, **kwargs):
+            calls.append(image)
+            if len(calls) == 1:
+                raise loading_error(0.05)
+            return output
+
+        retrying_service.client.image_to_image = image_to_image
+        started = time.monotonic()
+        result = await retrying_service.process_image(self.MODEL_ID, test_image_bytes)
+
+        assert result == output
+        assert len(calls) == 2
+        assert all(image is test_image_bytes for image in calls)
+        assert time.monotonic() - started >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_attempts(self, retrying_service, test_image_bytes):
+        """Test that retries stop after retry_attempts and map the last error."""
+        attempts = []
+
+        def image_to_image(image, **kwargs):
+            attempts.append(1)
+            raise ProviderHTTPError("502 Bad Gateway", MockHFResponse(502))
+
+        retrying_service.client.image_to_image = image_to_image
+        with pytest.raises(HFInferenceError):
+            await retrying_service.process_image(self.MODEL_ID, test_image_bytes)
+        assert len(attempts) == 4
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_client_errors(self, retrying_service, test_image_bytes):
+        """Test that rate limits are surfaced immediately."""
+        attempts = []
+
+        def image_to_image(image, **kwargs):
+            attempts.append(1)
+            raise ProviderHTTPError("429 Too Many Requests", MockHFResponse(429))
+
+        retrying_service.client.image_to_image = image_to_image
+        with pytest.raises(HFRateLimitError):
+            await retrying_service.process_image(self.MODEL_ID, test_image_bytes)
+        assert len(attempts) == 1
+
+    @pytest.mark.asyncio
+    async def test_respects_deadline(self, retrying_service, test_image_bytes):
+        """Test that a load time beyond the deadline fails at once instead of waiting."""
+        attempts = []
+
+        def image_to_image(image, **kwargs):
+            attempts.append(1)
+            raise loading_error(60.0)
+
+        retrying_service.client.image_to_image = image_to_image
+        started = time.monotonic()
+        with pytest.raises(HFModelLoadingError, match="loading") as raised:
+            await retrying_service.process_image(self.MODEL_ID, test_image_bytes)
+        assert raised.value.retry_after == 60.0
+        assert len(attempts) == 1
+        assert time.monotonic() - started < 1
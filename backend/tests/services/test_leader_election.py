@@ -0,0 +1,92 @@
+"""Tests for the scheduler lease and leader-only jobs."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import SchedulerLease
+from app.services import leader_election
+from app.services.leader_election import LeaderElection, leader_only
+
+
+@pytest.fixture
+def session_factory(test_engine, monkeypatch):
+    """Point the election at the test database."""
+    factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(leader_election, "get_session_factory", lambda: factory)
+    return factory
+
+
+@pytest.fixture
+def election_settings(test_settings):
+    """Settings with leader election enabled."""
+    return test_settings.model_copy(
+        update={"scheduler_leader_election": True, "scheduler_lease_seconds": 30, "scheduler_heartbeat_seconds": 10}
+    )
+
+
+async def _expire_lease(factory) -> None:
+    """Make the current lease look abandoned."""
+    async with factory() as db:
+        await db.execute(update(SchedulerLease).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+class TestLeaderElection:
+    """Tests for lease acquisition, renewal and takeover."""
+
+    async def test_one_worker_holds_the_lease(self, session_factory, election_settings):
+        """Test that of two workers only the first acquires, and it keeps the lease on renewal."""
+        first = LeaderElection(settings=election_settings)
+        second = LeaderElection(settings=election_settings)
+        elected = []
+        first.on_elected(lambda: elected.append("first"))
+
+        assert await first.heartbeat() is True
+        assert await second.heartbeat() is False
+        assert await first.heartbeat() is True
+
+        assert first.is_leader() and not second.is_leader()
+        assert elected == ["first"]
+
+    async def test_expired_lease_is_taken_over(self, session_factory, election_settings):
+        """Test that a lease not renewed in time moves to another worker."""
+        first = LeaderElection(settings=election_settings)
+        second = LeaderElection(settings=election_settings)
+        await first.heartbeat()
+
+        await _expire_lease(session_factory)
+
+        assert await second.heartbeat() is True
+        assert await first.heartbeat() is False
+        assert second.is_leader() and not first.is_leader()
+
+    async def test_release_hands_over_on_next_heartbeat(self, session_factory, election_settings):
+        """Test that a released lease can be acquired right away."""
+        first = LeaderElection(settings=election_settings)
+        second = LeaderElection(settings=election_settings)
+        await first.heartbeat()
+
+        await first.release()
+
+        assert not first.is_leader()
+        assert await second.heartbeat() is True
+
+    async def test_leader_only_skips_followers(self, session_factory, election_settings, monkeypatch):
+        """Test that wrapped jobs run in the leader only."""
+        runs = []
+
+        async def job() -> None:
+            runs.append(1)
+
+        election = LeaderElection(settings=election_settings)
+        monkeypatch.setattr(leader_election, "_election", election)
+
+        await leader_only(job)()
+        assert runs == []
+
+        await election.heartbeat()
+        await leader_only(job)()
+        assert runs == [1]
@@ -0,0 +1,64 @@
+"""Tests for the event-loop stall detector."""
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.services import loop_watchdog
+from app.services.loop_watchdog import LoopWatchdog
+
+
+def blocking_call(seconds: float) -> None:
+    """Block the calling thread, as a synchronous SDK call would."""
+    time.sleep(seconds)
+
+
+@pytest.fixture
+def watchdog_settings(test_settings):
+    """Settings with a fast heartbeat and a low stall threshold."""
+    return test_settings.model_copy(
+        update={
+            "loop_watchdog_interval_ms": 20,
+            "loop_watchdog_threshold_ms": 100,
+            "loop_watchdog_log_interval_seconds": 0.0,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_stall_is_counted_and_blocking_stack_logged(watchdog_settings, caplog):
+    """Test that blocking the loop logs the blocking function and counts one stall."""
+    watchdog = LoopWatchdog(watchdog_settings)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.1)
+        with caplog.at_level(logging.WARNING, logger="app.services.loop_watchdog"):
+            blocking_call(0.4)
+            await asyncio.sleep(0.1)
+    finally:
+        await watchdog.stop()
+
+    assert watchdog.stalls == 1
+    blocked = [r.getMessage() for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert len(blocked) == 1
+    assert "in blocking_call" in blocked[0]
+    assert "test_stall_is_counted_and_blocking_stack_logged" in blocked[0]
+
+
+@pytest.mark.asyncio
+async def test_report_names_the_request_being_served(watchdog_settings, caplog):
+    """Test that a stall report includes the route of the tracked request."""
+    watchdog = LoopWatchdog(watchdog_settings)
+    watchdog.start()
+    task = loop_watchdog.track_request({"type": "http", "method": "POST", "path": "/api/v1/restore"})
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.services.loop_watchdog"):
+            blocking_call(0.4)
+            await asyncio.sleep(0.05)
+    finally:
+        loop_watchdog.untrack_request(task)
+        await watchdog.stop()
+
+    assert task not in loop_watchdog._task_scopes
+    assert any("while serving POST " in r.getMessage() for r in caplog.records)
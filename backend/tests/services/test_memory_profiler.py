@@ -0,0 +1,66 @@
+"""Tests for allocation tracing, snapshot diffs and the memory report."""
+import logging
+
+import pytest
+
+from app.services.memory_profiler import MemoryProfiler, TracingNotStartedError, UnknownSnapshotError
+
+
+def allocate_buffers() -> list[bytes]:
+    """Allocate about 1 MB in 100 blocks."""
+    return [bytes(10_000) for _ in range(100)]
+
+
+@pytest.fixture
+def profiler(test_settings):
+    """A profiler keeping two snapshots, stopped after the test."""
+    profiler = MemoryProfiler(test_settings.model_copy(update={"memory_profiling_max_snapshots": 2}))
+    yield profiler
+    profiler.stop()
+
+
+def test_diff_pins_growth_to_the_allocating_line(profiler):
+    """Test that memory allocated between two snapshots is attributed to its source line."""
+    profiler.start(frames=3)
+    base = profiler.take_snapshot()["id"]
+    buffers = allocate_buffers()
+    target = profiler.take_snapshot()["id"]
+
+    lines = profiler.compare(base, target, limit=1)
+    tracebacks = profiler.compare(base, None, group_by="traceback", limit=1)
+
+    site = lines["sites"][0]
+    assert site["file"].endswith("test_memory_profiler.py")
+    assert site["size_diff_bytes"] >= 1_000_000 and site["count_diff"] >= 100
+    innermost, *_, outermost = tracebacks["sites"][0]["traceback"]
+    assert innermost == f"{site['file']}:{site['line']}"  # in allocate_buffers
+    assert int(outermost.rsplit(":", 1)[1]) > site["line"]  # the call in this test
+    del buffers
+
+
+def test_oldest_snapshots_are_dropped(profiler):
+    """Test that only max_snapshots snapshots are kept and tracing is required."""
+    with pytest.raises(TracingNotStartedError):
+        profiler.take_snapshot()
+
+    profiler.start(frames=1)
+    ids = [profiler.take_snapshot(limit=0)["id"] for _ in range(3)]
+
+    assert [snapshot["id"] for snapshot in profiler.status()["snapshots"]] == ids[1:]
+    with pytest.raises(UnknownSnapshotError):
+        profiler.compare(ids[0])
+
+
+def test_report_lists_growing_sites(profiler, caplog):
+    """Test that the periodic report logs RSS, GC state and sites grown since the last report."""
+    profiler.start(frames=1)
+    profiler.report()
+
+    buffers = allocate_buffers()
+    with caplog.at_level(logging.INFO, logger="app.services.memory_profiler"):
+        profiler.report()
+
+    message = caplog.records[-1].getMessage()
+    assert "GC counts" in message
+    assert "grown since last report" in message and "test_memory_profiler.py" in message
+    del buffers
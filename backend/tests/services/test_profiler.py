@@ -0,0 +1,62 @@
+"""Tests for the on-demand CPU profiler."""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.profiler import ProfilerBusyError, StackSampler, profile_cpu
+
+
+def busy_loop(stop: threading.Event) -> None:
+    """Burn CPU until stopped."""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def threads():
+    """A busy thread and an idle one, stopped after the test."""
+    stop = threading.Event()
+    busy = threading.Thread(target=busy_loop, args=(stop,), name="busy-worker")
+    idle = threading.Thread(target=stop.wait, name="idle-worker")
+    busy.start()
+    idle.start()
+    yield
+    stop.set()
+    busy.join()
+    idle.join()
+
+
+@pytest.mark.asyncio
+async def test_profile_collapses_busy_stacks(threads):
+    """Test that a busy thread's stacks are counted and idle threads are skipped."""
+    sampler = await profile_cpu(0.3, 0.005, max_overhead=0.5)
+
+    lines = sampler.collapsed().splitlines()
+    assert sampler.samples > 0
+    busy = [line for line in lines if line.startswith("busy-worker;")]
+    assert busy and all("busy_loop (" in line for line in busy)
+    assert not any(line.startswith("idle-worker;") for line in lines)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) >= 1
+
+
+def test_idle_threads_are_kept_on_request(threads):
+    """Test that include_idle also samples threads blocked in a wait."""
+    sampler = StackSampler(0.01, 0.5, include_idle=True)
+
+    sampler.sample()
+
+    assert any(stack.startswith("idle-worker;") for stack in sampler.stacks)
+
+
+@pytest.mark.asyncio
+async def test_one_profile_at_a_time():
+    """Test that a second profile is refused while one is running."""
+    first = asyncio.create_task(profile_cpu(0.2, 0.01, max_overhead=0.5))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(ProfilerBusyError):
+        await profile_cpu(0.1, 0.01, max_overhead=0.5)
+
+    await first
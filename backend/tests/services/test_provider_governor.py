@@ -0,0 +1,256 @@
+"""Tests for the provider concurrency governor."""
+import asyncio
+
+import pytest
+
+from app.services.provider_governor import (
+    AdaptiveLimit,
+    ProviderBusyError,
+    ProviderGovernor,
+    ProviderPool,
+)
+
+
+def make_pool(max_in_flight: int = 2, per_model: int = 0, max_queued: int = 100) -> ProviderPool:
+    return ProviderPool("replicate", max_in_flight, per_model, max_queued)
+
+
+async def settle():
+    """Let queued callbacks and tasks run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestProviderPool:
+    """Tests for limits and fair queuing."""
+
+    @pytest.mark.asyncio
+    async def test_limit_and_handoff(self):
+        """Test that calls beyond the limit wait until a slot is released."""
+        pool = make_pool(max_in_flight=2)
+        first = await pool.acquire("m", "user:1", 1.0, timeout=5)
+        await pool.acquire("m", "user:1", 1.0, timeout=5)
+
+        waiting = asyncio.create_task(pool.acquire("m", "user:2", 1.0, timeout=5))
+        await settle()
+        assert not waiting.done()
+        assert pool.snapshot()["queued"] == 1
+
+        pool.release(first, success=True)
+        slot = await asyncio.wait_for(waiting, 1)
+        assert slot.waited > 0
+        assert pool.snapshot()["in_flight"] == 2
+
+    @pytest.mark.asyncio
+    async def test_fair_queuing_across_users(self):
+        """Test that a user queueing many calls does not starve a later user."""
+        pool = make_pool(max_in_flight=1)
+        held = await pool.acquire("m", "user:batch", 1.0, timeout=5)
+        order = []
+
+        async def call(user_key: str):
+            slot = await pool.acquire("m", user_key, 1.0, timeout=5)
+            order.append(user_key)
+            pool.release(slot, success=True)
+
+        tasks = [asyncio.create_task(call("user:batch")) for _ in range(5)]
+        await settle()
+        tasks.append(asyncio.create_task(call("user:other")))
+        await settle()
+
+        pool.release(held, success=True)
+        await asyncio.gather(*tasks)
+        assert order.index("user:other") <= 1
+
+    @pytest.mark.asyncio
+    async def test_weight_gives_larger_share(self):
+        """Test that a heavier weight is served proportionally more often."""
+        pool = make_pool(max_in_flight=1)
+        held = await pool.acquire("m", "user:0", 1.0, timeout=5)
+        order = []
+
+        async def call(user_key: str, weight: float):
+            slot = await pool.acquire("m", user_key, weight, timeout=5)
+            order.append(user_key)
+            pool.release(slot, success=True)
+
+        tasks = [asyncio.create_task(call("user:light", 1.0)) for _ in range(3)]
+        tasks += [asyncio.create_task(call("user:heavy", 2.0)) for _ in range(6)]
+        await settle()
+
+        pool.release(held, success=True)
+        await asyncio.gather(*tasks)
+        assert order[:6].count("user:heavy") == 4
+
+    @pytest.mark.asyncio
+    async def test_model_limit_does_not_block_other_models(self):
+        """Test that a full model does not hold up queued calls for other models."""
+        pool = make_pool(max_in_flight=3, per_model=1)
+        await pool.acquire("slow", "user:1", 1.0, timeout=5)
+
+        blocked = asyncio.create_task(pool.acquire("slow", "user:1", 1.0, timeout=5))
+        await settle()
+        other = await asyncio.wait_for(pool.acquire("fast", "user:2", 1.0, timeout=5), 1)
+
+        assert other.model_id == "fast"
+        assert not blocked.done()
+        blocked.cancel()
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_and_full_queue(self):
+        """Test that waits give up after the timeout and a full queue rejects at once."""
+        pool = make_pool(max_in_flight=1, max_queued=1)
+        await pool.acquire("m", "user:1", 1.0, timeout=5)
+
+        waiting = asyncio.create_task(pool.acquire("m", "user:2", 1.0, timeout=0.05))
+        await settle()
+        with pytest.raises(ProviderBusyError, match="already queued"):
+            await pool.acquire("m", "user:3", 1.0, timeout=5)
+        with pytest.raises(ProviderBusyError, match="no free slot"):
+            await waiting
+
+        snapshot = pool.snapshot()
+        assert snapshot["queued"] == 0
+        assert snapshot["rejected"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_its_place(self):
+        """Test that a cancelled waiter neither leaks a slot nor blocks the queue."""
+        pool = make_pool(max_in_flight=1)
+        held = await pool.acquire("m", "user:1", 1.0, timeout=5)
+
+        abandoned = asyncio.create_task(pool.acquire("m", "user:2", 1.0, timeout=5))
+        waiting = asyncio.create_task(pool.acquire("m", "user:3", 1.0, timeout=5))
+        await settle()
+        abandoned.cancel()
+        await settle()
+
+        pool.release(held, success=True)
+        slot = await asyncio.wait_for(waiting, 1)
+        pool.release(slot, success=True)
+        assert pool.snapshot()["in_flight"] == 0
+        assert pool.snapshot()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_stats(self):
+        """Test that every granted call is recorded in the wait histogram."""
+        pool = make_pool(max_in_flight=1)
+        held = await pool.acquire("m", "user:1", 1.0, timeout=5)
+        waiting = asyncio.create_task(pool.acquire("m", "user:2", 1.0, timeout=5))
+        await asyncio.sleep(0.02)
+        pool.release(held, success=True)
+        await waiting
+
+        stats = pool.snapshot()["queue_wait"]
+        assert stats["count"] == 2
+        assert stats["max_seconds"] >= 0.02
+        assert stats["buckets"]["0.01"] == 1
+        assert stats["buckets"]["+Inf"] == 2
+
+
+class TestAdaptiveLimit:
+    """Tests for AIMD behaviour."""
+
+    def test_decrease_once_per_window(self):
+        """Test that several rate limits from one window halve the limit once."""
+        limit = AdaptiveLimit(8)
+        epoch = limit.epoch
+
+        assert limit.on_rate_limited(epoch) is True
+        assert limit.on_rate_limited(epoch) is False
+        assert int(limit.limit) == 4
+
+        limit.on_rate_limited(limit.epoch)
+        limit.on_rate_limited(limit.epoch)
+        limit.on_rate_limited(limit.epoch)
+        assert limit.limit == 1.0
+
+    def test_additive_increase_up_to_max(self):
+        """Test that successes grow the limit back, capped at the maximum."""
+        limit = AdaptiveLimit(4)
+        limit.on_rate_limited(limit.epoch)
+        assert int(limit.limit) == 2
+
+        # About +1 per window of `limit` successes
+        for _ in range(3):
+            limit.on_success()
+        assert int(limit.limit) == 3
+        for _ in range(100):
+            limit.on_success()
+        assert limit.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_pool_backs_off_on_rate_limit(self):
+        """Test that a rate-limited call shrinks the pool and fewer calls run."""
+        pool = make_pool(max_in_flight=4)
+        slots = [await pool.acquire("m", "user:1", 1.0, timeout=5) for _ in range(4)]
+
+        for slot in slots:
+            slot.mark_rate_limited()
+            pool.release(slot, success=False)
+
+        snapshot = pool.snapshot()
+        assert snapshot["limit"] == 2
+        assert snapshot["rate_limited"] == 4
+
+        await pool.acquire("m", "user:1", 1.0, timeout=5)
+        await pool.acquire("m", "user:1", 1.0, timeout=5)
+        with pytest.raises(ProviderBusyError):
+            await pool.acquire("m", "user:1", 1.0, timeout=0.01)
+
+
+class TestProviderGovernor:
+    """Tests for configuration and the slot context manager."""
+
+    @pytest.mark.asyncio
+    async def test_slot_context_manager(self, test_settings, monkeypatch):
+        """Test that slot() releases on exit and feeds rate limits back."""
+        monkeypatch.setattr(test_settings, "replicate_max_concurrent_requests", 2)
+        monkeypatch.setattr(test_settings, "replicate_max_concurrent_requests_per_model", 0)
+        governor = ProviderGovernor(test_settings)
+
+        async with governor.slot("replicate", "m", "user:1"):
+            assert governor.snapshot()["replicate"]["in_flight"] == 1
+
+        with pytest.raises(RuntimeError):
+            async with governor.slot("replicate", "m", "user:1") as slot:
+                slot.mark_rate_limited()
+                raise RuntimeError("429")
+
+        snapshot = governor.snapshot()["replicate"]
+        assert snapshot["in_flight"] == 0
+        assert snapshot["limit"] == 1
+        assert snapshot["models"]["m"]["max_limit"] == 2
+
+    @pytest.mark.asyncio
+    async def test_zero_limit_is_unlimited(self, test_settings, monkeypatch):
+        """Test that a provider limit of 0 disables governing for that provider."""
+        monkeypatch.setattr(test_settings, "hf_max_concurrent_requests", 0)
+        governor = ProviderGovernor(test_settings)
+
+        assert "huggingface" not in governor.snapshot()
+        async with governor.slot("huggingface", "m", "user:1") as slot:
+            assert slot.waited == 0.0
+
+    @pytest.mark.asyncio
+    async def test_configure_resizes_pools_in_place(self, test_settings, monkeypatch):
+        """Test that new limits keep in-flight slots and start queued calls they allow."""
+        monkeypatch.setattr(test_settings, "replicate_max_concurrent_requests", 1)
+        monkeypatch.setattr(test_settings, "replicate_max_concurrent_requests_per_model", 0)
+        governor = ProviderGovernor(test_settings)
+        held = await governor.acquire("replicate", "m", "user:1")
+        waiting = asyncio.create_task(governor.acquire("replicate", "m", "user:2"))
+        await settle()
+        assert not waiting.done()
+
+        monkeypatch.setattr(test_settings, "replicate_max_concurrent_requests", 2)
+        governor.configure(test_settings)
+        second = await asyncio.wait_for(waiting, 1)
+        assert governor.snapshot()["replicate"]["in_flight"] == 2
+
+        # Unlimited: the pool goes away and its slots are released harmlessly
+        monkeypatch.setattr(test_settings, "replicate_max_concurrent_requests", 0)
+        governor.configure(test_settings)
+        assert "replicate" not in governor.snapshot()
+        governor.release(held, success=True)
+        governor.release(second, success=True)
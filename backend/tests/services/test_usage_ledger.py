@@ -0,0 +1,327 @@
+"""Tests for the per-user usage ledger and quota checks."""
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import ProcessedImage, Session, User, UserUsage
+from app.db.write_queue import start_write_queue, stop_write_queue
+from app.services import usage_ledger
+from app.services.session_manager import SessionManager
+from app.services.usage_ledger import (
+    QuotaExceededError,
+    apply_usage_delta,
+    check_quota,
+    get_usage,
+    reconcile_usage,
+    record_provider_call,
+    release_provider_call,
+    utc_today,
+)
+
+
+async def _create_user_session(db, username: str = "ledger") -> Session:
+    """Create a user with one session."""
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        full_name="Ledger User",
+        hashed_password="x",
+    )
+    db.add(user)
+    await db.flush()
+    session = Session(user_id=user.id, session_id=f"{username}-session")
+    db.add(session)
+    await db.commit()
+    return session
+
+
+class TestUsageDeltas:
+    """Tests for incremental ledger updates."""
+
+    @pytest.mark.asyncio
+    async def test_delta_creates_and_updates_row(self, db_session):
+        """Test that the first delta creates the row and later ones add to it."""
+        session = await _create_user_session(db_session)
+
+        await apply_usage_delta(db_session, session.user_id, images=1, storage_bytes=100)
+        await apply_usage_delta(db_session, session.user_id, images=2, storage_bytes=50)
+        await db_session.commit()
+
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert usage.image_count == 3
+        assert usage.storage_bytes == 150
+
+    @pytest.mark.asyncio
+    async def test_negative_delta_never_goes_below_zero(self, db_session):
+        """Test that releasing more than recorded clamps at zero."""
+        session = await _create_user_session(db_session)
+
+        await apply_usage_delta(db_session, session.user_id, images=1, storage_bytes=10)
+        await apply_usage_delta(db_session, session.user_id, images=-5, storage_bytes=-50)
+        await db_session.commit()
+
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert usage.image_count == 0
+        assert usage.storage_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_provider_calls_reset_on_new_day(self, db_session):
+        """Test that the daily provider call counter rolls over."""
+        session = await _create_user_session(db_session)
+        yesterday = date(2024, 1, 1)
+        today = yesterday + timedelta(days=1)
+
+        await record_provider_call(db_session, session.user_id, day=yesterday)
+        await record_provider_call(db_session, session.user_id, day=yesterday)
+        await db_session.commit()
+
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert usage.calls_on(yesterday) == 2
+        assert usage.calls_on(today) == 0
+
+        await record_provider_call(db_session, session.user_id, day=today)
+        await db_session.commit()
+        await db_session.refresh(usage)
+        assert usage.calls_on(today) == 1
+
+    @pytest.mark.asyncio
+    async def test_provider_call_limit_is_enforced_on_increment(self, db_session):
+        """Test that the counter stops at the limit and a refunded call can be taken again."""
+        session = await _create_user_session(db_session)
+        today = utc_today()
+
+        assert await record_provider_call(db_session, session.user_id, limit=2) == today
+        await record_provider_call(db_session, session.user_id, limit=2)
+        with pytest.raises(QuotaExceededError) as exc_info:
+            await record_provider_call(db_session, session.user_id, limit=2)
+        assert (exc_info.value.quota, exc_info.value.current) == ("provider_calls", 2)
+
+        await release_provider_call(db_session, session.user_id, today)
+        await record_provider_call(db_session, session.user_id, limit=2)
+        await release_provider_call(db_session, session.user_id, today - timedelta(days=1))
+        await db_session.commit()
+
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert usage.calls_on(today) == 2
+
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_calls_share_one_row(self, test_engine, monkeypatch):
+        """Test that two first calls of a new user, both finding no ledger row, each count once."""
+        factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            user_id = (await _create_user_session(db, "racing")).user_id
+
+        # Both requests reach the row creation before either has inserted it
+        barrier = asyncio.Barrier(2)
+        ensure_row = usage_ledger._ensure_row
+
+        async def racing_ensure_row(db, user_id):
+            await barrier.wait()
+            await ensure_row(db, user_id)
+
+        monkeypatch.setattr(usage_ledger, "_ensure_row", racing_ensure_row)
+
+        async def first_call():
+            async with factory() as db:
+                await record_provider_call(db, user_id, limit=5)
+                await db.commit()
+
+        await asyncio.wait_for(asyncio.gather(first_call(), first_call()), 10)
+
+        async with factory() as db:
+            usage = await get_usage(db, user_id)
+            assert usage.calls_on(utc_today()) == 2
+
+
+class TestCheckQuota:
+    """Tests for quota enforcement."""
+
+    @pytest.mark.asyncio
+    async def test_unlimited_by_default(self, db_session, test_settings):
+        """Test that zero limits are not enforced."""
+        session = await _create_user_session(db_session)
+        await apply_usage_delta(db_session, session.user_id, images=1000, storage_bytes=10**9)
+        await db_session.commit()
+
+        await check_quota(db_session, session.user_id, incoming_bytes=10**9, settings=test_settings)
+
+    @pytest.mark.asyncio
+    async def test_image_limit(self, db_session, test_settings, monkeypatch):
+        """Test that the image count limit is enforced."""
+        monkeypatch.setattr(test_settings, "quota_max_images_per_user", 2)
+        session = await _create_user_session(db_session)
+
+        await apply_usage_delta(db_session, session.user_id, images=1)
+        await db_session.commit()
+        await check_quota(db_session, session.user_id, settings=test_settings)
+
+        await apply_usage_delta(db_session, session.user_id, images=1)
+        await db_session.commit()
+        with pytest.raises(QuotaExceededError) as exc_info:
+            await check_quota(db_session, session.user_id, settings=test_settings)
+        assert exc_info.value.quota == "images"
+
+    @pytest.mark.asyncio
+    async def test_storage_limit_counts_incoming_bytes(self, db_session, test_settings, monkeypatch):
+        """Test that the storage limit includes the upload being checked."""
+        monkeypatch.setattr(test_settings, "quota_max_storage_bytes_per_user", 1000)
+        session = await _create_user_session(db_session)
+        await apply_usage_delta(db_session, session.user_id, images=1, storage_bytes=900)
+        await db_session.commit()
+
+        await check_quota(db_session, session.user_id, incoming_bytes=100, settings=test_settings)
+        with pytest.raises(QuotaExceededError) as exc_info:
+            await check_quota(db_session, session.user_id, incoming_bytes=101, settings=test_settings)
+        assert exc_info.value.quota == "storage_bytes"
+
+    @pytest.mark.asyncio
+    async def test_daily_provider_call_limit(self, db_session, test_settings, monkeypatch):
+        """Test that only today's provider calls count towards the limit."""
+        monkeypatch.setattr(test_settings, "quota_max_provider_calls_per_day", 1)
+        user_id = (await _create_user_session(db_session)).user_id
+
+        await record_provider_call(db_session, user_id, day=utc_today() - timedelta(days=1))
+        await db_session.commit()
+        await check_quota(db_session, user_id, settings=test_settings)
+
+        await record_provider_call(db_session, user_id)
+        await db_session.commit()
+        db_session.expire_all()
+        with pytest.raises(QuotaExceededError) as exc_info:
+            await check_quota(db_session, user_id, settings=test_settings)
+        assert exc_info.value.quota == "provider_calls"
+
+
+class TestLedgerIntegration:
+    """Tests that image writes and deletes keep the ledger in step."""
+
+    @pytest.mark.asyncio
+    async def test_save_and_delete_session_update_ledger(self, db_session, test_settings):
+        """Test that saving images charges and deleting the session releases usage."""
+        session = await _create_user_session(db_session)
+        manager = SessionManager(test_settings)
+
+        for i in range(2):
+            await manager.save_processed_image(
+                db=db_session,
+                session_id=session.session_id,
+                original_filename=f"photo{i}.jpg",
+                model_id="swin2sr-2x",
+                original_path=f"{session.session_id}/photo{i}.jpg",
+                processed_path=f"{session.session_id}/photo{i}_processed.jpg",
+                storage_bytes=300,
+            )
+
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert (usage.image_count, usage.storage_bytes) == (2, 600)
+
+        await manager.delete_session(db_session, session.session_id)
+
+        await db_session.refresh(usage)
+        assert (usage.image_count, usage.storage_bytes) == (0, 0)
+
+    @pytest.mark.asyncio
+    async def test_cleanup_goes_through_write_queue(self, db_session, test_engine, test_settings):
+        """Test that expiring sessions is committed by the write queue and releases usage."""
+        session = await _create_user_session(db_session)
+        manager = SessionManager(test_settings)
+        await manager.save_processed_image(
+            db=db_session,
+            session_id=session.session_id,
+            original_filename="photo.jpg",
+            model_id="swin2sr-2x",
+            original_path=f"{session.session_id}/photo.jpg",
+            processed_path=f"{session.session_id}/photo_processed.jpg",
+            storage_bytes=300,
+        )
+
+        writer = start_write_queue(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+        try:
+            assert await manager.cleanup_old_sessions(db_session, hours=-1) == (1, 0)
+        finally:
+            await stop_write_queue()
+
+        assert writer.units_committed == 1
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert (usage.image_count, usage.storage_bytes) == (0, 0)
+        assert (await db_session.execute(select(Session))).scalars().all() == []
+
+    @pytest.mark.asyncio
+    async def test_reconcile_corrects_drift(self, db_session):
+        """Test that reconciliation recomputes totals from processed_images."""
+        session = await _create_user_session(db_session)
+        other = await _create_user_session(db_session, username="other")
+
+        # Images written without going through the ledger
+        for i in range(3):
+            db_session.add(
+                ProcessedImage(
+                    session_id=session.id,
+                    user_id=session.user_id,
+                    original_filename=f"photo{i}.jpg",
+                    model_id="swin2sr-2x",
+                    original_path=f"a/photo{i}.jpg",
+                    processed_path=f"a/photo{i}_processed.jpg",
+                    storage_bytes=10,
+                )
+            )
+        # Stale ledger row for a user with no images
+        await apply_usage_delta(db_session, other.user_id, images=4, storage_bytes=40)
+        await db_session.commit()
+
+        assert await reconcile_usage(db_session) == 2
+
+        rows = {
+            usage.user_id: usage
+            for usage in (await db_session.execute(select(UserUsage))).scalars().all()
+        }
+        for usage in rows.values():
+            await db_session.refresh(usage)
+        assert (rows[session.user_id].image_count, rows[session.user_id].storage_bytes) == (3, 30)
+        assert (rows[other.user_id].image_count, rows[other.user_id].storage_bytes) == (0, 0)
+        assert rows[session.user_id].reconciled_at is not None
+
+        # A consistent ledger needs no corrections
+        assert await reconcile_usage(db_session) == 0
+
+    @pytest.mark.asyncio
+    async def test_reconcile_keeps_concurrent_changes(self, db_session, monkeypatch):
+        """Test that an image recorded while reconciliation runs is not overwritten."""
+        session = await _create_user_session(db_session)
+        await apply_usage_delta(db_session, session.user_id, images=5, storage_bytes=50)
+        await db_session.commit()
+        run_write = usage_ledger.run_write
+
+        async def upload_then_write(db, unit):
+            # Another request stores an image after the drift was computed
+            db.add(
+                ProcessedImage(
+                    session_id=session.id,
+                    user_id=session.user_id,
+                    original_filename="late.jpg",
+                    model_id="swin2sr-2x",
+                    original_path="a/late.jpg",
+                    processed_path="a/late_processed.jpg",
+                    storage_bytes=7,
+                )
+            )
+            await apply_usage_delta(db, session.user_id, images=1, storage_bytes=7)
+            await db.commit()
+            return await run_write(db, unit)
+
+        monkeypatch.setattr(usage_ledger, "run_write", upload_then_write)
+        assert await reconcile_usage(db_session) == 1
+
+        usage = await get_usage(db_session, session.user_id)
+        await db_session.refresh(usage)
+        assert (usage.image_count, usage.storage_bytes) == (1, 7)
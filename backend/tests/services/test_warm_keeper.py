@@ -0,0 +1,117 @@
+"""Tests for the background model warm-keeper."""
+import pytest
+
+from app.services import leader_election
+from app.services.warm_keeper import (
+    ERROR,
+    LOADING,
+    READY,
+    UNKNOWN,
+    ModelReadiness,
+    WarmKeeper,
+    keep_alive_image,
+)
+
+
+class FakeHFService:
+    """Stand-in for HFInferenceService.check_model_status() with scripted answers."""
+
+    def __init__(self, answers: dict[str, list[dict]]):
+        self.answers = answers
+        self.requests: list[tuple[str, bytes]] = []
+
+    async def check_model_status(self, model_id: str, content: bytes = b"") -> dict:
+        self.requests.append((model_id, content))
+        answers = self.answers[model_id]
+        return answers.pop(0) if len(answers) > 1 else answers[0]
+
+
+class TestModelReadiness:
+    """Tests for readiness transitions."""
+
+    def test_cold_start_is_measured(self):
+        """Test that loading followed by ready records the cold-start duration."""
+        readiness = ModelReadiness()
+        assert readiness.status == UNKNOWN
+
+        readiness.record({"status": "loading", "estimated_time": 20.0}, now=100)
+        assert readiness.status == LOADING
+        assert readiness.eta_seconds(now=105) == 15.0
+
+        readiness.record({"status": "loading", "estimated_time": 5.0}, now=118)
+        readiness.record({"status": "ready"}, now=124)
+        assert readiness.status == READY
+        assert readiness.eta_seconds(now=124) is None
+        assert readiness.last_cold_start_seconds == 24
+        assert readiness.cold_starts == 1
+
+    def test_rate_limit_keeps_state(self):
+        """Test that a rate-limited probe does not change the known state."""
+        readiness = ModelReadiness()
+        readiness.record({"status": "ready"})
+        readiness.record({"status": "rate_limited"})
+        assert readiness.status == READY
+
+        readiness.record({"status": "error", "error": "HuggingFace API returned 410"})
+        assert readiness.status == ERROR
+        assert readiness.snapshot()["error"] == "HuggingFace API returned 410"
+
+
+class TestWarmKeeper:
+    """Tests for scheduled probes and keep-alive requests."""
+
+    @pytest.fixture
+    def keeper(self, test_settings):
+        """Warm-keeper over the test models."""
+        return WarmKeeper(test_settings)
+
+    @staticmethod
+    def model(keeper: WarmKeeper, model_id: str, **overrides) -> dict:
+        """Configuration of a test model."""
+        return dict(keeper.settings.get_model_by_id(model_id), **overrides)
+
+    @pytest.mark.asyncio
+    async def test_probe_sends_keep_alive_to_keep_warm_models(self, keeper):
+        """Test that keep_warm models get a real image and others an empty probe."""
+        service = FakeHFService({"swin2sr-2x": [{"status": "ready"}], "swin2sr-4x": [{"status": "ready"}]})
+        await keeper.probe(service, self.model(keeper, "swin2sr-2x", keep_warm=True))
+        await keeper.probe(service, self.model(keeper, "swin2sr-4x"))
+
+        assert service.requests == [("swin2sr-2x", keep_alive_image()), ("swin2sr-4x", b"")]
+        assert keeper.get("swin2sr-2x").status == READY
+
+    @pytest.mark.asyncio
+    async def test_followers_send_empty_probes(self, keeper, monkeypatch):
+        """Test that only the scheduler leader sends keep-alive images."""
+        election = leader_election.LeaderElection(
+            settings=keeper.settings.model_copy(update={"scheduler_leader_election": True})
+        )
+        monkeypatch.setattr(leader_election, "_election", election)
+        service = FakeHFService({"swin2sr-2x": [{"status": "ready"}]})
+
+        await keeper.probe(service, self.model(keeper, "swin2sr-2x", keep_warm=True))
+
+        assert service.requests == [("swin2sr-2x", b"")]
+        assert keeper.get("swin2sr-2x").status == READY
+
+    @pytest.mark.asyncio
+    async def test_loading_model_is_followed_up(self, keeper, monkeypatch):
+        """Test that a loading model is re-probed until ready and its cold start recorded."""
+        monkeypatch.setattr("app.services.warm_keeper.MIN_FOLLOW_UP_SECONDS", 0.01)
+        service = FakeHFService(
+            {
+                "qwen-edit": [
+                    {"status": "loading", "estimated_time": 0.01},
+                    {"status": "loading", "estimated_time": 0.01},
+                    {"status": "ready"},
+                ]
+            }
+        )
+        readiness = await keeper.probe(service, self.model(keeper, "qwen-edit"))
+        assert readiness.status == LOADING
+
+        await keeper._follow_ups["qwen-edit"]
+        assert readiness.status == READY
+        assert readiness.cold_starts == 1
+        assert len(service.requests) == 3
+        assert "qwen-edit" not in keeper._follow_ups
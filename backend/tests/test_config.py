@@ -113,6 +113,19 @@ class TestSettingsLoading:
         assert len(models) == 1
         assert models[0]["id"] == "test"
 
+    def test_models_config_parsed_once(self, monkeypatch):
+        """Test that MODELS_CONFIG is parsed once per value, so model dicts keep their identity."""
+        monkeypatch.setenv("MODELS_CONFIG", '[{"id":"test","name":"Test Model","model":"test/model"}]')
+        settings = Settings()
+        settings._using_json_config = False
+
+        models = settings.get_models()
+        assert settings.get_models() is models
+        assert settings.get_model_by_id("test") is models[0]
+
+        settings.models_config = '[{"id":"other","name":"Other","model":"test/other"}]'
+        assert settings.get_models()[0]["id"] == "other"
+
     def test_models_config_invalid_json(self, monkeypatch):
         """Test MODELS_CONFIG with invalid JSON raises error."""
         monkeypatch.setenv("MODELS_CONFIG", "not valid json")
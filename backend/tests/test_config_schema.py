@@ -247,6 +247,60 @@ class TestConfigFile:
         with pytest.raises(ValidationError, match="Model IDs must be unique"):
             ConfigFile(**config_dict)
 
+    def test_fallback_model_validation(self):
+        """Test that a fallback model must exist and share the category."""
+        def model(model_id, category, fallback=None):
+            return {
+                "id": model_id,
+                "name": model_id,
+                "model": f"test/{model_id}",
+                "provider": "huggingface",
+                "category": category,
+                "description": "Test",
+                "fallback_model": fallback,
+            }
+
+        config = ConfigFile(models=[model("a", "restore", "b"), model("b", "restore")])
+        assert config.models[0].fallback_model == "b"
+
+        with pytest.raises(ValidationError, match="must be another configured model"):
+            ConfigFile(models=[model("a", "restore", "missing")])
+        with pytest.raises(ValidationError, match="same category"):
+            ConfigFile(models=[model("a", "restore", "b"), model("b", "upscale")])
+
+    def test_hedge_group_validation(self):
+        """Test that hedge groups pair two configured models of one category."""
+        def model(model_id, category):
+            return {
+                "id": model_id,
+                "name": model_id,
+                "model": f"test/{model_id}",
+                "provider": "huggingface",
+                "category": category,
+                "description": "Test",
+            }
+
+        models = [model("a", "restore"), model("b", "restore"), model("c", "upscale")]
+        config = ConfigFile(models=models, hedging={"enabled": True, "groups": [{"primary": "a", "secondary": "b"}]})
+        assert config.hedging.groups[0].percentile == 90
+
+        with pytest.raises(ValidationError, match="two configured models"):
+            ConfigFile(models=models, hedging={"groups": [{"primary": "a", "secondary": "missing"}]})
+        with pytest.raises(ValidationError, match="same category"):
+            ConfigFile(models=models, hedging={"groups": [{"primary": "a", "secondary": "c"}]})
+        with pytest.raises(ValidationError, match="more than one hedge group"):
+            ConfigFile(
+                models=models,
+                hedging={"groups": [{"primary": "a", "secondary": "b"}, {"primary": "a", "secondary": "b"}]},
+            )
+
+    def test_scheduler_heartbeat_within_lease(self):
+        """Test that the lease must outlast at least two heartbeats."""
+        assert ConfigFile(scheduler={"lease_seconds": 20, "heartbeat_seconds": 10}).scheduler.lease_seconds == 20
+
+        with pytest.raises(ValidationError, match="at most half"):
+            ConfigFile(scheduler={"lease_seconds": 15, "heartbeat_seconds": 10})
+
     def test_empty_models_allowed(self):
         """Test that empty models list is allowed."""
         config = ConfigFile(models=[])
@@ -9,7 +9,12 @@ from app.core.replicate_schema import (
     ParameterSchema,
     ReplicateModelSchema,
 )
-from app.services.schema_validator import SchemaValidator, ValidationWarning
+from app.services.schema_validator import (
+    CompiledSchema,
+    SchemaValidator,
+    ValidationWarning,
+    get_compiled_schema,
+)
 
 
 @pytest.fixture
@@ -249,3 +254,77 @@ def test_validation_warning_str():
     warning2 = ValidationWarning("field_name", "Error message")
     assert "field_name" in str(warning2)
     assert "Error message" in str(warning2)
+
+
+def sample_model(schema: ReplicateModelSchema, **parameters) -> dict:
+    """Model configuration with a replicate_schema and configured parameters."""
+    return {
+        "id": "sample-model",
+        "provider": "replicate",
+        "parameters": parameters,
+        "replicate_schema": schema.model_dump(),
+    }
+
+
+def test_compiled_schema_matches_validator(sample_schema):
+    """Test that the compiled schema validates exactly like SchemaValidator."""
+    parameters = {
+        "output_format": "gif",
+        "quality": 150,
+        "required_param": "x",
+        "enable_feature": "yes",
+        "unknown_param": 1,
+    }
+    validator = SchemaValidator(sample_schema)
+    expected = validator.validate_parameters(parameters)
+
+    validated, warnings = CompiledSchema(sample_schema).validate_parameters(parameters)
+
+    assert validated == expected
+    assert [str(w) for w in warnings] == [str(w) for w in validator.get_warnings()]
+
+
+def test_compiled_schema_merges_model_defaults(sample_schema):
+    """Test that configured parameters are validated once and used as defaults."""
+    compiled = CompiledSchema(sample_schema, {"quality": 500, "required_param": "configured"})
+
+    assert compiled.defaults["quality"] == 100
+    assert [w.field for w in compiled.default_warnings] == ["quality"]
+
+    # Required parameter satisfied by the configuration; user values win
+    validated, warnings = compiled.validate_parameters({"quality": 50})
+    assert validated == {
+        "output_format": "png",
+        "quality": 50,
+        "required_param": "configured",
+        "enable_feature": False,
+    }
+    assert warnings == []
+
+    with pytest.raises(ValueError, match="required_param"):
+        CompiledSchema(sample_schema).validate_parameters({})
+
+
+def test_compiled_enum_rejects_unhashable_value(sample_schema):
+    """Test that unhashable enum values fall back to the default."""
+    validated, warnings = CompiledSchema(sample_schema).validate_parameters(
+        {"required_param": "x", "output_format": ["jpg"]}
+    )
+
+    assert validated["output_format"] == "png"
+    assert warnings[0].field == "output_format"
+
+
+def test_get_compiled_schema_is_cached_per_config(sample_schema):
+    """Test that the registry compiles once and recompiles for a new configuration."""
+    model = sample_model(sample_schema, quality=90)
+    compiled = get_compiled_schema(model)
+
+    assert get_compiled_schema(model) is compiled
+    assert compiled.defaults["quality"] == 90
+
+    reloaded = sample_model(sample_schema, quality=70)
+    assert get_compiled_schema(reloaded) is not compiled
+    assert get_compiled_schema(reloaded).defaults["quality"] == 70
+
+    assert get_compiled_schema({"id": "no-schema"}) is None
@@ -0,0 +1,30 @@
+"""Tests for keyset pagination utilities."""
+from datetime import datetime
+
+import pytest
+
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+class TestCursorEncoding:
+    """Tests for encode_cursor / decode_cursor."""
+
+    def test_roundtrip(self):
+        """Test that a cursor decodes to the position it was built from."""
+        created_at = datetime(2025, 12, 24, 13, 1, 31, 320470)
+
+        cursor = encode_cursor(created_at, 42)
+
+        assert decode_cursor(cursor) == (created_at, 42)
+
+    def test_cursor_is_url_safe(self):
+        """Test that cursors can be passed in a query string unescaped."""
+        cursor = encode_cursor(datetime(2025, 1, 1), 123456789)
+
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["", "not-base64!", "e30", "eyJjIjoieCIsImkiOjF9"])
+    def test_rejects_malformed_cursors(self, cursor):
+        """Test that garbage, empty JSON and bad timestamps raise InvalidCursorError."""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
@@ -23,6 +23,7 @@ export interface HistoryResponse {
   total: number;
   limit: number;
   offset: number;
+  next_cursor?: string | null;
 }
 
 /**